@@ -0,0 +1,177 @@
+#  ****************************************************************************
+#  @run.py
+#
+#  @copyright 2023 e:fs TechHub GmbH and Audi AG. All rights reserved.
+#
+#  @license Apache v2.0
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#  ****************************************************************************
+
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import tempfile
+from argparse import ArgumentParser
+
+from osc_generator.osc_generator import OSCGenerator
+from benchmarks.synthetic import generate_recording, write_csv, write_osi
+
+BASELINES_PATH = os.path.join(os.path.dirname(__file__), 'baselines.json')
+OPENDRIVE_PATH = os.path.join(os.path.dirname(__file__), '..', 'tests', 'test_data', 'TestTrack.xodr')
+
+# Scale points: duration in s, number of objects, lane changes per minute of each vehicle
+SCALE_POINTS = {
+    'small': {'duration': 30.0, 'objects': 2, 'lane_changes_per_minute': 2.0},
+    'medium': {'duration': 60.0, 'objects': 4, 'lane_changes_per_minute': 2.0},
+    'large': {'duration': 120.0, 'objects': 8, 'lane_changes_per_minute': 2.0},
+}
+
+# A stage is a regression if it takes longer than tolerance * baseline + MIN_SLACK. The slack keeps stages of a few
+# milliseconds from failing by timer noise.
+DEFAULT_TOLERANCE = 1.5
+MIN_SLACK = 0.05
+
+
+def run_point(name: str, work_dir: str, repeat: int = 1, input_format: str = 'csv') -> dict:
+    """
+    Generates the recording of a scale point and runs generate_osc on it.
+
+    Args:
+        name: Scale point (see SCALE_POINTS)
+        work_dir: Directory for the recording and the scenario
+        repeat: Number of runs, the fastest time of each stage is reported
+        input_format: 'csv' or 'osi' trajectories file
+
+    Returns:
+        object (dict): Wall times in s per stage and of the whole generate_osc ('generate_osc'), rows and objects
+    """
+    point = SCALE_POINTS[name]
+    df = generate_recording(point['duration'], point['objects'], point['lane_changes_per_minute'])
+    trajectories_path = os.path.join(work_dir, name + '.' + input_format)
+    if input_format == 'osi':
+        write_osi(df, trajectories_path)
+    else:
+        write_csv(df, trajectories_path)
+    opendrive_path = os.path.join(work_dir, 'TestTrack.xodr')
+    shutil.copyfile(OPENDRIVE_PATH, opendrive_path)
+    output_path = os.path.join(work_dir, name + '.xosc')
+
+    times = {}
+    oscg = OSCGenerator()
+    for _ in range(repeat):
+        start = time.perf_counter()
+        oscg.generate_osc(trajectories_path, opendrive_path, output_path)
+        wall_time = time.perf_counter() - start
+        for stage in oscg.converter.metrics.summary():
+            times[stage['stage']] = min(times.get(stage['stage'], stage['wall_time']), stage['wall_time'])
+        times['generate_osc'] = min(times.get('generate_osc', wall_time), wall_time)
+    return {'rows': len(df), 'objects': point['objects'], 'times': times}
+
+
+def compare(results: dict, baselines: dict, tolerance: float = DEFAULT_TOLERANCE) -> list:
+    """
+    Compares the results with the baselines.
+
+    Args:
+        results: Results per scale point (see run_point)
+        baselines: Baselines in the same format
+        tolerance: Allowed factor of the baseline time
+
+    Returns:
+        object (list): Regressions as (scale point, stage, time, baseline time)
+    """
+    regressions = []
+    for name, result in results.items():
+        if name not in baselines:
+            continue
+        for stage, baseline in baselines[name]['times'].items():
+            current = result['times'].get(stage)
+            if current is not None and current > tolerance * baseline + MIN_SLACK:
+                regressions.append((name, stage, current, baseline))
+    return regressions
+
+
+def main(argv: list = None):
+    parser = ArgumentParser(prog='python -m benchmarks.run',
+                            description="Runs the pipeline on synthetic recordings and compares the stage times "
+                                        "with the stored baselines. Exits with 1 on a regression.")
+    parser.add_argument("points", nargs='*',
+                        help="Scale points to run (" + ', '.join(SCALE_POINTS) + "). Default is all.")
+    parser.add_argument("-r", "--repeat", dest="repeat", type=int, default=1,
+                        help="Runs per scale point, the fastest time of each stage is used.")
+    parser.add_argument("-f", "--format", dest="input_format", default='csv', choices=['csv', 'osi'],
+                        help="Format of the trajectories file. osi requires the Open Simulation Interface.")
+    parser.add_argument("--tolerance", dest="tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="Allowed factor of the baseline time per stage.")
+    parser.add_argument("--baselines", dest="baselines", default=BASELINES_PATH,
+                        help="Baselines file.")
+    parser.add_argument("--update", dest="update", action="store_true",
+                        help="Store the results as new baselines of the run scale points.")
+    parser.add_argument("-o", "--output", dest="output", default=None,
+                        help="Write the results to this JSON file.")
+    args = parser.parse_args(argv)
+    points = args.points or list(SCALE_POINTS)
+    for name in points:
+        if name not in SCALE_POINTS:
+            parser.error("unknown scale point: " + name)
+
+    baselines = {}
+    if os.path.isfile(args.baselines):
+        with open(args.baselines, 'r') as f:
+            baselines = json.load(f)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as work_dir:
+        # Warm-up, the first run imports the lazily imported modules
+        generate_recording(20.0, 1, 6.0).pipe(write_csv, os.path.join(work_dir, 'warmup.csv'))
+        shutil.copyfile(OPENDRIVE_PATH, os.path.join(work_dir, 'warmup.xodr'))
+        OSCGenerator().generate_osc(os.path.join(work_dir, 'warmup.csv'), os.path.join(work_dir, 'warmup.xodr'))
+
+        for name in points:
+            results[name] = run_point(name, work_dir, args.repeat, args.input_format)
+
+    print()
+    print('{:<8} {:<24} {:>10} {:>10}'.format('point', 'stage', 'time [s]', 'baseline'))
+    for name, result in results.items():
+        for stage, current in result['times'].items():
+            baseline = baselines.get(name, {}).get('times', {}).get(stage)
+            print('{:<8} {:<24} {:>10.3f} {:>10}'.format(name, stage, current,
+                                                         '-' if baseline is None else '{:.3f}'.format(baseline)))
+
+    if args.output is not None:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=4)
+
+    if args.update:
+        baselines.update(results)
+        baselines['machine'] = {'platform': platform.platform(), 'python': platform.python_version(),
+                                'processor': platform.processor()}
+        with open(args.baselines, 'w') as f:
+            json.dump(baselines, f, indent=4)
+            f.write('\n')
+        print('Baselines updated: ' + os.path.abspath(args.baselines))
+        return
+
+    regressions = compare(results, baselines, args.tolerance)
+    for name, stage, current, baseline in regressions:
+        print('REGRESSION {} {}: {:.3f} s, baseline {:.3f} s'.format(name, stage, current, baseline))
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
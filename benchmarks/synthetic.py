@@ -0,0 +1,249 @@
+#  ****************************************************************************
+#  @synthetic.py
+#
+#  @copyright 2023 e:fs TechHub GmbH and Audi AG. All rights reserved.
+#
+#  @license Apache v2.0
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#  ****************************************************************************
+
+import math
+import struct
+import numpy as np
+import pandas as pd
+
+# Start of the ego vehicle on the road of tests/test_data/TestTrack.xodr (see testfile_llc.csv)
+START_LAT = 48.96068916644596
+START_LON = 11.424023849492427
+START_HEADING = 87.54136678564001
+
+EARTH_RADIUS = 6371000.0
+LANE_WIDTH = 3.5
+NUMBER_OF_LANES = 3
+LANE_CHANGE_DURATION = 4.0
+MARKING_RANGE = 50.0
+
+# Column layout of the relative csv input (see Converter.process_trajectories)
+EGO_COLUMNS = ['timestamp', 'lat', 'long', 'heading', 'speed', 'lin_left_typ', 'lin_right_typ', 'lin_left_beginn_x',
+               'lin_left_y_abstand', 'lin_left_kruemm', 'lin_left_ende_x', 'lin_left_breite', 'lin_right_beginn_x',
+               'lin_right_y_abstand', 'lin_right_kruemm', 'lin_right_ende_x', 'lin_right_breite']
+OBJECT_COLUMNS = ['pos_x_', 'pos_y_', 'speed_x_', 'speed_y_', 'class_']
+
+
+def _lane_change_times(duration: float, lane_changes_per_minute: float, rng: np.random.Generator) -> list:
+    """
+    Start times of lane changes, exponentially distributed with the given rate and at least one lane change
+    duration apart, so consecutive lane changes do not overlap.
+    """
+    times = []
+    if lane_changes_per_minute <= 0:
+        return times
+    t = rng.exponential(60.0 / lane_changes_per_minute)
+    while t + LANE_CHANGE_DURATION < duration:
+        times.append(t)
+        t += 2 * LANE_CHANGE_DURATION + rng.exponential(60.0 / lane_changes_per_minute)
+    return times
+
+
+def _lateral_offset(t: np.ndarray, duration: float, lane_changes_per_minute: float, start_lane: int,
+                    rng: np.random.Generator) -> np.ndarray:
+    """
+    Lateral offset in m of a vehicle from the center of the rightmost lane, left positive. A lane change moves
+    the vehicle by one lane width along a cosine ramp, to the left unless it is on the leftmost lane.
+    """
+    offset = np.full(len(t), start_lane * LANE_WIDTH)
+    lane = start_lane
+    for start in _lane_change_times(duration, lane_changes_per_minute, rng):
+        if lane == NUMBER_OF_LANES - 1:
+            direction = -1
+        elif lane == 0:
+            direction = 1
+        else:
+            direction = rng.choice([-1, 1])
+        lane += direction
+        ramp = np.clip((t - start) / LANE_CHANGE_DURATION, 0.0, 1.0)
+        offset += direction * LANE_WIDTH * (1 - np.cos(np.pi * ramp)) / 2
+    return offset
+
+
+def _speed_profile(t: np.ndarray, frame_rate: float, rng: np.random.Generator) -> np.ndarray:
+    """
+    Speed in km/h with alternating phases of acceleration, constant speed and deceleration of 5 to 15 s.
+    """
+    acceleration = np.zeros(len(t))
+    i = 0
+    while i < len(t):
+        length = int(rng.uniform(5.0, 15.0) * frame_rate)
+        acceleration[i:i + length] = rng.choice([-1.0, 0.0, 1.0]) * rng.uniform(0.5, 1.5)
+        i += length
+    speed = 100.0 / 3.6 + np.cumsum(acceleration) / frame_rate
+    return np.clip(speed, 60.0 / 3.6, 130.0 / 3.6) * 3.6
+
+
+def generate_recording(duration: float = 60.0, objects: int = 4, lane_changes_per_minute: float = 1.0,
+                       frame_rate: float = 10.0, seed: int = 0) -> pd.DataFrame:
+    """
+    Synthetic recording of an ego vehicle and surrounding objects on a straight road with three lanes, in the
+    column layout of the relative csv input.
+
+    The ego vehicle starts on the middle lane and changes its speed every 5 to 15 s. Ego and objects change lanes
+    with the given rate. The objects drive within 40 m in front of or behind the ego vehicle, so no object is
+    removed as irrelevant.
+
+    Args:
+        duration: Length of the recording in s
+        objects: Number of objects (pos_x_1 ... class_N)
+        lane_changes_per_minute: Mean number of lane changes per minute of each vehicle
+        frame_rate: Frames per second
+        seed: Seed of the random generator, the same arguments give the same recording
+
+    Returns:
+        object (pd.DataFrame): Recording
+    """
+    if not isinstance(duration, (int, float)):
+        raise TypeError("input must be a float")
+    if not isinstance(objects, int):
+        raise TypeError("input must be a int")
+    if not isinstance(lane_changes_per_minute, (int, float)):
+        raise TypeError("input must be a float")
+    if not isinstance(frame_rate, float):
+        raise TypeError("input must be a float")
+    if not isinstance(seed, int):
+        raise TypeError("input must be a int")
+
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(round(duration * frame_rate))) / frame_rate
+
+    # Ego
+    speed = _speed_profile(t, frame_rate, rng)
+    distance = np.concatenate([[0.0], np.cumsum(speed[:-1] / 3.6) / frame_rate])
+    ego_offset = _lateral_offset(t, duration, lane_changes_per_minute, 1, rng)
+    heading = math.radians(START_HEADING)
+    # Forward and left unit vectors in east and north
+    east = distance * math.sin(heading) - ego_offset * math.cos(heading)
+    north = distance * math.cos(heading) + ego_offset * math.sin(heading)
+    lat = START_LAT + np.degrees(north / EARTH_RADIUS)
+    lon = START_LON + np.degrees(east / (EARTH_RADIUS * math.cos(math.radians(START_LAT))))
+
+    # The camera reports the markings of the lane of the previous frame, so the crossed marking is seen on the other
+    # side for one frame, as in recorded data
+    lane = np.floor((np.concatenate([ego_offset[:1], ego_offset[:-1]]) + LANE_WIDTH / 2) / LANE_WIDTH)
+    left_marking = (lane + 0.5) * LANE_WIDTH - ego_offset
+    right_marking = (lane - 0.5) * LANE_WIDTH - ego_offset
+
+    n = len(t)
+    data = {'timestamp': np.round(t, 6), 'lat': lat, 'long': lon, 'heading': np.full(n, START_HEADING),
+            'speed': speed,
+            'lin_left_typ': np.full(n, 2), 'lin_right_typ': np.full(n, 1),
+            'lin_left_beginn_x': np.zeros(n), 'lin_left_y_abstand': left_marking, 'lin_left_kruemm': np.zeros(n),
+            'lin_left_ende_x': np.full(n, MARKING_RANGE), 'lin_left_breite': np.full(n, 0.15),
+            'lin_right_beginn_x': np.zeros(n), 'lin_right_y_abstand': right_marking,
+            'lin_right_kruemm': np.zeros(n), 'lin_right_ende_x': np.full(n, MARKING_RANGE),
+            'lin_right_breite': np.full(n, 0.15)}
+
+    # Objects
+    for i in range(1, objects + 1):
+        offset = _lateral_offset(t, duration, lane_changes_per_minute, int(rng.integers(NUMBER_OF_LANES)), rng)
+        # Gap oscillates around a start gap, relative speed follows
+        gap_start = rng.uniform(-30.0, 30.0)
+        period = rng.uniform(20.0, 60.0)
+        gap = gap_start + 10.0 * np.sin(2 * np.pi * t / period)
+        relative_speed = 10.0 * 2 * np.pi / period * np.cos(2 * np.pi * t / period)
+        data['pos_x_' + str(i)] = gap
+        data['pos_y_' + str(i)] = offset - ego_offset
+        data['speed_x_' + str(i)] = speed + relative_speed * 3.6
+        data['speed_y_' + str(i)] = np.gradient(offset, 1.0 / frame_rate) * 3.6
+        data['class_' + str(i)] = np.full(n, 7)
+
+    return pd.DataFrame(data)
+
+
+def write_csv(df: pd.DataFrame, path: str) -> str:
+    """
+    Writes a recording as csv trajectories file.
+
+    Args:
+        df: Recording (see generate_recording)
+        path: Path of the csv file
+
+    Returns:
+        object (str): Path of the csv file
+    """
+    if not isinstance(df, pd.DataFrame):
+        raise TypeError("input must be a pd.DataFrame")
+    if not isinstance(path, str):
+        raise TypeError("input must be a str")
+    df.to_csv(path, index=False)
+    return path
+
+
+def write_osi(df: pd.DataFrame, path: str) -> str:
+    """
+    Writes a recording as OSI trace of SensorView messages, which osi_transformer.osi2df reads back into the
+    csv layout. Requires the osi3 package of the Open Simulation Interface.
+
+    Args:
+        df: Recording (see generate_recording)
+        path: Path of the osi file
+
+    Returns:
+        object (str): Path of the osi file
+    """
+    if not isinstance(df, pd.DataFrame):
+        raise TypeError("input must be a pd.DataFrame")
+    if not isinstance(path, str):
+        raise TypeError("input must be a str")
+    try:
+        from osi3.osi_sensorview_pb2 import SensorView
+    except ImportError:
+        raise ImportError("writing osi files requires the osi3 package of the Open Simulation Interface: "
+                          "https://github.com/OpenSimulationInterface/open-simulation-interface")
+
+    objects = len(df.filter(regex='^pos_x_').columns)
+    with open(path, 'wb') as f:
+        for row in df.itertuples(index=False):
+            row = row._asdict()
+            sensor_view = SensorView()
+            ground_truth = sensor_view.global_ground_truth
+            ground_truth.timestamp.seconds = int(row['timestamp'])
+            ground_truth.timestamp.nanos = int(round((row['timestamp'] % 1) * 1e9))
+
+            # The ego vehicle is the first moving object
+            ego = ground_truth.moving_object.add()
+            ego.base.position.x = row['lat']
+            ego.base.position.y = row['long']
+            ego.base.velocity.x = row['speed']
+            ego.base.orientation.yaw = row['heading']
+            for i in range(1, objects + 1):
+                obj = ground_truth.moving_object.add()
+                obj.base.position.x = row['pos_x_' + str(i)]
+                obj.base.position.y = row['pos_y_' + str(i)]
+                obj.base.velocity.x = row['speed_x_' + str(i)]
+                obj.base.velocity.y = row['speed_y_' + str(i)]
+                obj.vehicle_classification.type = int(row['class_' + str(i)])
+
+            # Lane boundary 0 is the right, 1 the left marking
+            for lane_id, side in [(0, 'right'), (1, 'left')]:
+                boundary = ground_truth.lane_boundary.add()
+                boundary.id.value = lane_id
+                boundary.classification.type = int(row['lin_' + side + '_typ'])
+                line = boundary.boundary_line.add()
+                line.position.x = row['lin_' + side + '_beginn_x']
+                line.position.y = row['lin_' + side + '_y_abstand']
+                line.width = row['lin_' + side + '_breite']
+
+            message = sensor_view.SerializeToString()
+            f.write(struct.pack('<L', len(message)))
+            f.write(message)
+    return path
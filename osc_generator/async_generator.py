@@ -0,0 +1,227 @@
+#  ****************************************************************************
+#  @async_generator.py
+#
+#  @copyright 2023 e:fs TechHub GmbH and Audi AG. All rights reserved.
+#
+#  @license Apache v2.0
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#  ****************************************************************************
+
+import os
+import json
+import asyncio
+import threading
+from typing import Union, TYPE_CHECKING
+from concurrent.futures import Executor, ProcessPoolExecutor
+
+from .osc_generator import OSCGenerator
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Options of AsyncOSCGenerator.generate, the file based options of generate_osc (skip_unchanged, diagnostics)
+# are not available
+OPTIONS = ('catalog_path', 'osc_version', 'frame_rate', 'parameterize')
+
+# One generator per worker thread or process, a generator holds the state of one run
+_local = threading.local()
+
+
+def _generate(trajectories: Union['pd.DataFrame', bytes], opendrive: Union[bytes, dict], options: dict) -> str:
+    """
+    Generates a scenario in memory, executed by the executor of AsyncOSCGenerator.
+    """
+    generator = getattr(_local, 'generator', None)
+    if generator is None:
+        generator = _local.generator = OSCGenerator()
+    else:
+        # The options of a call do not carry over to later calls
+        generator.reset()
+    try:
+        return generator.generate_osc_from_memory(trajectories, opendrive, **options)
+    except BaseException:
+        # A failed run may leave the converter in an intermediate state
+        _local.generator = None
+        raise
+
+
+def _generate_osi(trajectories_path: str, opendrive: Union[bytes, dict], options: dict) -> str:
+    """
+    Reads an OSI trace and generates its scenario in memory, executed by the executor of AsyncOSCGenerator.
+    The bounding boxes of the trace are added to the user configuration of the options.
+    """
+    from .tools.osi_transformer import osi2df
+    from .tools.user_config import UserConfig
+    user_config = UserConfig('')
+    user_config.load_config(options.get('user_config') or {})
+    trajectories = osi2df(trajectories_path, user_config)
+    return _generate(trajectories, opendrive, dict(options, user_config=user_config.get_config(), data_type='osi'))
+
+
+def _read_inputs(trajectories_path: str, opendrive_path: str) -> tuple:
+    """
+    Contents of the trajectories (None for OSI traces, which are read by the executor), OpenDRIVE and user
+    configuration (None if not present) files.
+    """
+    trajectories = None
+    if trajectories_path.endswith('.csv'):
+        with open(trajectories_path, 'rb') as f:
+            trajectories = f.read()
+    with open(opendrive_path, 'rb') as f:
+        opendrive = f.read()
+    user_config = None
+    config_path = os.path.join(os.path.dirname(trajectories_path), 'user_config.json')
+    if os.path.isfile(config_path):
+        with open(config_path, 'r') as f:
+            user_config = json.load(f)
+    return trajectories, opendrive, user_config
+
+
+def _write_output(trajectories_path: str, output_scenario_path: str, parameterize: bool, scenario: str) -> str:
+    """
+    Writes the scenario to the given path or the path generate_osc would choose.
+    """
+    if output_scenario_path is None:
+        from .tools.scenario_writer import create_output_path
+        output_scenario_path = create_output_path(os.path.dirname(trajectories_path),
+                                                  os.path.basename(trajectories_path), True, False, 2.0,
+                                                  parameterize)
+    with open(output_scenario_path, 'wb') as f:
+        f.write(scenario.encode('utf-8'))
+    return output_scenario_path
+
+
+class AsyncOSCGenerator:
+    """
+    asyncio facade of OSCGenerator for async services. Files are read and written in the default executor of the
+    event loop, trajectory processing, labeling and XML writing run in the given executor, so the event loop is
+    never blocked by a generation. OSI traces are read in the given executor as well.
+
+    At most max_concurrency generations run at once, further calls wait. A cancelled call that has not started yet
+    is not run; a running generation cannot be interrupted, its result is discarded and its output is not written.
+    """
+
+    def __init__(self, executor: Executor = None, max_concurrency: int = 4):
+        """
+        Args:
+            executor: Executor of the generation stages, e.g. a ThreadPoolExecutor. If not specified, a process pool
+                with max_concurrency workers is created on first use and shut down by close().
+            max_concurrency: Maximum number of generations in flight
+        """
+        if executor is not None and not isinstance(executor, Executor):
+            raise TypeError("input must be a Executor")
+        if not isinstance(max_concurrency, int):
+            raise TypeError("input must be a int")
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+
+        self.max_concurrency = max_concurrency
+        self._executor = executor
+        self._own_executor = executor is None
+        self._semaphore = None
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_concurrency)
+        return self._executor
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        # Created in the running event loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    @staticmethod
+    def _options(kwargs: dict) -> dict:
+        unknown = set(kwargs) - set(OPTIONS)
+        if unknown:
+            raise ValueError("unknown options: " + ', '.join(sorted(unknown)))
+        return {key: value for key, value in kwargs.items() if value is not None}
+
+    async def generate(self, trajectories_path: str, opendrive_path: str, output_scenario_path: str = None,
+                       **kwargs) -> str:
+        """
+        Generates an OpenSCENARIO file based on trajectories (csv or OSI trace) and an OpenDRIVE file.
+
+        Args:
+            trajectories_path: Path to the file containing the object trajectories used as input
+            opendrive_path: Path to the OpenDRIVE file which describes the road net which the objects are using
+            output_scenario_path: Output file path and name. If not specified, the path of generate_osc is used.
+            keyword arguments: catalog_path, osc_version, frame_rate, parameterize (see OSCGenerator.generate_osc)
+
+        Returns:
+            object (str): Path to the scenario file
+        """
+        if not isinstance(trajectories_path, str):
+            raise TypeError("input must be a str")
+        if not isinstance(opendrive_path, str):
+            raise TypeError("input must be a str")
+        if output_scenario_path is not None and not isinstance(output_scenario_path, str):
+            raise TypeError("input must be a str")
+        if not trajectories_path.endswith(('.csv', '.osi')):
+            raise ValueError("trajectories must be a csv or osi file")
+        options = self._options(kwargs)
+
+        loop = asyncio.get_running_loop()
+        async with self._get_semaphore():
+            trajectories, opendrive, user_config = await loop.run_in_executor(
+                None, _read_inputs, trajectories_path, opendrive_path)
+            options['opendrive_name'] = os.path.basename(opendrive_path)
+            if user_config is not None:
+                options['user_config'] = user_config
+            if trajectories is None:
+                # Reading an OSI trace is as costly as processing it
+                scenario = await loop.run_in_executor(self._get_executor(), _generate_osi, trajectories_path,
+                                                      opendrive, options)
+            else:
+                scenario = await loop.run_in_executor(self._get_executor(), _generate, trajectories, opendrive,
+                                                      options)
+            return await loop.run_in_executor(
+                None, _write_output, trajectories_path, output_scenario_path, bool(options.get('parameterize')),
+                scenario)
+
+    async def generate_from_memory(self, trajectories: Union['pd.DataFrame', bytes], opendrive: Union[bytes, dict],
+                                   **kwargs) -> str:
+        """
+        Generates a scenario from inputs held in memory (see OSCGenerator.generate_osc_from_memory).
+
+        Args:
+            trajectories: Object trajectories as dataframe or content of a csv file
+            opendrive: Content of the OpenDRIVE file or its parsed header
+            keyword arguments: opendrive_name, user_config, data_type and the options of generate
+
+        Returns:
+            object (str): Scenario
+        """
+        options = {key: kwargs.pop(key) for key in ['opendrive_name', 'user_config', 'data_type'] if key in kwargs}
+        options.update(self._options(kwargs))
+
+        loop = asyncio.get_running_loop()
+        async with self._get_semaphore():
+            return await loop.run_in_executor(self._get_executor(), _generate, trajectories, opendrive, options)
+
+    def close(self):
+        """
+        Shuts down the executor if it was created by this object.
+        """
+        if self._own_executor and self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        # Waits for running generations, without blocking the event loop
+        await asyncio.get_running_loop().run_in_executor(None, self.close)
@@ -0,0 +1,352 @@
+#  ****************************************************************************
+#  @batch.py
+#
+#  @copyright 2023 e:fs TechHub GmbH and Audi AG. All rights reserved.
+#
+#  @license Apache v2.0
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#  ****************************************************************************
+
+import os
+import sys
+import csv
+import glob
+import json
+import time
+import traceback
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from .osc_generator import OSCGenerator
+from .tools.user_config import UserConfig
+
+JOURNAL_NAME = 'osc_generator_batch.jsonl'
+
+# Options of run_batch which change the generated scenarios, a job run with other values is a different job
+SCENARIO_OPTIONS = ('catalog_path', 'osc_version', 'frame_rate', 'parameterize', 'vehicle_catalog')
+
+# Generator of the worker process, created once and reused for all jobs of the worker
+_generator = None
+
+
+def collect_jobs(source: str, opendrive_path: str = None, output_dir: str = None) -> list:
+    """
+    Jobs of a batch from a manifest, a directory or a glob pattern of trajectory files.
+
+    Args:
+        source: Manifest (.csv with columns trajectories, opendrive and optional output, or .json with a list of
+            objects with these keys), directory (all .csv and .osi files) or glob pattern of trajectory files.
+            Relative paths in a manifest are relative to the manifest.
+        opendrive_path: OpenDRIVE file of all jobs, required for directories and glob patterns
+        output_dir: Directory of the scenarios for directories and glob patterns. If not specified, a directory
+            and name will be chosen per job.
+
+    Returns:
+        object (list): Jobs as dicts with keys trajectories, opendrive and output (None if chosen per job)
+    """
+    if not isinstance(source, str):
+        raise TypeError("input must be a str")
+    if opendrive_path is not None and not isinstance(opendrive_path, str):
+        raise TypeError("input must be a str")
+    if output_dir is not None and not isinstance(output_dir, str):
+        raise TypeError("input must be a str")
+
+    if os.path.isfile(source) and source.endswith(('.csv', '.json')):
+        base_dir = os.path.dirname(os.path.abspath(source))
+        if source.endswith('.json'):
+            with open(source, 'r') as manifest:
+                entries = json.load(manifest)
+        else:
+            with open(source, 'r', newline='') as manifest:
+                entries = list(csv.DictReader(manifest))
+
+        jobs = []
+        for entry in entries:
+            if not entry.get('trajectories') or not entry.get('opendrive'):
+                raise ValueError("manifest entries need trajectories and opendrive: " + str(entry))
+            output = entry.get('output') or None
+            jobs.append({'trajectories': os.path.join(base_dir, entry['trajectories']),
+                         'opendrive': os.path.join(base_dir, entry['opendrive']),
+                         'output': os.path.join(base_dir, output) if output else None})
+        return jobs
+
+    if opendrive_path is None:
+        raise ValueError("an OpenDRIVE file is required for a directory or glob pattern")
+    if os.path.isdir(source):
+        paths = glob.glob(os.path.join(source, '*.csv')) + glob.glob(os.path.join(source, '*.osi'))
+    else:
+        paths = glob.glob(source, recursive=True)
+
+    jobs = []
+    for path in sorted(paths):
+        output = None
+        if output_dir is not None:
+            output = os.path.join(output_dir, os.path.splitext(os.path.basename(path))[0] + '.xosc')
+        jobs.append({'trajectories': os.path.abspath(path), 'opendrive': os.path.abspath(opendrive_path),
+                     'output': output})
+    return jobs
+
+
+def job_key(job: dict, options: dict = None) -> str:
+    """
+    Identifies a job in the journal.
+
+    Args:
+        job: Job (see collect_jobs)
+        options: Options of the batch, those of SCENARIO_OPTIONS which are set are part of the key
+
+    Returns:
+        object (str): Key of the job
+    """
+    output = os.path.abspath(job['output']) if job['output'] else ''
+    parts = [os.path.abspath(job['trajectories']), os.path.abspath(job['opendrive']), output]
+    scenario_options = {key: value for key, value in (options or {}).items()
+                        if key in SCENARIO_OPTIONS and value is not None and value is not False}
+    if scenario_options:
+        parts.append(json.dumps(scenario_options, sort_keys=True))
+    return '|'.join(parts)
+
+
+def read_journal(journal_path: str) -> dict:
+    """
+    Last recorded status of each job in a journal. Incomplete lines of an interrupted batch are ignored.
+
+    Args:
+        journal_path: Path to the journal (JSON lines)
+
+    Returns:
+        object (dict): Journal entries by job key
+    """
+    if not isinstance(journal_path, str):
+        raise TypeError("input must be a str")
+
+    entries = {}
+    if not os.path.isfile(journal_path):
+        return entries
+    with open(journal_path, 'r') as journal:
+        for line in journal:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            entries[entry['job']] = entry
+    return entries
+
+
+def _run_job(job: dict, options: dict, key: str = None) -> dict:
+    """
+    Generates the scenario of one job, executed in a worker process.
+    With the option vehicle_catalog, the vehicles are referenced from a catalog with stable entry names and their
+    definitions are part of the journal entry, so run_batch writes one catalog for all jobs.
+
+    Args:
+        job: Job (see collect_jobs)
+        options: Options of OSCGenerator.generate_osc
+        key: Key of the job in the journal, if not specified the key of the job and options
+
+    Returns:
+        object (dict): Journal entry of the job
+    """
+    global _generator
+    if _generator is None:
+        _generator = OSCGenerator()
+    else:
+        # Jobs of a server carry their own options
+        _generator.reset()
+    generate_options = options
+    vehicle_catalog = None
+    if options.get('vehicle_catalog') is True:
+        from .tools.scenario_writer import VehicleCatalog
+        vehicle_catalog = VehicleCatalog(options.get('osc_version') or '1.0', stable_names=True)
+        generate_options = dict(options, vehicle_catalog=vehicle_catalog)
+    start = time.perf_counter()
+    try:
+        _generator.generate_osc(job['trajectories'], job['opendrive'], job['output'], **generate_options)
+        entry = {'status': 'done', 'output': os.path.abspath(_generator.converter.outfile)}
+        # Empty if the scenario was unchanged, the definitions of the earlier run are in the journal
+        if vehicle_catalog is not None and len(vehicle_catalog):
+            entry['vehicles'] = vehicle_catalog.definitions()
+    except Exception:
+        # A failed run may leave the converter in an intermediate state
+        _generator = None
+        entry = {'status': 'failed', 'error': traceback.format_exc(limit=3)}
+    entry['job'] = key if key is not None else job_key(job, options)
+    entry['seconds'] = round(time.perf_counter() - start, 3)
+    return entry
+
+
+def _write_vehicle_catalogs(journal_path: str, keys: list, osc_version: str) -> list:
+    """
+    Helper function. Writes one VehicleCatalog per scenario directory with the vehicles of the jobs recorded in the
+    journal, including those of jobs done in an earlier run of the batch.
+
+    Args:
+        journal_path: Path to the journal (JSON lines)
+        keys: Keys of the jobs of the batch
+        osc_version: OpenSCENARIO version of the catalogs
+
+    Returns:
+        object (list): Paths to the catalog files
+    """
+    from .tools.scenario_writer import VehicleCatalog
+
+    keys = set(keys)
+    vehicles = {}
+    with open(journal_path, 'r') as journal:
+        for line in journal:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if entry['job'] in keys and entry['status'] == 'done' and entry.get('vehicles'):
+                vehicles[entry['job']] = (os.path.dirname(entry['output']), entry['vehicles'])
+
+    catalogs = {}
+    for dir_name, definitions in vehicles.values():
+        if dir_name not in catalogs:
+            catalogs[dir_name] = VehicleCatalog(osc_version, stable_names=True)
+        for name, bb_input, control in definitions:
+            catalogs[dir_name].reference(name, bb_input, control)
+    return [catalogs[dir_name].write(dir_name) for dir_name in sorted(catalogs)]
+
+
+def run_batch(jobs: list, journal_path: str = JOURNAL_NAME, max_workers: int = 1, **kwargs) -> dict:
+    """
+    Generates the scenarios of all jobs on a process pool. The status of each job is appended to a journal,
+    jobs which are done according to the journal are skipped, so an interrupted batch resumes where it stopped.
+    Failed jobs are retried.
+
+    Args:
+        jobs: Jobs (see collect_jobs)
+        journal_path: Path to the journal (JSON lines)
+        max_workers: Number of worker processes, 1 runs all jobs in this process
+        keyword arguments: Options of OSCGenerator.generate_osc for all jobs (catalog_path, osc_version,
+            frame_rate, parameterize, vehicle_catalog, skip_unchanged, max_memory, cache_dir, cache_size).
+            With vehicle_catalog=True, one VehicleCatalog per scenario directory is filled by all jobs and
+            written once after the last job.
+
+    Returns:
+        object (dict): Number of jobs done, failed and skipped, duration in s and throughput in scenarios/s
+    """
+    if not isinstance(jobs, list):
+        raise TypeError("input must be a list")
+    if not isinstance(journal_path, str):
+        raise TypeError("input must be a str")
+    if not isinstance(max_workers, int):
+        raise TypeError("input must be a int")
+    if max_workers < 1:
+        raise ValueError("max_workers must be at least 1")
+
+    journal = read_journal(journal_path)
+    keys = [job_key(job, kwargs) for job in jobs]
+    pending = [(job, key) for job, key in zip(jobs, keys) if journal.get(key, {}).get('status') != 'done']
+    summary = {'done': 0, 'failed': 0, 'skipped': len(jobs) - len(pending)}
+
+    # Written once here instead of by each job, jobs of a directory share the configuration
+    options = dict(kwargs)
+    catalog_path = options.pop('catalog_path', None)
+    if catalog_path is not None:
+        for dir_name in sorted({os.path.dirname(job['trajectories']) for job, _ in pending}):
+            user_config = UserConfig(dir_name)
+            user_config.read_config()
+            user_config.catalogs = catalog_path
+            user_config.write_config()
+
+    start = time.perf_counter()
+    with open(journal_path, 'a') as journal_file:
+        def record(entry: dict):
+            summary[entry['status']] += 1
+            journal_file.write(json.dumps(entry, sort_keys=True) + '\n')
+            journal_file.flush()
+
+        if max_workers == 1:
+            for job, key in pending:
+                record(_run_job(job, options, key))
+        else:
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                futures = [executor.submit(_run_job, job, options, key) for job, key in pending]
+                for future in as_completed(futures):
+                    record(future.result())
+
+    if options.get('vehicle_catalog'):
+        _write_vehicle_catalogs(journal_path, keys, options.get('osc_version') or '1.0')
+
+    summary['seconds'] = time.perf_counter() - start
+    summary['throughput'] = summary['done'] / summary['seconds'] if summary['seconds'] > 0 else 0.0
+    return summary
+
+
+def main(argv: list = None):
+    parser = ArgumentParser(prog='osc_generator batch',
+                            description='Generate the scenarios of many trajectory files on a process pool.')
+    parser.add_argument("source",
+                        help="manifest (.csv or .json with trajectories, opendrive and optional output), "
+                             "directory or glob pattern of trajectory files")
+    parser.add_argument("-d", "--opendrive", dest="opendrive_path", default=None,
+                        help="opendrive file of all trajectory files of a directory or glob pattern")
+    parser.add_argument("-o", "--outputdir", dest="output_dir", default=None,
+                        help="output directory for a directory or glob pattern. If not specified, a directory and "
+                             "name will be chosen per file.")
+    parser.add_argument("-j", "--jobs", dest="jobs", type=int, default=os.cpu_count() or 1,
+                        help="number of worker processes. If not specified, the number of CPUs is used.")
+    parser.add_argument("--journal", dest="journal_path", default=JOURNAL_NAME,
+                        help="journal of the job status, used to resume an interrupted batch. "
+                             "Default is " + JOURNAL_NAME)
+    parser.add_argument("-cat", "--catalog", dest="catalog_path", default=None,
+                        help="catalog file path and name. If not specified, a default catalog path is used. ")
+    parser.add_argument("-oscv", "--oscversion", dest="osc_version", default=None,
+                        help="Desired version of the output OpenScenario files. If not specified, default is OSC V1.0 ")
+    parser.add_argument("-fr", "--framerate", dest="frame_rate", default=None,
+                        help="Resample the trajectories to this frame rate in Hz. If not specified, "
+                             "10 Hz input is assumed.")
+    parser.add_argument("-p", "--parameterize", dest="parameterize", action="store_true",
+                        help="Declare the trigger radius and a speed factor as scenario parameters. Requires OSC V1.1 "
+                             "or later.")
+    parser.add_argument("-vc", "--vehiclecatalog", dest="vehicle_catalog", action="store_true",
+                        help="Reference the vehicles from one VehicleCatalog per output directory, which is written "
+                             "once after the last job, instead of defining them inline.")
+    parser.add_argument("-su", "--skipunchanged", dest="skip_unchanged", action="store_true",
+                        help="Skip scenarios which were generated from the same inputs, parameters and generator "
+                             "version.")
+    parser.add_argument("-mm", "--maxmemory", dest="max_memory", type=int, default=None,
+                        help="Memory budget in MB for the trajectory data of each job. If exceeded, the trajectories "
+                             "are processed in chunks and spilled to temporary files.")
+    parser.add_argument("-c", "--cache", dest="cache_dir", default=None,
+                        help="Directory of a cache of processed trajectories, shared by the workers.")
+    parser.add_argument("--cachesize", dest="cache_size", type=int, default=1024,
+                        help="Maximum size of the cache in MB. Default is 1024")
+    args = parser.parse_args(argv)
+
+    jobs = collect_jobs(args.source, args.opendrive_path, args.output_dir)
+    if args.output_dir is not None:
+        os.makedirs(args.output_dir, exist_ok=True)
+    summary = run_batch(jobs, args.journal_path, max(1, args.jobs),
+                        catalog_path=args.catalog_path,
+                        osc_version=args.osc_version,
+                        frame_rate=args.frame_rate,
+                        parameterize=args.parameterize,
+                        vehicle_catalog=args.vehicle_catalog,
+                        skip_unchanged=args.skip_unchanged,
+                        max_memory=None if args.max_memory is None else args.max_memory * 2 ** 20,
+                        cache_dir=args.cache_dir,
+                        cache_size=args.cache_size * 2 ** 20)
+    print('Batch finished: {done} done, {failed} failed, {skipped} skipped in {seconds:.1f} s '
+          '({throughput:.2f} scenarios/s)'.format(**summary))
+    if summary['failed']:
+        print('Failed jobs are listed in ' + os.path.abspath(args.journal_path) + ', run again to retry them')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -19,13 +19,20 @@
 #  ****************************************************************************
 
 import os
+import io
+from typing import Union, TextIO, TYPE_CHECKING
 
-from .tools.converter import Converter
 from .tools.user_config import UserConfig
 import sys
 from argparse import ArgumentParser
 from .version import __version__
 
+# The tools import pandas, pyproj, shapely and scenariogeneration. They are imported on first use,
+# so the CLI starts fast for --version, --help and the batch dispatch.
+if TYPE_CHECKING:
+    import pandas as pd
+    from .tools.converter import Converter
+
 
 class OSCGenerator:
     """
@@ -35,7 +42,17 @@ class OSCGenerator:
 
     """
     def __init__(self):
-        self.converter: Converter = Converter()
+        from .tools.converter import Converter
+        self.converter: 'Converter' = Converter()
+
+    def reset(self):
+        """
+        Replaces the converter by a new one, so the options and results of earlier runs do not carry over.
+        The memoised OpenDRIVE headers, projections and transformers are kept.
+
+        """
+        from .tools.converter import Converter
+        self.converter = Converter()
 
     def generate_osc(self, trajectories_path: str, opendrive_path: str, output_scenario_path: str = None,
                      **kwargs: str):
@@ -50,6 +67,25 @@ class OSCGenerator:
             keyword arguments:
                 catalog_path: Path to the catalog file containing vehicle catalog information for the output scenario
                 osc_version: Desired version of the output OpenScenario file. Default is OSC V1.0
+                frame_rate: Resample the trajectories to this frame rate in Hz. Default is 10 Hz input without resampling
+                parameterize: Declare trigger radius and speed factor as scenario parameters, requires OSC V1.1 or
+                    later. Default is False
+                vehicle_catalog: Reference the vehicles from a generated VehicleCatalog instead of defining them
+                    inline. True writes the catalog below the directory of the scenario, a VehicleCatalog is only
+                    filled and written by the caller, e.g. once for a batch. Default is False
+                skip_unchanged: Write a content hash of inputs, parameters and generator version into the scenario
+                    and skip the generation, if the existing scenario has the same hash. Default is False
+                diagnostics: Intermediate results, 'off', 'npz' (one compressed file) or 'legacy' (csv and xlsx
+                    files). Default is 'off'
+                metrics: Path of a JSON file for the wall time, CPU time, peak RSS and processed rows, objects and
+                    events of each stage (see self.converter.metrics). Default is no file
+                profile_memory: Record the peak allocations and RSS of each stage in the metrics. Default is False
+                max_memory: Memory budget in bytes for the trajectory data. If exceeded, the trajectories are processed
+                    in chunks and spilled to temporary files. Default is no budget
+                cache_dir: Directory of a cache of processed trajectories. A rerun on the same trajectories file
+                    with other parameters of labeling or writing skips reading and processing. Default is no cache
+                cache_size: Maximum size of the cache in bytes, least recently used entries are removed.
+                    Default is 1 GiB
 
         """
         if "catalog_path" in kwargs:
@@ -63,22 +99,177 @@ class OSCGenerator:
             if kwargs["osc_version"] is not None:
                 self.converter.osc_version = kwargs["osc_version"]
 
+        target_rate = None
+        if "frame_rate" in kwargs:
+            if kwargs["frame_rate"] is not None:
+                target_rate = float(kwargs["frame_rate"])
+
+        parameterize = False
+        if "parameterize" in kwargs:
+            if kwargs["parameterize"] is not None:
+                parameterize = bool(kwargs["parameterize"])
+
+        vehicle_catalog = None
+        write_vehicle_catalog = False
+        if "vehicle_catalog" in kwargs:
+            from .tools.scenario_writer import VehicleCatalog
+            if isinstance(kwargs["vehicle_catalog"], VehicleCatalog):
+                vehicle_catalog = kwargs["vehicle_catalog"]
+            elif kwargs["vehicle_catalog"]:
+                vehicle_catalog = VehicleCatalog(self.converter.osc_version)
+                write_vehicle_catalog = True
+
+        skip_unchanged = False
+        if "skip_unchanged" in kwargs:
+            if kwargs["skip_unchanged"] is not None:
+                skip_unchanged = bool(kwargs["skip_unchanged"])
+
+        if "diagnostics" in kwargs:
+            if kwargs["diagnostics"] is not None:
+                self.converter.diagnostics_mode = kwargs["diagnostics"]
+
+        if "max_memory" in kwargs:
+            if kwargs["max_memory"] is not None:
+                self.converter.max_memory = int(kwargs["max_memory"])
+
+        if "cache_dir" in kwargs:
+            if kwargs["cache_dir"] is not None:
+                from .tools.trajectory_cache import TrajectoryCache
+                cache_size = 2 ** 30
+                if kwargs.get("cache_size") is not None:
+                    cache_size = int(kwargs["cache_size"])
+                self.converter.cache = TrajectoryCache(kwargs["cache_dir"], cache_size)
+
+        profile_memory = False
+        if "profile_memory" in kwargs:
+            if kwargs["profile_memory"] is not None:
+                profile_memory = bool(kwargs["profile_memory"])
+
         if output_scenario_path:
             self.converter.set_paths(trajectories_path, opendrive_path, output_scenario_path)
         else:
             self.converter.set_paths(trajectories_path, opendrive_path)
 
-        self.converter.process_trajectories(relative=True)
+        content_hash = None
+        if skip_unchanged:
+            from .tools import utils
+            input_paths = [trajectories_path, opendrive_path]
+            config_path = os.path.join(self.converter.dir_name, 'user_config.json')
+            if os.path.isfile(config_path):
+                input_paths.append(config_path)
+            params = {'osc_version': self.converter.osc_version, 'frame_rate': target_rate,
+                      'parameterize': parameterize}
+            if vehicle_catalog is not None:
+                params['vehicle_catalog'] = True
+            content_hash = utils.compute_content_hash(input_paths, params)
+            output_path = self.converter.get_output_path(radius_pos_trigger=2.0, timebased_lon=True,
+                                                         timebased_lat=False, parameterize=parameterize)
+            if utils.read_content_hash(output_path) == content_hash:
+                self.converter.outfile = output_path
+                print('Unchanged OpenSCENARIO file: ' + os.path.abspath(output_path))
+                return
+
+        if profile_memory:
+            self.converter.metrics.start_memory_profiling()
+        try:
+            self.converter.process_trajectories(relative=True, target_rate=target_rate)
+            self.converter.label_maneuvers(acc_threshold=0.2, optimize_acc=False, generate_kml=False)
+            self.converter.write_scenario(plot=False,
+                                          radius_pos_trigger=2.0,
+                                          timebased_lon=True,
+                                          timebased_lat=False,
+                                          output='xosc',
+                                          parameterize=parameterize,
+                                          vehicle_catalog=vehicle_catalog,
+                                          content_hash=content_hash)
+            if write_vehicle_catalog:
+                vehicle_catalog.write(os.path.dirname(os.path.abspath(self.converter.outfile)))
+            self.converter.close_diagnostics()
+        finally:
+            if profile_memory:
+                self.converter.metrics.stop_memory_profiling()
+        if kwargs.get("metrics") is not None:
+            self.converter.metrics.write(kwargs["metrics"])
+        print('Path to OpenSCENARIO file: ' + os.path.abspath(self.converter.outfile))
+
+    def generate_osc_from_memory(self, trajectories: Union['pd.DataFrame', bytes], opendrive: Union[bytes, dict],
+                                 stream: TextIO = None, **kwargs) -> Union[str, None]:
+        """
+        This method generates an OpenSCENARIO scenario from trajectories and an OpenDRIVE file held in memory,
+        without reading or writing any file.
+
+        Args:
+            trajectories: Object trajectories as dataframe or content of a csv file
+            opendrive: Content of the OpenDRIVE file or its parsed header
+                (see coord_calculations.parse_open_drive_header)
+            stream: Text stream the scenario is written to. If not specified, the scenario is returned.
+            keyword arguments:
+                opendrive_name: Road file name referenced by the scenario. Default is 'road.xodr'
+                user_config: Content of a user configuration file as dict. Default is no user configuration
+                data_type: Source of a trajectories dataframe, 'csv' or 'osi' (see osi_transformer.osi2df).
+                    Default is 'csv'
+                catalog_path: Path to the vehicle catalog referenced by the output scenario
+                osc_version: Desired version of the output OpenScenario file. Default is OSC V1.0
+                frame_rate: Resample the trajectories to this frame rate in Hz. Default is 10 Hz input without resampling
+                parameterize: Declare trigger radius and speed factor as scenario parameters, requires OSC V1.1 or
+                    later. Default is False
+
+        Returns:
+            object (Union[str, None]): Scenario, None if written to stream
+        """
+        opendrive_name = 'road.xodr'
+        if kwargs.get("opendrive_name") is not None:
+            opendrive_name = kwargs["opendrive_name"]
+
+        user_config = dict(kwargs.get("user_config") or {})
+        if kwargs.get("catalog_path") is not None:
+            user_config["catalogs"] = kwargs["catalog_path"]
+
+        if kwargs.get("osc_version") is not None:
+            self.converter.osc_version = kwargs["osc_version"]
+
+        target_rate = None
+        if kwargs.get("frame_rate") is not None:
+            target_rate = float(kwargs["frame_rate"])
+
+        parameterize = False
+        if kwargs.get("parameterize") is not None:
+            parameterize = bool(kwargs["parameterize"])
+
+        data_type = 'csv'
+        if kwargs.get("data_type") is not None:
+            data_type = kwargs["data_type"]
+
+        # Diagnostics are files
+        self.converter.diagnostics_mode = 'off'
+        self.converter.set_data(trajectories, opendrive, opendrive_name, user_config, data_type=data_type)
+
+        output = io.StringIO() if stream is None else stream
+        self.converter.process_trajectories(relative=True, target_rate=target_rate)
         self.converter.label_maneuvers(acc_threshold=0.2, optimize_acc=False, generate_kml=False)
         self.converter.write_scenario(plot=False,
                                       radius_pos_trigger=2.0,
                                       timebased_lon=True,
                                       timebased_lat=False,
-                                      output='xosc')
-        print('Path to OpenSCENARIO file: ' + os.path.abspath(self.converter.outfile))
+                                      output='xosc',
+                                      parameterize=parameterize,
+                                      stream=output)
+        self.converter.close_diagnostics()
+        if stream is None:
+            return output.getvalue()
+        return None
 
 
 def main():
+    if len(sys.argv) > 1 and sys.argv[1] == 'batch':
+        from .batch import main as batch_main
+        batch_main(sys.argv[2:])
+        return
+    if len(sys.argv) > 1 and sys.argv[1] in ('serve', 'submit'):
+        from .server import serve_main, submit_main
+        (serve_main if sys.argv[1] == 'serve' else submit_main)(sys.argv[2:])
+        return
+
     parser = ArgumentParser()
     parser.add_argument('-v', '--version', action='version', version=('%(prog)s ' + str(__version__)),
                         help="Show program's version number and exit.")
@@ -93,6 +284,35 @@ def main():
                         help="catalog file path and name. If not specified, a default catalog path is used. ")
     parser.add_argument("-oscv", "--oscversion", dest="osc_version", default=None,
                         help="Desired version of the output OpenScenario file. If not specified, default is OSC V1.0 ")
+    parser.add_argument("-fr", "--framerate", dest="frame_rate", default=None,
+                        help="Resample the trajectories to this frame rate in Hz. If not specified, "
+                             "10 Hz input is assumed.")
+    parser.add_argument("-p", "--parameterize", dest="parameterize", action="store_true",
+                        help="Declare the trigger radius and a speed factor as scenario parameters, so one "
+                             "scenario covers a parameter sweep. Requires OSC V1.1 or later.")
+    parser.add_argument("-vc", "--vehiclecatalog", dest="vehicle_catalog", action="store_true",
+                        help="Reference the vehicles from a VehicleCatalog, which is written to Catalogs/Vehicles "
+                             "below the directory of the scenario, instead of defining them inline.")
+    parser.add_argument("-su", "--skipunchanged", dest="skip_unchanged", action="store_true",
+                        help="Skip the generation if the existing scenario was generated from the same inputs, "
+                             "parameters and generator version (content hash in the scenario).")
+    parser.add_argument("-diag", "--diagnostics", dest="diagnostics", default=None, choices=['off', 'npz', 'legacy'],
+                        help="Write intermediate results: one compressed diagnostics.npz or the legacy csv and xlsx "
+                             "files. If not specified, no diagnostics are written.")
+    parser.add_argument("-m", "--metrics", dest="metrics", default=None,
+                        help="Write the wall time, CPU time, peak RSS and processed rows, objects and events of each "
+                             "pipeline stage to this JSON file.")
+    parser.add_argument("-pm", "--profilememory", dest="profile_memory", action="store_true",
+                        help="Record the peak allocations (tracemalloc) and the peak RSS of each pipeline stage in "
+                             "the metrics. Slows the generation down.")
+    parser.add_argument("-mm", "--maxmemory", dest="max_memory", type=int, default=None,
+                        help="Memory budget in MB for the trajectory data. If the estimated peak exceeds it, the "
+                             "trajectories are processed in chunks and spilled to temporary files.")
+    parser.add_argument("-c", "--cache", dest="cache_dir", default=None,
+                        help="Directory of a cache of processed trajectories. Reruns on the same trajectories file "
+                             "skip reading and processing. If not specified, no cache is used.")
+    parser.add_argument("--cachesize", dest="cache_size", type=int, default=1024,
+                        help="Maximum size of the cache in MB. Default is 1024")
 
     try:
         args = parser.parse_args()
@@ -106,7 +326,17 @@ def main():
     oscg = OSCGenerator()
     oscg.generate_osc(args.trajectories_path, args.opendrive_path, args.output_scenario_path,
                       catalog_path=args.catalog_path,
-                      osc_version=args.osc_version)
+                      osc_version=args.osc_version,
+                      frame_rate=args.frame_rate,
+                      parameterize=args.parameterize,
+                      vehicle_catalog=args.vehicle_catalog,
+                      skip_unchanged=args.skip_unchanged,
+                      diagnostics=args.diagnostics,
+                      metrics=args.metrics,
+                      profile_memory=args.profile_memory,
+                      max_memory=None if args.max_memory is None else args.max_memory * 2 ** 20,
+                      cache_dir=args.cache_dir,
+                      cache_size=args.cache_size * 2 ** 20)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,369 @@
+#  ****************************************************************************
+#  @server.py
+#
+#  @copyright 2023 e:fs TechHub GmbH and Audi AG. All rights reserved.
+#
+#  @license Apache v2.0
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#  ****************************************************************************
+
+import os
+import sys
+import json
+import stat
+import socket
+import ipaddress
+import threading
+import socketserver
+import http.client
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from . import batch
+from .version import __version__
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+# Options of OSCGenerator.generate_osc which a request may set
+JOB_OPTIONS = ('catalog_path', 'osc_version', 'frame_rate', 'parameterize', 'skip_unchanged')
+
+
+def _warm_up():
+    """
+    Initializer of the worker processes. Imports the generation stack once, the OpenDRIVE headers, projections and
+    transformers are then memoised per road file in the worker (see coord_calculations).
+    """
+    batch._generator = batch.OSCGenerator()
+    from scipy.signal import find_peaks  # noqa: F401, used by every lane change
+
+
+def _ready() -> int:
+    return os.getpid()
+
+
+def _is_loopback(host: str) -> bool:
+    try:
+        return ipaddress.ip_address(socket.gethostbyname(host)).is_loopback
+    except (socket.gaierror, ValueError):
+        return False
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    server_version = 'OSCGenerator/' + str(__version__)
+
+    def do_GET(self):
+        if self.path != '/health':
+            self._send(404, {'error': 'unknown path ' + self.path})
+            return
+        generation_server = self.server.generation_server
+        self._send(200, {'status': 'ok', 'version': str(__version__), 'workers': generation_server.max_workers})
+
+    def do_POST(self):
+        if self.path != '/generate':
+            self._send(404, {'error': 'unknown path ' + self.path})
+            return
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            request = json.loads(self.rfile.read(length).decode('utf-8'))
+            job, options = _parse_request(request)
+        except (ValueError, TypeError) as e:
+            self._send(400, {'error': str(e)})
+            return
+
+        entry = self.server.generation_server.submit(job, options)
+        self._send(200 if entry['status'] == 'done' else 422, entry)
+
+    def _send(self, code: int, body: dict):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        # Requests are answered with the job status, no access log
+        pass
+
+
+def _parse_request(request: dict) -> tuple:
+    """
+    Job and options of a generation request.
+
+    Returns:
+        object (tuple): Job (see batch.collect_jobs) and options of OSCGenerator.generate_osc
+    """
+    if not isinstance(request, dict):
+        raise TypeError("request must be a JSON object")
+    for key in ['trajectories', 'opendrive']:
+        if not isinstance(request.get(key), str):
+            raise ValueError("request needs the path " + key)
+    output = request.get('output')
+    if output is not None and not isinstance(output, str):
+        raise ValueError("output must be a path")
+    options = request.get('options', {})
+    if not isinstance(options, dict):
+        raise TypeError("options must be a JSON object")
+    unknown = set(options) - set(JOB_OPTIONS)
+    if unknown:
+        raise ValueError("unknown options: " + ', '.join(sorted(unknown)))
+
+    job = {'trajectories': request['trajectories'], 'opendrive': request['opendrive'], 'output': output}
+    return job, options
+
+
+class GenerationServer:
+    """
+    Long-running generation server on localhost (HTTP) or a Unix socket. Jobs are accepted concurrently and run on a
+    pool of warm worker processes, which keep the generation stack imported and the parsed OpenDRIVE headers,
+    projections and transformers memoised between jobs. Each job starts with a new converter, the options of a
+    request do not carry over to later requests. The server has no authentication and reads and writes the
+    requested paths, so it only listens on loopback addresses.
+
+    Endpoints:
+        GET /health: Version and number of workers
+        POST /generate: JSON object with paths trajectories, opendrive, optional output and options
+            (see JOB_OPTIONS). The answer is the job status (see batch.run_batch journal entries).
+    """
+
+    def __init__(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, unix_socket: str = None,
+                 max_workers: int = None):
+        """
+        Args:
+            host: Host of the HTTP server, must be a loopback address
+            port: Port of the HTTP server, 0 chooses a free port
+            unix_socket: If set, listen on this Unix socket instead of host and port
+            max_workers: Number of worker processes. If not specified, the number of CPUs is used.
+        """
+        if not isinstance(host, str):
+            raise TypeError("input must be a str")
+        if not isinstance(port, int):
+            raise TypeError("input must be a int")
+        if unix_socket is not None and not isinstance(unix_socket, str):
+            raise TypeError("input must be a str")
+        if max_workers is not None and not isinstance(max_workers, int):
+            raise TypeError("input must be a int")
+        if unix_socket is None and not _is_loopback(host):
+            raise ValueError("host must be a loopback address, the server has no authentication: " + host)
+
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.unix_socket = unix_socket
+        self._executor_lock = threading.Lock()
+        self._executor = self._start_executor()
+
+        if unix_socket is not None:
+            if os.path.exists(unix_socket) and stat.S_ISSOCK(os.stat(unix_socket).st_mode):
+                # Left over from a server which was not shut down
+                os.remove(unix_socket)
+            self._http_server = _UnixHTTPServer(unix_socket, _RequestHandler)
+        else:
+            self._http_server = ThreadingHTTPServer((host, port), _RequestHandler)
+            self._http_server.daemon_threads = True
+        self._http_server.generation_server = self
+
+    @property
+    def address(self):
+        """
+        Unix socket path or (host, port) the server listens on.
+        """
+        return self._http_server.server_address
+
+    def _start_executor(self) -> ProcessPoolExecutor:
+        executor = ProcessPoolExecutor(max_workers=self.max_workers, initializer=_warm_up)
+        # Start all workers now, not on the first requests
+        for future in [executor.submit(_ready) for _ in range(self.max_workers)]:
+            future.result()
+        return executor
+
+    def submit(self, job: dict, options: dict) -> dict:
+        """
+        Runs a job on the worker pool and waits for it. If a worker died (e.g. killed when out of memory), the job
+        fails and the pool is replaced for the following jobs.
+
+        Args:
+            job: Job (see batch.collect_jobs)
+            options: Options of OSCGenerator.generate_osc
+
+        Returns:
+            object (dict): Status of the job (see batch.run_batch)
+        """
+        executor = self._executor
+        try:
+            return executor.submit(batch._run_job, job, options).result()
+        except BrokenProcessPool as e:
+            with self._executor_lock:
+                # Replaced once, also if several running jobs were lost
+                if self._executor is executor:
+                    executor.shutdown(wait=False)
+                    self._executor = self._start_executor()
+            return {'status': 'failed', 'error': 'worker process died: ' + str(e), 'job': batch.job_key(job, options)}
+
+    def serve_forever(self):
+        self._http_server.serve_forever()
+
+    def shutdown(self):
+        """
+        Stops serve_forever (from another thread).
+        """
+        self._http_server.shutdown()
+
+    def close(self):
+        self._http_server.server_close()
+        self._executor.shutdown()
+        if self.unix_socket is not None and os.path.exists(self.unix_socket):
+            os.remove(self.unix_socket)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, unix_socket: str, timeout: float):
+        super().__init__('localhost', timeout=timeout)
+        self.unix_socket = unix_socket
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.unix_socket)
+
+
+class GenerationClient:
+    """
+    Thin client of a GenerationServer.
+    """
+
+    def __init__(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, unix_socket: str = None,
+                 timeout: float = 600.0):
+        """
+        Args:
+            host: Host of the server
+            port: Port of the server
+            unix_socket: If set, connect to this Unix socket instead of host and port
+            timeout: Timeout of a request in s
+        """
+        self.host = host
+        self.port = port
+        self.unix_socket = unix_socket
+        self.timeout = timeout
+
+    def _request(self, method: str, path: str, body: dict = None) -> tuple:
+        if self.unix_socket is not None:
+            connection = _UnixHTTPConnection(self.unix_socket, self.timeout)
+        else:
+            connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        try:
+            data = None if body is None else json.dumps(body).encode('utf-8')
+            connection.request(method, path, body=data, headers={'Content-Type': 'application/json'})
+            response = connection.getresponse()
+            return response.status, json.loads(response.read().decode('utf-8'))
+        finally:
+            connection.close()
+
+    def health(self) -> dict:
+        """
+        Returns:
+            object (dict): Status, version and number of workers of the server
+        """
+        return self._request('GET', '/health')[1]
+
+    def generate(self, trajectories_path: str, opendrive_path: str, output_scenario_path: str = None,
+                 **kwargs) -> dict:
+        """
+        Generates a scenario on the server. Relative paths are resolved here, the server may run in another directory.
+
+        Args:
+            trajectories_path: Path to the file containing the object trajectories used as input
+            opendrive_path: Path to the OpenDRIVE file which describes the road net which the objects are using
+            output_scenario_path: Output file path and name. If not specified, a directory and name will be chosen.
+            keyword arguments: Options of OSCGenerator.generate_osc (see JOB_OPTIONS)
+
+        Returns:
+            object (dict): Status of the job, 'done' with the output path or 'failed' with the error
+        """
+        request = {'trajectories': os.path.abspath(trajectories_path), 'opendrive': os.path.abspath(opendrive_path),
+                   'output': os.path.abspath(output_scenario_path) if output_scenario_path else None,
+                   'options': {key: value for key, value in kwargs.items() if value is not None}}
+        code, body = self._request('POST', '/generate', request)
+        if code == 400:
+            raise ValueError(body['error'])
+        return body
+
+
+def serve_main(argv: list = None):
+    parser = ArgumentParser(prog='osc_generator serve',
+                            description='Run a local generation server with warm worker processes.')
+    parser.add_argument("--host", dest="host", default=DEFAULT_HOST,
+                        help="loopback host, default is " + DEFAULT_HOST)
+    parser.add_argument("--port", dest="port", type=int, default=DEFAULT_PORT,
+                        help="port, default is " + str(DEFAULT_PORT))
+    parser.add_argument("--unixsocket", dest="unix_socket", default=None,
+                        help="listen on this Unix socket instead of host and port")
+    parser.add_argument("-j", "--jobs", dest="jobs", type=int, default=None,
+                        help="number of worker processes. If not specified, the number of CPUs is used.")
+    args = parser.parse_args(argv)
+
+    with GenerationServer(args.host, args.port, args.unix_socket, args.jobs) as server:
+        print('OSC-Generator server listening on ' + str(server.address) + ' with ' + str(server.max_workers) +
+              ' workers')
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+
+def submit_main(argv: list = None):
+    parser = ArgumentParser(prog='osc_generator submit', description='Generate a scenario on a running server.')
+    parser.add_argument("-t", "--trajectories", dest="trajectories_path", required=True,
+                        help="path to the file containing the object trajectories used as input")
+    parser.add_argument("-d", "--opendrive", dest="opendrive_path", required=True,
+                        help="path to the opendrive file which describes the road net which the objects are using")
+    parser.add_argument("-s", "--openscenario", dest="output_scenario_path", default=None,
+                        help="output file path and name. If not specified, a directory and name will be chosen.")
+    parser.add_argument("-cat", "--catalog", dest="catalog_path", default=None,
+                        help="catalog file path and name. If not specified, a default catalog path is used. ")
+    parser.add_argument("-oscv", "--oscversion", dest="osc_version", default=None,
+                        help="Desired version of the output OpenScenario file. If not specified, default is OSC V1.0 ")
+    parser.add_argument("-fr", "--framerate", dest="frame_rate", default=None,
+                        help="Resample the trajectories to this frame rate in Hz.")
+    parser.add_argument("-p", "--parameterize", dest="parameterize", action="store_true",
+                        help="Declare the trigger radius and a speed factor as scenario parameters. Requires OSC V1.1 "
+                             "or later.")
+    parser.add_argument("-su", "--skipunchanged", dest="skip_unchanged", action="store_true",
+                        help="Skip the generation if the existing scenario has the same content hash.")
+    parser.add_argument("--host", dest="host", default=DEFAULT_HOST, help="host of the server")
+    parser.add_argument("--port", dest="port", type=int, default=DEFAULT_PORT, help="port of the server")
+    parser.add_argument("--unixsocket", dest="unix_socket", default=None, help="Unix socket of the server")
+    args = parser.parse_args(argv)
+
+    client = GenerationClient(args.host, args.port, args.unix_socket)
+    entry = client.generate(args.trajectories_path, args.opendrive_path, args.output_scenario_path,
+                            catalog_path=args.catalog_path,
+                            osc_version=args.osc_version,
+                            frame_rate=args.frame_rate,
+                            parameterize=args.parameterize or None,
+                            skip_unchanged=args.skip_unchanged or None)
+    if entry['status'] != 'done':
+        print(entry.get('error', 'generation failed'), file=sys.stderr)
+        sys.exit(1)
+    print('Path to OpenSCENARIO file: ' + entry['output'])
@@ -0,0 +1,192 @@
+#  ****************************************************************************
+#  @bundle.py
+#  
+#  @copyright 2023 e:fs TechHub GmbH and Audi AG. All rights reserved.
+#
+#  @license Apache v2.0
+#  
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#  
+#      http://www.apache.org/licenses/LICENSE-2.0
+#  
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#  ****************************************************************************
+
+import io
+import gzip
+import json
+import time
+import queue
+import hashlib
+import tarfile
+import zipfile
+import threading
+
+
+class ScenarioBundle:
+    """
+    Archive (zip, tar or tar.gz) of many scenarios with an optional shared catalog and a manifest.
+    Members are written by a background thread, so scenario generation does not block on storage.
+
+    Usage:
+        with ScenarioBundle('scenarios.zip', catalog=catalog_bytes) as bundle:
+            bundle.add('scenario.xosc', data)
+
+    The catalog is either its file content or a catalog object with a to_bytes() method, which is
+    collected while scenarios are added and written when the bundle is closed.
+
+    The archive only depends on the added members: without a creation time, the manifest has none and the members
+    get a fixed modification time, so the same scenarios give the same archive.
+    """
+    catalog_directory = 'Catalogs/Vehicles'
+    catalog_name = 'VehicleCatalog.xosc'
+    manifest_name = 'manifest.json'
+
+    def __init__(self, archive_path: str, catalog=None, max_pending: int = 256, created: float = None):
+        """
+        Args:
+            archive_path: Path of the archive, format by extension (.zip, .tar, .tar.gz, .tgz)
+            catalog: Vehicle catalog shared by all scenarios, content (bytes) or catalog object (to_bytes())
+            max_pending: Maximum number of scenarios waiting for the writer, add() blocks if exceeded
+            created: Creation time (seconds since the epoch, e.g. time.time()) written to the manifest and used as
+                modification time of the members. If not specified, the archive has no time stamps.
+        """
+        if not isinstance(archive_path, str):
+            raise TypeError("input must be a str")
+        if catalog is not None and not isinstance(catalog, bytes) and not hasattr(catalog, 'to_bytes'):
+            raise TypeError("input must be a bytes or catalog")
+        if not isinstance(max_pending, int):
+            raise TypeError("input must be a int")
+        if created is not None and not isinstance(created, float):
+            raise TypeError("input must be a float")
+
+        if archive_path.endswith('.zip'):
+            self.archive_format = 'zip'
+        elif archive_path.endswith('.tar'):
+            self.archive_format = 'tar'
+        elif archive_path.endswith('.tar.gz') or archive_path.endswith('.tgz'):
+            self.archive_format = 'tar.gz'
+        else:
+            raise ValueError("archive must be a .zip, .tar, .tar.gz or .tgz file")
+
+        self.archive_path = archive_path
+        self.catalog = catalog
+        self.created = created
+        self.manifest = {'catalog': None, 'scenarios': []}
+        if created is not None:
+            self.manifest['created'] = time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(created))
+        self._names = set()
+        self._error = None
+        self._closed = False
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._thread = threading.Thread(target=self._write, name='ScenarioBundleWriter', daemon=True)
+        self._thread.start()
+
+        if catalog is not None:
+            name = self.catalog_directory + '/' + self.catalog_name
+            self._names.add(name)
+            self.manifest['catalog'] = name
+            if isinstance(catalog, bytes):
+                self._queue.put((name, catalog, None))
+
+    def add(self, name: str, data: bytes, **metadata):
+        """
+        Queues a scenario for the archive.
+
+        Args:
+            name: Member name in the archive
+            data: File content
+            metadata: Additional manifest entries of the scenario
+        """
+        if not isinstance(name, str):
+            raise TypeError("input must be a str")
+        if not isinstance(data, bytes):
+            raise TypeError("input must be a bytes")
+        if self._closed:
+            raise ValueError("bundle is closed")
+        self._raise_error()
+        if name in self._names:
+            raise ValueError("scenario already in bundle: " + name)
+
+        self._names.add(name)
+        self._queue.put((name, data, metadata))
+
+    def close(self):
+        """
+        Waits until all scenarios are written and finishes the archive with the manifest.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        if self.catalog is not None and not isinstance(self.catalog, bytes):
+            self._queue.put((self.manifest['catalog'], self.catalog.to_bytes(), None))
+        self._queue.put(None)
+        self._thread.join()
+        self._raise_error()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _raise_error(self):
+        if self._error is not None:
+            raise RuntimeError("writing " + self.archive_path + " failed") from self._error
+
+    def _write(self):
+        """
+        Writer thread, consumes the queue until close() is called.
+        """
+        finished = False
+        # Earliest time of a zip member
+        mtime = int(self.created) if self.created is not None else 315532800
+        compressed = None
+        try:
+            if self.archive_format == 'zip':
+                archive = zipfile.ZipFile(self.archive_path, 'w', compression=zipfile.ZIP_DEFLATED)
+
+                def write_member(member_name, member_data):
+                    info = zipfile.ZipInfo(member_name, date_time=time.gmtime(mtime)[:6])
+                    info.compress_type = zipfile.ZIP_DEFLATED
+                    archive.writestr(info, member_data)
+            else:
+                if self.archive_format == 'tar.gz':
+                    # The gzip header holds a time stamp as well
+                    compressed = gzip.GzipFile(self.archive_path, 'wb', mtime=mtime)
+                    archive = tarfile.open(fileobj=compressed, mode='w')
+                else:
+                    archive = tarfile.open(self.archive_path, 'w')
+
+                def write_member(member_name, member_data):
+                    info = tarfile.TarInfo(member_name)
+                    info.size = len(member_data)
+                    info.mtime = mtime
+                    archive.addfile(info, io.BytesIO(member_data))
+
+            with archive:
+                while True:
+                    item = self._queue.get()
+                    if item is None:
+                        finished = True
+                        break
+                    name, data, metadata = item
+                    write_member(name, data)
+                    if metadata is not None:
+                        self.manifest['scenarios'].append(dict(name=name, size=len(data),
+                                                               sha256=hashlib.sha256(data).hexdigest(), **metadata))
+                write_member(self.manifest_name, json.dumps(self.manifest, indent=4).encode('utf-8'))
+        except Exception as e:
+            self._error = e
+            # Keep consuming until close(), so that producers do not block
+            while not finished:
+                finished = self._queue.get() is None
+        finally:
+            if compressed is not None:
+                compressed.close()
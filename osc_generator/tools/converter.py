@@ -21,13 +21,25 @@
 import numpy as np
 import pandas as pd
 import os
-from typing import Union
+import io
+import tempfile
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Union, TextIO, Iterable, Callable
 
 from osc_generator.tools import utils
 from osc_generator.tools import man_helpers
-from osc_generator.tools.coord_calculations import transform_lanes_rel2abs
-from osc_generator.tools.scenario_writer import convert_to_osc
+from osc_generator.tools.coord_calculations import transform_lanes_rel2abs, create_local_tangent_plane, \
+    parse_open_drive_header
+from osc_generator.tools.scenario_writer import convert_to_osc, convert_to_osc_variants, create_output_path, \
+    VehicleCatalog, StreamingScenarioWriter
+from osc_generator.tools.streaming import StreamingLabeler, process_frame
+from osc_generator.tools.bundle import ScenarioBundle
+from osc_generator.tools.diagnostics import DiagnosticsSink
+from osc_generator.tools.metrics import MetricsRecorder
+from osc_generator.tools.trajectory_cache import TrajectoryCache
 from osc_generator.tools.osi_transformer import osi2df
+from osc_generator.tools.user_config import UserConfig
 
 class Converter:
     """
@@ -40,10 +52,41 @@ class Converter:
         self.opendrive_path: str = ''
         self.outfile = None
         self.use_folder: bool = True
+        # Frames per second of the processed trajectories
+        self.frame_rate: float = 10.0
+
+        # Optional planar geodesy for small scenes, falls back to WGS84 if tolerances are exceeded
+        self.local_tangent_plane: bool = False
+        self.ltp_max_extent: float = 5000.0
+        self.ltp_max_error: float = 0.05
+        self.ltp = None
+
+        # Intermediate results of a run: 'off', 'npz' (one diagnostics.npz) or 'legacy' (csv and xlsx files)
+        self.diagnostics_mode: str = 'off'
+        self.diagnostics = DiagnosticsSink()
+
+        # Timing, peak RSS and counts of the stages of the last run (see MetricsRecorder)
+        self.metrics = MetricsRecorder()
+
+        # Memory budget in bytes for the trajectory data of a run. If the estimated peak exceeds it, the trajectories
+        # are read in chunks and the dataframes are backed by temporary files in spill_dir (None: system temp dir).
+        self.max_memory: int = None
+        self.spill_dir: str = None
+        self.spilled: bool = False
+
+        # Optional cache of processed trajectories (relative coordinates from files only)
+        self.cache: TrajectoryCache = None
+        self.cache_hit: bool = False
 
         self.dir_name: str = ''
         self.section_name: str = ''
 
+        # In-memory input (see set_data), nothing is read from or written to disk
+        self.trajectories_data = None
+        self.trajectories_type = 'csv'
+        self.open_drive_header = None
+        self.user_config = None
+
         self.df = None
         self.df_lanes = None
 
@@ -53,6 +96,7 @@ class Converter:
         self.objects = None
         self.ego = None
         self.movobj_grps_coord = None
+        self.merge_report = None
 
     def set_paths(self, trajectories_path: str, opendrive_path: str, output_scenario_path: str = None):
         """
@@ -77,10 +121,14 @@ class Converter:
 
         if output_scenario_path is not None:
             output_dir_path = os.path.dirname(os.path.abspath(output_scenario_path))
-            if os.path.isdir(output_dir_path):
-                self.outfile = output_scenario_path
-            else:
+            if not os.path.isdir(output_dir_path):
                 raise FileNotFoundError("folder not found: " + str(output_dir_path))
+        # Without a path, the output path of this run is chosen again, not taken from an earlier run
+        self.outfile = output_scenario_path
+
+        self.trajectories_data = None
+        self.open_drive_header = None
+        self.user_config = None
 
         if self.use_folder:
             path_name = self.trajectories_path.rsplit(os.path.sep)
@@ -89,7 +137,54 @@ class Converter:
         else:
             raise NotImplementedError("use_folder flag is going to be removed")
 
-    def process_trajectories(self, relative: bool = True, df_lanes: pd.DataFrame = None):
+    def set_data(self, trajectories: Union[pd.DataFrame, bytes], opendrive: Union[bytes, dict],
+                 opendrive_name: str = 'road.xodr', user_config: dict = None, section_name: str = 'memory',
+                 data_type: str = 'csv'):
+        """
+        Alternative to set_paths for input held in memory. The following steps neither read nor write files
+        if write_scenario is called with a stream.
+
+        Args:
+            trajectories: Trajectories as dataframe or content of a csv file
+            opendrive: Content of the OpenDRIVE file or its header (see coord_calculations.parse_open_drive_header)
+            opendrive_name: Road file name written to the scenario
+            user_config: Content of a user configuration file, defaults are used if not given
+            section_name: Name of the scenario section
+            data_type: Source of a dataframe, 'csv' or 'osi' (see osi_transformer.osi2df)
+        """
+        if not isinstance(trajectories, (pd.DataFrame, bytes)):
+            raise TypeError("input must be a pd.DataFrame or bytes")
+        if not isinstance(opendrive, (bytes, dict)):
+            raise TypeError("input must be a bytes or dict")
+        if not isinstance(opendrive_name, str):
+            raise TypeError("input must be a str")
+        if user_config is not None and not isinstance(user_config, dict):
+            raise TypeError("input must be a dict")
+        if not isinstance(section_name, str):
+            raise TypeError("input must be a str")
+        if data_type not in ('csv', 'osi'):
+            raise ValueError("data_type must be 'csv' or 'osi'")
+
+        if isinstance(trajectories, bytes):
+            trajectories = pd.read_csv(io.BytesIO(trajectories))
+        if isinstance(opendrive, bytes):
+            opendrive = parse_open_drive_header(io.BytesIO(opendrive))
+
+        self.trajectories_data = trajectories
+        self.trajectories_type = data_type
+        self.open_drive_header = opendrive
+        self.user_config = UserConfig('')
+        if user_config is not None:
+            self.user_config.load_config(user_config)
+
+        self.trajectories_path = ''
+        self.opendrive_path = opendrive_name
+        self.outfile = None
+        self.section_name = section_name
+        self.dir_name = ''
+
+    def process_trajectories(self, relative: bool = True, df_lanes: pd.DataFrame = None,
+                             target_rate: float = None):
         """
         Process trajectories file and convert it to cleaned main dataframe
         and a dataframe for absolute coordination of lanes
@@ -97,78 +192,229 @@ class Converter:
         Args:
             relative: True -> coordinates of lanes and vehicles are relative to ego.
             df_lanes: If absolute coordinates are used, the lane coordinates needs to be passed here.
+            target_rate: Resample the trajectories to this frame rate in Hz. If None, 10 Hz input is assumed.
+
+        If self.local_tangent_plane is set, relative to absolute conversions and headings are computed in a
+        local tangent plane anchored at the first ego position, unless the scene exceeds self.ltp_max_extent
+        or self.ltp_max_error (then self.ltp stays None and WGS84 is used).
+
+        If self.max_memory is set and the estimated peak memory of the trajectories exceeds it, csv trajectories
+        are read in chunks and the main dataframe is backed by a temporary file (self.spilled is set). Resampling
+        and absolute coordinates are processed in memory.
+
+        If self.cache is set, the processed trajectories of a file are stored in the cache and taken from it when
+        the same file is processed with the same parameters again (self.cache_hit is set).
 
+        """
+        # New run
+        self.metrics.reset()
+        self.spilled = False
+        self.cache_hit = False
+
+        cache_key = None
+        if self.cache is not None and relative and self.trajectories_data is None:
+            cache_key = self.cache.key(self.trajectories_path, {'relative': relative, 'target_rate': target_rate,
+                                                                'local_tangent_plane': self.local_tangent_plane,
+                                                                'ltp_max_extent': self.ltp_max_extent,
+                                                                'ltp_max_error': self.ltp_max_error})
+            self.cache_hit = self._load_cached(cache_key)
+
+        if not self.cache_hit:
+            self._ingest(relative, df_lanes, target_rate)
+            if cache_key is not None:
+                self._store_cached(cache_key)
+
+        if self.use_folder:
+            # New run, the diagnostics of the previous run are completed
+            self.diagnostics.close()
+            self.diagnostics = DiagnosticsSink(self.diagnostics_mode, self.dir_name)
+            self.diagnostics.record('df33', self.df, 'df33.csv')
+        else:
+            raise NotImplementedError("use_folder flag is going to be removed")
+
+    def _ingest(self, relative: bool, df_lanes: pd.DataFrame, target_rate: float):
+        """
+        Reads, filters and converts the trajectories (see process_trajectories).
         """
         data_type = ''
-        if self.trajectories_path.endswith(".csv"):
-            df = pd.read_csv(self.trajectories_path)
-            data_type = 'csv'
-        elif self.trajectories_path.endswith(".osi"):
-            df = osi2df(self.trajectories_path)
-            data_type = 'osi'
+        with self.metrics.stage('read') as counts:
+            if self.trajectories_data is not None:
+                df = self.trajectories_data.copy()
+                data_type = self.trajectories_type
+                self.spilled = self._exceeds_memory(int(df.memory_usage().sum()))
+            elif self.trajectories_path.endswith(".csv"):
+                self.spilled = self._exceeds_memory(utils.estimate_csv_memory(self.trajectories_path))
+                if self.spilled:
+                    df = utils.read_csv_spilled(self.trajectories_path, spill_dir=self.spill_dir,
+                                                max_chunk_memory=self.max_memory // 4)
+                else:
+                    df = pd.read_csv(self.trajectories_path)
+                data_type = 'csv'
+            elif self.trajectories_path.endswith(".osi"):
+                # The bounding boxes of the OSI trace stay in memory, jobs of a directory may run concurrently
+                user_config = UserConfig(os.path.dirname(self.trajectories_path))
+                user_config.read_config()
+                df = osi2df(self.trajectories_path, user_config)
+                self.user_config = user_config
+                data_type = 'osi'
+                self.spilled = self._exceeds_memory(int(df.memory_usage().sum()))
+            counts['rows'] = len(df)
+
+        if target_rate is not None:
+            self.frame_rate = float(target_rate)
+            df = utils.resample_trajectories(df, self.frame_rate)
+        else:
+            self.frame_rate = 10.0
+        min_nofcases = int(round(2 * self.frame_rate))
 
         if relative:
             # Delete not relevant objects (too far away, not visible long enough, not plausible)
-            movobj_grps = utils.find_vars('pos_x_|pos_y_|speed_x_|speed_y_|class_', df.columns, reshape=True)
-            df, del_obj = utils.delete_irrelevant_objects(df, movobj_grps, min_nofcases=20, max_posx_min=50.0,
-                                                          max_posx_nofcases_ratio=10.0)
-            # Create absolute lane points from relative
-            self.df_lanes = transform_lanes_rel2abs(df, data_type)
+            with self.metrics.stage('object_filtering', rows=len(df)) as counts:
+                movobj_grps = utils.find_vars('pos_x_|pos_y_|speed_x_|speed_y_|class_', df.columns, reshape=True)
+                irrelevant, del_obj = utils.find_irrelevant_objects(df, movobj_grps, min_nofcases=min_nofcases,
+                                                                    max_posx_min=50.0, max_posx_nofcases_ratio=10.0,
+                                                                    frame_rate=self.frame_rate)
+                irrelevant = utils.flatten(irrelevant)
+                columns = [column for column in df.columns if column not in irrelevant]
+                # A spilled dataframe keeps the columns of irrelevant objects, dropping would copy it into memory
+                if irrelevant and not self.spilled:
+                    df = df.drop(columns=irrelevant)
+                counts['objects'] = len(movobj_grps)
+                counts['removed_objects'] = del_obj
+            self.ltp = None
+            if self.local_tangent_plane:
+                self.ltp = create_local_tangent_plane(df['lat'], df['long'], max_extent=self.ltp_max_extent,
+                                                      max_error=self.ltp_max_error)
+
+            # Create absolute lane points from relative, from the ego and lane columns only
+            with self.metrics.stage('lane_reconstruction', rows=len(df)):
+                lane_columns = ['lat', 'long', 'heading'] + [column for column in df.columns
+                                                             if column.startswith('lin_')]
+                self.df_lanes = transform_lanes_rel2abs(df[lane_columns], data_type, self.ltp)
 
             # Compute coordinates of Objects
+            token = self.metrics.begin('coordinate_conversion')
             # Find posx-posy movobj_grps and define lat-lon movobj_grps
-            movobj_grps = utils.find_vars('pos_x_|pos_y_|speed_x_', df.columns, reshape=True)
+            movobj_grps = utils.find_vars('pos_x_|pos_y_|speed_x_', columns, reshape=True)
 
             movobj_grps_coord = []
             for p in movobj_grps:
                 movobj_grps_coord.append([p[0].replace('pos_x', 'lat'), p[1].replace('pos_y', 'lon'),
                                           p[2].replace('speed_x', 'speed'), p[2].replace('speed_x', 'class')])
 
-            # Compute Coordinates and absolute speed
-            for p, q in zip(movobj_grps, movobj_grps_coord):
-                coordx = []
-                coordy = []
-                for k in range(len(df[p])):
-                    if not any(list(pd.isna(df.loc[k, p]))):
-                        n = utils.calc_new_geopos_from_2d_vector_on_spheric_earth(curr_coords=df.loc[k, ["lat", "long"]],
-                                                                                  heading=df.loc[k, "heading"],
-                                                                                  dist_x=df.loc[k, p[0]], dist_y=df.loc[k, p[1]])
-                        coordx.append(n[0])
-                        coordy.append(n[1])
-                    else:
-                        coordx.append(np.nan)
-                        coordy.append(np.nan)
-                df[q[0]] = coordx
-                df[q[1]] = coordy
-                df[q[2]] = abs(df[p[2]])
-
-            # Delete and reorder columns
-            delete_vars = utils.find_vars('speed_x_|speed_y_', df.columns)
-            df = df.drop(columns=delete_vars)
-
+            # The main dataframe is filled column by column into one array instead of adding, dropping and
+            # reordering columns, which copies the whole dataframe each time
             reorder_vars1 = ['timestamp', 'lat', 'long', 'heading', 'speed']
             reorder_vars3 = utils.flatten(movobj_grps_coord)
-            self.df = df[reorder_vars1 + reorder_vars3]
+            shape = (len(df), len(reorder_vars1) + len(reorder_vars3))
+            values = utils.spill_array(shape, self.spill_dir) if self.spilled else np.empty(shape)
+            for j, column in enumerate(reorder_vars1):
+                values[:, j] = df[column].values
+
+            # Compute Coordinates and absolute speed
+            for j, (p, q) in enumerate(zip(movobj_grps, movobj_grps_coord)):
+                if self.ltp is not None:
+                    valid = ~df[p].isna().any(axis=1).values
+                    coordx = np.full(len(df), np.nan)
+                    coordy = np.full(len(df), np.nan)
+                    coordx[valid], coordy[valid] = self.ltp.offset(df['lat'].values[valid], df['long'].values[valid],
+                                                                   df['heading'].values[valid],
+                                                                   df[p[0]].values[valid], df[p[1]].values[valid])
+                else:
+                    coordx = []
+                    coordy = []
+                    for k in range(len(df[p])):
+                        if not any(list(pd.isna(df.loc[k, p]))):
+                            n = utils.calc_new_geopos_from_2d_vector_on_spheric_earth(
+                                curr_coords=df.loc[k, ["lat", "long"]], heading=df.loc[k, "heading"],
+                                dist_x=df.loc[k, p[0]], dist_y=df.loc[k, p[1]])
+                            coordx.append(n[0])
+                            coordy.append(n[1])
+                        else:
+                            coordx.append(np.nan)
+                            coordy.append(np.nan)
+                column = len(reorder_vars1) + 4 * j
+                values[:, column] = coordx
+                values[:, column + 1] = coordy
+                values[:, column + 2] = np.abs(df[p[2]].values)
+                values[:, column + 3] = df[q[3]].values
+
+            self.df = pd.DataFrame(values, columns=reorder_vars1 + reorder_vars3, copy=False)
+            if not self.spilled:
+                # Classes without missing values stay integers
+                for q in movobj_grps_coord:
+                    if df[q[3]].dtype != self.df[q[3]].dtype:
+                        self.df[q[3]] = self.df[q[3]].astype(df[q[3]].dtype)
+            self.metrics.end(token, rows=len(df), objects=len(movobj_grps))
         else:
             # Delete not relevant objects (too far away, too short seen, not plausible)
-            movobj_grps = utils.find_vars('lat_|lon_|speed_|class_', df.columns, reshape=True)
-            df, del_obj = utils.delete_irrelevant_objects(df, movobj_grps, min_nofcases=20, max_posx_min=50.0,
-                                                          max_posx_nofcases_ratio=10.0)
+            with self.metrics.stage('object_filtering', rows=len(df)) as counts:
+                movobj_grps = utils.find_vars('lat_|lon_|speed_|class_', df.columns, reshape=True)
+                df, del_obj = utils.delete_irrelevant_objects(df, movobj_grps, min_nofcases=min_nofcases,
+                                                              max_posx_min=50.0, max_posx_nofcases_ratio=10.0,
+                                                              frame_rate=self.frame_rate)
+                counts['objects'] = len(movobj_grps)
+                counts['removed_objects'] = del_obj
 
             if df_lanes is None:
                 raise ValueError('if absolute coordinates are used, the lane coordinates needs '
                                  'to be passed in process_inter func. as a dataframe.')
             else:
                 self.df_lanes = df_lanes
+            self.ltp = None
+            if self.local_tangent_plane:
+                self.ltp = create_local_tangent_plane(df['lat'], df['long'], max_extent=self.ltp_max_extent,
+                                                      max_error=self.ltp_max_error)
             self.df = df
 
-        if self.use_folder:
-            self.df.to_csv(os.path.join(self.dir_name, 'df33.csv'))
-        else:
-            raise NotImplementedError("use_folder flag is going to be removed")
+    def _load_cached(self, key: str) -> bool:
+        """
+        Takes the processed trajectories from the cache.
+
+        Returns:
+            object (bool): True if cached
+        """
+        with self.metrics.stage('cache_load') as counts:
+            cached = self.cache.load(key)
+            if cached is None:
+                return False
+            frames, values = cached
+            self.df = frames['df']
+            self.df_lanes = frames['df_lanes']
+            self.frame_rate = values['frame_rate']
+            counts['rows'] = len(self.df)
+        self.ltp = None
+        if self.local_tangent_plane:
+            self.ltp = create_local_tangent_plane(self.df['lat'], self.df['long'], max_extent=self.ltp_max_extent,
+                                                  max_error=self.ltp_max_error)
+        if 'object_boundingbox' in values:
+            # Taken from the OSI trace when the file is read
+            user_config = UserConfig(os.path.dirname(self.trajectories_path))
+            user_config.read_config()
+            user_config.object_boundingbox = values['object_boundingbox']
+            user_config.bbcenter_to_rear = values['bbcenter_to_rear']
+            self.user_config = user_config
+        return True
+
+    def _store_cached(self, key: str):
+        """
+        Adds the processed trajectories to the cache.
+        """
+        values = {'frame_rate': self.frame_rate}
+        if self.trajectories_path.endswith(".osi") and self.user_config is not None:
+            values['object_boundingbox'] = self.user_config.object_boundingbox
+            values['bbcenter_to_rear'] = self.user_config.bbcenter_to_rear
+        with self.metrics.stage('cache_store', rows=len(self.df)):
+            self.cache.store(key, {'df': self.df, 'df_lanes': self.df_lanes}, values)
+
+    def _exceeds_memory(self, frame_memory: int) -> bool:
+        """
+        Whether the estimated peak memory of processing a dataframe of this size exceeds self.max_memory.
+        """
+        return self.max_memory is not None and frame_memory * utils.MEMORY_FACTOR > self.max_memory
 
     def label_maneuvers(self, acc_threshold: Union[float, np.ndarray] = 0.2, optimize_acc: bool = False,
-                        generate_kml: bool = False):
+                        generate_kml: bool = False, merge_tolerance: float = None):
         """
         Main dataframe and lanes dataframe will be used here to label the maneuvers.
 
@@ -176,18 +422,30 @@ class Converter:
             acc_threshold: Acceleration threshold for labeling
             optimize_acc: Option to get optimal acceleration threshold
             generate_kml: Option to create kml files
+            merge_tolerance: If set, consecutive longitudinal maneuvers are merged as long as the modelled speed
+                deviates less than this tolerance in km/h. The result is reported in self.merge_report.
         """
         if optimize_acc:
-            acc_thres_opt = man_helpers.calc_opt_acc_thresh(self.df, self.df_lanes, self.opendrive_path,
-                                                            self.use_folder, self.dir_name)
+            with self.metrics.stage('threshold_optimization', rows=len(self.df)):
+                acc_thres_opt = man_helpers.calc_opt_acc_thresh(self.df, self.df_lanes, self.opendrive_path,
+                                                                self.use_folder, self.dir_name, ltp=self.ltp,
+                                                                frame_rate=self.frame_rate,
+                                                                diagnostics=self.diagnostics,
+                                                                open_drive_header=self.open_drive_header)
             acc_threshold = acc_thres_opt
             ego_maneuver_array, inf_maneuver_array, objlist, objects, ego, movobj_grps_coord = man_helpers.label_maneuvers(
                 self.df, self.df_lanes, acc_threshold, generate_kml,
-                self.opendrive_path, self.use_folder, self.dir_name)
+                self.opendrive_path, self.use_folder, self.dir_name, ltp=self.ltp, frame_rate=self.frame_rate,
+                diagnostics=self.diagnostics, open_drive_header=self.open_drive_header, metrics=self.metrics)
         else:
             ego_maneuver_array, inf_maneuver_array, objlist, objects, ego, movobj_grps_coord = man_helpers.label_maneuvers(
                 self.df, self.df_lanes, acc_threshold, generate_kml,
-                self.opendrive_path, self.use_folder, self.dir_name)
+                self.opendrive_path, self.use_folder, self.dir_name, ltp=self.ltp, frame_rate=self.frame_rate,
+                diagnostics=self.diagnostics, open_drive_header=self.open_drive_header, metrics=self.metrics)
+
+        if merge_tolerance is not None:
+            ego_maneuver_array, self.merge_report = man_helpers.compact_maneuvers(
+                self.df, ego_maneuver_array, movobj_grps_coord, merge_tolerance, self.frame_rate)
 
         self.ego_maneuver_array = ego_maneuver_array
         self.inf_maneuver_array = inf_maneuver_array
@@ -196,9 +454,41 @@ class Converter:
         self.ego = ego
         self.movobj_grps_coord = movobj_grps_coord
 
+    def close_diagnostics(self):
+        """
+        Waits until the diagnostics of the current run are written (see diagnostics_mode).
+        """
+        self.diagnostics.close()
+
+    def get_output_path(self, radius_pos_trigger: float = 2.0, timebased_lon: bool = True,
+                        timebased_lat: bool = False, output: str = 'xosc', parameterize: bool = False) -> str:
+        """
+        Path of the scenario which write_scenario creates with these options (set_paths has to be called before).
+
+        Args:
+            radius_pos_trigger: Defines the radius of position trigger
+            timebased_lon: True -> timebase trigger for longitudinal maneuver will be used. False -> position base
+            timebased_lat: True -> timebase trigger for latitudinal maneuver will be used. False -> position base
+            output: Option for different file formats. OpenScenario -> 'xosc', compressed -> 'xosc.gz'.
+            parameterize: Scenario with parameter declarations
+
+        Returns:
+            object (str): Path to scenario file
+        """
+        if self.outfile is not None:
+            path = self.outfile
+        else:
+            path = create_output_path(self.dir_name, self.section_name, timebased_lon, timebased_lat,
+                                      radius_pos_trigger, parameterize)
+        if output == 'xosc.gz' and not path.endswith('.gz'):
+            path += '.gz'
+        return path
+
     def write_scenario(self, plot: bool = False,
                        radius_pos_trigger: float = 2.0, timebased_lon: bool = True, timebased_lat: bool = False,
-                       output: str = 'xosc'):
+                       output: str = 'xosc', streaming: bool = False, bundle: ScenarioBundle = None,
+                       trajectory_tolerance: float = None, parameterize: bool = False,
+                       vehicle_catalog: VehicleCatalog = None, content_hash: str = None, stream: TextIO = None):
         """
         Writes the trajectories or maneuvers in selected file formats.
 
@@ -207,14 +497,219 @@ class Converter:
             radius_pos_trigger: Defines the radius of position trigger
             timebased_lon: True -> timebase trigger for longitudinal maneuver will be used. False -> position base
             timebased_lat: True -> timebase trigger for latitudinal maneuver will be used. False -> position base
-            output: Pption for different file formats. To write OpenScenario -> 'xosc'.
+            output: Pption for different file formats. To write OpenScenario -> 'xosc', compressed -> 'xosc.gz'.
+            streaming: Write the scenario incrementally, for large recordings with many objects
+            bundle: Add the scenario to this archive (see scenario_writer.open_scenario_bundle) instead of a file
+            trajectory_tolerance: Write recorded trajectories simplified to this tolerance in m instead of maneuvers
+            parameterize: Declare the trigger radius and a speed factor as scenario parameters, for sweeps
+            vehicle_catalog: Reference the vehicles from this generated catalog, which is written once after the
+                last scenario (VehicleCatalog.write with the scenario directory)
+            content_hash: Written into the scenario head to detect unchanged scenarios (utils.compute_content_hash)
+            stream: Write the scenario as text to this stream instead of a file, e.g. io.StringIO
         """
-        if output == 'xosc':
+        if stream is not None and output != 'xosc':
+            raise ValueError("a stream can only be written as 'xosc'")
+        if output == 'xosc' or output == 'xosc.gz':
+            token = self.metrics.begin('xml_writing')
             outfile = convert_to_osc(self.df, self.ego, self.objects, self.ego_maneuver_array, self.inf_maneuver_array,
                                      self.movobj_grps_coord, self.objlist, plot,
                                      self.opendrive_path, self.use_folder, timebased_lon, timebased_lat,
-                                     self.section_name, radius_pos_trigger, self.dir_name, self.osc_version, self.outfile)
-            self.outfile = outfile
+                                     self.section_name, radius_pos_trigger, self.dir_name, self.osc_version, self.outfile,
+                                     self.frame_rate, streaming, output == 'xosc.gz', bundle,
+                                     trajectory_tolerance, parameterize, vehicle_catalog, content_hash,
+                                     self.user_config, self.open_drive_header, stream)
+            self.metrics.end(token, rows=len(self.df), objects=len(self.objects) + 1,
+                             events=sum(len(a) for a in self.ego_maneuver_array.values()) +
+                             sum(len(a) for a in self.inf_maneuver_array.values()))
+            if bundle is None and stream is None:
+                self.outfile = outfile
 
         else:
             raise NotImplementedError('selected output option is not implemented')
+
+    def write_scenario_variants(self, variants: list, output: str = 'xosc', max_workers: int = None,
+                                vehicle_catalog: VehicleCatalog = None) -> list:
+        """
+        Writes several trigger variants of the labeled maneuvers in one pass. Entities and init are shared.
+
+        Args:
+            variants: List of (timebased_lon, timebased_lat, radius_pos_trigger), e.g. [(True, False, 2.0)]
+            output: Option for different file formats. To write OpenScenario -> 'xosc', compressed -> 'xosc.gz'.
+            max_workers: If set, the variants are written in parallel by this number of threads
+            vehicle_catalog: Reference the vehicles from this generated catalog
+
+        Returns:
+            object (list): Paths to scenario files in the order of variants
+        """
+        if output == 'xosc' or output == 'xosc.gz':
+            return convert_to_osc_variants(self.df, self.ego, self.objects, self.ego_maneuver_array,
+                                           self.inf_maneuver_array, self.movobj_grps_coord, self.objlist,
+                                           self.opendrive_path, self.use_folder, variants, self.section_name,
+                                           self.dir_name, self.osc_version, self.frame_rate, output == 'xosc.gz',
+                                           max_workers, vehicle_catalog, self.user_config)
+        else:
+            raise NotImplementedError('selected output option is not implemented')
+
+    def sweep(self, grid: dict, output: str = 'xosc', max_workers: int = None) -> pd.DataFrame:
+        """
+        Writes the scenarios of all combinations of the grid from the processed trajectories. Each stage runs once
+        per distinct input: the lane changes are labeled once, the longitudinal maneuvers once per acceleration
+        threshold and the trigger variants of a threshold are written in one pass (see write_scenario_variants).
+
+        Args:
+            grid: Values by parameter, parameters are 'acc_threshold' (default [0.2]), 'radius_pos_trigger'
+                (default [2.0]), 'timebased_lon' (default [True]) and 'timebased_lat' (default [False]),
+                e.g. {'acc_threshold': [0.1, 0.2], 'timebased_lat': [True, False]}
+            output: Option for different file formats. To write OpenScenario -> 'xosc', compressed -> 'xosc.gz'.
+            max_workers: If set, the thresholds and the variants of each threshold are processed in parallel by
+                this number of threads
+
+        Returns:
+            object (pd.DataFrame): One row per combination with the parameters, the path to the scenario file,
+                the number of longitudinal events and the speed model RMSE in km/h of ego and of all vehicles
+        """
+        if not isinstance(grid, dict):
+            raise TypeError("input must be a dict")
+        defaults = {'acc_threshold': [0.2], 'radius_pos_trigger': [2.0], 'timebased_lon': [True],
+                    'timebased_lat': [False]}
+        unknown = set(grid) - set(defaults)
+        if unknown:
+            raise ValueError('unknown sweep parameters: ' + ', '.join(sorted(unknown)))
+        values = {name: list(grid.get(name, default)) for name, default in defaults.items()}
+        for name, types in [('acc_threshold', float), ('radius_pos_trigger', float),
+                            ('timebased_lon', bool), ('timebased_lat', bool)]:
+            if not values[name] or not all(isinstance(value, types) for value in values[name]):
+                raise TypeError("input must be a non-empty list of " + types.__name__)
+        if output != 'xosc' and output != 'xosc.gz':
+            raise NotImplementedError('selected output option is not implemented')
+        if self.df is None:
+            raise RuntimeError('process_trajectories has to be called before sweep')
+
+        thresholds = list(dict.fromkeys(values['acc_threshold']))
+        variants = list(itertools.product(values['timebased_lon'], values['timebased_lat'],
+                                          values['radius_pos_trigger']))
+        lateral = man_helpers.label_lateral_maneuvers(self.df, self.df_lanes, self.metrics)
+
+        def run_threshold(acc_threshold: float) -> tuple:
+            ego_maneuver_array, inf_maneuver_array, objlist, objects, ego, movobj_grps_coord = \
+                man_helpers.label_maneuvers(self.df, self.df_lanes, acc_threshold, False, self.opendrive_path,
+                                            self.use_folder, self.dir_name, ltp=self.ltp,
+                                            frame_rate=self.frame_rate, open_drive_header=self.open_drive_header,
+                                            metrics=self.metrics, lateral=lateral)
+            rmse = man_helpers.speed_model_rmse(self.df, ego_maneuver_array, movobj_grps_coord, self.frame_rate)
+            events = sum(len(array) for array in ego_maneuver_array.values())
+
+            # One file per path, e.g. the radius is not part of time based variants
+            section_name = self.section_name + '_acc_' + str(acc_threshold)
+            unique = {}
+            for variant in variants:
+                unique.setdefault(create_output_path(self.dir_name, section_name, *variant), variant)
+            with self.metrics.stage('xml_writing', events=events * len(unique)):
+                paths = convert_to_osc_variants(self.df, ego, objects, ego_maneuver_array, inf_maneuver_array,
+                                                movobj_grps_coord, objlist, self.opendrive_path, self.use_folder,
+                                                list(unique.values()), section_name, self.dir_name,
+                                                self.osc_version, self.frame_rate, output == 'xosc.gz',
+                                                max_workers, None, self.user_config)
+            paths = dict(zip(unique.keys(), paths))
+            rows = []
+            for variant in variants:
+                path = paths[create_output_path(self.dir_name, section_name, *variant)]
+                rows.append([acc_threshold, *variant, path, events, rmse[0], np.nanmean(list(rmse.values()))])
+            return rows
+
+        if max_workers is None:
+            results = [run_threshold(acc_threshold) for acc_threshold in thresholds]
+        else:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                results = list(executor.map(run_threshold, thresholds))
+
+        return pd.DataFrame([row for rows in results for row in rows],
+                            columns=['acc_threshold', 'timebased_lon', 'timebased_lat', 'radius_pos_trigger', 'path',
+                                     'events', 'rmse_ego', 'rmse_mean'])
+
+    def convert_stream(self, frames: Iterable, df_lanes: pd.DataFrame = None, acc_threshold: float = 0.2,
+                       radius_pos_trigger: float = 2.0, timebased_lon: bool = True, timebased_lat: bool = False,
+                       relative: bool = True, callback: Callable = None, output_scenario_path: str = None) -> str:
+        """
+        Labels the maneuvers of a live recording frame by frame and writes the scenario (see
+        streaming.StreamingLabeler). Segments are final a few frames after they end, the scenario head is written
+        after the first frames and the acts when the stream ends. The trajectories are not kept, self.df stays None.
+        The scenario is written to a temporary file next to the output, which replaces the output when the stream
+        ended without error, so an empty or broken stream leaves an existing scenario untouched.
+
+        Args:
+            frames: Frames in the layout of a relative csv file (e.g. osi_stream.osi_to_frame), or of the processed
+                main dataframe if relative is False. Objects are not filtered, they are taken from the first frame.
+            df_lanes: Absolute lane lines, e.g. of process_trajectories of a previous drive. Default self.df_lanes.
+            acc_threshold: Acceleration threshold for labeling
+            radius_pos_trigger: Defines the radius of position trigger
+            timebased_lon: True -> timebase trigger for longitudinal maneuver will be used. False -> position base
+            timebased_lat: True -> timebase trigger for latitudinal maneuver will be used. False -> position base
+            relative: Frames with object positions relative to ego
+            callback: Called with each segment (key, 'lon' or 'lat', row) when it is final
+            output_scenario_path: Output file path and name. If not specified, the path given to set_paths or a
+                chosen directory and name.
+
+        Returns:
+            object (str): Path to scenario file
+        """
+        if df_lanes is None:
+            df_lanes = self.df_lanes
+        if df_lanes is None:
+            raise ValueError('the lane lines have to be known before the stream, pass df_lanes or call '
+                             'process_trajectories')
+        if callback is not None and not callable(callback):
+            raise TypeError("input must be callable")
+
+        labeler = StreamingLabeler(df_lanes, self.opendrive_path, acc_threshold, self.frame_rate, self.ltp,
+                                   self.open_drive_header)
+        if output_scenario_path is not None:
+            path = output_scenario_path
+        else:
+            path = self.get_output_path(radius_pos_trigger, timebased_lon, timebased_lat)
+        self.df = None
+
+        token = self.metrics.begin('streaming_labeling')
+        fd, temp_path = tempfile.mkstemp(prefix='.tmp_', suffix='.xosc', dir=os.path.dirname(os.path.abspath(path)))
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                self._write_stream(f, frames, labeler, relative, radius_pos_trigger, timebased_lon, timebased_lat,
+                                   callback)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+
+        self.ego_maneuver_array, self.inf_maneuver_array, self.objlist, self.objects, self.ego, \
+            self.movobj_grps_coord = labeler.result()
+        self.metrics.end(token, rows=labeler.frames, objects=len(self.objects) + 1,
+                         events=sum(len(a) for a in self.ego_maneuver_array.values()) +
+                         sum(len(a) for a in self.inf_maneuver_array.values()))
+        self.outfile = path
+        return path
+
+    def _write_stream(self, f: TextIO, frames: Iterable, labeler: StreamingLabeler, relative: bool,
+                      radius_pos_trigger: float, timebased_lon: bool, timebased_lat: bool, callback: Callable):
+        """
+        Labels the frames and writes the scenario to f, see convert_stream.
+        """
+        writer = StreamingScenarioWriter(f, self.opendrive_path, self.osc_version, timebased_lon, timebased_lat,
+                                         radius_pos_trigger, self.frame_rate, self.user_config, self.dir_name)
+
+        def emit(segments: list):
+            if writer.vehicles is None and labeler.start is not None:
+                ego, objects, objlist = labeler.start
+                writer.write_head(ego, objects, objlist)
+            for key, kind, row in segments:
+                writer.add(key, kind, row)
+                if callback is not None:
+                    callback((key, kind, row))
+
+        for frame in frames:
+            if relative:
+                frame = process_frame(frame, self.ltp)
+            emit(labeler.push(frame))
+        emit(labeler.finish())
+        if labeler.start is None:
+            raise ValueError('the stream contains no frames')
+        writer.close()
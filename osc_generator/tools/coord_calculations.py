@@ -20,19 +20,282 @@
 
 import pandas as pd
 import math
+import os
+import json
+import hashlib
 import pyproj
 from pyproj import Geod
 import numpy as np
 import warnings
+from typing import Union, IO
+from xml.etree import ElementTree
+
+# Memoised OpenDRIVE headers and projections, keyed by (absolute path, mtime, size) of the OpenDRIVE file
+_open_drive_header_cache: dict = {}
+_open_drive_proj_cache: dict = {}
+# Memoised transformers, keyed by the definitions of both coordinate systems
+_transformer_cache: dict = {}
+# Bump when the layout of the on-disk header sidecar changes
+_HEADER_SIDECAR_VERSION = 1
+# Directory of the on-disk header sidecars, shared between processes. None: headers are memoised in memory only
+header_sidecar_dir: str = None
+
+# WGS84 ellipsoid
+_WGS84_A = 6378137.0
+_WGS84_F = 1 / 298.257223563
+_WGS84_E2 = _WGS84_F * (2 - _WGS84_F)
+_WGS84_B = _WGS84_A * (1 - _WGS84_F)
+
+
+class LocalTangentPlane:
+    """
+    East-north-up (ENU) local tangent plane anchored at a geo position on the WGS84 ellipsoid.
+    All conversions are vectorised planar operations, intended for scenes spanning a few kilometres.
+    """
+
+    def __init__(self, lat0: float, lon0: float):
+        if not (isinstance(lat0, float) or isinstance(lat0, int)):
+            raise TypeError("input must be a float or int")
+        if not (isinstance(lon0, float) or isinstance(lon0, int)):
+            raise TypeError("input must be a float or int")
+
+        self.lat0: float = float(lat0)
+        self.lon0: float = float(lon0)
+        self.extent = None
+        self.max_error = None
+
+        phi0 = math.radians(self.lat0)
+        lam0 = math.radians(self.lon0)
+        self._sin_phi0 = math.sin(phi0)
+        self._cos_phi0 = math.cos(phi0)
+        self._sin_lam0 = math.sin(lam0)
+        self._cos_lam0 = math.cos(lam0)
+        self._ecef0 = self._to_ecef(np.array([self.lat0]), np.array([self.lon0]))
+
+    @staticmethod
+    def _to_ecef(lat: np.ndarray, lon: np.ndarray) -> tuple:
+        """
+        Helper function. Geodetic coordinates on the ellipsoid surface to earth-centered earth-fixed coordinates.
+
+        Args:
+            lat: Latitude in degree
+            lon: Longitude in degree
+
+        Returns:
+            object (tuple): x, y, z in meters
+        """
+        phi = np.radians(lat)
+        lam = np.radians(lon)
+        n = _WGS84_A / np.sqrt(1 - _WGS84_E2 * np.sin(phi) ** 2)
+        return n * np.cos(phi) * np.cos(lam), n * np.cos(phi) * np.sin(lam), n * (1 - _WGS84_E2) * np.sin(phi)
+
+    @staticmethod
+    def _from_ecef(x: np.ndarray, y: np.ndarray, z: np.ndarray) -> tuple:
+        """
+        Helper function. Earth-centered earth-fixed coordinates to geodetic coordinates (Bowring).
+
+        Args:
+            x: x in meters
+            y: y in meters
+            z: z in meters
+
+        Returns:
+            object (tuple): Latitude and longitude in degree, height above ellipsoid in meters
+        """
+        ep2 = (_WGS84_A ** 2 - _WGS84_B ** 2) / _WGS84_B ** 2
+        p = np.hypot(x, y)
+        theta = np.arctan2(z * _WGS84_A, p * _WGS84_B)
+        phi = np.arctan2(z + ep2 * _WGS84_B * np.sin(theta) ** 3, p - _WGS84_E2 * _WGS84_A * np.cos(theta) ** 3)
+        n = _WGS84_A / np.sqrt(1 - _WGS84_E2 * np.sin(phi) ** 2)
+        return np.degrees(phi), np.degrees(np.arctan2(y, x)), p / np.cos(phi) - n
+
+    def to_enu(self, lat: Union[float, np.ndarray], lon: Union[float, np.ndarray]) -> tuple:
+        """
+        Project geo positions on the ellipsoid surface into the tangent plane.
+
+        Args:
+            lat: Latitude in degree
+            lon: Longitude in degree
+
+        Returns:
+            object (tuple): East and north in meters
+        """
+        x, y, z = self._to_ecef(np.asarray(lat, dtype=float), np.asarray(lon, dtype=float))
+        dx = x - self._ecef0[0]
+        dy = y - self._ecef0[1]
+        dz = z - self._ecef0[2]
+        east = -self._sin_lam0 * dx + self._cos_lam0 * dy
+        north = -self._sin_phi0 * self._cos_lam0 * dx - self._sin_phi0 * self._sin_lam0 * dy + self._cos_phi0 * dz
+        return east, north
+
+    def from_enu(self, east: Union[float, np.ndarray], north: Union[float, np.ndarray]) -> tuple:
+        """
+        Get the geo positions on the ellipsoid surface below tangent plane coordinates.
+
+        Args:
+            east: East in meters
+            north: North in meters
+
+        Returns:
+            object (tuple): Latitude and longitude in degree
+        """
+        east = np.asarray(east, dtype=float)
+        north = np.asarray(north, dtype=float)
+        # Start on the sphere approximation and let the ellipsoid height correct the up component
+        up = -(east ** 2 + north ** 2) / (2 * _WGS84_A)
+        lat = lon = None
+        for _ in range(2):
+            dx = -self._sin_lam0 * east - self._sin_phi0 * self._cos_lam0 * north + self._cos_phi0 * self._cos_lam0 * up
+            dy = self._cos_lam0 * east - self._sin_phi0 * self._sin_lam0 * north + self._cos_phi0 * self._sin_lam0 * up
+            dz = self._cos_phi0 * north + self._sin_phi0 * up
+            lat, lon, height = self._from_ecef(self._ecef0[0] + dx, self._ecef0[1] + dy, self._ecef0[2] + dz)
+            up = up - height
+        return lat, lon
+
+    def convergence(self, lat: Union[float, np.ndarray], lon: Union[float, np.ndarray]) -> np.ndarray:
+        """
+        Angle between geographic north at the given positions and the north axis of the tangent plane.
+
+        Args:
+            lat: Latitude in degree
+            lon: Longitude in degree
+
+        Returns:
+            object (np.ndarray): Angle in rad, clockwise
+        """
+        phi = np.radians(np.asarray(lat, dtype=float))
+        d_lam = np.radians(np.asarray(lon, dtype=float)) - math.radians(self.lon0)
+        north_east = -np.sin(phi) * np.sin(d_lam)
+        north_north = self._sin_phi0 * np.sin(phi) * np.cos(d_lam) + self._cos_phi0 * np.cos(phi)
+        return np.arctan2(north_east, north_north)
+
+    def offset(self, lat: Union[float, np.ndarray], lon: Union[float, np.ndarray],
+               heading: Union[float, np.ndarray], dist_x: Union[float, np.ndarray],
+               dist_y: Union[float, np.ndarray]) -> tuple:
+        """
+        Computes new geo positions from a 2D vector in vehicle coordinates (x forward, y left).
+
+        Args:
+            lat: Latitude of the vehicle in degree
+            lon: Longitude of the vehicle in degree
+            heading: Heading of the vehicle in degree, starting north increasing clockwise
+            dist_x: Distance in x direction of the vehicle
+            dist_y: Distance in y direction of the vehicle
+
+        Returns:
+            object (tuple): Latitude and longitude of the new positions in degree
+        """
+        east, north = self.to_enu(lat, lon)
+        head = np.radians(np.asarray(heading, dtype=float)) + self.convergence(lat, lon)
+        dist_x = np.asarray(dist_x, dtype=float)
+        dist_y = np.asarray(dist_y, dtype=float)
+        return self.from_enu(east + dist_x * np.sin(head) - dist_y * np.cos(head),
+                             north + dist_x * np.cos(head) + dist_y * np.sin(head))
+
+    def azimuth(self, lat1: Union[float, np.ndarray], lon1: Union[float, np.ndarray],
+                lat2: Union[float, np.ndarray], lon2: Union[float, np.ndarray]) -> np.ndarray:
+        """
+        Azimuth from the first to the second positions.
+
+        Args:
+            lat1: Start latitude
+            lon1: Start longitude
+            lat2: End latitude
+            lon2: End longitude
+
+        Returns:
+            object (np.ndarray): Azimuth in degree, starting north increasing clockwise, in (-180, 180]
+        """
+        east1, north1 = self.to_enu(lat1, lon1)
+        east2, north2 = self.to_enu(lat2, lon2)
+        azi = np.degrees(np.arctan2(east2 - east1, north2 - north1) - self.convergence(lat1, lon1))
+        return np.where(azi <= -180, azi + 360, np.where(azi > 180, azi - 360, azi))
 
+    def evaluate(self, lat: np.ndarray, lon: np.ndarray, max_samples: int = 1000) -> float:
+        """
+        Estimates the worst-case error of the tangent plane against WGS84 geodesics for a scene.
+        The error is the distance between the planar vector from the anchor to a position and the
+        geodesic distance and azimuth to the same position. Result is stored in self.extent and self.max_error.
+
+        Args:
+            lat: Latitudes of the scene in degree
+            lon: Longitudes of the scene in degree
+            max_samples: Maximum number of scene positions to be evaluated (bounding box is always included)
 
-def transform_lanes_rel2abs(df: pd.DataFrame, data_type: str) -> pd.DataFrame:
+        Returns:
+            object (float): Worst-case error in meters
+        """
+        lat = np.asarray(lat, dtype=float)
+        lon = np.asarray(lon, dtype=float)
+        valid = ~(np.isnan(lat) | np.isnan(lon))
+        lat = lat[valid]
+        lon = lon[valid]
+        if len(lat) > max_samples:
+            step = int(math.ceil(len(lat) / max_samples))
+            lat_s, lon_s = lat[::step], lon[::step]
+        else:
+            lat_s, lon_s = lat, lon
+        if len(lat):
+            corners_lat = np.array([lat.min(), lat.min(), lat.max(), lat.max()])
+            corners_lon = np.array([lon.min(), lon.max(), lon.min(), lon.max()])
+            lat_s = np.concatenate([lat_s, corners_lat])
+            lon_s = np.concatenate([lon_s, corners_lon])
+
+        east, north = self.to_enu(lat_s, lon_s)
+        azi, _, dist = Geod(ellps='WGS84').inv(np.full(len(lat_s), self.lon0), np.full(len(lat_s), self.lat0),
+                                                lon_s, lat_s)
+        azi = np.radians(azi)
+        error = np.hypot(east - dist * np.sin(azi), north - dist * np.cos(azi))
+
+        self.extent = float(np.max(np.hypot(east, north))) if len(east) else 0.0
+        self.max_error = float(np.max(error)) if len(error) else 0.0
+        return self.max_error
+
+
+def create_local_tangent_plane(lat: pd.Series, lon: pd.Series, max_extent: float = 5000.0,
+                               max_error: float = 0.05) -> Union[LocalTangentPlane, None]:
+    """
+    Creates a local tangent plane anchored at the first valid position of a scene. Falls back (returns None)
+    if the scene is too large for planar calculations.
+
+    Args:
+        lat: Latitudes of the scene (e.g. ego), first valid one is the anchor
+        lon: Longitudes of the scene
+        max_extent: Maximum distance of a scene position to the anchor in meters
+        max_error: Maximum tolerated worst-case error against WGS84 in meters
+
+    Returns:
+        object (Union[LocalTangentPlane, None]): Local tangent plane, None if tolerances are exceeded
+    """
+    if not isinstance(lat, pd.Series):
+        raise TypeError("input must be a pd.Series")
+    if not isinstance(lon, pd.Series):
+        raise TypeError("input must be a pd.Series")
+    if not isinstance(max_extent, float):
+        raise TypeError("input must be a float")
+    if not isinstance(max_error, float):
+        raise TypeError("input must be a float")
+
+    valid = ~(lat.isna() | lon.isna())
+    if not valid.any():
+        return None
+    ltp = LocalTangentPlane(float(lat[valid].iloc[0]), float(lon[valid].iloc[0]))
+    ltp.evaluate(lat.values, lon.values)
+    if ltp.extent > max_extent or ltp.max_error > max_error:
+        warnings.warn("scene extent " + str(round(ltp.extent, 1)) + " m, worst-case error " +
+                      str(round(ltp.max_error, 4)) + " m -> local tangent plane not used", UserWarning)
+        return None
+    return ltp
+
+
+def transform_lanes_rel2abs(df: pd.DataFrame, data_type: str, ltp: LocalTangentPlane = None) -> pd.DataFrame:
     """
     Transforms lane coordinates in absolut coordinate system
 
     Args:
         df: Input dataframe
         data_type: Input file type (csv or osi)
+        ltp: Local tangent plane for planar calculations. If None, WGS84 geodesics are used.
 
     Returns:
         object (pd.DataFrame): Transformed dataframe
@@ -41,6 +304,8 @@ def transform_lanes_rel2abs(df: pd.DataFrame, data_type: str) -> pd.DataFrame:
         raise TypeError("input must be a pd.DataFrame")
     if not isinstance(data_type, str):
         raise TypeError("input must be a str")
+    if not (ltp is None or isinstance(ltp, LocalTangentPlane)):
+        raise TypeError("input must be a LocalTangentPlane")
 
     def find_curve(begin_x: float, begin_y: float, k: float, end_x: float) -> np.ndarray:
         """
@@ -116,31 +381,48 @@ def transform_lanes_rel2abs(df: pd.DataFrame, data_type: str) -> pd.DataFrame:
     else:
         pass
 
-    geodetic = Geod(ellps='WGS84')
-    r_lane_lat_list = []
-    r_lane_lon_list = []
-    l_lane_lat_list = []
-    l_lane_lon_list = []
-    for i in range(len(df.index)):
-        if i < length:
-            r_lane_lat, r_lane_lon = calc_new_geopos_from_2d_vector(df['lat'][i], df['long'][i], df['heading'][i],
-                                                df['lin_right_beginn_x'][i],
-                                                df['lin_right_y_abstand'][i], geodetic)
-            l_lane_lat, l_lane_lon = calc_new_geopos_from_2d_vector(df['lat'][i], df['long'][i], df['heading'][i],
-                                                df['lin_left_beginn_x'][i],
-                                                df['lin_left_y_abstand'][i], geodetic)
-        else:
-            r_lane_lat, r_lane_lon = calc_new_geopos_from_2d_vector(df['lat'][length], df['long'][length], df['heading'][length],
-                                                df['lin_right_beginn_x'][i],
-                                                df['lin_right_y_abstand'][i], geodetic)
-            l_lane_lat, l_lane_lon = calc_new_geopos_from_2d_vector(df['lat'][length], df['long'][length], df['heading'][length],
-                                                df['lin_left_beginn_x'][i],
-                                                df['lin_left_y_abstand'][i], geodetic)
-
-        r_lane_lat_list.append(r_lane_lat)
-        r_lane_lon_list.append(r_lane_lon)
-        l_lane_lat_list.append(l_lane_lat)
-        l_lane_lon_list.append(l_lane_lon)
+    if ltp is not None:
+        # Appended curve points use the last ego pose
+        pose = np.minimum(np.arange(len(df.index)), length)
+        pose_lat = df['lat'].values[pose]
+        pose_lon = df['long'].values[pose]
+        pose_heading = df['heading'].values[pose]
+        r_lane_lat_list, r_lane_lon_list = ltp.offset(pose_lat, pose_lon, pose_heading,
+                                                      df['lin_right_beginn_x'].values,
+                                                      df['lin_right_y_abstand'].values)
+        l_lane_lat_list, l_lane_lon_list = ltp.offset(pose_lat, pose_lon, pose_heading,
+                                                      df['lin_left_beginn_x'].values,
+                                                      df['lin_left_y_abstand'].values)
+        r_lane_lat_list = list(r_lane_lat_list)
+        r_lane_lon_list = list(r_lane_lon_list)
+        l_lane_lat_list = list(l_lane_lat_list)
+        l_lane_lon_list = list(l_lane_lon_list)
+    else:
+        geodetic = Geod(ellps='WGS84')
+        r_lane_lat_list = []
+        r_lane_lon_list = []
+        l_lane_lat_list = []
+        l_lane_lon_list = []
+        for i in range(len(df.index)):
+            if i < length:
+                r_lane_lat, r_lane_lon = calc_new_geopos_from_2d_vector(df['lat'][i], df['long'][i], df['heading'][i],
+                                                    df['lin_right_beginn_x'][i],
+                                                    df['lin_right_y_abstand'][i], geodetic)
+                l_lane_lat, l_lane_lon = calc_new_geopos_from_2d_vector(df['lat'][i], df['long'][i], df['heading'][i],
+                                                    df['lin_left_beginn_x'][i],
+                                                    df['lin_left_y_abstand'][i], geodetic)
+            else:
+                r_lane_lat, r_lane_lon = calc_new_geopos_from_2d_vector(df['lat'][length], df['long'][length], df['heading'][length],
+                                                    df['lin_right_beginn_x'][i],
+                                                    df['lin_right_y_abstand'][i], geodetic)
+                l_lane_lat, l_lane_lon = calc_new_geopos_from_2d_vector(df['lat'][length], df['long'][length], df['heading'][length],
+                                                    df['lin_left_beginn_x'][i],
+                                                    df['lin_left_y_abstand'][i], geodetic)
+
+            r_lane_lat_list.append(r_lane_lat)
+            r_lane_lon_list.append(r_lane_lon)
+            l_lane_lat_list.append(l_lane_lat)
+            l_lane_lon_list.append(l_lane_lon)
 
     # Give each line an ID:
     left = []
@@ -229,7 +511,110 @@ def transform_lanes_rel2abs(df: pd.DataFrame, data_type: str) -> pd.DataFrame:
     return df_out
 
 
-def get_proj_from_open_drive(open_drive_path: str) -> str:
+def parse_open_drive_header(source: Union[str, IO]) -> dict:
+    """
+    Incrementally parse the header of an OpenDRIVE file. Parsing stops after the closing header tag,
+    so the (possibly very large) road network is never read.
+
+    Args:
+        source: Path to OpenDRIVE file or binary file-like object
+
+    Returns:
+        object (dict): 'geo_reference' (str or None) and 'offset' (dict with x, y, z, hdg or None)
+    """
+    if not (isinstance(source, str) or hasattr(source, 'read')):
+        raise TypeError("input must be a str or file-like object")
+
+    header = {'geo_reference': None, 'offset': None}
+    for event, elem in ElementTree.iterparse(source, events=('start', 'end')):
+        tag = elem.tag.rsplit('}', 1)[-1]
+        if event == 'start':
+            if tag == 'road':
+                # No header in front of the road network
+                break
+            continue
+        if tag == 'geoReference':
+            # CDATA content may span several lines
+            if elem.text is not None and elem.text.strip():
+                header['geo_reference'] = ' '.join(elem.text.split())
+        elif tag == 'offset':
+            header['offset'] = {key: float(elem.get(key, 0.0)) for key in ('x', 'y', 'z', 'hdg')}
+        elif tag == 'header':
+            break
+    return header
+
+
+def _open_drive_cache_key(open_drive_path: str) -> tuple:
+    """
+    Helper function. Identifies an OpenDRIVE file by its absolute path, modification time and size.
+
+    Args:
+        open_drive_path: Path to OpenDRIVE file
+
+    Returns:
+        object (tuple): Cache key
+    """
+    stat = os.stat(open_drive_path)
+    return os.path.abspath(open_drive_path), stat.st_mtime_ns, stat.st_size
+
+
+def read_open_drive_header(open_drive_path: str, sidecar_dir: str = None) -> dict:
+    """
+    Get the header information of an OpenDRIVE file.
+    Results are memoised per (path, mtime, size) for the lifetime of the process and, if a sidecar directory is
+    given, in a sidecar file in this directory. Nothing is written next to the OpenDRIVE file.
+
+    Args:
+        open_drive_path: Path to OpenDRIVE file
+        sidecar_dir: Directory of the on-disk sidecars. Default is header_sidecar_dir, None disables them.
+
+    Returns:
+        object (dict): 'geo_reference' (str or None) and 'offset' (dict with x, y, z, hdg or None)
+    """
+    if not isinstance(open_drive_path, str):
+        raise TypeError("input must be a str")
+    if sidecar_dir is None:
+        sidecar_dir = header_sidecar_dir
+    if sidecar_dir is not None and not isinstance(sidecar_dir, str):
+        raise TypeError("input must be a str")
+
+    key = _open_drive_cache_key(open_drive_path)
+    if key in _open_drive_header_cache:
+        return dict(_open_drive_header_cache[key])
+
+    header = None
+    sidecar_path = None
+    if sidecar_dir is not None:
+        sidecar_path = os.path.join(sidecar_dir, hashlib.sha1(key[0].encode('utf-8')).hexdigest() + '.header.json')
+    if sidecar_path is not None and os.path.isfile(sidecar_path):
+        try:
+            with open(sidecar_path, 'r') as sidecar_file:
+                data = json.load(sidecar_file)
+            if data.get('version') == _HEADER_SIDECAR_VERSION and data.get('path') == key[0] \
+                    and data.get('mtime_ns') == key[1] and data.get('size') == key[2]:
+                header = {'geo_reference': data.get('geo_reference'), 'offset': data.get('offset')}
+        except (OSError, ValueError):
+            header = None
+
+    if header is None:
+        with open(open_drive_path, 'rb') as open_drive:
+            header = parse_open_drive_header(open_drive)
+        if sidecar_path is not None:
+            try:
+                os.makedirs(sidecar_dir, exist_ok=True)
+                with open(sidecar_path, 'w') as sidecar_file:
+                    json.dump({'version': _HEADER_SIDECAR_VERSION, 'path': key[0], 'mtime_ns': key[1],
+                               'size': key[2], 'geo_reference': header['geo_reference'],
+                               'offset': header['offset']}, sidecar_file, indent=4)
+            except OSError:
+                # The sidecar is an optimisation only
+                pass
+
+    _open_drive_header_cache[key] = header
+    return dict(header)
+
+
+def get_proj_from_open_drive(open_drive_path: str) -> Union[pyproj.Proj, str]:
     """
     Get Coordinate system infos from OpenDrive file
 
@@ -237,19 +622,65 @@ def get_proj_from_open_drive(open_drive_path: str) -> str:
         open_drive_path: Path to OpenDRIVE file
 
     Returns:
-        object (str): Coordinate system
+        object (Union[pyproj.Proj, str]): Coordinate system, 'unknown' if the file has no geo reference
     """
     if not isinstance(open_drive_path, str):
         raise TypeError("input must be a str")
 
-    open_drive = open(open_drive_path, 'r')
-    proj_open_drive = 'unknown'
-    for line in open_drive:
-        if line.find("geoReference") >= 0:
-            proj_open_drive = pyproj.Proj(line[line.find("[CDATA[") + 7:line.find("]]")])
-            break
-    if proj_open_drive == 'unknown':
-        warnings.warn("no valid coordinate system found in OpenDRIVE -> coordinates won't be correct", UserWarning)
+    key = _open_drive_cache_key(open_drive_path)
+    if key in _open_drive_proj_cache:
+        return _open_drive_proj_cache[key]
 
-    open_drive.close()
+    header = read_open_drive_header(open_drive_path)
+    proj_open_drive = get_proj_from_open_drive_header(header)
+    if proj_open_drive != 'unknown':
+        _open_drive_proj_cache[key] = proj_open_drive
     return proj_open_drive
+
+
+def get_proj_from_open_drive_header(header: dict) -> Union[pyproj.Proj, str]:
+    """
+    Get Coordinate system infos from the header of an OpenDrive file, e.g. parsed from memory
+
+    Args:
+        header: Header information (see parse_open_drive_header)
+
+    Returns:
+        object (Union[pyproj.Proj, str]): Coordinate system, 'unknown' if the header has no geo reference
+    """
+    if not isinstance(header, dict):
+        raise TypeError("input must be a dict")
+
+    if header.get('geo_reference') is None:
+        warnings.warn("no valid coordinate system found in OpenDRIVE -> coordinates won't be correct", UserWarning)
+        return 'unknown'
+
+    key = ('geo_reference', header['geo_reference'])
+    if key not in _open_drive_proj_cache:
+        _open_drive_proj_cache[key] = pyproj.Proj(header['geo_reference'])
+    return _open_drive_proj_cache[key]
+
+
+def get_transformer(proj_in: pyproj.Proj, proj_out: pyproj.Proj, always_xy: bool = True) -> pyproj.Transformer:
+    """
+    Transformer between two coordinate systems, created once per pair and process
+
+    Args:
+        proj_in: Source coordinate system
+        proj_out: Target coordinate system
+        always_xy: Option to use lon, lat (x, y) order regardless of the axis order of the coordinate systems
+
+    Returns:
+        object (pyproj.Transformer): Transformer
+    """
+    if not isinstance(proj_in, pyproj.Proj):
+        raise TypeError("input must be a pyproj.Proj")
+    if not isinstance(proj_out, pyproj.Proj):
+        raise TypeError("input must be a pyproj.Proj")
+    if not isinstance(always_xy, bool):
+        raise TypeError("input must be a bool")
+
+    key = (proj_in.srs, proj_out.srs, always_xy)
+    if key not in _transformer_cache:
+        _transformer_cache[key] = pyproj.Transformer.from_crs(proj_in.crs, proj_out.crs, always_xy=always_xy)
+    return _transformer_cache[key]
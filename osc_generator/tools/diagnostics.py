@@ -0,0 +1,171 @@
+#  ****************************************************************************
+#  @diagnostics.py
+#
+#  @copyright 2023 e:fs TechHub GmbH and Audi AG. All rights reserved.
+#
+#  @license Apache v2.0
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#  ****************************************************************************
+
+import os
+import queue
+import atexit
+import threading
+import numpy as np
+import pandas as pd
+from typing import Union
+
+
+class DiagnosticsSink:
+    """
+    Receives intermediate results of a run (processed trajectories, maneuver tables and arrays) for debugging.
+
+    Modes:
+        'off': Nothing is written
+        'npz': All records of the run in one compressed file diagnostics.npz, written when the sink is closed
+        'legacy': One file per record (df33.csv, maneuver_lists/*.xlsx and *.csv)
+
+    Files are written by a background thread, record() only takes a copy of the data.
+    """
+    modes = ('off', 'npz', 'legacy')
+    npz_name = 'diagnostics.npz'
+
+    def __init__(self, mode: str = 'off', dir_name: str = '', max_pending: int = 64):
+        """
+        Args:
+            mode: 'off', 'npz' or 'legacy'
+            dir_name: Directory of the diagnostic files
+            max_pending: Maximum number of records waiting for the writer, record() blocks if exceeded
+        """
+        if not isinstance(mode, str):
+            raise TypeError("input must be a str")
+        if not isinstance(dir_name, str):
+            raise TypeError("input must be a str")
+        if not isinstance(max_pending, int):
+            raise TypeError("input must be a int")
+        if mode not in self.modes:
+            raise ValueError("mode must be one of " + ', '.join(self.modes))
+
+        self.mode = mode
+        self.dir_name = dir_name
+        self._arrays = {}
+        self._error = None
+        self._closed = False
+        self._thread = None
+        if mode != 'off':
+            self._queue = queue.Queue(maxsize=max_pending)
+            self._thread = threading.Thread(target=self._write, name='DiagnosticsWriter', daemon=True)
+            self._thread.start()
+            atexit.register(self.close)
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != 'off'
+
+    def record(self, name: str, data: Union[pd.DataFrame, np.ndarray], legacy_file: str):
+        """
+        Queues an intermediate result.
+
+        Args:
+            name: Key of the record in the npz file
+            data: Table or array
+            legacy_file: Path relative to dir_name in legacy mode, written as .xlsx or .csv by extension
+        """
+        if not self.enabled:
+            return
+        if not isinstance(name, str):
+            raise TypeError("input must be a str")
+        if not isinstance(data, (pd.DataFrame, np.ndarray)):
+            raise TypeError("input must be a pd.DataFrame or np.ndarray")
+        if not isinstance(legacy_file, str):
+            raise TypeError("input must be a str")
+        if self._closed:
+            raise ValueError("diagnostics sink is closed")
+        self._raise_error()
+
+        if self.mode == 'npz':
+            data = self._to_array(data)
+        else:
+            data = data.copy()
+        self._queue.put((name, data, legacy_file))
+
+    def close(self):
+        """
+        Waits until all records are written. In npz mode, the file is written now.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        if self._thread is not None:
+            atexit.unregister(self.close)
+            self._queue.put(None)
+            self._thread.join()
+        self._raise_error()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @staticmethod
+    def _to_array(data: Union[pd.DataFrame, np.ndarray]) -> np.ndarray:
+        """
+        Converts a table to a structured array, which can be stored without pickling.
+        """
+        if isinstance(data, np.ndarray):
+            return data.astype(str) if data.dtype == object else data.copy()
+        records = data.to_records()
+        names = records.dtype.names
+        if any(records.dtype[name] == object for name in names):
+            return np.rec.fromarrays([records[name].astype(str) if records.dtype[name] == object else records[name]
+                                      for name in names], names=names)
+        return records
+
+    def _raise_error(self):
+        if self._error is not None:
+            raise RuntimeError("writing diagnostics to " + self.dir_name + " failed") from self._error
+
+    def _write(self):
+        """
+        Writer thread, consumes the queue until close() is called.
+        """
+        finished = False
+        try:
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    finished = True
+                    break
+                name, data, legacy_file = item
+                if self.mode == 'npz':
+                    self._arrays[name] = data
+                    continue
+
+                path = os.path.join(self.dir_name, legacy_file)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                if isinstance(data, np.ndarray):
+                    data = pd.DataFrame(data)
+                if legacy_file.endswith('.xlsx'):
+                    data.to_excel(path)
+                else:
+                    data.to_csv(path)
+
+            if self.mode == 'npz' and self._arrays:
+                np.savez_compressed(os.path.join(self.dir_name, self.npz_name), **self._arrays)
+        except Exception as e:
+            self._error = e
+            # Keep consuming until close(), so that producers do not block
+            while not finished:
+                finished = self._queue.get() is None
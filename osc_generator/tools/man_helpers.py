@@ -22,18 +22,33 @@
 helper functions for maneuver abstraction.
 """
 import pyproj
-import simplekml
 import math
 import pandas as pd
 import numpy as np
 import os
+import logging
 from typing import Union
 
-from osc_generator.tools.coord_calculations import get_proj_from_open_drive
+from osc_generator.tools.coord_calculations import get_proj_from_open_drive, get_proj_from_open_drive_header, \
+    get_transformer, LocalTangentPlane
 from osc_generator.tools import rulebased, utils
+from osc_generator.tools.diagnostics import DiagnosticsSink
+from osc_generator.tools.metrics import MetricsRecorder
 
+logger = logging.getLogger(__name__)
 
-def convert_maneuvers_to_kml(lat: pd.DataFrame, lon: pd.DataFrame, maneuvers: pd.DataFrame, ego: bool) -> simplekml.Kml:
+# Vehicle names by OSI object class
+OBJECT_CLASSES = {0: ["UnknownClass1"],
+                  3: ["PedestrianClass1"],
+                  5: ["BicycleClass1"],
+                  6: ["MotorbikeClass1"],
+                  7: ["CarClass1"],
+                  8: ["VanClass1"],
+                  9: ["TruckClass1"],
+                  11: ["AnimalClass1"]}
+
+
+def convert_maneuvers_to_kml(lat: pd.DataFrame, lon: pd.DataFrame, maneuvers: pd.DataFrame, ego: bool) -> 'simplekml.Kml':
     """
     Convert manuevers from pandas Dataframe to kml
 
@@ -55,6 +70,9 @@ def convert_maneuvers_to_kml(lat: pd.DataFrame, lon: pd.DataFrame, maneuvers: pd
     if not isinstance(ego, bool):
         raise TypeError("input must be a bool")
 
+    # Optional, only needed for kml output
+    import simplekml
+
     kml = simplekml.Kml()
     overview_doc = kml.newdocument(name='Overview')
     old_lon = 0
@@ -124,13 +142,116 @@ def convert_maneuvers_to_kml(lat: pd.DataFrame, lon: pd.DataFrame, maneuvers: pd
     return kml
 
 
-def create_speed_model(df_maneuvers: pd.DataFrame, init_speed: float) -> Union[list, np.ndarray]:
+def calc_object_headings(df: pd.DataFrame, movobj_grps_coord: np.ndarray, step: int = 1,
+                         ltp: LocalTangentPlane = None) -> np.ndarray:
+    """
+    Headings of all objects for all frames, computed in one vectorised call.
+
+    Args:
+        df: Main processed dataframe
+        movobj_grps_coord: Coordinates of groups of detected objects (lat, lon, speed, class)
+        step: Frame offset used to derive the heading from two positions
+        ltp: Local tangent plane for planar heading calculation. If None, WGS84 geodesics are used.
+
+    Returns:
+        object (np.ndarray): Headings in rad (OpenSCENARIO convention), shape (frames, objects)
+    """
+    if not isinstance(df, pd.DataFrame):
+        raise TypeError("input must be a pd.DataFrame")
+    if not isinstance(movobj_grps_coord, np.ndarray):
+        raise TypeError("input must be a np.ndarray")
+
+    if len(movobj_grps_coord) == 0:
+        return np.empty((len(df), 0))
+    lat = df[list(movobj_grps_coord[:, 0])].values
+    lon = df[list(movobj_grps_coord[:, 1])].values
+    if ltp is not None:
+        headings = np.full(lat.shape, np.nan)
+        if lat.shape[0] > step:
+            headings[:-step] = ltp.azimuth(lat[:-step], lon[:-step], lat[step:], lon[step:])
+            headings[-step:] = headings[-step - 1]
+    else:
+        headings = utils.calc_headings_from_geo_positions(lat, lon, step=step)
+    return utils.convert_headings(headings)
+
+
+def _get_proj(opendrive_path: str, open_drive_header: dict = None) -> Union[pyproj.Proj, str]:
+    """
+    Coordinate system of the OpenDRIVE file, from its header if given.
+
+    Args:
+        opendrive_path: Path to the OpenDRIVE file
+        open_drive_header: Header of the OpenDRIVE file
+
+    Returns:
+        object (Union[pyproj.Proj, str]): Coordinate system, 'unknown' if there is no geo reference
+    """
+    if open_drive_header is not None:
+        return get_proj_from_open_drive_header(open_drive_header)
+    return get_proj_from_open_drive(open_drive_path=opendrive_path)
+
+
+def create_trajectories(df: pd.DataFrame, movobj_grps_coord: np.ndarray, opendrive_path: str,
+                        frame_rate: float = 10.0, open_drive_header: dict = None) -> dict:
+    """
+    Timed positions of ego and objects in the coordinate system of the OpenDRIVE file.
+    All positions are projected in one vectorised call, frames without position of a vehicle are skipped.
+
+    Args:
+        df: Main processed dataframe
+        movobj_grps_coord: Coordinates of groups of detected objects (lat, lon, speed, class)
+        opendrive_path: Path to the OpenDRIVE file
+        frame_rate: Frames per second of df
+        open_drive_header: Header of the OpenDRIVE file (see coord_calculations.parse_open_drive_header),
+            used instead of reading the file
+
+    Returns:
+        object (dict): Arrays with columns time, x, y, heading (rad) for ego (key 0) and objects (key 1..n)
+    """
+    if not isinstance(df, pd.DataFrame):
+        raise TypeError("input must be a pd.DataFrame")
+    if not isinstance(movobj_grps_coord, np.ndarray):
+        raise TypeError("input must be a np.ndarray")
+    if not isinstance(opendrive_path, str):
+        raise TypeError("input must be a str")
+    if not isinstance(frame_rate, float):
+        raise TypeError("input must be a float")
+
+    proj_in = pyproj.Proj('EPSG:4326')
+    proj_out = _get_proj(opendrive_path, open_drive_header)
+    if proj_out == 'unknown':
+        raise ValueError('OpenDRIVE file has no geo reference')
+    transformer = get_transformer(proj_in, proj_out)
+
+    lat_vars = ['lat'] + [p[0] for p in movobj_grps_coord]
+    lon_vars = ['long'] + [p[1] for p in movobj_grps_coord]
+    lat = df[lat_vars].values.astype(float)
+    lon = df[lon_vars].values.astype(float)
+    x, y = transformer.transform(lon, lat)
+
+    headings = np.column_stack([utils.convert_headings(df['heading'].values),
+                                calc_object_headings(df, movobj_grps_coord)])
+    # Last frame before an object disappears keeps its previous heading
+    headings = pd.DataFrame(headings).ffill().values
+
+    time = np.arange(len(df)) / frame_rate
+    trajectories = {}
+    for key in range(lat.shape[1]):
+        valid = ~np.isnan(lat[:, key]) & ~np.isnan(lon[:, key]) & ~np.isnan(headings[:, key])
+        trajectories[key] = np.column_stack([time[valid], x[valid, key], y[valid, key], headings[valid, key]])
+
+    return trajectories
+
+
+def create_speed_model(df_maneuvers: pd.DataFrame, init_speed: float,
+                       frame_rate: float = 10.0) -> Union[list, np.ndarray]:
     """
     Helper function. Extracts speed information from maneuvers.
 
     Args:
         df_maneuvers: Maneuvers array
         init_speed: Initial speed
+        frame_rate: Frames per second of the maneuver indices
 
     Returns:
         object (Union[list, np.ndarray]): Modelled speed
@@ -139,6 +260,8 @@ def create_speed_model(df_maneuvers: pd.DataFrame, init_speed: float) -> Union[l
         raise TypeError("input must be a pd.DataFrame")
     if not isinstance(init_speed, float):
         raise TypeError("input must be a float")
+    if not isinstance(frame_rate, float):
+        raise TypeError("input must be a float")
 
     speed = []
     man_type = []  # 1 for acceleration, -1 for deceleration, 0 for standstill
@@ -177,7 +300,7 @@ def create_speed_model(df_maneuvers: pd.DataFrame, init_speed: float) -> Union[l
             maneuver_len.append(int(df_maneuvers.iloc[i].iloc[1]) + 1 - int(df_maneuvers.iloc[i].iloc[0]))
 
     start_time = int(df_maneuvers.iloc[0].iloc[0])
-    delta_t = 0.1
+    delta_t = 1 / frame_rate
 
     acc_full = []
     for i in range(len(maneuver_len)):
@@ -196,8 +319,271 @@ def create_speed_model(df_maneuvers: pd.DataFrame, init_speed: float) -> Union[l
     return speed_np
 
 
+def _model_speed_deviation(maneuver_array: np.ndarray, speed: np.ndarray, frame_rate: float) -> np.ndarray:
+    """
+    Helper function. Deviation of the modelled speed (create_speed_model) from the recorded speed.
+
+    Args:
+        maneuver_array: Longitudinal maneuvers of one vehicle
+        speed: Recorded speed in km/h for all frames
+        frame_rate: Frames per second of the maneuver indices
+
+    Returns:
+        object (np.ndarray): Absolute deviation in km/h for all frames, NaN where no model or recording exists
+    """
+    start = int(maneuver_array[0][0])
+    model_speed = create_speed_model(pd.DataFrame(maneuver_array), float(speed[start]), frame_rate)
+    deviation = np.full(len(speed), np.nan)
+    length = min(len(model_speed), len(speed) - start)
+    deviation[start:start + length] = np.abs(model_speed[:length] - speed[start:start + length])
+    return deviation
+
+
+def _model_speed_rmse(maneuver_array: np.ndarray, speed: np.ndarray, frame_rate: float) -> float:
+    """
+    Helper function. RMSE of the modelled speed (create_speed_model) in km/h.
+
+    Args:
+        maneuver_array: Longitudinal maneuvers of one vehicle
+        speed: Recorded speed in km/h for all frames
+        frame_rate: Frames per second of the maneuver indices
+
+    Returns:
+        object (float): RMSE in km/h, NaN without maneuvers
+    """
+    if len(maneuver_array) == 0:
+        return float('nan')
+    deviation = _model_speed_deviation(maneuver_array, speed, frame_rate)
+    return float(np.sqrt(np.nanmean(np.square(deviation))))
+
+
+def speed_model_rmse(df: pd.DataFrame, ego_maneuver_array: dict, movobj_grps_coord: np.ndarray,
+                     frame_rate: float = 10.0) -> dict:
+    """
+    Quality of the labeled longitudinal maneuvers: RMSE of the speed modelled by the maneuvers against the recording.
+
+    Args:
+        df: Main processed dataframe
+        ego_maneuver_array: Dict containing array of ego and object maneuvers
+        movobj_grps_coord: Coordinates of groups of detected objects (lat, lon, speed, class)
+        frame_rate: Frames per second of df
+
+    Returns:
+        object (dict): RMSE in km/h by key of ego_maneuver_array, NaN for vehicles without maneuvers
+    """
+    if not isinstance(df, pd.DataFrame):
+        raise TypeError("input must be a pd.DataFrame")
+    if not isinstance(ego_maneuver_array, dict):
+        raise TypeError("input must be a dict")
+    if not isinstance(frame_rate, float):
+        raise TypeError("input must be a float")
+
+    rmse = {}
+    for key, maneuver_array in ego_maneuver_array.items():
+        if key == 0:
+            speed = df['speed'].values.astype(float)
+        else:
+            speed = df[movobj_grps_coord[key - 1][2]].values.astype(float)
+        rmse[key] = _model_speed_rmse(maneuver_array, speed, frame_rate)
+    return rmse
+
+
+def _speed_model_segments(starts: np.ndarray, ends: np.ndarray, names: np.ndarray, targets: np.ndarray,
+                          rates: np.ndarray, init_speed: float) -> tuple:
+    """
+    Helper function. Speed model of create_speed_model as segments of constant acceleration.
+
+    Args:
+        starts: Start frames of the maneuvers
+        ends: End frames of the maneuvers
+        names: Maneuver names
+        targets: Target speeds in m/s
+        rates: Acceleration rates in m/s²
+        init_speed: Initial speed in km/h
+
+    Returns:
+        object (tuple): Number of frames (np.ndarray) and acceleration in m/s² (np.ndarray) of each segment
+    """
+    previous_targets = np.concatenate([[init_speed / 3.6], targets[:-1]])
+    man_type = np.select([names == 'FM_EGO_decelerate', names == 'FM_EGO_accelerate', names == 'FM_EGO_standstill',
+                          names == 'FM_EGO_keep_velocity'],
+                         [-1.0, 1.0, 0.0, np.where(targets >= previous_targets, 1.0, -1.0)], np.nan)
+    lengths = ends + 1 - starts
+    if len(starts) > 1:
+        # Overlapping maneuvers continue after the end of the previous one
+        overlap = ends[:-1] >= starts[1:]
+        lengths[1:] = np.where(overlap, ends[1:] - ends[:-1], lengths[1:])
+    return lengths, rates * man_type
+
+
+def _accumulated_acceleration(cum_lengths: np.ndarray, cum_areas: np.ndarray, accelerations: np.ndarray,
+                              index: np.ndarray) -> np.ndarray:
+    """
+    Helper function. Sum of the accelerations of all frames of the speed model before index.
+    """
+    segment = np.searchsorted(cum_lengths, index, side='right')
+    previous_length = np.where(segment > 0, cum_lengths[segment - 1], 0)
+    previous_area = np.where(segment > 0, cum_areas[segment - 1], 0.0)
+    return previous_area + (index - previous_length) * accelerations[np.minimum(segment, len(accelerations) - 1)]
+
+
+def merge_maneuvers(maneuver_array: np.ndarray, speed: np.ndarray, tolerance: float,
+                    frame_rate: float = 10.0) -> np.ndarray:
+    """
+    Merges consecutive accelerate, decelerate and keep velocity maneuvers into one linear speed change,
+    as long as the modelled speed within the merged maneuver deviates less than tolerance from the recording.
+
+    Args:
+        maneuver_array: Longitudinal maneuvers of one vehicle (start, end, name, x, y, target speed, rate)
+        speed: Recorded speed in km/h for all frames
+        tolerance: Maximum deviation of the modelled speed in km/h
+        frame_rate: Frames per second of the maneuver indices
+
+    Returns:
+        object (np.ndarray): Merged maneuvers
+    """
+    if not isinstance(maneuver_array, np.ndarray):
+        raise TypeError("input must be a np.ndarray")
+    if not isinstance(speed, np.ndarray):
+        raise TypeError("input must be a np.ndarray")
+    if not isinstance(tolerance, float):
+        raise TypeError("input must be a float")
+    if not isinstance(frame_rate, float):
+        raise TypeError("input must be a float")
+
+    if len(maneuver_array) == 0:
+        return maneuver_array
+
+    mergeable = ['FM_EGO_accelerate', 'FM_EGO_decelerate', 'FM_EGO_keep_velocity']
+    speed = speed.astype(float)
+    # Numeric columns of the current maneuvers. origin is the input row of the first merged maneuver (position),
+    # the other columns are written back for merged maneuvers only.
+    origin = np.arange(len(maneuver_array))
+    merged = np.zeros(len(maneuver_array), dtype=bool)
+    starts = maneuver_array[:, 0].astype(float).astype(int)
+    ends = maneuver_array[:, 1].astype(float).astype(int)
+    names = maneuver_array[:, 2].astype(str)
+    targets = maneuver_array[:, 5].astype(float)
+    rates = maneuver_array[:, 6].astype(float)
+
+    # Speed model of create_speed_model as segments. Merging keeps the frames of the segments, only the
+    # acceleration within the merged maneuver and the speed offset of the following maneuvers change.
+    start_time = starts[0]
+    init_speed = speed[start_time]
+    lengths, accelerations = _speed_model_segments(starts, ends, names, targets, rates, init_speed)
+    cum_lengths = np.cumsum(lengths)
+    cum_areas = np.cumsum(lengths * accelerations)
+    model_end = start_time + min(cum_lengths[-1], len(speed) - start_time)
+
+    k = 0
+    while k < len(starts) - 1:
+        # Adjacent or sharing the boundary frame
+        if names[k] in mergeable and names[k + 1] in mergeable and starts[k + 1] <= ends[k] + 1:
+            start = starts[k]
+            end = ends[k + 1]
+            target_speed = targets[k + 1]
+            speed_change = target_speed - speed[start] / 3.6
+            if names[k] == names[k + 1]:
+                name = names[k]
+            elif speed_change > 0:
+                name = 'FM_EGO_accelerate'
+            else:
+                name = 'FM_EGO_decelerate'
+            rate = abs(speed_change) / ((end + 1 - start) / frame_rate)
+
+            if not np.isnan(rate):
+                if name == 'FM_EGO_accelerate':
+                    acceleration = rate
+                elif name == 'FM_EGO_decelerate':
+                    acceleration = -rate
+                else:
+                    previous_target = targets[k - 1] if k > 0 else init_speed / 3.6
+                    acceleration = rate if target_speed >= previous_target else -rate
+                prefix_length = cum_lengths[k - 1] if k > 0 else 0
+                prefix_area = cum_areas[k - 1] if k > 0 else 0.0
+                merged_length = cum_lengths[k + 1] - prefix_length
+                delta = prefix_area + merged_length * acceleration - cum_areas[k + 1]
+
+                # Modelled speed of the candidate on the frames of the merged maneuver
+                frames = np.arange(max(start, start_time), min(end + 1, model_end))
+                index = frames - start_time
+                area = _accumulated_acceleration(cum_lengths, cum_areas, accelerations, index)
+                area = np.where(index <= prefix_length, area,
+                                np.where(index <= prefix_length + merged_length,
+                                         prefix_area + (index - prefix_length) * acceleration, area + delta))
+                deviation = np.abs(init_speed + area * 3.6 / frame_rate - speed[frames])
+                if np.nanmax(deviation, initial=0.0) <= tolerance:
+                    origin = np.delete(origin, k + 1)
+                    merged = np.delete(merged, k + 1)
+                    merged[k] = True
+                    starts = np.delete(starts, k + 1)
+                    ends = np.delete(ends, k)
+                    names = np.delete(names, k + 1)
+                    names[k] = name
+                    targets = np.delete(targets, k)
+                    rates = np.delete(rates, k + 1)
+                    rates[k] = rate
+                    accelerations = np.delete(accelerations, k + 1)
+                    accelerations[k] = acceleration
+                    cum_lengths = np.delete(cum_lengths, k)
+                    cum_areas = np.concatenate([cum_areas[:k], cum_areas[k + 1:] + delta])
+                    continue
+        k += 1
+
+    result = maneuver_array[origin]
+    for i in np.flatnonzero(merged):
+        result[i, [0, 1, 2, 5, 6]] = [starts[i], ends[i], names[i], targets[i], rates[i]]
+    return result
+
+
+def compact_maneuvers(df: pd.DataFrame, ego_maneuver_array: dict, movobj_grps_coord: np.ndarray,
+                      tolerance: float, frame_rate: float = 10.0) -> tuple:
+    """
+    Post-labeling compaction: merges maneuvers of ego and objects (see merge_maneuvers) to reduce the
+    number of events in the scenario.
+
+    Args:
+        df: Main processed dataframe
+        ego_maneuver_array: Dict containing array of ego and object maneuvers
+        movobj_grps_coord: Coordinates of groups of detected objects (lat, lon, speed, class)
+        tolerance: Maximum deviation of the modelled speed in km/h
+        frame_rate: Frames per second of df
+
+    Returns:
+        object (tuple): Dict with merged maneuver arrays,
+            report (pd.DataFrame) with events and speed model RMSE in km/h before and after merging
+    """
+    if not isinstance(df, pd.DataFrame):
+        raise TypeError("input must be a pd.DataFrame")
+    if not isinstance(ego_maneuver_array, dict):
+        raise TypeError("input must be a dict")
+
+    merged_maneuver_array = {}
+    report = []
+    for key, maneuver_array in ego_maneuver_array.items():
+        if key == 0:
+            speed = df['speed'].values.astype(float)
+            name = 'Ego'
+        else:
+            speed = df[movobj_grps_coord[key - 1][2]].values.astype(float)
+            name = 'Player' + str(key)
+
+        if len(maneuver_array) == 0:
+            merged_maneuver_array[key] = maneuver_array
+            continue
+        merged = merge_maneuvers(maneuver_array, speed, tolerance, frame_rate)
+        merged_maneuver_array[key] = merged
+
+        rmse = [_model_speed_rmse(array, speed, frame_rate) for array in [maneuver_array, merged]]
+        report.append([name, len(maneuver_array), len(merged), rmse[0], rmse[1]])
+
+    report = pd.DataFrame(report, columns=['object', 'events_before', 'events_after', 'rmse_before', 'rmse_after'])
+    return merged_maneuver_array, report
+
+
 def calc_opt_acc_thresh(df: pd.DataFrame, df_lanes: pd.DataFrame, opendrive_path: str, use_folder: bool,
-                        dir_name: str) -> np.ndarray:
+                        dir_name: str, ltp: LocalTangentPlane = None, frame_rate: float = 10.0,
+                        diagnostics: DiagnosticsSink = None, open_drive_header: dict = None) -> np.ndarray:
     """
     Used to get optimal acceleration threshold to label maneuvers.
 
@@ -207,6 +593,11 @@ def calc_opt_acc_thresh(df: pd.DataFrame, df_lanes: pd.DataFrame, opendrive_path
         opendrive_path: Path to opendrive file
         use_folder: Option to create folder structure
         dir_name: Name of the folder
+        ltp: Local tangent plane for planar heading calculation. If None, WGS84 geodesics are used.
+        frame_rate: Frames per second of df
+        diagnostics: Receives the acceleration thresholds of all objects
+        open_drive_header: Header of the OpenDRIVE file (see coord_calculations.parse_open_drive_header),
+            used instead of reading the file
 
     Returns:
         object (np.ndarray): Optimal acceleration threshold
@@ -221,6 +612,8 @@ def calc_opt_acc_thresh(df: pd.DataFrame, df_lanes: pd.DataFrame, opendrive_path
         raise TypeError("input must be a bool")
     if not isinstance(dir_name, str):
         raise TypeError("input must be a str")
+    if not isinstance(frame_rate, float):
+        raise TypeError("input must be a float")
 
     movobj_grps_coord = utils.find_vars('lat_|lon_|speed_|class', df.columns, reshape=True)
 
@@ -232,7 +625,7 @@ def calc_opt_acc_thresh(df: pd.DataFrame, df_lanes: pd.DataFrame, opendrive_path
 
     for x in range(len(acc_thres)):
         curr_thres = acc_thres[x]
-        print('current acceleration threshold: ' + str(curr_thres))
+        logger.info('current acceleration threshold: ' + str(curr_thres))
         speed = df['speed']
         accelerate_array, \
             start_array, \
@@ -241,7 +634,7 @@ def calc_opt_acc_thresh(df: pd.DataFrame, df_lanes: pd.DataFrame, opendrive_path
             decelerate_array, \
             stop_array, \
             reversing_array = rulebased.create_longitudinal_maneuver_vectors(
-                speed, acceleration_definition_threshold=curr_thres)
+                speed, acceleration_definition_threshold=curr_thres, frame_rate=frame_rate)
 
         # Create df with maneuver info
         df_maneuvers = pd.DataFrame(data=None)
@@ -265,7 +658,7 @@ def calc_opt_acc_thresh(df: pd.DataFrame, df_lanes: pd.DataFrame, opendrive_path
                 decelerate_array, \
                 stop_array, \
                 reversing_array = rulebased.create_longitudinal_maneuver_vectors(
-                    speed, acceleration_definition_threshold=acc_thres[x])
+                    speed, acceleration_definition_threshold=acc_thres[x], frame_rate=frame_rate)
             df_maneuvers_objects[i] = pd.DataFrame(data=None)
             df_maneuvers_objects[i]['FM_EGO_accelerate'] = accelerate_array
             df_maneuvers_objects[i]['FM_EGO_start'] = start_array
@@ -282,12 +675,12 @@ def calc_opt_acc_thresh(df: pd.DataFrame, df_lanes: pd.DataFrame, opendrive_path
         # Init
         # Get projection coordinates of respective open drive from open drive file
         proj_in = pyproj.Proj('EPSG:4326')
-        proj_out = get_proj_from_open_drive(open_drive_path=opendrive_path)
+        proj_out = _get_proj(opendrive_path, open_drive_header)
         columns = ['lat', 'long', 'speed', 'heading']
 
         # Get start position, speed and heading of ego
         ego = []
-        lon, lat = (pyproj.Transformer.from_crs(proj_in.crs, proj_out.crs, always_xy=True)).transform(
+        lon, lat = get_transformer(proj_in, proj_out).transform(
             df[columns[1]][0],
             df[columns[0]][0])
         ego.append(lon)
@@ -298,7 +691,7 @@ def calc_opt_acc_thresh(df: pd.DataFrame, df_lanes: pd.DataFrame, opendrive_path
         # Get start position, speed and heading of other objects
         objects = {}
         for i in range(len(movobj_grps_coord)):
-            lon, lat = (pyproj.Transformer.from_crs(proj_in.crs, proj_out.crs, always_xy=True)).transform(
+            lon, lat = get_transformer(proj_in, proj_out).transform(
                 df[movobj_grps_coord[i][1]][0],
                 df[movobj_grps_coord[i][0]][0])
             obj = list()
@@ -306,8 +699,14 @@ def calc_opt_acc_thresh(df: pd.DataFrame, df_lanes: pd.DataFrame, opendrive_path
             obj.append(lat)  # Lat
             obj.append(df[movobj_grps_coord[i][2]][0] / 3.6)  # Speed
 
-            temp_heading = utils.calc_heading_from_two_geo_positions(df[movobj_grps_coord[i][0]][0], df[movobj_grps_coord[i][1]][0],
-                                                                     df[movobj_grps_coord[i][0]][1], df[movobj_grps_coord[i][1]][1])
+            if ltp is not None:
+                temp_heading = float(ltp.azimuth(df[movobj_grps_coord[i][0]][0], df[movobj_grps_coord[i][1]][0],
+                                                 df[movobj_grps_coord[i][0]][1], df[movobj_grps_coord[i][1]][1]))
+            else:
+                temp_heading = utils.calc_heading_from_two_geo_positions(df[movobj_grps_coord[i][0]][0],
+                                                                         df[movobj_grps_coord[i][1]][0],
+                                                                         df[movobj_grps_coord[i][0]][1],
+                                                                         df[movobj_grps_coord[i][1]][1])
             obj.append(utils.convert_heading(temp_heading))
 
             objects[i] = obj
@@ -333,7 +732,7 @@ def calc_opt_acc_thresh(df: pd.DataFrame, df_lanes: pd.DataFrame, opendrive_path
             for i in range(len(maneuvers)):
                 # Start
                 if maneuvers['FM_EGO_accelerate'][i] == 1 and acceleration_switch == -1:
-                    temp_lon, temp_lat = (pyproj.Transformer.from_crs(proj_in.crs, proj_out.crs, always_xy=True)).\
+                    temp_lon, temp_lat = get_transformer(proj_in, proj_out).\
                         transform(
                         df[cols[1]][i],
                         df[cols[0]][i])
@@ -348,11 +747,11 @@ def calc_opt_acc_thresh(df: pd.DataFrame, df_lanes: pd.DataFrame, opendrive_path
                     # Calculate the acceleration = (target speed - start speed) / duration
                     temp_ego_maneuver_array[acceleration_switch][6] = abs(df[cols[2]][i - 1] / 3.6 - (
                             df[cols[2]][int(temp_ego_maneuver_array[acceleration_switch][0])] / 3.6)) / ((i - int(
-                                temp_ego_maneuver_array[acceleration_switch][0])) / 10)
+                                temp_ego_maneuver_array[acceleration_switch][0])) / frame_rate)
                     acceleration_switch = -1
 
                 if maneuvers['FM_EGO_keep_velocity'][i] == 1 and keep_switch == -1:
-                    temp_lon, temp_lat = (pyproj.Transformer.from_crs(proj_in.crs, proj_out.crs, always_xy=True)).\
+                    temp_lon, temp_lat = get_transformer(proj_in, proj_out).\
                         transform(
                         df[cols[1]][i],
                         df[cols[0]][i])
@@ -365,11 +764,11 @@ def calc_opt_acc_thresh(df: pd.DataFrame, df_lanes: pd.DataFrame, opendrive_path
                     temp_ego_maneuver_array[keep_switch][5] = df[cols[2]][i - 1] / 3.6
                     temp_ego_maneuver_array[keep_switch][6] = abs(df[cols[2]][i - 1] / 3.6 - (
                             df[cols[2]][int(temp_ego_maneuver_array[keep_switch][0])] / 3.6)) / ((i - int(
-                                temp_ego_maneuver_array[keep_switch][0])) / 10)
+                                temp_ego_maneuver_array[keep_switch][0])) / frame_rate)
                     keep_switch = -1
 
                 if maneuvers['FM_EGO_decelerate'][i] == 1 and deceleration_switch == -1:
-                    temp_lon, temp_lat = (pyproj.Transformer.from_crs(proj_in.crs, proj_out.crs, always_xy=True)).\
+                    temp_lon, temp_lat = get_transformer(proj_in, proj_out).\
                         transform(
                         df[cols[1]][i],
                         df[cols[0]][i])
@@ -382,13 +781,14 @@ def calc_opt_acc_thresh(df: pd.DataFrame, df_lanes: pd.DataFrame, opendrive_path
                     temp_ego_maneuver_array[deceleration_switch][5] = df[cols[2]][i - 1] / 3.6
                     temp_ego_maneuver_array[deceleration_switch][6] = abs(df[cols[2]][i - 1] / 3.6 - (
                             df[cols[2]][int(temp_ego_maneuver_array[deceleration_switch][0])] / 3.6)) / ((i - int(
-                                temp_ego_maneuver_array[deceleration_switch][0])) / 10)
+                                temp_ego_maneuver_array[deceleration_switch][0])) / frame_rate)
                     deceleration_switch = -1
 
                 if maneuvers['FM_EGO_standstill'][i] == 1 and standstill_switch == -1:
                     if len(temp_ego_maneuver_array) > 0:  # Assure that last maneuver (if it exists) ends with 0 km/h
                         temp_ego_maneuver_array[len(temp_ego_maneuver_array) - 1][5] = 0.0
-                    temp_lon, temp_lat = pyproj.transform(proj_in, proj_out, df[cols[1]][i], df[cols[0]][i])
+                    temp_lon, temp_lat = get_transformer(proj_in, proj_out, always_xy=False).transform(
+                        df[cols[1]][i], df[cols[0]][i])
                     temp_ego_maneuver_array = np.append(temp_ego_maneuver_array,
                                                         [[i, i, 'FM_EGO_standstill', temp_lon, temp_lat, 0, 0]],
                                                         axis=0)
@@ -398,7 +798,7 @@ def calc_opt_acc_thresh(df: pd.DataFrame, df_lanes: pd.DataFrame, opendrive_path
                     temp_ego_maneuver_array[standstill_switch][5] = df[cols[2]][i - 1] / 3.6
                     temp_ego_maneuver_array[standstill_switch][6] = abs(df[cols[2]][i - 1] / 3.6 - (
                             df[cols[2]][int(temp_ego_maneuver_array[standstill_switch][0])] / 3.6)) / ((i - int(
-                                temp_ego_maneuver_array[standstill_switch][0])) / 10)
+                                temp_ego_maneuver_array[standstill_switch][0])) / frame_rate)
                     standstill_switch = -1
 
             if j == 0:
@@ -417,7 +817,7 @@ def calc_opt_acc_thresh(df: pd.DataFrame, df_lanes: pd.DataFrame, opendrive_path
                     data=temp_ego_maneuver_array[0:, 0:],
                     index=temp_ego_maneuver_array[0:, 0],
                     columns=temp_ego_maneuver_array[0, 0:])
-                model_speed = create_speed_model(df_ego_maneuver_array, speed[0])
+                model_speed = create_speed_model(df_ego_maneuver_array, speed[0], frame_rate)
                 # Use RMSE Value for calculating the difference
                 if len(model_speed) - len(speed) == 1:
                     rmse_speed = np.sqrt(np.square(np.subtract(model_speed[0:-1], speed)).mean())
@@ -451,17 +851,50 @@ def calc_opt_acc_thresh(df: pd.DataFrame, df_lanes: pd.DataFrame, opendrive_path
             raise FileNotFoundError("input must be a valid path.")
         if not os.path.exists(os.path.abspath(dir_name)):
             raise NotADirectoryError("input must be a directory.")
-        maneuver_dir = os.path.abspath(dir_name + '/maneuver_lists')
-        if not os.path.exists(maneuver_dir):
-            os.mkdir(maneuver_dir)
-        df_opt_acc.to_csv(maneuver_dir + '/acc_thres_values.csv')
+    if diagnostics is not None:
+        diagnostics.record('acc_thres_values', df_opt_acc, 'maneuver_lists/acc_thres_values.csv')
     acc_thres_opt.append(acc_thres[np.argmin(obj_qual)])
 
     return np.array(acc_thres_opt)
 
 
+def label_lateral_maneuvers(df: pd.DataFrame, df_lanes: pd.DataFrame, metrics: MetricsRecorder = None) -> dict:
+    """
+    Labels the lane changes of ego and objects. They do not depend on the acceleration threshold, so several
+    labelings of the same trajectories can share them (see label_maneuvers).
+
+    Args:
+        df: Main processed dataframe
+        df_lanes: Dataframe which contains absolute positions of lanes
+        metrics: Receives the timing of the stage lateral_labeling
+
+    Returns:
+        object (dict): Left and right lane change vectors, key 0 for ego and i + 1 for object i
+    """
+    if not isinstance(df, pd.DataFrame):
+        raise TypeError("input must be a pd.DataFrame")
+    if not isinstance(df_lanes, pd.DataFrame):
+        raise TypeError("input must be a pd.DataFrame")
+    if metrics is None:
+        metrics = MetricsRecorder(enabled=False)
+
+    lateral = {}
+    token = metrics.begin('lateral_labeling')
+    lateral[0] = rulebased.create_lateral_maneuver_vectors(df_lanes, df['lat'], df['long'])
+    metrics.end(token, rows=len(df), objects=1)
+    movobj_grps_coord = utils.find_vars('lat_|lon_|speed_|class', df.columns, reshape=True)
+    for i in range(len(movobj_grps_coord)):
+        token = metrics.begin('lateral_labeling')
+        lateral[i + 1] = rulebased.create_lateral_maneuver_vectors(df_lanes, df[movobj_grps_coord[i][0]],
+                                                                   df[movobj_grps_coord[i][1]])  # lat lon
+        metrics.end(token, rows=len(df), objects=1)
+    return lateral
+
+
 def label_maneuvers(df: pd.DataFrame, df_lanes: pd.DataFrame, acc_threshold: Union[float, np.ndarray], generate_kml: bool,
-                    opendrive_path: str, use_folder: bool, dir_name: str) -> tuple:
+                    opendrive_path: str, use_folder: bool, dir_name: str, ltp: LocalTangentPlane = None,
+                    frame_rate: float = 10.0, diagnostics: DiagnosticsSink = None,
+                    open_drive_header: dict = None, metrics: MetricsRecorder = None, lateral: dict = None) -> tuple:
     """
     Used for labeling the maneuvers
 
@@ -473,6 +906,14 @@ def label_maneuvers(df: pd.DataFrame, df_lanes: pd.DataFrame, acc_threshold: Uni
         opendrive_path: Path to opendrive file
         use_folder: Option to create folder structure
         dir_name: Name of the folder
+        ltp: Local tangent plane for planar heading calculation. If None, WGS84 geodesics are used.
+        frame_rate: Frames per second of df
+        diagnostics: Receives the maneuver tables and arrays of all objects
+        open_drive_header: Header of the OpenDRIVE file (see coord_calculations.parse_open_drive_header),
+            used instead of reading the file
+        metrics: Receives the timing of the stages longitudinal_labeling, lateral_labeling, projection and
+            segment_extraction
+        lateral: Lane change vectors of ego and objects (see label_lateral_maneuvers). If None, they are labeled here.
 
     Returns:
         object (tuple): ego_maneuver_array, inf_maneuver_array, objlist, objects, ego, movobj_grps_coord
@@ -491,14 +932,19 @@ def label_maneuvers(df: pd.DataFrame, df_lanes: pd.DataFrame, acc_threshold: Uni
         raise TypeError("input must be a bool")
     if not isinstance(dir_name, str):
         raise TypeError("input must be a str")
+    if not isinstance(frame_rate, float):
+        raise TypeError("input must be a float")
+    if metrics is None:
+        metrics = MetricsRecorder(enabled=False)
+    if lateral is None:
+        lateral = label_lateral_maneuvers(df, df_lanes, metrics)
 
     # Get signals from trajectories file
     speed = df['speed']
 
     # Labeling
-    lane_change_left_array, lane_change_right_array = rulebased.create_lateral_maneuver_vectors(df_lanes,
-                                                                                                df['lat'],
-                                                                                                df['long'])
+    lane_change_left_array, lane_change_right_array = lateral[0]
+    token = metrics.begin('longitudinal_labeling')
     if isinstance(acc_threshold, int) or isinstance(acc_threshold, float):
         accelerate_array, \
             start_array, \
@@ -507,7 +953,7 @@ def label_maneuvers(df: pd.DataFrame, df_lanes: pd.DataFrame, acc_threshold: Uni
             decelerate_array, \
             stop_array, \
             reversing_array = rulebased.create_longitudinal_maneuver_vectors(
-                            speed, acceleration_definition_threshold=acc_threshold)
+                speed, acceleration_definition_threshold=acc_threshold, frame_rate=frame_rate)
     else:
         accelerate_array, \
             start_array, \
@@ -516,7 +962,8 @@ def label_maneuvers(df: pd.DataFrame, df_lanes: pd.DataFrame, acc_threshold: Uni
             decelerate_array, \
             stop_array, \
             reversing_array = rulebased.create_longitudinal_maneuver_vectors(
-                                speed, acceleration_definition_threshold=acc_threshold[0])
+                speed, acceleration_definition_threshold=acc_threshold[0], frame_rate=frame_rate)
+    metrics.end(token, rows=len(df), objects=1)
 
     # Create df with maneuver info
     df_maneuvers = pd.DataFrame(data=None)
@@ -530,30 +977,23 @@ def label_maneuvers(df: pd.DataFrame, df_lanes: pd.DataFrame, acc_threshold: Uni
     df_maneuvers['FM_EGO_stop'] = stop_array
     df_maneuvers['FM_EGO_reversing'] = reversing_array
 
-    if use_folder:
-        if not os.path.exists(dir_name + '/maneuver_lists'):
-            os.mkdir(dir_name + '/maneuver_lists')
-        df_maneuvers.to_excel(dir_name + '/maneuver_lists/maneuver_ego.xlsx')
+    if diagnostics is not None:
+        diagnostics.record('maneuver_ego', df_maneuvers, 'maneuver_lists/maneuver_ego.xlsx')
 
-    class_dict = {0: ["UnknownClass1"],
-                  3: ["PedestrianClass1"],
-                  5: ["BicycleClass1"],
-                  6: ["MotorbikeClass1"],
-                  7: ["CarClass1"],
-                  8: ["VanClass1"],
-                  9: ["TruckClass1"],
-                  11: ["AnimalClass1"]}
+    class_dict = OBJECT_CLASSES
 
     movobj_grps_coord = utils.find_vars('lat_|lon_|speed_|class', df.columns, reshape=True)
     rel_class = [int(df[movobj_grps_coord[i][3]].mode()) for i in range(len(movobj_grps_coord))]
     objlist = []
-    np.random.seed(0)
+    # Local generator, the choice does not depend on or change the global random state
+    rng = np.random.RandomState(0)
     for cl in rel_class:
-        objlist.append(class_dict[cl][np.random.randint(0, len(class_dict[cl]))])
+        objlist.append(class_dict[cl][rng.randint(0, len(class_dict[cl]))])
 
     df_maneuvers_objects = {}
     for i in range(len(movobj_grps_coord)):
         speed = df[movobj_grps_coord[i][2]]
+        token = metrics.begin('longitudinal_labeling')
         if isinstance(acc_threshold, int) or isinstance(acc_threshold, float):
             accelerate_array, \
                 start_array, \
@@ -562,7 +1002,7 @@ def label_maneuvers(df: pd.DataFrame, df_lanes: pd.DataFrame, acc_threshold: Uni
                 decelerate_array, \
                 stop_array, \
                 reversing_array = rulebased.create_longitudinal_maneuver_vectors(
-                                            speed, acceleration_definition_threshold=acc_threshold)
+                    speed, acceleration_definition_threshold=acc_threshold, frame_rate=frame_rate)
         else:
             accelerate_array, \
                 start_array, \
@@ -571,8 +1011,8 @@ def label_maneuvers(df: pd.DataFrame, df_lanes: pd.DataFrame, acc_threshold: Uni
                 decelerate_array, \
                 stop_array, \
                 reversing_array = rulebased.create_longitudinal_maneuver_vectors(
-                    speed,
-                    acceleration_definition_threshold=acc_threshold[i + 1])
+                    speed, acceleration_definition_threshold=acc_threshold[i + 1], frame_rate=frame_rate)
+        metrics.end(token, rows=len(df), objects=1)
         df_maneuvers_objects[i] = pd.DataFrame(data=None)
         df_maneuvers_objects[i]['FM_EGO_accelerate'] = accelerate_array
         df_maneuvers_objects[i]['FM_EGO_start'] = start_array
@@ -581,13 +1021,12 @@ def label_maneuvers(df: pd.DataFrame, df_lanes: pd.DataFrame, acc_threshold: Uni
         df_maneuvers_objects[i]['FM_EGO_decelerate'] = decelerate_array
         df_maneuvers_objects[i]['FM_EGO_stop'] = stop_array
         df_maneuvers_objects[i]['FM_EGO_reversing'] = reversing_array
-        left_lane_change_array, right_lane_change_array = rulebased.create_lateral_maneuver_vectors(df_lanes,
-                                                                                                    df[movobj_grps_coord[i][0]],
-                                                                                                    df[movobj_grps_coord[i][1]])
+        left_lane_change_array, right_lane_change_array = lateral[i + 1]
         df_maneuvers_objects[i]['FM_INF_lane_change_left'] = left_lane_change_array
         df_maneuvers_objects[i]['FM_INF_lane_change_right'] = right_lane_change_array
-        if use_folder:
-            df_maneuvers_objects[i].to_excel(dir_name + '/maneuver_lists/maneuver_object' + str(i) + '.xlsx')
+        if diagnostics is not None:
+            diagnostics.record('maneuver_object' + str(i), df_maneuvers_objects[i],
+                               'maneuver_lists/maneuver_object' + str(i) + '.xlsx')
 
     if generate_kml:
         kml = convert_maneuvers_to_kml(df['lat'], df['long'], df_maneuvers, True)
@@ -608,15 +1047,15 @@ def label_maneuvers(df: pd.DataFrame, df_lanes: pd.DataFrame, acc_threshold: Uni
 
     # Prepare simulation parameters
     # Get projection coordinates of respective open drive from open drive file
+    token = metrics.begin('projection')
     proj_in = pyproj.Proj('EPSG:4326')
-    proj_out = get_proj_from_open_drive(open_drive_path=opendrive_path)
+    proj_out = _get_proj(opendrive_path, open_drive_header)
     columns = ['lat', 'long', 'speed', 'heading']
 
     # Get start position, speed and heading of ego
     ego = []
-    lon, lat = (pyproj.Transformer.from_crs(proj_in.crs, proj_out.crs, always_xy=True)).transform(df[columns[1]][0],
-                                                                                                  df[columns[0]][0])
-    
+    lon, lat = get_transformer(proj_in, proj_out).transform(df[columns[1]][0], df[columns[0]][0])
+
     ego.append(lon)
     ego.append(lat)
     ego.append(df[columns[2]][0] / 3.6)  # speed
@@ -625,7 +1064,7 @@ def label_maneuvers(df: pd.DataFrame, df_lanes: pd.DataFrame, acc_threshold: Uni
     # Get start position, speed and heading of other objects
     objects = {}
     for i in range(len(movobj_grps_coord)):
-        lon, lat = (pyproj.Transformer.from_crs(proj_in.crs, proj_out.crs, always_xy=True)).transform(
+        lon, lat = get_transformer(proj_in, proj_out).transform(
             df[movobj_grps_coord[i][1]][0],
             df[movobj_grps_coord[i][0]][0])
         obj = list()
@@ -633,13 +1072,21 @@ def label_maneuvers(df: pd.DataFrame, df_lanes: pd.DataFrame, acc_threshold: Uni
         obj.append(lat)  # Lat
         obj.append(df[movobj_grps_coord[i][2]][0] / 3.6)  # speed
 
-        temp_heading = utils.calc_heading_from_two_geo_positions(df[movobj_grps_coord[i][0]][0], df[movobj_grps_coord[i][1]][0],
-                                                                 df[movobj_grps_coord[i][0]][2], df[movobj_grps_coord[i][1]][2])
+        if ltp is not None:
+            temp_heading = float(ltp.azimuth(df[movobj_grps_coord[i][0]][0], df[movobj_grps_coord[i][1]][0],
+                                             df[movobj_grps_coord[i][0]][2], df[movobj_grps_coord[i][1]][2]))
+        else:
+            temp_heading = utils.calc_heading_from_two_geo_positions(df[movobj_grps_coord[i][0]][0],
+                                                                     df[movobj_grps_coord[i][1]][0],
+                                                                     df[movobj_grps_coord[i][0]][2],
+                                                                     df[movobj_grps_coord[i][1]][2])
         obj.append(utils.convert_heading(temp_heading))
 
         objects[i] = obj
+    metrics.end(token, objects=len(movobj_grps_coord) + 1)
 
     # Get maneuvers
+    token = metrics.begin('segment_extraction')
     ego_maneuver_array = {}
     for j in range(len(df_maneuvers_objects) + 1):  # + 1 because of ego maneuvers
         # Ego basis maneuvers for speed & acceleration control
@@ -660,7 +1107,7 @@ def label_maneuvers(df: pd.DataFrame, df_lanes: pd.DataFrame, acc_threshold: Uni
         for i in range(len(maneuvers)):
             # Start
             if maneuvers['FM_EGO_accelerate'][i] == 1 and acceleration_switch == -1:
-                temp_lon, temp_lat = (pyproj.Transformer.from_crs(proj_in.crs, proj_out.crs, always_xy=True)).transform(
+                temp_lon, temp_lat = get_transformer(proj_in, proj_out).transform(
                     df[cols[1]][i],
                     df[cols[0]][i])
                 temp_ego_maneuver_array = np.append(temp_ego_maneuver_array,
@@ -674,11 +1121,11 @@ def label_maneuvers(df: pd.DataFrame, df_lanes: pd.DataFrame, acc_threshold: Uni
                 # Calculate the acceleration = (target speed - start speed) / duration
                 temp_ego_maneuver_array[acceleration_switch][6] = abs(df[cols[2]][i - 1] / 3.6 - (
                         df[cols[2]][int(temp_ego_maneuver_array[acceleration_switch][0])] / 3.6)) / ((i - int(
-                            temp_ego_maneuver_array[acceleration_switch][0])) / 10)
+                            temp_ego_maneuver_array[acceleration_switch][0])) / frame_rate)
                 acceleration_switch = -1
 
             if maneuvers['FM_EGO_keep_velocity'][i] == 1 and keep_switch == -1:
-                temp_lon, temp_lat = (pyproj.Transformer.from_crs(proj_in.crs, proj_out.crs, always_xy=True)).transform(
+                temp_lon, temp_lat = get_transformer(proj_in, proj_out).transform(
                     df[cols[1]][i],
                     df[cols[0]][i])
                 temp_ego_maneuver_array = np.append(temp_ego_maneuver_array,
@@ -689,11 +1136,11 @@ def label_maneuvers(df: pd.DataFrame, df_lanes: pd.DataFrame, acc_threshold: Uni
                 temp_ego_maneuver_array[keep_switch][5] = df[cols[2]][i - 1] / 3.6
                 temp_ego_maneuver_array[keep_switch][6] = abs(
                     df[cols[2]][i - 1] / 3.6 - (df[cols[2]][int(temp_ego_maneuver_array[keep_switch][0])] / 3.6)) / \
-                    ((i - int(temp_ego_maneuver_array[keep_switch][0])) / 10)
+                    ((i - int(temp_ego_maneuver_array[keep_switch][0])) / frame_rate)
                 keep_switch = -1
 
             if maneuvers['FM_EGO_decelerate'][i] == 1 and deceleration_switch == -1:
-                temp_lon, temp_lat = (pyproj.Transformer.from_crs(proj_in.crs, proj_out.crs, always_xy=True)).transform(
+                temp_lon, temp_lat = get_transformer(proj_in, proj_out).transform(
                     df[cols[1]][i],
                     df[cols[0]][i])
                 temp_ego_maneuver_array = np.append(temp_ego_maneuver_array,
@@ -704,13 +1151,14 @@ def label_maneuvers(df: pd.DataFrame, df_lanes: pd.DataFrame, acc_threshold: Uni
                 temp_ego_maneuver_array[deceleration_switch][5] = df[cols[2]][i - 1] / 3.6
                 temp_ego_maneuver_array[deceleration_switch][6] = abs(df[cols[2]][i - 1] / 3.6 - (
                         df[cols[2]][int(temp_ego_maneuver_array[deceleration_switch][0])] / 3.6)) / ((i - int(
-                            temp_ego_maneuver_array[deceleration_switch][0])) / 10)
+                            temp_ego_maneuver_array[deceleration_switch][0])) / frame_rate)
                 deceleration_switch = -1
 
             if maneuvers['FM_EGO_standstill'][i] == 1 and standstill_switch == -1:
                 if len(temp_ego_maneuver_array) > 0:  # Assure that last maneuver (if it exists) ends with 0 km/h
                     temp_ego_maneuver_array[len(temp_ego_maneuver_array) - 1][5] = 0.0
-                temp_lon, temp_lat = pyproj.transform(proj_in, proj_out, df[cols[1]][i], df[cols[0]][i])
+                temp_lon, temp_lat = get_transformer(proj_in, proj_out, always_xy=False).transform(
+                    df[cols[1]][i], df[cols[0]][i])
                 temp_ego_maneuver_array = np.append(temp_ego_maneuver_array,
                                                     [[i, i, 'FM_EGO_standstill', temp_lon, temp_lat, 0, 0]], axis=0)
                 standstill_switch = temp_ego_maneuver_array.shape[0] - 1
@@ -719,13 +1167,13 @@ def label_maneuvers(df: pd.DataFrame, df_lanes: pd.DataFrame, acc_threshold: Uni
                 temp_ego_maneuver_array[standstill_switch][5] = df[cols[2]][i - 1] / 3.6
                 temp_ego_maneuver_array[standstill_switch][6] = abs(df[cols[2]][i - 1] / 3.6 - (
                         df[cols[2]][int(temp_ego_maneuver_array[standstill_switch][0])] / 3.6)) / ((i - int(
-                            temp_ego_maneuver_array[standstill_switch][0])) / 10)
+                            temp_ego_maneuver_array[standstill_switch][0])) / frame_rate)
                 standstill_switch = -1
 
         ego_maneuver_array[j] = temp_ego_maneuver_array
-        if use_folder:
-            pd.DataFrame(temp_ego_maneuver_array).to_csv(
-                dir_name + '/maneuver_lists/maneuver_array_lon_' + str(j) + '.csv')
+        if diagnostics is not None:
+            diagnostics.record('maneuver_array_lon_' + str(j), temp_ego_maneuver_array,
+                               'maneuver_lists/maneuver_array_lon_' + str(j) + '.csv')
 
     # Infrastructure maneuvers for lane change control
     inf_maneuver_array = {}
@@ -744,40 +1192,45 @@ def label_maneuvers(df: pd.DataFrame, df_lanes: pd.DataFrame, acc_threshold: Uni
         for i in range(len(maneuvers)):
             # Get start and end time of maneuver
             if maneuvers['FM_INF_lane_change_left'][i] == 1 and lane_change_left_switch == -1:
-                temp_lon, temp_lat = pyproj.transform(proj_in, proj_out, df[cols[1]][i], df[cols[0]][i])
+                temp_lon, temp_lat = get_transformer(proj_in, proj_out, always_xy=False).transform(
+                    df[cols[1]][i], df[cols[0]][i])
                 temp_inf_maneuver_array = np.append(temp_inf_maneuver_array,
                                                     [[i, i, 'FM_INF_lane_change_left', temp_lon, temp_lat, 0]], axis=0)
                 lane_change_left_switch = temp_inf_maneuver_array.shape[0] - 1
             elif maneuvers['FM_INF_lane_change_left'][i] == 0 and lane_change_left_switch > -1:
                 temp_inf_maneuver_array[lane_change_left_switch][1] = i
                 temp_inf_maneuver_array[lane_change_left_switch][5] = (i - int(
-                    temp_inf_maneuver_array[lane_change_left_switch][0])) / 10
+                    temp_inf_maneuver_array[lane_change_left_switch][0])) / frame_rate
                 lane_change_left_switch = -1
             elif i == len(maneuvers) - 1 and lane_change_left_switch > -1:
                 temp_inf_maneuver_array[lane_change_left_switch][1] = i
                 temp_inf_maneuver_array[lane_change_left_switch][5] = (i - int(
-                    temp_inf_maneuver_array[lane_change_left_switch][0])) / 10
+                    temp_inf_maneuver_array[lane_change_left_switch][0])) / frame_rate
                 lane_change_left_switch = -1
 
             if maneuvers['FM_INF_lane_change_right'][i] == 1 and lane_change_right_switch == -1:
-                temp_lon, temp_lat = pyproj.transform(proj_in, proj_out, df[cols[1]][i], df[cols[0]][i])
+                temp_lon, temp_lat = get_transformer(proj_in, proj_out, always_xy=False).transform(
+                    df[cols[1]][i], df[cols[0]][i])
                 temp_inf_maneuver_array = np.append(temp_inf_maneuver_array,
                                                     [[i, i, 'FM_INF_lane_change_right', temp_lon, temp_lat, 0]], axis=0)
                 lane_change_right_switch = temp_inf_maneuver_array.shape[0] - 1
             elif maneuvers['FM_INF_lane_change_right'][i] == 0 and lane_change_right_switch > -1:
                 temp_inf_maneuver_array[lane_change_right_switch][1] = i
                 temp_inf_maneuver_array[lane_change_right_switch][5] = (i - int(
-                    temp_inf_maneuver_array[lane_change_right_switch][0])) / 10
+                    temp_inf_maneuver_array[lane_change_right_switch][0])) / frame_rate
                 lane_change_right_switch = -1
             elif i == len(maneuvers) - 1 and lane_change_right_switch > -1:
                 temp_inf_maneuver_array[lane_change_right_switch][1] = i
                 temp_inf_maneuver_array[lane_change_right_switch][5] = (i - int(
-                    temp_inf_maneuver_array[lane_change_right_switch][0])) / 10
+                    temp_inf_maneuver_array[lane_change_right_switch][0])) / frame_rate
                 lane_change_right_switch = -1
 
         inf_maneuver_array[j] = temp_inf_maneuver_array
-        if use_folder and temp_inf_maneuver_array.size:
-            pd.DataFrame(temp_inf_maneuver_array).to_csv(
-                dir_name + '/maneuver_lists/maneuver_array_lat_' + str(j) + '.csv')
+        if diagnostics is not None and temp_inf_maneuver_array.size:
+            diagnostics.record('maneuver_array_lat_' + str(j), temp_inf_maneuver_array,
+                               'maneuver_lists/maneuver_array_lat_' + str(j) + '.csv')
+    metrics.end(token, rows=len(df), objects=len(movobj_grps_coord) + 1,
+                events=sum(len(a) for a in ego_maneuver_array.values()) +
+                sum(len(a) for a in inf_maneuver_array.values()))
 
     return ego_maneuver_array, inf_maneuver_array, objlist, objects, ego, movobj_grps_coord
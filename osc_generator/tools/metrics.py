@@ -0,0 +1,360 @@
+#  ****************************************************************************
+#  @metrics.py
+#
+#  @copyright 2023 e:fs TechHub GmbH and Audi AG. All rights reserved.
+#
+#  @license Apache v2.0
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#  ****************************************************************************
+
+import os
+import sys
+import json
+import time
+import logging
+import threading
+import contextlib
+import tracemalloc
+from typing import Callable
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows, peak RSS is not recorded
+    resource = None
+
+logger = logging.getLogger('osc_generator.metrics')
+
+# Python 3.9 and later, without it the peak of a stage is only exact if it exceeds the earlier peaks
+_reset_peak = getattr(tracemalloc, 'reset_peak', None)
+
+
+def peak_rss() -> int:
+    """
+    Peak resident set size of this process.
+
+    Returns:
+        object (int): Peak RSS in bytes, None if not available on this platform
+    """
+    if resource is None:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Bytes on macOS, KiB on Linux
+    return max_rss if sys.platform == 'darwin' else max_rss * 1024
+
+
+def current_rss() -> int:
+    """
+    Current resident set size of this process (Linux /proc, otherwise psutil if installed).
+
+    Returns:
+        object (int): RSS in bytes, None if not available on this platform
+    """
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import psutil
+    except ImportError:
+        return None
+    return psutil.Process().memory_info().rss
+
+
+class RSSSampler:
+    """
+    Samples the RSS of this process in a background thread, as the peak RSS of the operating system covers the
+    whole process lifetime and not a single stage.
+    """
+
+    def __init__(self, interval: float = 0.005):
+        """
+        Args:
+            interval: Time between two samples in s
+        """
+        self.interval = interval
+        self.peak = current_rss()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def sample(self) -> int:
+        """
+        Takes a sample and updates the peak.
+
+        Returns:
+            object (int): Current RSS in bytes
+        """
+        rss = current_rss()
+        if rss is not None and (self.peak is None or rss > self.peak):
+            self.peak = rss
+        return rss
+
+    def reset(self) -> int:
+        """
+        Starts a new peak at the current RSS.
+
+        Returns:
+            object (int): Peak RSS in bytes since the last reset
+        """
+        peak = self.peak
+        self.peak = None
+        self.sample()
+        return peak
+
+    def start(self):
+        if self._thread is None and self.peak is not None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='rss-sampler', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+
+class MetricsRecorder:
+    """
+    Records wall time, CPU time, peak RSS and processed rows, objects and events of the pipeline stages.
+
+    A stage may be entered several times, e.g. once per object. Each entry is passed to the callbacks and logged at
+    DEBUG level on the logger 'osc_generator.metrics', summary() adds up the entries per stage.
+
+    With memory profiling, each record also holds the peak of the Python allocations (tracemalloc, which includes
+    numpy and pandas buffers) and the peak of the sampled RSS during the stage, in bytes. Tracing allocations slows
+    the stages down, so the times of a profiling run are not comparable to the times of a normal run.
+    """
+
+    def __init__(self, enabled: bool = True, memory: bool = False):
+        """
+        Args:
+            enabled: If False, stages are not measured (for callers without a recorder)
+            memory: Profile the memory of the stages (see start_memory_profiling)
+        """
+        if not isinstance(enabled, bool):
+            raise TypeError("input must be a bool")
+        if not isinstance(memory, bool):
+            raise TypeError("input must be a bool")
+        self.enabled = enabled
+        self.records = []
+        self.callbacks = []
+        self.memory = False
+        self._sampler = None
+        self._started_tracing = False
+        # Tokens of the stages in progress, a nested stage resets the peaks of the enclosing stages
+        self._open = []
+        # Traced memory and traced peak at the last begin or end of a stage
+        self._traced_mark = (0, 0)
+        if memory:
+            self.start_memory_profiling()
+
+    def start_memory_profiling(self):
+        """
+        Starts tracing the allocations and sampling the RSS for the following stages.
+        """
+        if self.memory:
+            return
+        self.memory = True
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        self._traced_mark = tracemalloc.get_traced_memory()
+        self._sampler = RSSSampler()
+        self._sampler.start()
+
+    def stop_memory_profiling(self):
+        """
+        Stops the memory profiling started by start_memory_profiling.
+        """
+        if not self.memory:
+            return
+        self.memory = False
+        self._sampler.stop()
+        self._sampler = None
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def add_callback(self, callback: Callable[[dict], None]):
+        """
+        Args:
+            callback: Called with the record of each stage entry (see stage)
+        """
+        if not callable(callback):
+            raise TypeError("input must be a callable")
+        self.callbacks.append(callback)
+
+    def reset(self):
+        """
+        Removes the records, e.g. for a new run. Callbacks are kept.
+        """
+        self.records = []
+        self._open = []
+
+    def _traced_since_mark(self) -> tuple:
+        """
+        Helper function. Traced memory and its peak since the last begin or end of a stage. If the peak of
+        tracemalloc did not rise since then and cannot be reset, the larger traced memory of both points is the peak.
+
+        Returns:
+            object (tuple): Traced memory and peak in bytes
+        """
+        traced, traced_peak = tracemalloc.get_traced_memory()
+        if traced_peak <= self._traced_mark[1]:
+            traced_peak = max(self._traced_mark[0], traced)
+        if _reset_peak is not None:
+            _reset_peak()
+            self._traced_mark = (traced, traced)
+        else:
+            self._traced_mark = (traced, max(traced_peak, self._traced_mark[1]))
+        return traced, traced_peak
+
+    def begin(self, name: str) -> dict:
+        """
+        Starts measuring a stage, for blocks where the stage context manager does not fit.
+
+        Args:
+            name: Name of the stage
+
+        Returns:
+            object (dict): Token for end, None if disabled
+        """
+        if not self.enabled:
+            return None
+        token = {'stage': name}
+        if self.memory:
+            # Peaks so far belong to the enclosing stages
+            traced, traced_peak = self._traced_since_mark()
+            rss_peak = self._sampler.reset()
+            for outer in self._open:
+                outer['traced_peak'] = max(outer['traced_peak'], traced_peak)
+                outer['rss_peak'] = max(outer['rss_peak'] or 0, rss_peak or 0) or None
+            token['traced_start'] = traced
+            token['traced_peak'] = traced
+            token['rss_peak'] = None
+            self._open.append(token)
+        token['wall_start'] = time.perf_counter()
+        token['cpu_start'] = time.process_time()
+        return token
+
+    def end(self, token: tuple, **counts) -> dict:
+        """
+        Completes the measurement of a stage started by begin.
+
+        Args:
+            token: Result of begin
+            counts: Processed rows, objects, events, ...
+
+        Returns:
+            object (dict): Record with stage, wall_time, cpu_time, peak_rss, the memory of the stage (traced_peak,
+                traced_retained, rss_peak) if profiled and the counts, None if disabled
+        """
+        if token is None:
+            return None
+        name = token['stage']
+        record = {'stage': name,
+                  'wall_time': time.perf_counter() - token['wall_start'],
+                  'cpu_time': time.process_time() - token['cpu_start'],
+                  'peak_rss': peak_rss()}
+        if 'traced_start' in token and self.memory:
+            traced, traced_peak = self._traced_since_mark()
+            rss_peak = self._sampler.sample()
+            rss_peak = max(token['rss_peak'] or 0, self._sampler.peak or 0, rss_peak or 0) or None
+            self._open.remove(token)
+            for outer in self._open:
+                outer['traced_peak'] = max(outer['traced_peak'], traced_peak)
+                outer['rss_peak'] = max(outer['rss_peak'] or 0, rss_peak or 0) or None
+            # Allocated by the stage on top of the memory at its start, and kept after the stage
+            record['traced_peak'] = max(token['traced_peak'], traced_peak) - token['traced_start']
+            record['traced_retained'] = traced - token['traced_start']
+            record['rss_peak'] = rss_peak
+        record.update(counts)
+        self.records.append(record)
+
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug('%s: %.4f s wall, %.4f s cpu, peak rss %s, %s', name, record['wall_time'],
+                         record['cpu_time'], record['peak_rss'], counts)
+        for callback in self.callbacks:
+            callback(record)
+        return record
+
+    @contextlib.contextmanager
+    def stage(self, name: str, **counts):
+        """
+        Measures the enclosed block. The yielded dict takes counts known only at the end of the block.
+
+        Args:
+            name: Name of the stage
+            counts: Processed rows, objects, events, ...
+
+        Example:
+            with metrics.stage('read') as counts:
+                df = pd.read_csv(path)
+                counts['rows'] = len(df)
+        """
+        token = self.begin(name)
+        yield counts
+        self.end(token, **counts)
+
+    def summary(self) -> list:
+        """
+        Records added up per stage in order of the first entry. Times and counts are summed up, the peaks are the
+        maximum.
+
+        Returns:
+            object (list): One dict per stage with the keys of the records and the number of entries (calls)
+        """
+        stages = {}
+        for record in self.records:
+            if record['stage'] not in stages:
+                stages[record['stage']] = {'stage': record['stage'], 'calls': 0}
+            total = stages[record['stage']]
+            total['calls'] += 1
+            for key, value in record.items():
+                if key == 'stage':
+                    continue
+                if key in ('peak_rss', 'traced_peak', 'rss_peak'):
+                    total[key] = value if total.get(key) is None else max(total[key], value or 0)
+                else:
+                    total[key] = total.get(key, 0) + value
+        return list(stages.values())
+
+    def write(self, path: str) -> str:
+        """
+        Writes the summary and the single records as JSON.
+
+        Args:
+            path: Path of the JSON file
+
+        Returns:
+            object (str): Path of the JSON file
+        """
+        if not isinstance(path, str):
+            raise TypeError("input must be a str")
+
+        stages = self.summary()
+        data = {'wall_time': sum(stage['wall_time'] for stage in stages),
+                'cpu_time': sum(stage['cpu_time'] for stage in stages),
+                'peak_rss': peak_rss(),
+                'stages': stages,
+                'records': self.records}
+        with open(path, 'w') as f:
+            json.dump(data, f, indent=4)
+        return path
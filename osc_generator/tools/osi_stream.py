@@ -0,0 +1,230 @@
+#  ****************************************************************************
+#  @osi_stream.py
+#
+#  @copyright 2023 e:fs TechHub GmbH and Audi AG. All rights reserved.
+#
+#  @license Apache v2.0
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#  ****************************************************************************
+
+import socket
+import struct
+import time
+from typing import BinaryIO, Iterator
+
+# Length prefix of the messages of an OSI trace file and of a TCP stream
+OSI_HEADER = struct.Struct('<L')
+
+# Largest payload of a UDP datagram
+MAX_DATAGRAM = 65507
+
+
+def read_osi_messages(f: BinaryIO) -> Iterator[bytes]:
+    """
+    Reads the serialized messages of an OSI trace, each is preceded by its length (little endian uint32).
+
+    Args:
+        f: Binary file handle, e.g. of an .osi file
+
+    Returns:
+        object (Iterator[bytes]): Serialized messages
+    """
+    while True:
+        header = f.read(OSI_HEADER.size)
+        if len(header) < OSI_HEADER.size:
+            return
+        length, = OSI_HEADER.unpack(header)
+        message = f.read(length)
+        if len(message) < length:
+            raise ValueError('truncated OSI message')
+        yield message
+
+
+def osi_to_frame(message: bytes) -> dict:
+    """
+    Converts a serialized SensorView message into one frame in the layout of osi_transformer.osi2df, which
+    streaming.process_frame and Converter.convert_stream take. The first moving object is ego.
+    Requires the osi3 package of the Open Simulation Interface.
+
+    Args:
+        message: Serialized SensorView message
+
+    Returns:
+        object (dict): Frame by column
+    """
+    if not isinstance(message, bytes):
+        raise TypeError("input must be a bytes")
+    try:
+        from osi3.osi_sensorview_pb2 import SensorView
+    except ImportError:
+        raise ImportError("reading osi messages requires the osi3 package of the Open Simulation Interface: "
+                          "https://github.com/OpenSimulationInterface/open-simulation-interface")
+
+    sensor_view = SensorView()
+    sensor_view.ParseFromString(message)
+    ground_truth = sensor_view.global_ground_truth
+    vehicles = list(ground_truth.moving_object)
+
+    ego = vehicles[0]
+    frame = {'timestamp': ground_truth.timestamp.seconds + ground_truth.timestamp.nanos / 1000000000,
+             'lat': ego.base.position.x,
+             'long': ego.base.position.y,
+             'heading': ego.base.orientation.yaw,
+             'speed': ego.base.velocity.x}
+
+    # Lane boundary 0 is the right, 1 the left marking
+    for lane in ground_truth.lane_boundary:
+        if lane.id.value == 0:
+            side = 'right'
+        elif lane.id.value == 1:
+            side = 'left'
+        else:
+            continue
+        frame['lin_' + side + '_typ'] = lane.classification.type
+        for boundary_line in lane.boundary_line[:1]:
+            frame['lin_' + side + '_beginn_x'] = boundary_line.position.x
+            frame['lin_' + side + '_y_abstand'] = boundary_line.position.y
+            frame['lin_' + side + '_breite'] = boundary_line.width
+
+    for i, v in enumerate(vehicles[1:], start=1):
+        frame['pos_x_' + str(i)] = v.base.position.x
+        frame['pos_y_' + str(i)] = v.base.position.y
+        frame['speed_x_' + str(i)] = v.base.velocity.x
+        frame['speed_y_' + str(i)] = v.base.velocity.y
+        frame['class_' + str(i)] = v.vehicle_classification.type
+    return frame
+
+
+def replay_osi(path: str, host: str, port: int, protocol: str = 'tcp', frame_rate: float = None) -> int:
+    """
+    Sends the messages of an OSI trace file to a receiver (see OSIReceiver), as stand-in of a live OSI source.
+    TCP sends the length-prefixed messages of the file and closes the connection at the end, UDP sends one
+    datagram per message and an empty datagram at the end.
+
+    Args:
+        path: Path to the .osi file
+        host: Host of the receiver
+        port: Port of the receiver
+        protocol: 'tcp' or 'udp'
+        frame_rate: If set, messages are sent in real time at this rate, otherwise as fast as possible
+
+    Returns:
+        object (int): Number of sent messages
+    """
+    if not isinstance(path, str):
+        raise TypeError("input must be a str")
+    if not isinstance(host, str):
+        raise TypeError("input must be a str")
+    if not isinstance(port, int):
+        raise TypeError("input must be a int")
+    if protocol not in ['tcp', 'udp']:
+        raise ValueError("protocol must be 'tcp' or 'udp'")
+    if frame_rate is not None and not isinstance(frame_rate, float):
+        raise TypeError("input must be a float")
+
+    if protocol == 'tcp':
+        sock = socket.create_connection((host, port))
+    else:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    count = 0
+    start = time.monotonic()
+    with sock, open(path, 'rb') as f:
+        for message in read_osi_messages(f):
+            if frame_rate is not None:
+                delay = start + count / frame_rate - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+            if protocol == 'tcp':
+                sock.sendall(OSI_HEADER.pack(len(message)) + message)
+            else:
+                if len(message) > MAX_DATAGRAM:
+                    raise ValueError('OSI message exceeds the size of a UDP datagram')
+                sock.sendto(message, (host, port))
+            count += 1
+        if protocol == 'udp':
+            sock.sendto(b'', (host, port))
+    return count
+
+
+class OSIReceiver:
+    """
+    Receives serialized OSI messages of a live source over TCP (length-prefixed as in trace files, one connection)
+    or UDP (one message per datagram). The stream ends when the connection is closed or with an empty datagram.
+
+    Usage:
+        with OSIReceiver(port=48198) as receiver:
+            converter.convert_stream(osi_to_frame(message) for message in receiver)
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, protocol: str = 'tcp', timeout: float = None):
+        """
+        Args:
+            host: Address to listen on
+            port: Port to listen on, 0 for a free port (see address)
+            protocol: 'tcp' or 'udp'
+            timeout: Seconds without data after which socket.timeout is raised, None waits forever
+        """
+        if not isinstance(host, str):
+            raise TypeError("input must be a str")
+        if not isinstance(port, int):
+            raise TypeError("input must be a int")
+        if protocol not in ['tcp', 'udp']:
+            raise ValueError("protocol must be 'tcp' or 'udp'")
+        if timeout is not None and not isinstance(timeout, float):
+            raise TypeError("input must be a float")
+
+        self.protocol = protocol
+        self.timeout = timeout
+        if protocol == 'tcp':
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            self.sock.bind((host, port))
+            self.sock.listen(1)
+        else:
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            # Room for bursts while a frame is processed
+            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 2 ** 22)
+            self.sock.bind((host, port))
+        self.sock.settimeout(timeout)
+
+    @property
+    def address(self) -> tuple:
+        """
+        Returns:
+            object (tuple): Host and port the receiver listens on
+        """
+        return self.sock.getsockname()
+
+    def __iter__(self) -> Iterator[bytes]:
+        if self.protocol == 'udp':
+            while True:
+                message = self.sock.recv(MAX_DATAGRAM)
+                if not message:
+                    return
+                yield message
+        else:
+            connection, _ = self.sock.accept()
+            connection.settimeout(self.timeout)
+            with connection, connection.makefile('rb') as f:
+                yield from read_osi_messages(f)
+
+    def close(self):
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
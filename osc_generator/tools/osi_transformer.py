@@ -3,21 +3,21 @@ import pandas as pd
 import math
 import warnings
 from osc_generator.tools.user_config import UserConfig
-import os
 
 try:
     from osc_generator.tools.OSI.OSITrace import OSITrace
 except ImportError:
     warnings.warn("Feature OSI Input Data is not available. Download from: https://github.com/OpenSimulationInterface/open-simulation-interface/blob/master/format/OSITrace.py", UserWarning)
 
-def get_user_defined_attributes(osi_message, path):
+def get_user_defined_attributes(osi_message, user_config: UserConfig):
     """
     Obtain user defined attributes from the OSI message.
-    Writes to config file
+    Stores them in the user configuration, which is kept in memory so concurrent jobs of a directory
+    do not overwrite each other's attributes
 
     :param :
         osi_message: the initial message from the OSI file
-        path: for directory in which to write config file
+        user_config: user configuration which receives the bounding boxes
     """
     bb_dimension = []
     bb_center = []
@@ -39,23 +39,22 @@ def get_user_defined_attributes(osi_message, path):
         else:
             bb_center.append(None)
 
-    dir_name = os.path.dirname(path)
-    user_config = UserConfig(dir_name)
-    user_config.read_config()
     user_config.object_boundingbox = bb_dimension
     user_config.bbcenter_to_rear = bb_center
-    user_config.write_config()
 
 
-def osi2df(path: str) -> pd.DataFrame:
+def osi2df(path: str, user_config: UserConfig = None) -> pd.DataFrame:
     """
     Transfer osi messages into pandas dataframe.
 
     :param path: path to osi file
+    :param user_config: user configuration which receives the bounding boxes of the moving objects
     :return: pandas dataframe
     """
     if not isinstance(path, str):
         raise TypeError("input must be a str")
+    if user_config is not None and not isinstance(user_config, UserConfig):
+        raise TypeError("input must be a UserConfig")
 
     trace = OSITrace()
     trace.from_file(path=path)
@@ -63,7 +62,8 @@ def osi2df(path: str) -> pd.DataFrame:
     m = trace.get_message_by_index(0)
     number_of_vehicles = len(m.global_ground_truth.moving_object)
 
-    get_user_defined_attributes(m, path)
+    if user_config is not None:
+        get_user_defined_attributes(m, user_config)
 
     lists: list = [[] for _ in range(15)]
     for i in messages:
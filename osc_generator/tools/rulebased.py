@@ -19,25 +19,28 @@
 #  ****************************************************************************
 
 
+from typing import Union
+
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
 from shapely.geometry import MultiPoint, LineString, Point
-from scipy.signal import find_peaks
 
 
 def create_longitudinal_maneuver_vectors(speed: pd.Series, acceleration_definition_threshold: float = 0.2,
                                          acceleration_definition_min_length: float = 2.0,
-                                         speed_threshold_no_more_start: float = 20.0, plot: bool = False) -> tuple:
+                                         speed_threshold_no_more_start: float = 20.0, plot: bool = False,
+                                         frame_rate: float = 10.0) -> tuple:
     """
     Creates vectors for the longitudinal vehicle maneuvers.
 
     Args:
         speed: Vehicle speed information
         acceleration_definition_threshold: Due to noise, if acc is bigger --> ego is accelerating
-        acceleration_definition_min_length: Minimum number in frames, if ego vehicle state is shorter --> ignore
+        acceleration_definition_min_length: Minimum number in frames at 10 Hz, if ego vehicle state is shorter
+            --> ignore (scaled with frame_rate)
         speed_threshold_no_more_start: In kmh, if start is labeled and this velocity is surpassed --> finish labeling
         plot: Plotting option
+        frame_rate: Frames per second of speed, the acceleration is smoothed over 0.5 s
 
     Returns:
         object (tuple): Vectors with vehicle speed maneuvers:
@@ -59,11 +62,18 @@ def create_longitudinal_maneuver_vectors(speed: pd.Series, acceleration_definiti
         raise TypeError("input must be a float")
     if not isinstance(plot, bool):
         raise TypeError("input must be a bool")
+    if not isinstance(frame_rate, float):
+        raise TypeError("input must be a float")
+
+    delta_t = 1 / frame_rate
+    smoothing_window = max(1, int(round(0.5 * frame_rate)))
+    acceleration_definition_min_length = acceleration_definition_min_length * frame_rate / 10.0
 
     new_speed = speed / 3.6  # Conversion km/h --> m/s
-    speed_gradient = new_speed.diff(periods=1) / 0.1  # Delta_ay/delta_t
-    speed_gradient = speed_gradient.rolling(window=5, min_periods=0).mean()
-    speed_gradient = speed_gradient.shift(periods=-2, fill_value=speed_gradient[speed_gradient.shape[0] - 1])
+    speed_gradient = new_speed.diff(periods=1) / delta_t  # Delta_ay/delta_t
+    speed_gradient = speed_gradient.rolling(window=smoothing_window, min_periods=0).mean()
+    speed_gradient = speed_gradient.shift(periods=-(smoothing_window // 2),
+                                          fill_value=speed_gradient[speed_gradient.shape[0] - 1])
     speed_gradient[speed.isnull()] = np.NaN
     acceleration_x = speed_gradient
 
@@ -75,152 +85,252 @@ def create_longitudinal_maneuver_vectors(speed: pd.Series, acceleration_definiti
     stop_array = np.zeros(speed.shape[0])
     reversing_array = np.zeros(speed.shape[0])
 
-    # Initializations
-    counter_acceleration = 0
-    acceleration_start = False
+    machine = LongitudinalStateMachine({'accelerate': accelerate_array, 'start': start_array,
+                                        'keep_velocity': keep_velocity_array, 'standstill': standstill_array,
+                                        'decelerate': decelerate_array, 'stop': stop_array,
+                                        'reversing': reversing_array},
+                                       acceleration_definition_threshold, acceleration_definition_min_length,
+                                       speed_threshold_no_more_start)
+    for i in range(speed.shape[0]):
+        machine.step(i, acceleration_x[i], speed[i])
+    machine.finish()
+
+    if plot:
+        # Optional, matplotlib is imported on first use
+        import matplotlib.pyplot as plt
+        fill_array = accelerate_array.astype('bool') | decelerate_array.astype('bool') | \
+                     keep_velocity_array.astype('bool') | reversing_array.astype('bool') | \
+                     standstill_array.astype('bool') | start_array.astype('bool') | stop_array.astype('bool')
+        plt.subplot(10, 1, 1)
+        plt.plot(speed)
+        plt.subplot(10, 1, 2)
+        plt.plot(acceleration_x)
+        plt.subplot(10, 1, 3)
+        plt.plot(accelerate_array)
+        plt.subplot(10, 1, 4)
+        plt.plot(decelerate_array)
+        plt.subplot(10, 1, 5)
+        plt.plot(keep_velocity_array)
+        plt.subplot(10, 1, 6)
+        plt.plot(reversing_array)
+        plt.subplot(10, 1, 7)
+        plt.plot(standstill_array)
+        plt.subplot(10, 1, 8)
+        plt.plot(start_array)
+        plt.subplot(10, 1, 9)
+        plt.plot(stop_array)
+        plt.subplot(10, 1, 10)
+        plt.plot(fill_array)
+        plt.show()
+
+    return accelerate_array, start_array, keep_velocity_array, standstill_array, decelerate_array, stop_array, \
+        reversing_array
+
+
+class LongitudinalStateMachine:
+    """
+    Causal part of the longitudinal labeling (see create_longitudinal_maneuver_vectors). A step labels one frame
+    from its smoothed acceleration and speed. Maneuvers are written into the label arrays when they end, so a step
+    also labels earlier frames, but never frames before first_open_frames.
+    """
 
-    counter_deceleration = 0
-    deceleration_start = False
+    def __init__(self, arrays: dict, acceleration_definition_threshold: float,
+                 acceleration_definition_min_length: float, speed_threshold_no_more_start: float):
+        """
+        Args:
+            arrays: Label arrays by maneuver (accelerate, start, keep_velocity, standstill, decelerate, stop,
+                reversing), indexed by frame. They support slice assignment.
+            acceleration_definition_threshold: Due to noise, if acc is bigger --> ego is accelerating
+            acceleration_definition_min_length: Minimum number of frames of a maneuver
+            speed_threshold_no_more_start: In kmh, if start is labeled and this velocity is surpassed
+                --> finish labeling
+        """
+        self.accelerate_array = arrays['accelerate']
+        self.start_array = arrays['start']
+        self.keep_velocity_array = arrays['keep_velocity']
+        self.standstill_array = arrays['standstill']
+        self.decelerate_array = arrays['decelerate']
+        self.stop_array = arrays['stop']
+        self.reversing_array = arrays['reversing']
+        self.acceleration_definition_threshold = acceleration_definition_threshold
+        self.acceleration_definition_min_length = acceleration_definition_min_length
+        self.speed_threshold_no_more_start = speed_threshold_no_more_start
 
-    counter_keep = 0
-    keep_start = False
+        # Initializations
+        self.counter_acceleration = 0
+        self.acceleration_start = False
 
-    counter_start = -1
-    counter_stop = 0
+        self.counter_deceleration = 0
+        self.deceleration_start = False
 
-    counter_buffer = 0
+        self.counter_keep = 0
+        self.keep_start = False
 
-    length_speed_rows = 0
+        self.counter_start = -1
+        self.counter_stop = 0
 
-    for i in range(speed.shape[0]):
+        self.counter_buffer = 0
+
+        self.length_speed_rows = 0
+
+    def step(self, i: int, acceleration: float, speed: float):
+        """
+        Args:
+            i: Frame index, consecutive from 0
+            acceleration: Smoothed acceleration in m/s^2
+            speed: Speed in km/h
+        """
         # Future proofing if breaks are introduced in the loop
-        length_speed_rows = i
+        self.length_speed_rows = i
+        threshold = self.acceleration_definition_threshold
+        min_length = self.acceleration_definition_min_length
 
         # Get acceleration ego
-        if acceleration_x[i] > acceleration_definition_threshold:
-            acceleration_start = True
-            counter_acceleration += 1
+        if acceleration > threshold:
+            self.acceleration_start = True
+            self.counter_acceleration += 1
         else:
-            if acceleration_start & (counter_acceleration >= acceleration_definition_min_length):
-                if counter_buffer > 0:
-                    counter_acceleration += counter_buffer
-                accelerate_array[i - counter_acceleration: i] = 1
-                counter_buffer = 0
+            if self.acceleration_start & (self.counter_acceleration >= min_length):
+                if self.counter_buffer > 0:
+                    self.counter_acceleration += self.counter_buffer
+                self.accelerate_array[i - self.counter_acceleration: i] = 1
+                self.counter_buffer = 0
             else:
-                counter_buffer += counter_acceleration
-            counter_acceleration = 0
-            acceleration_start = False
+                self.counter_buffer += self.counter_acceleration
+            self.counter_acceleration = 0
+            self.acceleration_start = False
 
         # Get deceleration ego
-        if acceleration_x[i] < -acceleration_definition_threshold:
-            deceleration_start = True
-            counter_deceleration += 1
+        if acceleration < -threshold:
+            self.deceleration_start = True
+            self.counter_deceleration += 1
         else:
-            if deceleration_start & (counter_deceleration >= acceleration_definition_min_length):
-                if counter_buffer > 0:
-                    counter_deceleration += counter_buffer
-                decelerate_array[i - counter_deceleration: i] = 1
-                counter_buffer = 0
+            if self.deceleration_start & (self.counter_deceleration >= min_length):
+                if self.counter_buffer > 0:
+                    self.counter_deceleration += self.counter_buffer
+                self.decelerate_array[i - self.counter_deceleration: i] = 1
+                self.counter_buffer = 0
             else:
-                counter_buffer += counter_deceleration
-            counter_deceleration = 0
-            deceleration_start = False
+                self.counter_buffer += self.counter_deceleration
+            self.counter_deceleration = 0
+            self.deceleration_start = False
 
         # Get keep velocity ego
-        if (acceleration_x[i] < acceleration_definition_threshold) & (
-                acceleration_x[i] > -acceleration_definition_threshold) & (speed[i] != 0):
-            keep_start = True
-            counter_keep += 1
+        if (acceleration < threshold) & (acceleration > -threshold) & (speed != 0):
+            self.keep_start = True
+            self.counter_keep += 1
         else:
-            if keep_start & (counter_keep > acceleration_definition_min_length):
-                if counter_buffer > 0:
-                    counter_keep += counter_buffer
-                keep_velocity_array[i - counter_keep: i] = 1
-                counter_buffer = 0
+            if self.keep_start & (self.counter_keep > min_length):
+                if self.counter_buffer > 0:
+                    self.counter_keep += self.counter_buffer
+                self.keep_velocity_array[i - self.counter_keep: i] = 1
+                self.counter_buffer = 0
             else:
-                counter_buffer += counter_keep
-            counter_keep = 0
-            keep_start = False
+                self.counter_buffer += self.counter_keep
+            self.counter_keep = 0
+            self.keep_start = False
 
         # Get reversing
-        if speed[i] < 0:
-            reversing_array[i] = 1
+        if speed < 0:
+            self.reversing_array[i] = 1
 
         # Get standstill
-        if speed[i] == 0:
-            standstill_array[i] = 1
+        if speed == 0:
+            self.standstill_array[i] = 1
 
         # Get start
         # If counter > 0, counter increment (works only after start detection in next if statement)
-        if (speed[i] > 0) & (counter_start > 0):
-            counter_start += 1
-            start_array[(i - counter_start): i] = 1
+        if (speed > 0) & (self.counter_start > 0):
+            self.counter_start += 1
+            self.start_array[(i - self.counter_start): i] = 1
             # Break criteria:
-            if speed[i] > speed_threshold_no_more_start:
-                counter_start = -1
-            if deceleration_start:
-                counter_start = -1
+            if speed > self.speed_threshold_no_more_start:
+                self.counter_start = -1
+            if self.deceleration_start:
+                self.counter_start = -1
         # If start detected set counter to 1
-        if (speed[i] == 0) & (counter_start <= 1):
-            counter_start = 1
-        if (speed[i] > 0) & (counter_start <= 1):
-            counter_start = 0
+        if (speed == 0) & (self.counter_start <= 1):
+            self.counter_start = 1
+        if (speed > 0) & (self.counter_start <= 1):
+            self.counter_start = 0
 
         # Get stop
-        if (counter_stop > 0) & (speed[i] == 0):
-            stop_array[i - counter_stop: i] = 1
-            counter_stop = 0
+        if (self.counter_stop > 0) & (speed == 0):
+            self.stop_array[i - self.counter_stop: i] = 1
+            self.counter_stop = 0
 
-        if (speed[i] < speed_threshold_no_more_start) & (speed[i] != 0):
-            counter_stop += 1
+        if (speed < self.speed_threshold_no_more_start) & (speed != 0):
+            self.counter_stop += 1
         else:
-            counter_stop = 0
-
-        if acceleration_start:
-            counter_stop = 0
-        if keep_start:
-            counter_stop = 0
-
-    counter_acceleration += counter_buffer
-    counter_deceleration += counter_buffer
-    counter_keep += counter_buffer
+            self.counter_stop = 0
 
-    # Make sure that last maneuver is labeled
-    if acceleration_start:
-        accelerate_array[length_speed_rows - counter_acceleration: length_speed_rows] = 1
-    if deceleration_start:
-        decelerate_array[length_speed_rows - counter_deceleration: length_speed_rows] = 1
-    if keep_start:
-        keep_velocity_array[length_speed_rows - counter_keep: length_speed_rows] = 1
+        if self.acceleration_start:
+            self.counter_stop = 0
+        if self.keep_start:
+            self.counter_stop = 0
 
-    if plot:
-        fill_array = accelerate_array.astype('bool') | decelerate_array.astype('bool') | \
-                     keep_velocity_array.astype('bool') | reversing_array.astype('bool') | \
-                     standstill_array.astype('bool') | start_array.astype('bool') | stop_array.astype('bool')
-        plt.subplot(10, 1, 1)
-        plt.plot(speed)
-        plt.subplot(10, 1, 2)
-        plt.plot(acceleration_x)
-        plt.subplot(10, 1, 3)
-        plt.plot(accelerate_array)
-        plt.subplot(10, 1, 4)
-        plt.plot(decelerate_array)
-        plt.subplot(10, 1, 5)
-        plt.plot(keep_velocity_array)
-        plt.subplot(10, 1, 6)
-        plt.plot(reversing_array)
-        plt.subplot(10, 1, 7)
-        plt.plot(standstill_array)
-        plt.subplot(10, 1, 8)
-        plt.plot(start_array)
-        plt.subplot(10, 1, 9)
-        plt.plot(stop_array)
-        plt.subplot(10, 1, 10)
-        plt.plot(fill_array)
-        plt.show()
+    def committed_maneuver(self) -> Union[str, None]:
+        """
+        Returns:
+            object (Union[str, None]): Running maneuver (accelerate, keep_velocity or decelerate) which is long
+                enough to be labeled when it ends, None otherwise
+        """
+        min_length = self.acceleration_definition_min_length
+        if self.acceleration_start and self.counter_acceleration >= min_length:
+            return 'accelerate'
+        if self.keep_start and self.counter_keep > min_length:
+            return 'keep_velocity'
+        if self.deceleration_start and self.counter_deceleration >= min_length:
+            return 'decelerate'
+        return None
+
+    def first_open_frames(self) -> dict:
+        """
+        Returns:
+            object (dict): First frame which later steps or finish can still label, by maneuver of the segments
+                (accelerate, keep_velocity, decelerate, standstill). Earlier frames are final.
+        """
+        i = self.length_speed_rows
+        min_length = self.acceleration_definition_min_length
+        runs = {'accelerate': (self.acceleration_start, self.counter_acceleration,
+                               self.counter_acceleration >= min_length),
+                'keep_velocity': (self.keep_start, self.counter_keep, self.counter_keep > min_length),
+                'decelerate': (self.deceleration_start, self.counter_deceleration,
+                               self.counter_deceleration >= min_length)}
+        running = [(name, counter, long_enough) for name, (started, counter, long_enough) in runs.items() if started]
+
+        # Standstill is labeled at the current frame only. finish labels a running maneuver from one frame before
+        # its start, so a maneuver starting after i can be labeled from i on.
+        first = {'standstill': i + 1}
+        for name in runs:
+            if not running:
+                # A following maneuver starts with the buffer
+                first[name] = i - self.counter_buffer
+            else:
+                run_name, counter, long_enough = running[0]
+                if name == run_name or not long_enough:
+                    # A maneuver shorter than the minimum becomes the buffer of the next one
+                    first[name] = i - counter - self.counter_buffer
+                else:
+                    first[name] = i
+        return {name: max(frame, 0) for name, frame in first.items()}
+
+    def finish(self):
+        """
+        Labels the maneuvers which are still running at the last frame.
+        """
+        self.counter_acceleration += self.counter_buffer
+        self.counter_deceleration += self.counter_buffer
+        self.counter_keep += self.counter_buffer
 
-    return accelerate_array, start_array, keep_velocity_array, standstill_array, decelerate_array, stop_array, \
-        reversing_array
+        # Make sure that last maneuver is labeled
+        length_speed_rows = self.length_speed_rows
+        if self.acceleration_start:
+            self.accelerate_array[length_speed_rows - self.counter_acceleration: length_speed_rows] = 1
+        if self.deceleration_start:
+            self.decelerate_array[length_speed_rows - self.counter_deceleration: length_speed_rows] = 1
+        if self.keep_start:
+            self.keep_velocity_array[length_speed_rows - self.counter_keep: length_speed_rows] = 1
 
 
 def create_lateral_maneuver_vectors(df_lanes: pd.DataFrame, lat: pd.core.series.Series,
@@ -305,6 +415,8 @@ def create_lateral_maneuver_vectors(df_lanes: pd.DataFrame, lat: pd.core.series.
             index2 = dist3.index(min(dist3))
 
             # Find previous and next extrema for
+            # scipy.signal takes most of the import time, it is imported on first use
+            from scipy.signal import find_peaks
             peaks, _ = find_peaks(dist2, height=0)
             pos = np.searchsorted(peaks, index)
             if pos == 0:
@@ -349,6 +461,7 @@ def create_lateral_maneuver_vectors(df_lanes: pd.DataFrame, lat: pd.core.series.
         return left_lanechange_array, right_lanechange_array
 
     if plot:
+        import matplotlib.pyplot as plt
         for i in range(int(df_lanes.shape[1] / 2)):
             plt.scatter(df_lanes.iloc[:, i * 2], df_lanes.iloc[:, i * 2 + 1])
         plt.scatter(lat, lon)
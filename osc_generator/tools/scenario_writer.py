@@ -21,18 +21,81 @@
 
 import pandas as pd
 import os
+import threading
+import io
+import gzip
+import hashlib
 import numpy as np
 from xml.etree.ElementTree import Element, SubElement
 from xml.etree import ElementTree
-from xml.dom import minidom
-from scenariogeneration import xosc
+from xml.sax.saxutils import quoteattr
+from typing import Iterable, TextIO, Union
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+from scenariogeneration import xosc, prettify
 from osc_generator.tools.user_config import UserConfig
+from osc_generator.tools import man_helpers, utils
+from osc_generator.tools.bundle import ScenarioBundle
 import datetime
 
+# Speed over ratio, level 9 is several times slower for a few percent smaller scenarios
+GZIP_COMPRESSLEVEL = 6
+
+
+def create_output_path(dir_name: str, section_name: str, timebased_lon: bool, timebased_lat: bool,
+                       radius_pos_trigger: float, parameterize: bool = False) -> str:
+    """
+    Creates the default scenario path, which encodes the trigger variant.
+
+    Args:
+        dir_name: Name of the directory
+        section_name: Name of the scenario section
+        timebased_lon: Option to use time based trigger for long maneuvers
+        timebased_lat: Option to use time based trigger for lat maneuvers
+        radius_pos_trigger: Radius of the position based trigger
+        parameterize: Scenario with parameter declarations, the radius is not part of the name
+
+    Returns:
+        object (str): Path to scenario file
+    """
+    if not isinstance(dir_name, str):
+        raise TypeError("input must be a str")
+    if not isinstance(section_name, str):
+        raise TypeError("input must be a str")
+    if not isinstance(timebased_lon, bool):
+        raise TypeError("input must be a bool")
+    if not isinstance(timebased_lat, bool):
+        raise TypeError("input must be a bool")
+    if not isinstance(radius_pos_trigger, float):
+        raise TypeError("input must be a float")
+    if not isinstance(parameterize, bool):
+        raise TypeError("input must be a bool")
+
+    if parameterize:
+        radius_suffix = '_param'
+    else:
+        radius_suffix = '_' + str(radius_pos_trigger) + '_m'
+
+    if timebased_lon and timebased_lat:
+        file_name = 'man_export_' + os.path.basename(section_name) + '_time_lon_lat'
+    elif timebased_lon and not timebased_lat:
+        file_name = 'man_export_' + os.path.basename(section_name) + '_time_lon_pos_lat' + radius_suffix
+    elif not timebased_lon and timebased_lat:
+        file_name = 'man_export_' + os.path.basename(section_name) + '_pos_lon_time_lat'
+    else:
+        file_name = 'man_export_' + os.path.basename(section_name) + '_pos_lon_lat' + radius_suffix
+    if parameterize and timebased_lat:
+        # Names without radius
+        file_name += '_param'
+    file_name += '.xosc'
+
+    return os.path.join(dir_name, file_name)
+
+
 def write_pretty(elem: Element, output: str, use_folder: bool, timebased_lon: bool, timebased_lat: bool,
                  dir_name: str, section_name: str, radius_pos_trigger: float, output_path: str = None):
     """
-    Write a pretty-printed XML string for the Element.
+    Write a pretty-printed XML file for the Element. The Element tree is indented in place.
 
     Args:
         elem: Root of the Element tree
@@ -63,116 +126,406 @@ def write_pretty(elem: Element, output: str, use_folder: bool, timebased_lon: bo
     if not isinstance(section_name, str):
         raise TypeError("input must be a str")
 
-    rough_string = ElementTree.tostring(elem, 'utf-8')
-    reparsed = minidom.parseString(rough_string)
-    xmlstr = reparsed.toprettyxml(indent="\t")
-
     if output == 'xosc':
         if output_path is not None:
             path = output_path
             
         else:
             if use_folder:
-                if timebased_lon and timebased_lat:
-                    path = os.path.join(dir_name, 'man_export_' + os.path.basename(section_name) + '_time_lon_lat.xosc')
-                elif timebased_lon and not timebased_lat:
-                    path = os.path.join(dir_name, 'man_export_' + os.path.basename(section_name) + '_time_lon_pos_lat_' + str(
-                        radius_pos_trigger) + '_m.xosc')
-                elif not timebased_lon and timebased_lat:
-                    path = os.path.join(dir_name, 'man_export_' + os.path.basename(section_name) + '_pos_lon_time_lat.xosc')
-
-                else:
-                    path = os.path.join(dir_name, 'man_export_' + os.path.basename(section_name) + '_pos_lon_lat_' +
-                                        str(radius_pos_trigger) + '_m.xosc')
-
+                path = create_output_path(dir_name, section_name, timebased_lon, timebased_lat, radius_pos_trigger)
             else:
                 raise NotImplementedError("use_folder flag is going to be removed")
 
     else:
         raise NotImplementedError("Only xosc output is currently implemented.")
 
-    with open(path, 'w') as f:
-        f.write(xmlstr)
+    # Indent in place and serialize directly to the file, without intermediate string or DOM copies
+    indent_element(elem, space='\t')
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('<?xml version="1.0" ?>\n')
+        ElementTree.ElementTree(elem).write(f, encoding='unicode')
+        f.write('\n')
 
     return path
 
 
-def convert_to_osc(df: pd.DataFrame, ego: list, objects: dict, ego_maneuver_array: dict, inf_maneuver_array: dict,
-                   movobj_grps_coord: np.ndarray, objlist: list,
-                   plot: bool, opendrive_path: str, use_folder: bool, timebased_lon: bool, timebased_lat: bool,
-                   section_name: str, radius_pos_trigger: float,
-                   dir_name: str, osc_version: str, output_path: str = None) -> str:
+def indent_element(elem: Element, level: int = 0, space: str = '    '):
     """
-    Converter for OpenScenario
+    Indents an Element tree in place, so that it can be serialized pretty-printed in a single pass.
+
+    Args:
+        elem: Root of the Element tree
+        level: Indentation level of elem
+        space: Whitespace per indentation level
+    """
+    children = list(elem)
+    if not children:
+        return
+    child_indent = _indent_string(level + 1, space)
+    if not elem.text or not elem.text.strip():
+        elem.text = child_indent
+    for child in children:
+        indent_element(child, level + 1, space)
+        if not child.tail or not child.tail.strip():
+            child.tail = child_indent
+    if not children[-1].tail.strip():
+        children[-1].tail = _indent_string(level, space)
+
+
+@lru_cache(maxsize=None)
+def _indent_string(level: int, space: str) -> str:
+    # One shared whitespace string per level instead of one per element
+    return '\n' + level * space
+
+
+def _write_element(f: TextIO, elem: Element, level: int):
+    """
+    Writes a pretty-printed Element to an open file at the given indentation level.
+
+    Args:
+        f: Text file handle
+        elem: Element to write
+        level: Indentation level of elem
+    """
+    indent_element(elem, level)
+    # ElementTree writes empty elements as '<Tag />', attribute values never contain ' />' as '>' is escaped
+    xmlstr = ElementTree.tostring(elem, encoding='unicode').replace(' />', '/>')
+    f.write('    ' * level + xmlstr + '\n')
+
+
+def write_osc_streaming(f: TextIO, scenario: xosc.Scenario, scenario_objects: Iterable,
+                        init_actions: Iterable, acts: Iterable, content_hash: str = None):
+    """
+    Writes an OpenSCENARIO file incrementally, entity by entity and act by act.
+    Only the element that is currently written is held in memory, the output is equivalent to Scenario.write_xml.
+
+    Args:
+        f: Text file handle
+        scenario: Scenario providing file header, parameters, catalogs and road network
+        scenario_objects: Tuples of (name, entity object, controller)
+        init_actions: Tuples of (entity name, list of private init actions)
+        acts: Acts of the story
+        content_hash: Written as comment after the XML declaration (see utils.compute_content_hash)
+    """
+    _write_osc_head(f, scenario, scenario_objects, init_actions, content_hash)
+    _write_osc_story(f, acts)
+
+
+def _write_osc_head(f: TextIO, scenario: xosc.Scenario, scenario_objects: Iterable, init_actions: Iterable,
+                    content_hash: str = None):
+    """
+    Writes the part of an OpenSCENARIO file before the story: header, entities and init.
+
+    Args:
+        f: Text file handle
+        scenario: Scenario providing file header, parameters, catalogs and road network
+        scenario_objects: Tuples of (name, entity object, controller)
+        init_actions: Tuples of (entity name, list of private init actions)
+        content_hash: Written as comment after the XML declaration
+    """
+    scenario_element = scenario.get_element()
+
+    f.write('<?xml version="1.0" encoding="utf-8"?>\n')
+    if content_hash is not None:
+        f.write(utils.content_hash_comment(content_hash) + '\n')
+    f.write('<OpenSCENARIO')
+    for name, value in scenario_element.attrib.items():
+        f.write(' ' + name + '=' + quoteattr(value))
+    f.write('>\n')
+    for tag in ['FileHeader', 'ParameterDeclarations', 'CatalogLocations', 'RoadNetwork']:
+        _write_element(f, scenario_element.find(tag), 1)
+    del scenario_element
+
+    f.write('    <Entities>\n')
+    for name, entity_object, controller in scenario_objects:
+        entities = xosc.Entities()
+        entities.add_scenario_object(name, entity_object, controller)
+        for elem in entities.get_element():
+            _write_element(f, elem, 2)
+    f.write('    </Entities>\n')
+
+    f.write('    <Storyboard>\n')
+    f.write('        <Init>\n')
+    f.write('            <Actions>\n')
+    for name, actions in init_actions:
+        init = xosc.Init()
+        for action in actions:
+            init.add_init_action(name, action)
+        for elem in init.get_element().find('Actions'):
+            _write_element(f, elem, 4)
+    f.write('            </Actions>\n')
+    f.write('        </Init>\n')
+
+
+def _write_osc_story(f: TextIO, acts: Iterable):
+    """
+    Writes the story and the end of an OpenSCENARIO file.
+
+    Args:
+        f: Text file handle
+        acts: Acts of the story
+    """
+    story = xosc.Story("New Story")
+    f.write('        <Story name=' + quoteattr(story.name) + '>\n')
+    _write_element(f, story.parameter.get_element(), 3)
+    for act in acts:
+        _write_element(f, act.get_element(), 3)
+    f.write('        </Story>\n')
+
+    _write_element(f, xosc.StoryBoard().stoptrigger.get_element(), 2)
+    f.write('    </Storyboard>\n')
+    f.write('</OpenSCENARIO>\n')
+
+
+def _vehicle_mass(osc_version: str) -> Union[int, None]:
+    """
+    Helper function. Mass of the vehicles, the attribute exists from OpenSCENARIO 1.1 on.
 
     Args:
-        df: Dataframe containing trajectories
-        ego: Ego position
-        objects: Object positions
-        ego_maneuver_array: Dict containing array of ego maneuvers
-        inf_maneuver_array: Ict containing array of infrastructure specific maneuvers
-        movobj_grps_coord: Coordinates of groups of detected objects
-        objlist: Object list
-        plot: Flag for graphical plotting
-        opendrive_path: Path to the OpenDRIVE file
-        use_folder: Iption to use folder structure
-        timebased_lon: Option to use time based trigger for long maneuvers
-        timebased_lat: Option to use time based trigger for lat maneuvers
-        section_name: Name of the scenario section
-        radius_pos_trigger: Radius of the position based trigger
-        dir_name: Name of the directory
         osc_version: OpenSCENARIO version
-        output_path: Path to OpenSCENARIO file
 
     Returns:
-        object (str): Path to scenario file
+        object (Union[int, None]): Mass in kg, None if the version has no mass attribute
+    """
+    if float(osc_version) < 1.1:
+        return None
+    return 1700
+
+
+def _create_vehicle(name: str, bb_input: list, control: str, mass: float = None) -> xosc.Vehicle:
+    """
+    Creates a car with the generator's default performance and axles.
+
+    Args:
+        name: Name of the vehicle
+        bb_input: Bounding box dimension (w, l, h) and centre (x, y, z)
+        control: Value of the control property, 'external' or 'internal'
+        mass: Mass in kg, decided once per scenario or catalog (see _vehicle_mass)
+
+    Returns:
+        object (xosc.Vehicle): Vehicle
+    """
+    bb = xosc.BoundingBox(*bb_input)  # dim(w, l, h), centre(x, y, z)
+    fa = xosc.Axle(0.48, 0.684, 1.672, 2.91, 0.342)
+    ra = xosc.Axle(0, 0.684, 1.672, 0, 0.342)
+    vehicle = xosc.Vehicle(name, xosc.VehicleCategory.car, bb, fa, ra, 67, 10, 9.5, mass)
+    vehicle.add_property(name="control", value=control)
+    vehicle.add_property_file("")
+
+    return vehicle
+
+
+def _default_controller() -> xosc.Controller:
+    """
+    Default driver of the entities with inline vehicles. A new controller per scenario, xosc objects are mutable
+    and are not shared between scenarios or threads.
+
+    Returns:
+        object (xosc.Controller): Controller
+    """
+    prop = xosc.Properties()
+    prop.add_property(name="weight", value="60")
+    prop.add_property(name="height", value="1.8")
+    prop.add_property(name="eyeDistance", value="0.065")
+    prop.add_property(name="age", value="28")
+    prop.add_property(name="sex", value="male")
+    return xosc.Controller("DefaultDriver", prop)
+
+
+class VehicleCatalog:
+    """
+    Generated VehicleCatalog of a batch of scenarios. Each distinct vehicle definition becomes one catalog entry,
+    which the scenarios reference via CatalogReference instead of defining the vehicle inline.
+    The catalog is written once after the last scenario, e.g. by a ScenarioBundle or by write().
+    Catalogs of worker processes are merged with definitions() and stable entry names.
+    """
+    directory = 'Catalogs/Vehicles'
+    file_name = 'VehicleCatalog.xosc'
+
+    def __init__(self, osc_version: str = '1.0', stable_names: bool = False):
+        """
+        Args:
+            osc_version: OpenSCENARIO version of the catalog
+            stable_names: Name the entries by a hash of the definition instead of the order of addition, so
+                catalogs filled in different processes reference the same definition by the same name
+        """
+        if not isinstance(osc_version, str):
+            raise TypeError("input must be a str")
+        if not isinstance(stable_names, bool):
+            raise TypeError("input must be a bool")
+
+        self.osc_version = osc_version
+        self.stable_names = stable_names
+        self._mass = _vehicle_mass(osc_version)
+        self._entries = {}
+        self._vehicles = []
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._vehicles)
+
+    def reference(self, name: str, bb_input: list, control: str) -> xosc.CatalogReference:
+        """
+        Adds the vehicle definition if it is new and references its entry.
+        Different definitions of the same name get the entries name, name_2, name_3, ...
+        or name_<hash> with stable names.
+
+        Args:
+            name: Name of the vehicle
+            bb_input: Bounding box dimension (w, l, h) and centre (x, y, z)
+            control: Value of the control property, 'external' or 'internal'
+
+        Returns:
+            object (xosc.CatalogReference): Reference to the catalog entry
+        """
+        definition = (name, tuple(float(value) for value in bb_input), control)
+        with self._lock:
+            entry_name = self._entries.get(definition)
+            if entry_name is None and self.stable_names:
+                digest = hashlib.sha1(repr(definition).encode('utf-8')).hexdigest()[:8]
+                entry_name = f'{name}_{digest}'
+                self._entries[definition] = entry_name
+                self._vehicles.append(_create_vehicle(entry_name, list(definition[1]), control, self._mass))
+            elif entry_name is None:
+                entry_name = name
+                names = set(self._entries.values())
+                count = 1
+                while entry_name in names:
+                    count += 1
+                    entry_name = f'{name}_{count}'
+                self._entries[definition] = entry_name
+                self._vehicles.append(_create_vehicle(entry_name, list(definition[1]), control, self._mass))
+
+        return xosc.CatalogReference("VehicleCatalog", entry_name)
+
+    def definitions(self) -> list:
+        """
+        Vehicle definitions of the catalog, which reference() adds to another catalog.
+
+        Returns:
+            object (list): Definitions as lists of name, bounding box and control
+        """
+        with self._lock:
+            return [[name, list(bb_input), control] for name, bb_input, control in self._entries]
+
+    def to_bytes(self) -> bytes:
+        """
+        Returns:
+            object (bytes): Catalog file content
+        """
+        osc_minor_version = int(self.osc_version.split('.')[-1])
+        catalog_file = xosc.CatalogFile()
+        catalog_file.create_catalog(self.file_name, 'VehicleCatalog', 'Vehicles of OSC Generator scenarios',
+                                    'OSC Generator')
+        catalog_file.catalog_element.find('FileHeader').set('revMinor', str(osc_minor_version))
+        with self._lock:
+            for vehicle in self._vehicles:
+                catalog_file.add_to_catalog(vehicle, osc_minor_version)
+
+        element = catalog_file.catalog_element
+        indent_element(element)
+        return b'<?xml version="1.0" encoding="utf-8"?>\n' + ElementTree.tostring(element, encoding='utf-8',
+                                                                                xml_declaration=False) + b'\n'
+
+    def write(self, dir_name: str) -> str:
+        """
+        Writes the catalog below the scenario directory, where the scenarios expect it.
+
+        Args:
+            dir_name: Directory of the scenarios
+
+        Returns:
+            object (str): Path to catalog file
+        """
+        if not isinstance(dir_name, str):
+            raise TypeError("input must be a str")
+
+        catalog_dir = os.path.join(dir_name, *self.directory.split('/'))
+        os.makedirs(catalog_dir, exist_ok=True)
+        path = os.path.join(catalog_dir, self.file_name)
+        with open(path, 'wb') as f:
+            f.write(self.to_bytes())
+        return path
+
+
+def create_vehicle_catalog(osc_version: str) -> bytes:
+    """
+    Creates a VehicleCatalog with the vehicles referenced by scenarios that use catalogs
+    (car_blue for ego, car_white for objects) with default dimensions.
+
+    Args:
+        osc_version: OpenSCENARIO version
+
+    Returns:
+        object (bytes): Catalog file content
     """
-    if not isinstance(df, pd.DataFrame):
-        raise TypeError("input must be a pd.DataFrame")
-    if not isinstance(ego, list):
-        raise TypeError("input must be a list")
-    if not isinstance(objects, dict):
-        raise TypeError("input must be a dict")
-    if not isinstance(ego_maneuver_array, dict):
-        raise TypeError("input must be a dict")
-    if not isinstance(inf_maneuver_array, dict):
-        raise TypeError("input must be a dict")
-    if not isinstance(movobj_grps_coord, np.ndarray):
-        raise TypeError("input must be a np.ndarray")
-    if not isinstance(objlist, list):
-        raise TypeError("input must be a list")
-    if not isinstance(plot, bool):
-        raise TypeError("input must be a bool")
-    if not isinstance(opendrive_path, str):
-        raise TypeError("input must be a str")
-    if not isinstance(use_folder, bool):
-        raise TypeError("input must be a bool")
-    if not isinstance(timebased_lon, bool):
-        raise TypeError("input must be a bool")
-    if not isinstance(timebased_lat, bool):
-        raise TypeError("input must be a bool")
-    if not isinstance(section_name, str):
-        raise TypeError("input must be a str")
-    if not isinstance(radius_pos_trigger, float):
-        raise TypeError("input must be a float")
-    if not isinstance(dir_name, str):
-        raise TypeError("input must be a str")
     if not isinstance(osc_version, str):
         raise TypeError("input must be a str")
 
-    opendrive_name = opendrive_path.split(os.path.sep)[-1]
-    osgb_name = opendrive_name[:-4] + 'opt.osgb'
+    vehicle_catalog = VehicleCatalog(osc_version)
+    for name, control in [('car_blue', 'external'), ('car_white', 'internal')]:
+        vehicle_catalog.reference(name, [1.872, 4.924, 1.444, 1.376, 0, 0.722], control)
+    return vehicle_catalog.to_bytes()
 
-    #Get User-defined parameters
-    user_param = UserConfig(dir_name)
-    user_param.read_config()
-    object_bb, object_bb_center = user_param.object_boundingbox, user_param.bbcenter_to_rear
 
-    # Write Parameters
-    param = xosc.ParameterDeclarations()
+def open_scenario_bundle(archive_path: str, osc_version: str = '1.0', max_pending: int = 256,
+                         created: float = None) -> ScenarioBundle:
+    """
+    Opens an archive for many scenarios (see convert_to_osc bundle option) with a generated vehicle catalog,
+    which holds the distinct vehicles of all scenarios and is written when the bundle is closed.
+
+    Args:
+        archive_path: Path of the archive, format by extension (.zip, .tar, .tar.gz, .tgz)
+        osc_version: OpenSCENARIO version of the vehicle catalog
+        max_pending: Maximum number of scenarios waiting for the background writer
+        created: Creation time of the bundle in seconds since the epoch. If not specified, the archive has no time
+            stamps and is reproducible.
+
+    Returns:
+        object (ScenarioBundle): Bundle, to be closed after the last scenario
+    """
+    return ScenarioBundle(archive_path, catalog=VehicleCatalog(osc_version), max_pending=max_pending,
+                          created=created)
+
+
+def _get_priority(osc_version: str) -> xosc.Priority:
+    """
+    Helper function. Priority of the events, the attribute value was renamed in OpenSCENARIO 1.2.
+    """
+    if float(osc_version) <= 1.1:
+        return xosc.Priority.overwrite
+    return xosc.Priority.override
+
+
+def _create_scenario(opendrive_path: str, osc_version: str, user_param: UserConfig, param: xosc.ParameterDeclarations,
+                     entities: xosc.Entities = None, storyboard: xosc.StoryBoard = None,
+                     vehicle_catalog: VehicleCatalog = None, bundle: ScenarioBundle = None) -> xosc.Scenario:
+    """
+    Helper function. Scenario with file header, vehicle catalog location and road network. Without entities and
+    storyboard, it holds the header parts for the streaming writers (see _write_osc_head).
+
+    Args:
+        opendrive_path: Path to the OpenDRIVE file, only its name is written
+        osc_version: OpenSCENARIO version
+        user_param: User-defined parameters
+        param: Global parameter declarations
+        entities: Entities of the scenario
+        storyboard: Storyboard of the scenario
+        vehicle_catalog: Generated vehicle catalog, referenced from its directory
+        bundle: Bundle of the scenario, referenced catalog directory if no generated catalog is given
+
+    Returns:
+        object (xosc.Scenario): Scenario
+    """
+    opendrive_name = opendrive_path.split(os.path.sep)[-1]
+    osgb_name = opendrive_name[:-4] + 'opt.osgb'
 
     # Write catalogs
-    if user_param.catalogs is not None:
+    if vehicle_catalog is not None:
+        catalog_path = vehicle_catalog.directory
+    elif bundle is not None:
+        catalog_path = bundle.catalog_directory
+    elif user_param.catalogs is not None:
         catalog_path = user_param.catalogs
     else:
         catalog_path = "../Catalogs/Vehicles"
@@ -184,8 +537,38 @@ def convert_to_osc(df: pd.DataFrame, ego: list, objects: dict, ego_maneuver_arra
         roadfile=opendrive_name, scenegraph=osgb_name
     )
 
-    # Write entities
-    entities = xosc.Entities()
+    return xosc.Scenario(
+        "",
+        "OSC Generator",
+        param,
+        entities if entities is not None else xosc.Entities(),
+        storyboard if storyboard is not None else xosc.StoryBoard(),
+        road,
+        catalog,
+        creation_date=datetime.datetime(2023, 1, 1, 0, 0, 0, 0),
+        osc_minor_version=int(osc_version.split('.')[-1])
+    )
+
+
+def _create_scenario_objects(objects: dict, objlist: list, user_param: UserConfig, osc_version: str,
+                             use_catalog: bool, vehicle_catalog: VehicleCatalog = None):
+    """
+    Creates the scenario objects of ego and detected objects. Inline vehicles and the controller are new objects
+    for each scenario.
+
+    Args:
+        objects: Object positions
+        objlist: Object list
+        user_param: User configuration with bounding boxes
+        osc_version: OpenSCENARIO version
+        use_catalog: Reference vehicles from the VehicleCatalog instead of defining them
+        vehicle_catalog: Generated catalog, which the vehicles are added to and referenced from
+
+    Returns:
+        object (generator): Tuples of (name, entity object, controller)
+    """
+    object_bb, object_bb_center = user_param.object_boundingbox, user_param.bbcenter_to_rear
+
     # Entity - ego
     egoname = "Ego"
 
@@ -207,30 +590,16 @@ def convert_to_osc(df: pd.DataFrame, ego: list, objects: dict, ego_maneuver_arra
     else:
         bb_input.extend([1.872, 4.924, 1.444, 1.376, 0, 0.722])
 
-    bb = xosc.BoundingBox(*bb_input)  # dim(w, l, h), centre(x, y, z)
-    fa = xosc.Axle(0.48, 0.684, 1.672, 2.91, 0.342)
-    ra = xosc.Axle(0, 0.684, 1.672, 0, 0.342)
-    if float(osc_version) < 1.1:
-        ego_veh = xosc.Vehicle("car_white", xosc.VehicleCategory.car, bb, fa, ra, 67, 10, 9.5)
-    else:
-        ego_veh = xosc.Vehicle("car_white", xosc.VehicleCategory.car, bb, fa, ra, 67, 10, 9.5, 1700)
-    ego_veh.add_property(name="control", value="external")
-    ego_veh.add_property_file("")
     # entity controller
-    prop = xosc.Properties()
-    prop.add_property(name="weight", value="60")
-    prop.add_property(name="height", value="1.8")
-    prop.add_property(name="eyeDistance", value="0.065")
-    prop.add_property(name="age", value="28")
-    prop.add_property(name="sex", value="male")
-    cont = xosc.Controller("DefaultDriver", prop)
+    cont = _default_controller()
+    mass = _vehicle_mass(osc_version)
 
-    if user_param.catalogs:
-        entities.add_scenario_object(
-            egoname, xosc.CatalogReference("VehicleCatalog", "car_blue")
-        )
+    if vehicle_catalog is not None:
+        yield egoname, vehicle_catalog.reference("car_white", bb_input, "external"), cont
+    elif use_catalog:
+        yield egoname, xosc.CatalogReference("VehicleCatalog", "car_blue"), None
     else:
-        entities.add_scenario_object(egoname, ego_veh, cont)
+        yield egoname, _create_vehicle("car_white", bb_input, "external", mass), cont
 
     # Entities - objects
     bb_obj = []
@@ -238,7 +607,8 @@ def convert_to_osc(df: pd.DataFrame, ego: list, objects: dict, ego_maneuver_arra
         object_count = idx + 1
         objname = f"Player{object_count}"
         # vehicle
-        if len(object_bb) <= 1 or object_bb[object_count] is None and object_bb_center[object_count] is None:
+        if not object_bb or len(object_bb) <= 1 or \
+                object_bb[object_count] is None and object_bb_center[object_count] is None:
             # set default values
             bb_obj.extend([1.872, 4.924, 1.444, 1.376, 0, 0.722])
         elif object_bb[object_count] is None and object_bb_center[object_count] is not None:
@@ -253,229 +623,765 @@ def convert_to_osc(df: pd.DataFrame, ego: list, objects: dict, ego_maneuver_arra
             bb_obj.extend([object_bb[object_count][0], object_bb[object_count][1], object_bb[object_count][2],
               object_bb_center[object_count][0], object_bb_center[object_count][1], object_bb_center[object_count][2]])
 
-        bb = xosc.BoundingBox(*bb_obj)  # dim(w, l, h), centre(x, y, z)
-        bb_obj.clear()
-        fa = xosc.Axle(0.48, 0.684, 1.672, 2.91, 0.342)
-        ra = xosc.Axle(0, 0.684, 1.672, 0, 0.342)
-        if float(osc_version) < 1.1:
-            obj_veh = xosc.Vehicle(objlist[idx], xosc.VehicleCategory.car, bb, fa, ra, 67, 10, 9.5)
+        if vehicle_catalog is not None:
+            yield objname, vehicle_catalog.reference(objlist[idx], bb_obj, "internal"), cont
+        elif use_catalog:
+            yield objname, xosc.CatalogReference("VehicleCatalog", "car_white"), None
         else:
-            obj_veh = xosc.Vehicle(objlist[idx], xosc.VehicleCategory.car, bb, fa, ra, 67, 10, 9.5, 1700)
-        obj_veh.add_property(name="control", value="internal")
-        obj_veh.add_property_file("")
-
-        if user_param.catalogs:
-            entities.add_scenario_object(
-                objname, xosc.CatalogReference("VehicleCatalog", "car_white")
-            )
-        else:
-            entities.add_scenario_object(objname, obj_veh, cont)
+            yield objname, _create_vehicle(objlist[idx], bb_obj, "internal", mass), cont
+        bb_obj.clear()
 
-    # Determine Priority attribute according to osc version
-    if float(osc_version) <= 1.1:
-        xosc_priority = xosc.Priority.overwrite
-    else:
-        xosc_priority = xosc.Priority.override
 
-    # Write Init
-    init = xosc.Init()
+def _create_parameter_declarations(radius_pos_trigger: float, osc_version: str, radius: bool = True,
+                                   speed: bool = True) -> xosc.ParameterDeclarations:
+    """
+    Creates the global parameters of a parameterized scenario. RadiusPosTrigger replaces the radius of all
+    position based triggers, SpeedFactor scales all speeds and acceleration rates. SpeedFactor uses
+    expressions, which require OpenSCENARIO 1.1 or later. Without them, the scenario would not cover the
+    sweeps a parameterized scenario promises, so older versions are rejected.
+
+    Args:
+        radius_pos_trigger: Default radius of the position based trigger
+        osc_version: OpenSCENARIO version
+        radius: Declare RadiusPosTrigger
+        speed: Declare SpeedFactor
+
+    Returns:
+        object (xosc.ParameterDeclarations): Parameter declarations of the scenario
+    """
+    if speed and float(osc_version) < 1.1:
+        raise ValueError("SpeedFactor of a parameterized scenario requires OpenSCENARIO 1.1 or later")
+
+    param = xosc.ParameterDeclarations()
+    if radius:
+        param.add_parameter(xosc.Parameter('RadiusPosTrigger', xosc.ParameterType.double,
+                                           utils.format_float(radius_pos_trigger)))
+    if speed:
+        param.add_parameter(xosc.Parameter('SpeedFactor', xosc.ParameterType.double, '1.0'))
+    return param
+
+
+def _scale_speed(value, speed_factor: bool):
+    """
+    Expression of a speed or acceleration rate scaled by the SpeedFactor parameter.
+
+    Args:
+        value: Speed in m/s or acceleration rate in m/s^2
+        speed_factor: Option to scale the value
+
+    Returns:
+        object (float, str): Value or expression
+    """
+    if speed_factor:
+        return '${$SpeedFactor * ' + utils.format_float(value) + '}'
+    return value
+
+
+def _create_init_actions(ego: list, objects: dict, speed_factor: bool = False):
+    """
+    Creates the start conditions of ego and detected objects.
+
+    Args:
+        ego: Ego position
+        objects: Object positions
+        speed_factor: Scale the start speeds by the SpeedFactor parameter
+
+    Returns:
+        object (generator): Tuples of (entity name, [TeleportAction, AbsoluteSpeedAction])
+    """
     step_time = xosc.TransitionDynamics(
         xosc.DynamicsShapes.step, xosc.DynamicsDimension.rate, 0
     )
     # Start (init) conditions - Ego
-    egospeed = xosc.AbsoluteSpeedAction(float(f'{ego[2]}'), step_time)
+    egospeed = xosc.AbsoluteSpeedAction(_scale_speed(float(f'{ego[2]}'), speed_factor), step_time)
     egostart = xosc.TeleportAction(xosc.WorldPosition(x=f'{ego[0]}', y=f'{ego[1]}', z='0', h=f'{ego[3]}', p='0', r='0'))
-    init.add_init_action(egoname, egostart)
-    init.add_init_action(egoname, egospeed)
-
-    # init storyboard object
-    sb = xosc.StoryBoard(init)
+    yield "Ego", [egostart, egospeed]
 
     # Start (init) conditions objects
     for idx, obj in objects.items():
         object_count = idx + 1
         objname = f"Player{object_count}"
-        objspeed = xosc.AbsoluteSpeedAction(float(f'{obj[2]}'), step_time)
+        objspeed = xosc.AbsoluteSpeedAction(_scale_speed(float(f'{obj[2]}'), speed_factor), step_time)
         objstart = xosc.TeleportAction(xosc.WorldPosition(x=f'{obj[0]}', y=f'{obj[1]}',
                                                           z='0', h=f'{obj[3]}', p='0', r='0'))
-        init.add_init_action(objname, objstart)
-        init.add_init_action(objname, objspeed)
+        yield objname, [objstart, objspeed]
 
-    # Write Story
-    story = xosc.Story("New Story")
 
-    # For each vehicle write a separate Act
-    # (Act --> for each vehicle; Events inside of Act --> for each of vehicles maneuvers)
-    for key, maneuver_list in ego_maneuver_array.items():
-        if key == 0:
-            name = 'Ego'
-        else:
-            name = 'Player' + str(key)
-
-        eventcounter = 0
-        standstill = False
-
-        # Create necessary Story Element Objects
-        man = xosc.Maneuver(f'New Maneuver {key + 1}', parameters=param)
-        man_lat = xosc.Maneuver(f'New Maneuver {key + 1}', parameters=param)
-        mangroup = xosc.ManeuverGroup(f'New Sequence {key + 1}')
-        mangroup.add_actor(name)
-        # Start trigger for Act
-        act_trig_cond = xosc.SimulationTimeCondition(value=0, rule=xosc.Rule.greaterThan)
-        act_starttrigger = xosc.ValueTrigger(name=f'Start Condition of Act {key + 1}', delay=0,
-                                    conditionedge=xosc.ConditionEdge.rising, valuecondition=act_trig_cond)
-        act = xosc.Act(f'New Act {key + 1}', starttrigger=act_starttrigger)
-
-        long_event = False
-        # Loop ego specific maneuvers (accelerate, decelerate, standstill, ...)
-        for idx, ego_maneuver in enumerate(maneuver_list):
-            if str(ego_maneuver[2]) != 'FM_EGO_standstill':
-                eventcounter += 1
-
-            if standstill & (str(ego_maneuver[2]) == 'FM_EGO_standstill'):
-                standstill = True
-
-            if not standstill:
-                ## Long maneuvers without move_in, move_out
-                event = xosc.Event(f'New Event {eventcounter}', priority=xosc_priority)
-
-                # Starting Condition of long maneuvers
-                if timebased_lon:
-                    long_event = True
-                    # Time based trigger
-                    trig_cond = xosc.SimulationTimeCondition(value=float(ego_maneuver[0]) / 10, rule=xosc.Rule.greaterThan)
-                    trigger = xosc.ValueTrigger(name=f'Start Condition of Event {eventcounter}', delay=0,
-                                                conditionedge=xosc.ConditionEdge.rising, valuecondition=trig_cond)
-
-                elif not timebased_lon:
-                    long_event = True
-                    # Position based absolute position trigger
-                    worldpos = xosc.WorldPosition(x=ego_maneuver[3], y=ego_maneuver[4],
-                                                  z='0', h='0', p='0', r='0')
-                    trig_cond = xosc.DistanceCondition(value=f'{radius_pos_trigger}', rule=xosc.Rule.lessThan,
-                                                       position=worldpos, alongroute="0", freespace="0")
-                    trigger = xosc.EntityTrigger(name=f'Start Condition of Event {eventcounter}', delay=0,
-                                                 conditionedge=xosc.ConditionEdge.rising, entitycondition=trig_cond,
-                                                 triggerentity=f'{name}')
-
-                event.add_trigger(trigger)
-                dyn = xosc.TransitionDynamics(shape=xosc.DynamicsShapes.linear,
-                                              dimension=xosc.DynamicsDimension.rate, value=ego_maneuver[6])
-                action = xosc.AbsoluteSpeedAction(speed=ego_maneuver[5], transition_dynamics=dyn)
-                event.add_action(actionname=f"{ego_maneuver[2]}", action=action)
-
-                man.add_event(event)
-
-            if standstill & (str(ego_maneuver[2]) != 'FM_EGO_standstill'):
-                standstill = False
-
-                # Maneuver: change speed by absolute elapsed simulation time trigger
-                event = xosc.Event(f'New Event {eventcounter}', priority=xosc_priority)
-
-                trig_cond = xosc.SimulationTimeCondition(value=float(ego_maneuver[0]) / 10, rule=xosc.Rule.greaterThan)
-                trigger = xosc.ValueTrigger(name=f'Start Condition of Event {eventcounter}', delay=0,
-                                            conditionedge=xosc.ConditionEdge.rising, valuecondition=trig_cond)
+def _create_trajectory_act(key: int, trajectory: np.ndarray, tolerance: float, param: xosc.ParameterDeclarations,
+                           xosc_priority: xosc.Priority) -> xosc.Act:
+    """
+    Creates the act of one vehicle, which follows its simplified recorded trajectory.
+
+    Args:
+        key: Vehicle index, 0 is ego
+        trajectory: Array with columns time, x, y, heading (rad)
+        tolerance: Maximum position deviation of the simplified trajectory in m
+        param: Parameter declarations of the maneuver
+        xosc_priority: Priority of the event
+
+    Returns:
+        object (xosc.Act): Act of the vehicle
+    """
+    if key == 0:
+        name = 'Ego'
+    else:
+        name = 'Player' + str(key)
+
+    man = xosc.Maneuver(f'New Maneuver {key + 1}', parameters=param)
+    mangroup = xosc.ManeuverGroup(f'New Sequence {key + 1}')
+    mangroup.add_actor(name)
+    act_trig_cond = xosc.SimulationTimeCondition(value=0, rule=xosc.Rule.greaterThan)
+    act_starttrigger = xosc.ValueTrigger(name=f'Start Condition of Act {key + 1}', delay=0,
+                                         conditionedge=xosc.ConditionEdge.rising, valuecondition=act_trig_cond)
+    act = xosc.Act(f'New Act {key + 1}', starttrigger=act_starttrigger)
+
+    vertices = utils.simplify_trajectory(trajectory[:, 0], trajectory[:, 1], trajectory[:, 2], tolerance)
+    if len(vertices) >= 2:
+        positions = [xosc.WorldPosition(x=float(trajectory[i, 1]), y=float(trajectory[i, 2]), z=0,
+                                        h=float(trajectory[i, 3]), p=0, r=0) for i in vertices]
+        polyline = xosc.Polyline([float(trajectory[i, 0]) for i in vertices], positions)
+        traj = xosc.Trajectory(f'Trajectory {name}', False)
+        traj.add_shape(polyline)
+
+        event = xosc.Event('New Event 1', priority=xosc_priority)
+        trig_cond = xosc.SimulationTimeCondition(value=0, rule=xosc.Rule.greaterThan)
+        trigger = xosc.ValueTrigger(name='Start Condition of Event 1', delay=0,
+                                    conditionedge=xosc.ConditionEdge.rising, valuecondition=trig_cond)
+        event.add_trigger(trigger)
+        # Vertex times are absolute simulation times
+        action = xosc.FollowTrajectoryAction(traj, xosc.FollowingMode.position, xosc.ReferenceContext.absolute, 1, 0)
+        event.add_action(actionname='FM_trajectory', action=action)
+        man.add_event(event)
+        mangroup.add_maneuver(man)
+
+    act.add_maneuver_group(mangroup)
+
+    return act
+
+
+def _create_act(key: int, maneuver_list: np.ndarray, current_inf_maneuver_array: np.ndarray,
+                param: xosc.ParameterDeclarations, xosc_priority: xosc.Priority, timebased_lon: bool,
+                timebased_lat: bool, radius_pos_trigger: float, frame_rate: float,
+                parameters: xosc.ParameterDeclarations = None) -> xosc.Act:
+    """
+    Creates the act of one vehicle
+    (Act --> for each vehicle; Events inside of Act --> for each of vehicles maneuvers)
 
-                event.add_trigger(trigger)
-                dyn = xosc.TransitionDynamics(shape=xosc.DynamicsShapes.linear,
-                                              dimension=xosc.DynamicsDimension.rate, value=ego_maneuver[6])
-                action = xosc.AbsoluteSpeedAction(speed=ego_maneuver[5], transition_dynamics=dyn)
-                event.add_action(actionname=f"{ego_maneuver[2]}", action=action)
+    Args:
+        key: Vehicle index, 0 is ego
+        maneuver_list: Array of longitudinal maneuvers of the vehicle
+        current_inf_maneuver_array: Array of infrastructure specific maneuvers of the vehicle
+        param: Parameter declarations of the maneuvers
+        xosc_priority: Priority of the events
+        timebased_lon: Option to use time based trigger for long maneuvers
+        timebased_lat: Option to use time based trigger for lat maneuvers
+        radius_pos_trigger: Radius of the position based trigger
+        frame_rate: Frames per second of the maneuver indices
+        parameters: Global parameters (see _create_parameter_declarations) referenced instead of the values
 
-                man.add_event(event)
+    Returns:
+        object (xosc.Act): Act of the vehicle
+    """
+    if key == 0:
+        name = 'Ego'
+    else:
+        name = 'Player' + str(key)
 
-        lateral_event = False
-        # Loop infrastructure specific maneuvers
-        current_inf_maneuver_array = inf_maneuver_array[key]
-        for idx, inf_maneuver in enumerate(current_inf_maneuver_array):
+    declared = [] if parameters is None else [p.name for p in parameters.parameters]
+    if 'RadiusPosTrigger' in declared:
+        radius_value = '$RadiusPosTrigger'
+    else:
+        radius_value = utils.format_float(radius_pos_trigger)
+    speed_factor = 'SpeedFactor' in declared
+
+    eventcounter = 0
+    standstill = False
+
+    # Create necessary Story Element Objects
+    man = xosc.Maneuver(f'New Maneuver {key + 1}', parameters=param)
+    man_lat = xosc.Maneuver(f'New Maneuver {key + 1}', parameters=param)
+    mangroup = xosc.ManeuverGroup(f'New Sequence {key + 1}')
+    mangroup.add_actor(name)
+    # Start trigger for Act
+    act_trig_cond = xosc.SimulationTimeCondition(value=0, rule=xosc.Rule.greaterThan)
+    act_starttrigger = xosc.ValueTrigger(name=f'Start Condition of Act {key + 1}', delay=0,
+                                conditionedge=xosc.ConditionEdge.rising, valuecondition=act_trig_cond)
+    act = xosc.Act(f'New Act {key + 1}', starttrigger=act_starttrigger)
+
+    long_event = False
+    # Loop ego specific maneuvers (accelerate, decelerate, standstill, ...)
+    for idx, ego_maneuver in enumerate(maneuver_list):
+        if str(ego_maneuver[2]) != 'FM_EGO_standstill':
             eventcounter += 1
 
-            if inf_maneuver[2] == 'FM_INF_lane_change_left':
-                lane_change = 1
-            elif inf_maneuver[2] == 'FM_INF_lane_change_right':
-                lane_change = -1
-            else:
-                raise ValueError('Lane change maneuver name is wrong')
+        if standstill & (str(ego_maneuver[2]) == 'FM_EGO_standstill'):
+            standstill = True
 
-            # Lane Change
+        if not standstill:
+            ## Long maneuvers without move_in, move_out
             event = xosc.Event(f'New Event {eventcounter}', priority=xosc_priority)
 
-            # Starting Condition of lane change
-            if timebased_lat:
-                # Time based_lat trigger
-                trig_cond = xosc.SimulationTimeCondition(value=float(inf_maneuver[0]) / 10,
-                                                         rule=xosc.Rule.greaterThan)
+            # Starting Condition of long maneuvers
+            if timebased_lon:
+                long_event = True
+                # Time based trigger
+                trig_cond = xosc.SimulationTimeCondition(value=float(ego_maneuver[0]) / frame_rate, rule=xosc.Rule.greaterThan)
                 trigger = xosc.ValueTrigger(name=f'Start Condition of Event {eventcounter}', delay=0,
                                             conditionedge=xosc.ConditionEdge.rising, valuecondition=trig_cond)
-                lateral_event = True
 
-            elif not timebased_lat:
+            elif not timebased_lon:
+                long_event = True
                 # Position based absolute position trigger
-                worldpos = xosc.WorldPosition(x=inf_maneuver[3], y=inf_maneuver[4],
+                worldpos = xosc.WorldPosition(x=ego_maneuver[3], y=ego_maneuver[4],
                                               z='0', h='0', p='0', r='0')
-                trig_cond = xosc.DistanceCondition(value=f'{radius_pos_trigger}', rule=xosc.Rule.lessThan,
+                trig_cond = xosc.DistanceCondition(value=radius_value, rule=xosc.Rule.lessThan,
                                                    position=worldpos, alongroute="0", freespace="0")
                 trigger = xosc.EntityTrigger(name=f'Start Condition of Event {eventcounter}', delay=0,
                                              conditionedge=xosc.ConditionEdge.rising, entitycondition=trig_cond,
                                              triggerentity=f'{name}')
-                lateral_event = True
 
             event.add_trigger(trigger)
-            dyn = xosc.TransitionDynamics(shape=xosc.DynamicsShapes.sinusoidal,
-                                          dimension=xosc.DynamicsDimension.time, value=inf_maneuver[5])
-            action = xosc.RelativeLaneChangeAction(lane=lane_change, entity=f'{name}', transition_dynamics=dyn,
-                                                   target_lane_offset=4.26961e-316)
-            event.add_action(actionname=f"{inf_maneuver[2]}", action=action)
-
-            man_lat.add_event(event)
-
-        # Add maneuver events to act and story
-        if long_event:
-            mangroup.add_maneuver(man)
-        if lateral_event:
-            mangroup.add_maneuver(man_lat)
-        act.add_maneuver_group(mangroup)
-        story.add_act(act)
+            dyn = xosc.TransitionDynamics(shape=xosc.DynamicsShapes.linear, dimension=xosc.DynamicsDimension.rate,
+                                          value=_scale_speed(ego_maneuver[6], speed_factor))
+            action = xosc.AbsoluteSpeedAction(speed=_scale_speed(ego_maneuver[5], speed_factor),
+                                              transition_dynamics=dyn)
+            event.add_action(actionname=f"{ego_maneuver[2]}", action=action)
 
-    # Create Scenario
-    sb.add_story(story)
+            man.add_event(event)
 
-    osc_minor_version = int(osc_version.split('.')[-1])
+        if standstill & (str(ego_maneuver[2]) != 'FM_EGO_standstill'):
+            standstill = False
 
-    scenario = xosc.Scenario(
-        "",
-        "OSC Generator",
-        param,
-        entities,
-        sb,
-        road,
-        catalog,
-        creation_date=datetime.datetime(2023, 1, 1, 0, 0, 0, 0),
-        osc_minor_version=osc_minor_version
-    )
+            # Maneuver: change speed by absolute elapsed simulation time trigger
+            event = xosc.Event(f'New Event {eventcounter}', priority=xosc_priority)
+
+            trig_cond = xosc.SimulationTimeCondition(value=float(ego_maneuver[0]) / frame_rate, rule=xosc.Rule.greaterThan)
+            trigger = xosc.ValueTrigger(name=f'Start Condition of Event {eventcounter}', delay=0,
+                                        conditionedge=xosc.ConditionEdge.rising, valuecondition=trig_cond)
+
+            event.add_trigger(trigger)
+            dyn = xosc.TransitionDynamics(shape=xosc.DynamicsShapes.linear, dimension=xosc.DynamicsDimension.rate,
+                                          value=_scale_speed(ego_maneuver[6], speed_factor))
+            action = xosc.AbsoluteSpeedAction(speed=_scale_speed(ego_maneuver[5], speed_factor),
+                                              transition_dynamics=dyn)
+            event.add_action(actionname=f"{ego_maneuver[2]}", action=action)
+
+            man.add_event(event)
+
+    lateral_event = False
+    # Loop infrastructure specific maneuvers
+    for idx, inf_maneuver in enumerate(current_inf_maneuver_array):
+        eventcounter += 1
+
+        if inf_maneuver[2] == 'FM_INF_lane_change_left':
+            lane_change = 1
+        elif inf_maneuver[2] == 'FM_INF_lane_change_right':
+            lane_change = -1
+        else:
+            raise ValueError('Lane change maneuver name is wrong')
+
+        # Lane Change
+        event = xosc.Event(f'New Event {eventcounter}', priority=xosc_priority)
+
+        # Starting Condition of lane change
+        if timebased_lat:
+            # Time based_lat trigger
+            trig_cond = xosc.SimulationTimeCondition(value=float(inf_maneuver[0]) / frame_rate,
+                                                     rule=xosc.Rule.greaterThan)
+            trigger = xosc.ValueTrigger(name=f'Start Condition of Event {eventcounter}', delay=0,
+                                        conditionedge=xosc.ConditionEdge.rising, valuecondition=trig_cond)
+            lateral_event = True
+
+        elif not timebased_lat:
+            # Position based absolute position trigger
+            worldpos = xosc.WorldPosition(x=inf_maneuver[3], y=inf_maneuver[4],
+                                          z='0', h='0', p='0', r='0')
+            trig_cond = xosc.DistanceCondition(value=radius_value, rule=xosc.Rule.lessThan,
+                                               position=worldpos, alongroute="0", freespace="0")
+            trigger = xosc.EntityTrigger(name=f'Start Condition of Event {eventcounter}', delay=0,
+                                         conditionedge=xosc.ConditionEdge.rising, entitycondition=trig_cond,
+                                         triggerentity=f'{name}')
+            lateral_event = True
+
+        event.add_trigger(trigger)
+        dyn = xosc.TransitionDynamics(shape=xosc.DynamicsShapes.sinusoidal,
+                                      dimension=xosc.DynamicsDimension.time, value=inf_maneuver[5])
+        action = xosc.RelativeLaneChangeAction(lane=lane_change, entity=f'{name}', transition_dynamics=dyn,
+                                               target_lane_offset=4.26961e-316)
+        event.add_action(actionname=f"{inf_maneuver[2]}", action=action)
+
+        man_lat.add_event(event)
+
+    # Add maneuver events to act
+    if long_event:
+        mangroup.add_maneuver(man)
+    if lateral_event:
+        mangroup.add_maneuver(man_lat)
+    act.add_maneuver_group(mangroup)
+
+    return act
+
+
+def convert_to_osc(df: pd.DataFrame, ego: list, objects: dict, ego_maneuver_array: dict, inf_maneuver_array: dict,
+                   movobj_grps_coord: np.ndarray, objlist: list,
+                   plot: bool, opendrive_path: str, use_folder: bool, timebased_lon: bool, timebased_lat: bool,
+                   section_name: str, radius_pos_trigger: float,
+                   dir_name: str, osc_version: str, output_path: str = None, frame_rate: float = 10.0,
+                   streaming: bool = False, compress: bool = False, bundle: ScenarioBundle = None,
+                   trajectory_tolerance: float = None, parameterize: bool = False,
+                   vehicle_catalog: VehicleCatalog = None, content_hash: str = None, user_param: UserConfig = None,
+                   open_drive_header: dict = None, stream: TextIO = None) -> Union[str, None]:
+    """
+    Converter for OpenScenario
+
+    Args:
+        df: Dataframe containing trajectories
+        ego: Ego position
+        objects: Object positions
+        ego_maneuver_array: Dict containing array of ego maneuvers
+        inf_maneuver_array: Ict containing array of infrastructure specific maneuvers
+        movobj_grps_coord: Coordinates of groups of detected objects
+        objlist: Object list
+        plot: Flag for graphical plotting
+        opendrive_path: Path to the OpenDRIVE file
+        use_folder: Iption to use folder structure
+        timebased_lon: Option to use time based trigger for long maneuvers
+        timebased_lat: Option to use time based trigger for lat maneuvers
+        section_name: Name of the scenario section
+        radius_pos_trigger: Radius of the position based trigger
+        dir_name: Name of the directory
+        osc_version: OpenSCENARIO version
+        output_path: Path to OpenSCENARIO file
+        frame_rate: Frames per second of the maneuver indices
+        streaming: Write entities and acts incrementally instead of building the whole scenario in memory
+        compress: Write a gzip compressed scenario (.xosc.gz), also used if output_path ends with '.gz'
+        bundle: Add the scenario to this archive instead of writing a file. The vehicles are referenced from
+            the shared catalog of the bundle, the file name is used as archive member name.
+        trajectory_tolerance: If set, each vehicle follows its recorded trajectory (FollowTrajectoryAction)
+            instead of the labeled maneuvers. The trajectory is simplified to this position tolerance in m.
+        parameterize: Write the trigger radius and a speed factor as global parameters (RadiusPosTrigger,
+            SpeedFactor), so one scenario covers a sweep over them. Not used for trajectories.
+        vehicle_catalog: Add the vehicles to this generated catalog and reference them, instead of inline vehicles.
+            The catalog is expected in VehicleCatalog.directory relative to the scenario. A bundle opened by
+            open_scenario_bundle uses its own generated catalog.
+        content_hash: Written as comment at the head of the scenario, so unchanged scenarios can be detected
+            (see utils.compute_content_hash and utils.read_content_hash)
+        user_param: User-defined parameters, read from user_config.json in dir_name if not given
+        open_drive_header: Header of the OpenDRIVE file (see coord_calculations.parse_open_drive_header), used
+            instead of reading opendrive_path, which is then only the road file name written to the scenario
+        stream: Write the scenario to this text stream instead of a file. Nothing is read from or written to disk
+            if user_param and open_drive_header are given as well.
+
+    Returns:
+        object (Union[str, None]): Path to scenario file, None if written to stream
+    """
+    if not isinstance(df, pd.DataFrame):
+        raise TypeError("input must be a pd.DataFrame")
+    if not isinstance(ego, list):
+        raise TypeError("input must be a list")
+    if not isinstance(objects, dict):
+        raise TypeError("input must be a dict")
+    if not isinstance(ego_maneuver_array, dict):
+        raise TypeError("input must be a dict")
+    if not isinstance(inf_maneuver_array, dict):
+        raise TypeError("input must be a dict")
+    if not isinstance(movobj_grps_coord, np.ndarray):
+        raise TypeError("input must be a np.ndarray")
+    if not isinstance(objlist, list):
+        raise TypeError("input must be a list")
+    if not isinstance(plot, bool):
+        raise TypeError("input must be a bool")
+    if not isinstance(opendrive_path, str):
+        raise TypeError("input must be a str")
+    if not isinstance(use_folder, bool):
+        raise TypeError("input must be a bool")
+    if not isinstance(timebased_lon, bool):
+        raise TypeError("input must be a bool")
+    if not isinstance(timebased_lat, bool):
+        raise TypeError("input must be a bool")
+    if not isinstance(section_name, str):
+        raise TypeError("input must be a str")
+    if not isinstance(radius_pos_trigger, float):
+        raise TypeError("input must be a float")
+    if not isinstance(dir_name, str):
+        raise TypeError("input must be a str")
+    if not isinstance(osc_version, str):
+        raise TypeError("input must be a str")
+    if not isinstance(frame_rate, float):
+        raise TypeError("input must be a float")
+    if not isinstance(streaming, bool):
+        raise TypeError("input must be a bool")
+    if not isinstance(compress, bool):
+        raise TypeError("input must be a bool")
+    if bundle is not None and not isinstance(bundle, ScenarioBundle):
+        raise TypeError("input must be a ScenarioBundle")
+    if not isinstance(parameterize, bool):
+        raise TypeError("input must be a bool")
+    if vehicle_catalog is not None and not isinstance(vehicle_catalog, VehicleCatalog):
+        raise TypeError("input must be a VehicleCatalog")
+    if content_hash is not None and not isinstance(content_hash, str):
+        raise TypeError("input must be a str")
+    if trajectory_tolerance is not None and not isinstance(trajectory_tolerance, float):
+        raise TypeError("input must be a float")
+    if user_param is not None and not isinstance(user_param, UserConfig):
+        raise TypeError("input must be a UserConfig")
+    if open_drive_header is not None and not isinstance(open_drive_header, dict):
+        raise TypeError("input must be a dict")
+    if stream is not None and bundle is not None:
+        raise ValueError("stream and bundle cannot be combined")
+
+    #Get User-defined parameters
+    if user_param is None:
+        user_param = UserConfig(dir_name)
+        user_param.read_config()
+
+    # Write Parameters
+    param = xosc.ParameterDeclarations()
+
+    if vehicle_catalog is None and bundle is not None and isinstance(bundle.catalog, VehicleCatalog):
+        vehicle_catalog = bundle.catalog
+
+    # Determine Priority attribute according to osc version
+    xosc_priority = _get_priority(osc_version)
+
+    # Global parameters, maneuvers keep their own empty declarations
+    parameterize = parameterize and trajectory_tolerance is None
+    if parameterize:
+        scenario_param = _create_parameter_declarations(radius_pos_trigger, osc_version,
+                                                        radius=not (timebased_lon and timebased_lat))
+    else:
+        scenario_param = param
+    speed_factor = any(p.name == 'SpeedFactor' for p in scenario_param.parameters)
+
+    # Entities, init actions and acts are created lazily, so the streaming writer only holds one act at a time
+    use_catalog = bool(user_param.catalogs) or bundle is not None
+    scenario_objects = _create_scenario_objects(objects, objlist, user_param, osc_version, use_catalog,
+                                                vehicle_catalog)
+    init_actions = _create_init_actions(ego, objects, speed_factor)
+    if trajectory_tolerance is not None:
+        trajectories = man_helpers.create_trajectories(df, movobj_grps_coord, opendrive_path, frame_rate,
+                                                       open_drive_header)
+        acts = (_create_trajectory_act(key, trajectories[key], trajectory_tolerance, param, xosc_priority)
+                for key in ego_maneuver_array.keys())
+    else:
+        acts = (_create_act(key, maneuver_list, inf_maneuver_array[key], param, xosc_priority, timebased_lon,
+                            timebased_lat, radius_pos_trigger, frame_rate, scenario_param)
+                for key, maneuver_list in ego_maneuver_array.items())
 
     # Create Output Path
-    if output_path is not None:
+    if stream is not None:
+        path = None
+    elif output_path is not None:
         path = output_path
 
     else:
         if use_folder:
-            if timebased_lon and timebased_lat:
-                path = os.path.join(dir_name, 'man_export_' + os.path.basename(section_name) + '_time_lon_lat.xosc')
-            elif timebased_lon and not timebased_lat:
-                path = os.path.join(dir_name,
-                                    'man_export_' + os.path.basename(section_name) + '_time_lon_pos_lat_' + str(
-                                        radius_pos_trigger) + '_m.xosc')
-            elif not timebased_lon and timebased_lat:
-                path = os.path.join(dir_name, 'man_export_' + os.path.basename(section_name) + '_pos_lon_time_lat.xosc')
-
-            else:
-                path = os.path.join(dir_name, 'man_export_' + os.path.basename(section_name) + '_pos_lon_lat_' +
-                                    str(radius_pos_trigger) + '_m.xosc')
-
+            path = create_output_path(dir_name, section_name, timebased_lon, timebased_lat, radius_pos_trigger,
+                                       parameterize)
         else:
             raise NotImplementedError("use_folder flag is going to be removed")
+
+    if stream is not None:
+        # Written to the stream, no file name
+        pass
+    elif bundle is not None:
+        # The archive is compressed as a whole
+        member_name = os.path.basename(path)
+        if member_name.endswith('.gz'):
+            member_name = member_name[:-3]
+        path = os.path.join(bundle.archive_path, member_name)
+    elif path.endswith('.gz'):
+        compress = True
+    elif compress:
+        path += '.gz'
+
+    if streaming:
+        # Header parts only, entities and storyboard are written incrementally
+        scenario = _create_scenario(opendrive_path, osc_version, user_param, scenario_param,
+                                    vehicle_catalog=vehicle_catalog, bundle=bundle)
+        if stream is not None:
+            write_osc_streaming(stream, scenario, scenario_objects, init_actions, acts, content_hash)
+        elif bundle is not None:
+            f = io.StringIO()
+            write_osc_streaming(f, scenario, scenario_objects, init_actions, acts, content_hash)
+            bundle.add(member_name, f.getvalue().encode('utf-8'), section=os.path.basename(section_name))
+        elif compress:
+            with gzip.open(path, 'wt', encoding='utf-8', compresslevel=GZIP_COMPRESSLEVEL) as f:
+                write_osc_streaming(f, scenario, scenario_objects, init_actions, acts, content_hash)
+        else:
+            with open(path, 'w', encoding='utf-8') as f:
+                write_osc_streaming(f, scenario, scenario_objects, init_actions, acts, content_hash)
+
+        return path
+
+    # Write entities
+    entities = xosc.Entities()
+    for objname, entity_object, controller in scenario_objects:
+        entities.add_scenario_object(objname, entity_object, controller)
+
+    # Write Init
+    init = xosc.Init()
+    for objname, actions in init_actions:
+        for action in actions:
+            init.add_init_action(objname, action)
+
+    # init storyboard object
+    sb = xosc.StoryBoard(init)
+
+    # Write Story
+    story = xosc.Story("New Story")
+    for act in acts:
+        story.add_act(act)
+
+    # Create Scenario
+    sb.add_story(story)
+
+    scenario = _create_scenario(opendrive_path, osc_version, user_param, scenario_param, entities, sb,
+                                vehicle_catalog, bundle)
+
     # Write Scenario to xml
-    scenario.write_xml(path)
+    data = prettify(scenario.get_element())
+    if content_hash is not None:
+        data = (utils.content_hash_comment(content_hash) + '\n').encode('utf-8') + data
+    if stream is not None:
+        stream.write(data.decode('utf-8'))
+    elif bundle is not None:
+        bundle.add(member_name, data, section=os.path.basename(section_name))
+    elif compress:
+        with gzip.open(path, 'wb', compresslevel=GZIP_COMPRESSLEVEL) as f:
+            f.write(data)
+    else:
+        with open(path, 'wb') as f:
+            f.write(data)
 
     return path
+
+
+def convert_to_osc_variants(df: pd.DataFrame, ego: list, objects: dict, ego_maneuver_array: dict,
+                            inf_maneuver_array: dict, movobj_grps_coord: np.ndarray, objlist: list,
+                            opendrive_path: str, use_folder: bool, variants: list, section_name: str,
+                            dir_name: str, osc_version: str, frame_rate: float = 10.0, compress: bool = False,
+                            max_workers: int = None, vehicle_catalog: VehicleCatalog = None,
+                            user_param: UserConfig = None) -> list:
+    """
+    Converter for OpenScenario, writes one scenario per trigger variant from a single labeling run.
+    File header, entities and init are created and serialized once and shared by all variants,
+    only the acts are created per variant.
+
+    Args:
+        df: Dataframe containing trajectories
+        ego: Ego position
+        objects: Object positions
+        ego_maneuver_array: Dict containing array of ego maneuvers
+        inf_maneuver_array: Dict containing array of infrastructure specific maneuvers
+        movobj_grps_coord: Coordinates of groups of detected objects
+        objlist: Object list
+        opendrive_path: Path to the OpenDRIVE file
+        use_folder: Option to use folder structure
+        variants: List of (timebased_lon, timebased_lat, radius_pos_trigger)
+        section_name: Name of the scenario section
+        dir_name: Name of the directory
+        osc_version: OpenSCENARIO version
+        frame_rate: Frames per second of the maneuver indices
+        compress: Write gzip compressed scenarios (.xosc.gz)
+        max_workers: If set, the variants are written by this number of threads
+        vehicle_catalog: Add the vehicles to this generated catalog and reference them, instead of inline vehicles
+        user_param: User-defined parameters, read from user_config.json in dir_name if not given
+
+    Returns:
+        object (list): Paths to scenario files in the order of variants
+    """
+    if not isinstance(df, pd.DataFrame):
+        raise TypeError("input must be a pd.DataFrame")
+    if not isinstance(ego, list):
+        raise TypeError("input must be a list")
+    if not isinstance(objects, dict):
+        raise TypeError("input must be a dict")
+    if not isinstance(ego_maneuver_array, dict):
+        raise TypeError("input must be a dict")
+    if not isinstance(inf_maneuver_array, dict):
+        raise TypeError("input must be a dict")
+    if not isinstance(movobj_grps_coord, np.ndarray):
+        raise TypeError("input must be a np.ndarray")
+    if not isinstance(objlist, list):
+        raise TypeError("input must be a list")
+    if not isinstance(opendrive_path, str):
+        raise TypeError("input must be a str")
+    if not isinstance(use_folder, bool):
+        raise TypeError("input must be a bool")
+    if not isinstance(variants, list):
+        raise TypeError("input must be a list")
+    if not isinstance(section_name, str):
+        raise TypeError("input must be a str")
+    if not isinstance(dir_name, str):
+        raise TypeError("input must be a str")
+    if not isinstance(osc_version, str):
+        raise TypeError("input must be a str")
+    if not isinstance(frame_rate, float):
+        raise TypeError("input must be a float")
+    if not isinstance(compress, bool):
+        raise TypeError("input must be a bool")
+    if max_workers is not None and not isinstance(max_workers, int):
+        raise TypeError("input must be a int")
+    if vehicle_catalog is not None and not isinstance(vehicle_catalog, VehicleCatalog):
+        raise TypeError("input must be a VehicleCatalog")
+    if user_param is not None and not isinstance(user_param, UserConfig):
+        raise TypeError("input must be a UserConfig")
+    for timebased_lon, timebased_lat, radius_pos_trigger in variants:
+        if not isinstance(timebased_lon, bool) or not isinstance(timebased_lat, bool):
+            raise TypeError("input must be a bool")
+        if not isinstance(radius_pos_trigger, float):
+            raise TypeError("input must be a float")
+    if not use_folder:
+        raise NotImplementedError("use_folder flag is going to be removed")
+
+    paths = [create_output_path(dir_name, section_name, *variant) + ('.gz' if compress else '')
+             for variant in variants]
+    if len(set(paths)) != len(paths):
+        raise ValueError("variants must be unique")
+
+    #Get User-defined parameters
+    if user_param is None:
+        user_param = UserConfig(dir_name)
+        user_param.read_config()
+
+    param = xosc.ParameterDeclarations()
+    xosc_priority = _get_priority(osc_version)
+
+    # Shared part of all variants
+    scenario = _create_scenario(opendrive_path, osc_version, user_param, param, vehicle_catalog=vehicle_catalog)
+    head = io.StringIO()
+    _write_osc_head(head, scenario,
+                    _create_scenario_objects(objects, objlist, user_param, osc_version, bool(user_param.catalogs),
+                                             vehicle_catalog),
+                    _create_init_actions(ego, objects))
+    head = head.getvalue()
+
+    def write_variant(path: str, variant: tuple) -> str:
+        timebased_lon, timebased_lat, radius_pos_trigger = variant
+        acts = (_create_act(key, maneuver_list, inf_maneuver_array[key], param, xosc_priority, timebased_lon,
+                            timebased_lat, radius_pos_trigger, frame_rate)
+                for key, maneuver_list in ego_maneuver_array.items())
+        if compress:
+            f = gzip.open(path, 'wt', encoding='utf-8', compresslevel=GZIP_COMPRESSLEVEL)
+        else:
+            f = open(path, 'w', encoding='utf-8')
+        with f:
+            f.write(head)
+            _write_osc_story(f, acts)
+        return path
+
+    if max_workers is None:
+        return [write_variant(path, variant) for path, variant in zip(paths, variants)]
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(write_variant, paths, variants))
+
+
+class StreamingScenarioWriter:
+    """
+    Writer for maneuvers which are labeled while a recording is received (see streaming.StreamingLabeler).
+    The head (header, entities and init) is written as soon as the start conditions are known. The segments are
+    collected as they are emitted and written as acts when the stream ends, as an act holds all events of a vehicle.
+
+    Usage:
+        writer = StreamingScenarioWriter(f, 'road.xodr')
+        writer.write_head(ego, objects, objlist)
+        for key, kind, row in segments:
+            writer.add(key, kind, row)
+        writer.close()
+    """
+
+    def __init__(self, f: TextIO, opendrive_path: str, osc_version: str = '1.0', timebased_lon: bool = True,
+                 timebased_lat: bool = False, radius_pos_trigger: float = 2.0, frame_rate: float = 10.0,
+                 user_param: UserConfig = None, dir_name: str = ''):
+        """
+        Args:
+            f: Text file handle
+            opendrive_path: Path to the OpenDRIVE file, only its name is written
+            osc_version: OpenSCENARIO version
+            timebased_lon: Option to use time based trigger for long maneuvers
+            timebased_lat: Option to use time based trigger for lat maneuvers
+            radius_pos_trigger: Radius of the position based trigger
+            frame_rate: Frames per second of the maneuver indices
+            user_param: User-defined parameters, read from user_config.json in dir_name if not given
+            dir_name: Name of the directory
+        """
+        if not isinstance(opendrive_path, str):
+            raise TypeError("input must be a str")
+        if not isinstance(osc_version, str):
+            raise TypeError("input must be a str")
+        if not isinstance(timebased_lon, bool):
+            raise TypeError("input must be a bool")
+        if not isinstance(timebased_lat, bool):
+            raise TypeError("input must be a bool")
+        if not isinstance(radius_pos_trigger, float):
+            raise TypeError("input must be a float")
+        if not isinstance(frame_rate, float):
+            raise TypeError("input must be a float")
+        if user_param is not None and not isinstance(user_param, UserConfig):
+            raise TypeError("input must be a UserConfig")
+
+        if user_param is None:
+            user_param = UserConfig(dir_name)
+            user_param.read_config()
+
+        self.f = f
+        self.opendrive_path = opendrive_path
+        self.osc_version = osc_version
+        self.timebased_lon = timebased_lon
+        self.timebased_lat = timebased_lat
+        self.radius_pos_trigger = radius_pos_trigger
+        self.frame_rate = frame_rate
+        self.user_param = user_param
+
+        self.xosc_priority = _get_priority(osc_version)
+        self.param = xosc.ParameterDeclarations()
+
+        self.vehicles = None
+        self.segments = {}
+
+    def write_head(self, ego: list, objects: dict, objlist: list):
+        """
+        Args:
+            ego: Ego position
+            objects: Object positions
+            objlist: Object list
+        """
+        if self.vehicles is not None:
+            raise RuntimeError('the head is already written')
+
+        scenario = _create_scenario(self.opendrive_path, self.osc_version, self.user_param, self.param)
+        _write_osc_head(self.f, scenario,
+                        _create_scenario_objects(objects, objlist, self.user_param, self.osc_version,
+                                                 bool(self.user_param.catalogs)),
+                        _create_init_actions(ego, objects))
+        self.vehicles = len(objects) + 1
+
+    def add(self, key: int, kind: str, row: np.ndarray):
+        """
+        Args:
+            key: Vehicle index, 0 is ego
+            kind: 'lon' for a row of the longitudinal maneuver array, 'lat' for a lane change
+            row: Row of the maneuver array
+        """
+        if kind not in ['lon', 'lat']:
+            raise ValueError("kind must be 'lon' or 'lat'")
+        self.segments.setdefault((key, kind), []).append(row)
+
+    def close(self):
+        """
+        Writes the acts and the end of the scenario.
+        """
+        if self.vehicles is None:
+            raise RuntimeError('the head is not written')
+
+        def rows(key: int, kind: str, columns: int) -> np.ndarray:
+            segments = self.segments.get((key, kind))
+            if not segments:
+                return np.empty(shape=[0, columns])
+            return np.array(segments)
+
+        acts = (_create_act(key, rows(key, 'lon', 7), rows(key, 'lat', 6), self.param, self.xosc_priority,
+                            self.timebased_lon, self.timebased_lat, self.radius_pos_trigger, self.frame_rate)
+                for key in range(self.vehicles))
+        _write_osc_story(self.f, acts)
@@ -0,0 +1,640 @@
+#  ****************************************************************************
+#  @streaming.py
+#
+#  @copyright 2023 e:fs TechHub GmbH and Audi AG. All rights reserved.
+#
+#  @license Apache v2.0
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#  ****************************************************************************
+
+import bisect
+import math
+from typing import Union
+
+import numpy as np
+import pandas as pd
+import pyproj
+from shapely.geometry import LineString, Point
+
+from osc_generator.tools import rulebased, utils
+from osc_generator.tools.coord_calculations import get_proj_from_open_drive, get_proj_from_open_drive_header, \
+    get_transformer, LocalTangentPlane
+from osc_generator.tools.man_helpers import OBJECT_CLASSES
+
+LONGITUDINAL_MANEUVERS = ['accelerate', 'start', 'keep_velocity', 'standstill', 'decelerate', 'stop', 'reversing']
+
+# Segment extraction order of the longitudinal maneuvers (see man_helpers.label_maneuvers)
+SEGMENT_MANEUVERS = ['accelerate', 'keep_velocity', 'decelerate', 'standstill']
+
+
+def process_frame(row: Union[dict, pd.Series], ltp: LocalTangentPlane = None) -> dict:
+    """
+    Converts one frame of relative trajectories (csv layout or osi_stream.osi_to_frame) to the layout of the
+    processed main dataframe: timestamp, lat, long, heading, speed of ego and lat_i, lon_i, speed_i, class_i of
+    the objects. Objects are not filtered, this needs the whole recording.
+
+    Args:
+        row: Values of the frame by column
+        ltp: Local tangent plane for planar calculations. If None, WGS84 geodesics are used.
+
+    Returns:
+        object (dict): Processed frame
+    """
+    if not isinstance(row, (dict, pd.Series)):
+        raise TypeError("input must be a dict or pd.Series")
+    if not (ltp is None or isinstance(ltp, LocalTangentPlane)):
+        raise TypeError("input must be a LocalTangentPlane")
+
+    frame = {column: row[column] for column in ['timestamp', 'lat', 'long', 'heading', 'speed']}
+    movobj_grps = utils.find_vars('pos_x_|pos_y_|speed_x_', list(row.keys()), reshape=True)
+    for p in movobj_grps:
+        q = [p[0].replace('pos_x', 'lat'), p[1].replace('pos_y', 'lon'), p[2].replace('speed_x', 'speed'),
+             p[2].replace('speed_x', 'class')]
+        if any(pd.isna(row[column]) for column in p):
+            frame[q[0]] = np.nan
+            frame[q[1]] = np.nan
+        elif ltp is not None:
+            coordx, coordy = ltp.offset(np.array([row['lat']]), np.array([row['long']]),
+                                        np.array([row['heading']]), np.array([row[p[0]]]), np.array([row[p[1]]]))
+            frame[q[0]] = float(coordx[0])
+            frame[q[1]] = float(coordy[0])
+        else:
+            n = utils.calc_new_geopos_from_2d_vector_on_spheric_earth(
+                curr_coords=pd.Series([row['lat'], row['long']], index=['lat', 'long']),
+                heading=float(row['heading']), dist_x=float(row[p[0]]), dist_y=float(row[p[1]]))
+            frame[q[0]] = n[0]
+            frame[q[1]] = n[1]
+        frame[q[2]] = abs(row[p[2]])
+        frame[q[3]] = row[q[3]]
+    return frame
+
+
+class _FrameWindow:
+    """
+    Values of consecutive frames, addressed by frame index. Frames before offset are dropped by trim.
+    """
+
+    def __init__(self):
+        self.offset = 0
+        self.length = 0
+        self.values = np.zeros(64)
+
+    def __len__(self) -> int:
+        return self.length
+
+    def append(self, value: float):
+        k = self.length - self.offset
+        if k == len(self.values):
+            self.values = np.concatenate([self.values, np.zeros(len(self.values))])
+        self.values[k] = value
+        self.length += 1
+
+    def __getitem__(self, i: int) -> float:
+        return self.values[i - self.offset]
+
+    def __setitem__(self, key: Union[int, slice], value: float):
+        if isinstance(key, slice):
+            self.values[max(key.start - self.offset, 0):key.stop - self.offset] = value
+        else:
+            self.values[key - self.offset] = value
+
+    def window(self, start: int, stop: int) -> np.ndarray:
+        return self.values[start - self.offset:stop - self.offset]
+
+    def trim(self, first: int):
+        """
+        Drops the frames before first, the array is only copied once the dropped part outweighs the kept one.
+        """
+        dropped = first - self.offset
+        live = self.length - first
+        if dropped > max(live, 64):
+            values = np.zeros(max(64, 2 * live))
+            values[:live] = self.values[dropped:dropped + live]
+            self.values = values
+            self.offset = first
+
+
+class _LaneCrossings:
+    """
+    Lane changes of one vehicle over one lane line. Like rulebased.create_lateral_maneuver_vectors, a lane change
+    lasts from the last peak of the distance to the line before the crossing to the first peak after it. It starts
+    at most max_frames before the crossing, so it is final after a bounded time.
+    """
+
+    def __init__(self, lane: np.ndarray, max_frames: int):
+        self.lane = lane
+        self.max_frames = max_frames
+        self.line = LineString(lane)
+        self.first_frame = None
+        self.previous = None
+        self.previous_frame = -1
+        self.previous_distance = None
+        self.rise_frame = None
+        self.last_peak = None
+        # (start, name) of crossings waiting for the next peak
+        self.pending = []
+
+    def first_needed_frame(self) -> Union[int, None]:
+        """
+        Returns:
+            object (Union[int, None]): First frame which a later lane change can start at
+        """
+        if self.first_frame is None:
+            return None
+        starts = [start for start, _ in self.pending]
+        last_peak = self.first_frame if self.last_peak is None else self.last_peak
+        starts.append(max(last_peak, self.previous_frame + 1 - self.max_frames))
+        return min(starts)
+
+    def step(self, i: int, point: tuple) -> list:
+        """
+        Args:
+            i: Frame index
+            point: (lat, lon) of the vehicle
+
+        Returns:
+            object (list): (start, end, name) of the lane changes which ended, end is the first frame after it
+        """
+        ended = []
+        if self.first_frame is None:
+            self.first_frame = i
+        distance = Point(point).distance(self.line)
+
+        # Peaks as scipy.signal.find_peaks, the middle of a plateau
+        if self.previous_distance is not None:
+            if distance > self.previous_distance:
+                self.rise_frame = i
+            elif distance < self.previous_distance and self.rise_frame is not None:
+                peak = (self.rise_frame + self.previous_frame) // 2
+                self.rise_frame = None
+                ended.extend((start, peak, name) for start, name in self.pending)
+                self.pending = []
+                self.last_peak = peak
+
+        if self.previous is not None:
+            intersection = LineString([self.previous, point]).intersection(self.line)
+            if not intersection.is_empty:
+                if hasattr(intersection, 'geoms'):
+                    intersection = intersection.geoms[0]
+                cross = intersection.coords[0]
+                start = self.first_frame if self.last_peak is None else self.last_peak
+                start = max(start, i - self.max_frames)
+                self.pending.append((start, self._direction(cross, point)))
+
+        self.previous = point
+        self.previous_frame = i
+        self.previous_distance = distance
+        return ended
+
+    def finish(self, end: int) -> list:
+        """
+        Args:
+            end: Last frame of the stream
+
+        Returns:
+            object (list): (start, end, name) of the lane changes without a peak after the crossing
+        """
+        ended = [(start, end, name) for start, name in self.pending]
+        self.pending = []
+        return ended
+
+    def _direction(self, cross: tuple, point: tuple) -> str:
+        """
+        Left or right lane change, from the angle between the lane and the vehicle (see
+        rulebased.create_lateral_maneuver_vectors).
+        """
+        index = int(np.argmin(np.sum(np.square(self.lane - np.array(cross)), axis=1)))
+        if index == 0:
+            v0 = self.lane[index + 1] - self.lane[index]
+        elif index + 1 == len(self.lane):
+            v0 = self.lane[index] - self.lane[index - 1]
+        else:
+            v0 = self.lane[index + 1] - self.lane[index - 1]
+        v1 = np.array(point) - np.array(self.previous)
+        angle = math.atan2(np.linalg.det([v0, v1]), np.dot(v0, v1))
+        if np.degrees(angle) < 0:
+            return 'FM_INF_lane_change_left'
+        return 'FM_INF_lane_change_right'
+
+
+class _VehicleStream:
+    """
+    Labeling state of one vehicle (see StreamingLabeler).
+    """
+
+    def __init__(self, key: int, columns: list, lanes: list, acc_threshold: float, frame_rate: float,
+                 max_lane_change: float):
+        self.key = key
+        self.columns = columns
+        self.frame_rate = frame_rate
+        self.smoothing_window = max(1, int(round(0.5 * frame_rate)))
+        self.look_ahead = self.smoothing_window // 2
+
+        self.lat = _FrameWindow()
+        self.lon = _FrameWindow()
+        self.speed = _FrameWindow()
+        self.gradient = _FrameWindow()
+        self.smoothed = _FrameWindow()
+        self.labels = {name: _FrameWindow() for name in LONGITUDINAL_MANEUVERS}
+        self.machine = rulebased.LongitudinalStateMachine(self.labels, acc_threshold, 2.0 * frame_rate / 10.0, 20.0)
+        # Frames passed to the state machine and to the segment extraction of each maneuver
+        self.labeled = 0
+        self.extracted = {name: 0 for name in SEGMENT_MANEUVERS}
+
+        # Rows of the maneuver array by (start frame, index in SEGMENT_MANEUVERS), which is the order of
+        # man_helpers.label_maneuvers, and the frame which ended them
+        self.rows = {}
+        self.closed = {}
+        self.switches = {name: None for name in SEGMENT_MANEUVERS}
+        self.pending = []
+        self.maneuver_array = np.empty(shape=[0, 7])
+
+        self.lanes = [_LaneCrossings(lane, int(round(max_lane_change * frame_rate))) for lane in lanes]
+        # [start, end, name] of lane changes, merged over all lane lines
+        self.lane_changes = []
+        self.inf_maneuver_array = np.empty(shape=[0, 6])
+
+    def push(self, frame: dict, transformers: tuple) -> list:
+        """
+        Args:
+            frame: Processed frame
+            transformers: Transformers to the OpenDRIVE coordinates, with lon, lat and lat, lon order
+
+        Returns:
+            object (list): Finalized segments (key, 'lon' or 'lat', row)
+        """
+        i = len(self.speed)
+        lat = frame[self.columns[0]]
+        lon = frame[self.columns[1]]
+        speed = frame[self.columns[2]]
+        self.lat.append(lat)
+        self.lon.append(lon)
+        self.speed.append(speed)
+        for window in self.labels.values():
+            window.append(0.0)
+
+        # Acceleration as rolling mean over the smoothing window, centred by the look-ahead
+        delta_t = 1 / self.frame_rate
+        if i == 0:
+            self.gradient.append(np.nan)
+        else:
+            self.gradient.append((speed / 3.6 - self.speed[i - 1] / 3.6) / delta_t)
+        window = self.gradient.window(max(0, i - self.smoothing_window + 1), i + 1)
+        valid = window[~np.isnan(window)]
+        self.smoothed.append(valid.mean() if len(valid) else np.nan)
+
+        segments = []
+        if i - self.look_ahead >= 0:
+            self._label(i - self.look_ahead, self.smoothed[i])
+            frontiers = {name: min(frame, self.labeled) for name, frame in self.machine.first_open_frames().items()}
+            self._extract(frontiers, transformers)
+            segments.extend(self._emit())
+
+        if not (pd.isna(lat) or pd.isna(lon)):
+            for lane in self.lanes:
+                for start, end, name in lane.step(i, (lat, lon)):
+                    self._add_lane_change(start, end, name)
+        segments.extend(self._emit_lane_changes(transformers))
+        self._trim()
+        return segments
+
+    def finish(self, transformers: tuple) -> list:
+        """
+        Labels the remaining frames, the look-ahead of the last frames is the last acceleration.
+
+        Returns:
+            object (list): Remaining segments (key, 'lon' or 'lat', row)
+        """
+        length = len(self.speed)
+        segments = []
+        if length > 0:
+            last = self.smoothed[length - 1]
+            for i in range(self.labeled, length):
+                self._label(i, self.smoothed[i + self.look_ahead] if i + self.look_ahead < length else last)
+            self.machine.finish()
+            self._extract({name: length for name in SEGMENT_MANEUVERS}, transformers)
+            segments.extend(self._emit(final=True))
+        for lane in self.lanes:
+            for start, end, name in lane.finish(length - 1):
+                self._add_lane_change(start, end, name)
+        segments.extend(self._emit_lane_changes(transformers, final=True))
+        return segments
+
+    def _label(self, i: int, acceleration: float):
+        speed = self.speed[i]
+        if pd.isna(speed):
+            acceleration = np.nan
+        self.machine.step(i, acceleration, speed)
+        self.labeled = i + 1
+
+    def _extract(self, frontiers: dict, transformers: tuple):
+        """
+        Segment extraction of the final frames of each maneuver, with the rules of man_helpers.label_maneuvers.
+        """
+        transformer, transformer_lat_lon = transformers
+        frame_rate = self.frame_rate
+        for index, name in enumerate(SEGMENT_MANEUVERS):
+            labels = self.labels[name]
+            for i in range(self.extracted[name], frontiers[name]):
+                key = self.switches[name]
+                flag = labels[i]
+                if flag == 1 and key is None:
+                    if name == 'standstill':
+                        temp_lon, temp_lat = transformer_lat_lon.transform(self.lon[i], self.lat[i])
+                    else:
+                        temp_lon, temp_lat = transformer.transform(self.lon[i], self.lat[i])
+                    key = (i, index)
+                    self.rows[key] = np.append(np.empty(shape=[0, 7]),
+                                               [[i, i, 'FM_EGO_' + name, temp_lon, temp_lat, 0, 0]], axis=0)[0]
+                    bisect.insort(self.pending, key)
+                    self.switches[name] = key
+                elif flag == 0 and key is not None:
+                    row = self.rows[key]
+                    start = key[0]
+                    row[1] = i - 1
+                    # Target speed
+                    row[5] = self.speed[i - 1] / 3.6
+                    # Calculate the acceleration = (target speed - start speed) / duration
+                    row[6] = abs(self.speed[i - 1] / 3.6 - (self.speed[start] / 3.6)) / ((i - start) / frame_rate)
+                    self.closed[key] = i
+                    self.switches[name] = None
+            self.extracted[name] = max(self.extracted[name], frontiers[name])
+
+    def _first_future(self) -> tuple:
+        """
+        Returns:
+            object (tuple): Lowest key of the rows which are not created yet
+        """
+        return min((self.extracted[name], index) for index, name in enumerate(SEGMENT_MANEUVERS))
+
+    def _successor(self, final: bool) -> Union[tuple, bool, None]:
+        """
+        Returns:
+            object (Union[tuple, bool, None]): Key of the row after the first pending one, None if there is none and
+                False if it is not known yet
+        """
+        created = self.pending[1] if len(self.pending) > 1 else None
+        if final:
+            return created
+
+        # Rows of a maneuver which are not created yet start at its extraction frontier or later
+        bounds = {name: (self.extracted[name], index) for index, name in enumerate(SEGMENT_MANEUVERS)}
+        committed = self.machine.committed_maneuver()
+        if committed is None or self.switches[committed] is not None:
+            if created is not None and created < min(bounds.values()):
+                return created
+            return False
+
+        # The running maneuver gets a row at its frontier (labeled by finish) or at the frame after it
+        first, index = bounds.pop(committed)
+        bound = min(bounds.values()) if bounds else (math.inf, 0)
+        if created is not None and created < bound and created < (first, index):
+            return created
+        if (first + 1, index) < bound and (created is None or (first + 1, index) < created):
+            return first + 1, index
+        return False
+
+    def _emit(self, final: bool = False) -> list:
+        """
+        Emits the rows in order once they ended and the next row is known, the start of a standstill changes
+        the target speed of the row before it.
+        """
+        segments = []
+        while self.pending:
+            key = self.pending[0]
+            if not final and (key not in self.closed or not key < self._first_future()):
+                break
+            successor = self._successor(final)
+            if successor is False:
+                break
+            self.pending.pop(0)
+            row = self.rows.pop(key)
+            close = self.closed.pop(key, None)
+            # Assure that last maneuver before a standstill ends with 0 km/h
+            if successor is not None and SEGMENT_MANEUVERS[successor[1]] == 'standstill' and \
+                    (close is None or close <= successor[0]):
+                row[5] = 0.0
+            self.maneuver_array = np.append(self.maneuver_array, [row], axis=0)
+            segments.append((self.key, 'lon', row.copy()))
+        return segments
+
+    def _add_lane_change(self, start: int, end: int, name: str):
+        """
+        Adds a lane change over one lane line. Like the lane change vectors of all lane lines, which are combined
+        with a logical or, overlapping lane changes in the same direction are merged.
+        """
+        for lane_change in self.lane_changes:
+            if lane_change[2] == name and start <= lane_change[1] and lane_change[0] <= end:
+                start = min(start, lane_change[0])
+                end = max(end, lane_change[1])
+        self.lane_changes = [lane_change for lane_change in self.lane_changes
+                             if not (lane_change[2] == name and start <= lane_change[1] and lane_change[0] <= end)]
+        self.lane_changes.append([start, end, name])
+        self.lane_changes.sort(key=lambda lane_change: (lane_change[0], lane_change[2] != 'FM_INF_lane_change_left'))
+
+    def _emit_lane_changes(self, transformers: tuple, final: bool = False) -> list:
+        """
+        Emits the lane changes in order once no lane change of another lane line can be merged into them.
+        """
+        _, transformer_lat_lon = transformers
+        lane_frames = [lane.first_needed_frame() for lane in self.lanes]
+        lane_frames = [frame for frame in lane_frames if frame is not None]
+        first_start = min(lane_frames) if lane_frames else math.inf
+        segments = []
+        while self.lane_changes and (final or self.lane_changes[0][1] < first_start):
+            start, end, name = self.lane_changes.pop(0)
+            temp_lon, temp_lat = transformer_lat_lon.transform(self.lon[start], self.lat[start])
+            row = np.append(np.empty(shape=[0, 6]), [[start, start, name, temp_lon, temp_lat, 0]], axis=0)
+            row[0][1] = end
+            row[0][5] = (end - start) / self.frame_rate
+            self.inf_maneuver_array = np.append(self.inf_maneuver_array, row, axis=0)
+            segments.append((self.key, 'lat', row[0].copy()))
+        return segments
+
+    def _trim(self):
+        """
+        Drops the frames which no later segment needs.
+        """
+        length = len(self.speed)
+        first = min([self.labeled, length - self.smoothing_window] + list(self.extracted.values()))
+        first = min([first] + [key[0] for key in self.pending])
+        lane_frames = [lane.first_needed_frame() for lane in self.lanes]
+        first = min([first] + [frame for frame in lane_frames if frame is not None] +
+                    [lane_change[0] for lane_change in self.lane_changes]) - 1
+        if first > 0:
+            for window in [self.lat, self.lon, self.speed, self.gradient, self.smoothed] + \
+                    list(self.labels.values()):
+                window.trim(first)
+
+
+class StreamingLabeler:
+    """
+    Incremental maneuver labeling for live data: consumes processed frames one at a time (see process_frame) and
+    emits maneuver segments as soon as they are final, instead of labeling a whole recording
+    (see man_helpers.label_maneuvers).
+
+    The longitudinal labeling runs the state machine of rulebased.create_longitudinal_maneuver_vectors. Its
+    acceleration is smoothed centred over 0.5 s, so a frame is labeled look_ahead frames after it arrived.
+    A maneuver is final once it ended and the next one is known, typically look_ahead plus the minimum maneuver
+    length (0.2 s) after its end, as the start of a standstill changes the target speed of the maneuver before it.
+    A vehicle out of view therefore keeps its last maneuver until the next one or the end of the stream.
+
+    The lateral labeling needs the lane lines in advance (e.g. of a previous drive or the processed recording). A lane
+    change ends at the first peak of the distance to the crossed line and is final once no crossing of another line
+    can overlap it, at most max_lane_change after its end. Every crossing of a line is labeled, the whole recording
+    only labels the first. The output equals man_helpers.label_maneuvers otherwise, only the frames of open
+    segments are kept.
+    """
+
+    def __init__(self, df_lanes: pd.DataFrame, opendrive_path: str = '', acc_threshold: float = 0.2,
+                 frame_rate: float = 10.0, ltp: LocalTangentPlane = None, open_drive_header: dict = None,
+                 max_lane_change: float = 10.0):
+        """
+        Args:
+            df_lanes: Dataframe which contains absolute positions of lanes (lat, lon column pairs)
+            opendrive_path: Path to opendrive file
+            acc_threshold: Acceleration threshold for labeling
+            frame_rate: Frames per second of the stream
+            ltp: Local tangent plane for planar heading calculation. If None, WGS84 geodesics are used.
+            open_drive_header: Header of the OpenDRIVE file (see coord_calculations.parse_open_drive_header),
+                used instead of reading the file
+            max_lane_change: Longest time in s from the start of a lane change to the crossing of the line
+        """
+        if not isinstance(df_lanes, pd.DataFrame):
+            raise TypeError("input must be a pd.DataFrame")
+        if not isinstance(opendrive_path, str):
+            raise TypeError("input must be a str")
+        if not isinstance(acc_threshold, float):
+            raise TypeError("input must be a float")
+        if not isinstance(frame_rate, float):
+            raise TypeError("input must be a float")
+        if not isinstance(max_lane_change, float):
+            raise TypeError("input must be a float")
+
+        self.acc_threshold = acc_threshold
+        self.frame_rate = frame_rate
+        self.ltp = ltp
+        self.max_lane_change = max_lane_change
+        self.look_ahead = max(1, int(round(0.5 * frame_rate))) // 2
+
+        self.lanes = []
+        for i in range(int(df_lanes.shape[1] / 2)):
+            lane = df_lanes.iloc[:, i * 2:i * 2 + 2].values.astype(float)
+            lane = lane[~np.isnan(lane).any(axis=1)]
+            if len(lane) > 1:
+                self.lanes.append(lane)
+
+        proj_in = pyproj.Proj('EPSG:4326')
+        if open_drive_header is not None:
+            proj_out = get_proj_from_open_drive_header(open_drive_header)
+        else:
+            proj_out = get_proj_from_open_drive(open_drive_path=opendrive_path)
+        self.transformers = (get_transformer(proj_in, proj_out), get_transformer(proj_in, proj_out, always_xy=False))
+
+        self.frames = 0
+        self.movobj_grps_coord = None
+        self.vehicles = []
+        # First frames for the start conditions
+        self.head = []
+        self.start = None
+        self.finished = False
+
+    def push(self, frame: Union[dict, pd.Series]) -> list:
+        """
+        Args:
+            frame: Processed frame with lat, long, heading, speed and lat_i, lon_i, speed_i, class_i of the
+                objects. The objects are taken from the first frame.
+
+        Returns:
+            object (list): Segments which became final, (key, 'lon' or 'lat', row) with key 0 for ego and i + 1 for
+                object i and the row of the maneuver arrays of man_helpers.label_maneuvers
+        """
+        if self.finished:
+            raise RuntimeError('the stream is finished')
+        if self.movobj_grps_coord is None:
+            self.movobj_grps_coord = utils.find_vars('lat_|lon_|speed_|class', list(frame.keys()), reshape=True)
+            columns = [['lat', 'long', 'speed']] + [list(group[:3]) for group in self.movobj_grps_coord]
+            self.vehicles = [_VehicleStream(key, column, self.lanes, self.acc_threshold, self.frame_rate,
+                                            self.max_lane_change) for key, column in enumerate(columns)]
+        self.frames += 1
+
+        if self.start is None:
+            self.head.append(frame)
+            if len(self.head) == 3:
+                self._create_start()
+
+        segments = []
+        for vehicle in self.vehicles:
+            segments.extend(vehicle.push(frame, self.transformers))
+        return segments
+
+    def finish(self) -> list:
+        """
+        Ends the stream.
+
+        Returns:
+            object (list): Remaining segments
+        """
+        if self.finished:
+            return []
+        self.finished = True
+        if self.start is None and self.head:
+            self._create_start()
+        segments = []
+        for vehicle in self.vehicles:
+            segments.extend(vehicle.finish(self.transformers))
+        return segments
+
+    def result(self) -> tuple:
+        """
+        Returns:
+            object (tuple): ego_maneuver_array, inf_maneuver_array, objlist, objects, ego, movobj_grps_coord as
+                man_helpers.label_maneuvers
+        """
+        ego, objects, objlist = self.start
+        ego_maneuver_array = {vehicle.key: vehicle.maneuver_array for vehicle in self.vehicles}
+        inf_maneuver_array = {vehicle.key: vehicle.inf_maneuver_array for vehicle in self.vehicles}
+        return ego_maneuver_array, inf_maneuver_array, objlist, objects, ego, self.movobj_grps_coord
+
+    def _create_start(self):
+        """
+        Start position, speed and heading of ego and objects from the first frames, like
+        man_helpers.label_maneuvers. The object classes are the most frequent class of these frames.
+        """
+        transformer, _ = self.transformers
+        first = self.head[0]
+        later = self.head[min(2, len(self.head) - 1)]
+
+        lon, lat = transformer.transform(first['long'], first['lat'])
+        ego = [lon, lat, first['speed'] / 3.6, utils.convert_heading(first['heading'])]
+
+        objects = {}
+        objlist = []
+        # Same choice of the catalog vehicle as man_helpers.label_maneuvers
+        rng = np.random.RandomState(0)
+        for i, group in enumerate(self.movobj_grps_coord):
+            lon, lat = transformer.transform(first[group[1]], first[group[0]])
+            if self.ltp is not None:
+                heading = float(self.ltp.azimuth(first[group[0]], first[group[1]], later[group[0]], later[group[1]]))
+            else:
+                heading = utils.calc_heading_from_two_geo_positions(first[group[0]], first[group[1]],
+                                                                    later[group[0]], later[group[1]])
+            objects[i] = [lon, lat, first[group[2]] / 3.6, utils.convert_heading(heading)]
+
+            classes = pd.Series([frame[group[3]] for frame in self.head]).dropna()
+            object_class = int(classes.mode()[0]) if len(classes) else 0
+            objlist.append(OBJECT_CLASSES[object_class][rng.randint(0, len(OBJECT_CLASSES[object_class]))])
+
+        self.start = ego, objects, objlist
+        self.head = []
@@ -0,0 +1,177 @@
+#  ****************************************************************************
+#  @trajectory_cache.py
+#
+#  @copyright 2023 e:fs TechHub GmbH and Audi AG. All rights reserved.
+#
+#  @license Apache v2.0
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#  ****************************************************************************
+
+import os
+import json
+import shutil
+import tempfile
+from typing import Union
+
+import numpy as np
+import pandas as pd
+
+from osc_generator.tools import utils
+
+# Part of the key, changes of the processing or the entry layout invalidate old entries
+CACHE_FORMAT = 1
+
+META_NAME = 'meta.json'
+
+
+class TrajectoryCache:
+    """
+    Disk cache of processed trajectories, addressed by the content of the input file and the processing parameters.
+
+    An entry is a directory named by the key, with one .npy file per dataframe and a meta.json with the columns,
+    non-float dtypes and further values of the run. Dataframes are loaded memory-mapped (copy-on-write), so a hit
+    reads only the pages which are used. Entries are written to a temporary directory and renamed, so several
+    processes can share a cache directory. The least recently used entries are removed when the cache exceeds
+    max_size.
+    """
+
+    def __init__(self, cache_dir: str, max_size: int = 2 ** 30):
+        """
+        Args:
+            cache_dir: Directory of the cache, created if missing
+            max_size: Maximum size of all entries in bytes
+        """
+        if not isinstance(cache_dir, str):
+            raise TypeError("input must be a str")
+        if not isinstance(max_size, int):
+            raise TypeError("input must be a int")
+
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def key(self, trajectories_path: str, parameters: dict) -> str:
+        """
+        Args:
+            trajectories_path: Path to the trajectories file
+            parameters: Parameters which change the processed trajectories
+
+        Returns:
+            object (str): Key of the entry (SHA-256 hex digest)
+        """
+        parameters = dict(parameters, cache_format=CACHE_FORMAT,
+                          input_format=os.path.splitext(trajectories_path)[1].lower())
+        return utils.compute_content_hash([trajectories_path], parameters)
+
+    def load(self, key: str) -> Union[tuple, None]:
+        """
+        Args:
+            key: Key of the entry
+
+        Returns:
+            object (Union[tuple, None]): Dataframes by name and the meta values of the entry, None if not cached
+        """
+        entry_dir = os.path.join(self.cache_dir, key)
+        meta_path = os.path.join(entry_dir, META_NAME)
+        try:
+            with open(meta_path, 'r') as f:
+                meta = json.load(f)
+            frames = {}
+            for name, layout in meta['frames'].items():
+                values = np.load(os.path.join(entry_dir, name + '.npy'), mmap_mode='c')
+                df = pd.DataFrame(values, columns=layout['columns'], copy=False)
+                for column, dtype in layout['dtypes'].items():
+                    df[column] = df[column].astype(dtype)
+                frames[name] = df
+            # Last use for the eviction
+            os.utime(meta_path)
+        except (OSError, ValueError, KeyError):
+            # Missing, or removed by the eviction of another process
+            return None
+        return frames, meta['values']
+
+    def store(self, key: str, frames: dict, values: dict = None) -> str:
+        """
+        Adds an entry and removes the least recently used entries beyond max_size.
+
+        Args:
+            key: Key of the entry
+            frames: Numeric dataframes by name, the index is not stored
+            values: Further JSON values of the entry
+
+        Returns:
+            object (str): Directory of the entry
+        """
+        if not isinstance(frames, dict):
+            raise TypeError("input must be a dict")
+
+        entry_dir = os.path.join(self.cache_dir, key)
+        temp_dir = tempfile.mkdtemp(prefix='.tmp_', dir=self.cache_dir)
+        try:
+            meta = {'frames': {}, 'values': values or {}}
+            for name, df in frames.items():
+                np.save(os.path.join(temp_dir, name + '.npy'), df.to_numpy(dtype=np.float64))
+                meta['frames'][name] = {'columns': [str(column) for column in df.columns],
+                                        'dtypes': {str(column): str(dtype) for column, dtype in df.dtypes.items()
+                                                   if dtype != np.float64}}
+            with open(os.path.join(temp_dir, META_NAME), 'w') as f:
+                json.dump(meta, f)
+            try:
+                os.rename(temp_dir, entry_dir)
+            except OSError:
+                # Stored by another process in the meantime
+                shutil.rmtree(temp_dir, ignore_errors=True)
+        except BaseException:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+            raise
+
+        self.evict()
+        return entry_dir
+
+    def entries(self) -> list:
+        """
+        Returns:
+            object (list): (last use, size in bytes, key) of all entries, least recently used first
+        """
+        entries = []
+        for key in os.listdir(self.cache_dir):
+            entry_dir = os.path.join(self.cache_dir, key)
+            if key.startswith('.') or not os.path.isdir(entry_dir):
+                continue
+            try:
+                last_use = os.path.getmtime(os.path.join(entry_dir, META_NAME))
+                size = sum(os.path.getsize(os.path.join(entry_dir, name)) for name in os.listdir(entry_dir))
+            except OSError:
+                continue
+            entries.append((last_use, size, key))
+        return sorted(entries)
+
+    def evict(self):
+        """
+        Removes the least recently used entries until the cache fits max_size. The most recent entry is kept.
+        """
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, key in entries[:-1]:
+            if total <= self.max_size:
+                break
+            shutil.rmtree(os.path.join(self.cache_dir, key), ignore_errors=True)
+            total -= size
+
+    def clear(self):
+        """
+        Removes all entries.
+        """
+        for _, _, key in self.entries():
+            shutil.rmtree(os.path.join(self.cache_dir, key), ignore_errors=True)
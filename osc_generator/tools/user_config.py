@@ -21,33 +21,38 @@ class UserConfig:
         try:
             with open(os.path.join(self.path_to_config, 'user_config.json'), 'r') as config_file:
                 data = json.load(config_file)
+                self.load_config(data)
 
-                if "moving_objects" in data:
-                    objects = data["moving_objects"]
-                    object_bb = []
-                    object_bbcenter = []
-                    for bb in objects:
-                        if "boundingbox" in bb:
-                            object_bb.append(bb["boundingbox"])
-                        else:
-                            object_bb.append(None)
-                        if "bbcenter_to_rear" in bb:
-                            object_bbcenter.append(bb["bbcenter_to_rear"])
-                        else:
-                            object_bbcenter.append(None)
+        except FileNotFoundError:
+            warnings.warn("User configuration file unavailable. ", UserWarning)
 
-                    self.object_boundingbox = object_bb
-                    self.bbcenter_to_rear = object_bbcenter
+    def load_config(self, data: dict):
+        """
+        store relevant information of config data (content of the config file)
+        """
+        if "moving_objects" in data:
+            objects = data["moving_objects"]
+            object_bb = []
+            object_bbcenter = []
+            for bb in objects:
+                if "boundingbox" in bb:
+                    object_bb.append(bb["boundingbox"])
+                else:
+                    object_bb.append(None)
+                if "bbcenter_to_rear" in bb:
+                    object_bbcenter.append(bb["bbcenter_to_rear"])
+                else:
+                    object_bbcenter.append(None)
 
-                if "catalogs" in data:
-                    self.catalogs = data["catalogs"]
+            self.object_boundingbox = object_bb
+            self.bbcenter_to_rear = object_bbcenter
 
-        except FileNotFoundError:
-            warnings.warn("User configuration file unavailable. ", UserWarning)
+        if "catalogs" in data:
+            self.catalogs = data["catalogs"]
 
-    def write_config(self):
+    def get_config(self) -> dict:
         """
-        write config file from relevant information
+        config data (content of the config file) from relevant information
         """
         config_data = {}
         if self.object_boundingbox is not None and self.bbcenter_to_rear is not None:
@@ -56,6 +61,13 @@ class UserConfig:
                                              for i in range(len(self.object_boundingbox))]
         if self.catalogs is not None:
             config_data["catalogs"] = self.catalogs
+        return config_data
+
+    def write_config(self):
+        """
+        write config file from relevant information
+        """
+        config_data = self.get_config()
 
         if config_data:
             try:
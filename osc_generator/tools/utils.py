@@ -19,17 +19,29 @@
 #  ****************************************************************************
 
 import math
+import numbers
 import decimal
 import re
+import os
+import gzip
+import json
+import hashlib
+import tempfile
 import pandas as pd
 import numpy as np
 from geographiclib.geodesic import Geodesic
+from pyproj import Geod
 from typing import Union
+from osc_generator.version import __version__
+
+# Peak memory of reading and processing trajectories per byte of the dataframe (pandas parser buffers, copies),
+# measured with the memory profiling of metrics.MetricsRecorder
+MEMORY_FACTOR = 4
 
 
 def delete_irrelevant_objects(df: pd.DataFrame, movobj_grps: Union[list, np.ndarray],
                               min_nofcases: int = 8, max_posx_min: float = 120.0,
-                              max_posx_nofcases_ratio: float = 4.0) -> tuple:
+                              max_posx_nofcases_ratio: float = 4.0, frame_rate: float = 10.0) -> tuple:
     """
     Deletes not relevant objects from input data
 
@@ -40,11 +52,41 @@ def delete_irrelevant_objects(df: pd.DataFrame, movobj_grps: Union[list, np.ndar
         max_posx_min: Maximum of minimum distance to object (lower value means more dropping)
         max_posx_nofcases_ratio: Maximum of ratio between minimum distance and number of cases
             (lower value means more dropping)
+        frame_rate: Frames per second of df
 
     Returns:
         df: Dataframe containing only objects
         count: Number of removed objects
     """
+    irrelevant, count = find_irrelevant_objects(df, movobj_grps, min_nofcases=min_nofcases,
+                                                max_posx_min=max_posx_min,
+                                                max_posx_nofcases_ratio=max_posx_nofcases_ratio,
+                                                frame_rate=frame_rate)
+    # One drop, every drop copies the whole dataframe
+    if irrelevant:
+        df = df.drop(columns=flatten(irrelevant))
+    return df, count
+
+
+def find_irrelevant_objects(df: pd.DataFrame, movobj_grps: Union[list, np.ndarray],
+                            min_nofcases: int = 8, max_posx_min: float = 120.0,
+                            max_posx_nofcases_ratio: float = 4.0, frame_rate: float = 10.0) -> tuple:
+    """
+    Finds the not relevant objects of the input data (see delete_irrelevant_objects), without copying it.
+
+    Args:
+        df: Input dataframe
+        movobj_grps: Detected objects
+        min_nofcases: Minimum number of cases (higher value means more dropping)
+        max_posx_min: Maximum of minimum distance to object (lower value means more dropping)
+        max_posx_nofcases_ratio: Maximum of ratio between minimum distance and number of cases
+            (lower value means more dropping)
+        frame_rate: Frames per second of df
+
+    Returns:
+        irrelevant: Column groups of the not relevant objects
+        count: Number of removed objects
+    """
     if not isinstance(df, pd.DataFrame):
         raise TypeError("input must be a Dataframe")
     if not (isinstance(movobj_grps, np.ndarray) or isinstance(movobj_grps, list)):
@@ -57,14 +99,17 @@ def delete_irrelevant_objects(df: pd.DataFrame, movobj_grps: Union[list, np.ndar
     if not isinstance(max_posx_nofcases_ratio, float):
         print(max_posx_nofcases_ratio)
         raise TypeError("input must be a float")
+    if not isinstance(frame_rate, float):
+        raise TypeError("input must be a float")
 
     end = len(df) - 1
     count = 0
+    irrelevant = []
     for p in movobj_grps:
         posx_min = df[p[0]].min()
         nofcases = sum(~pd.isna(df[p[0]]))
         if nofcases < min_nofcases or posx_min > max_posx_min or posx_min / nofcases > max_posx_nofcases_ratio:
-            df = df.drop(columns=p)
+            irrelevant.append(list(p))
             # count += 1
         else:
             start = True
@@ -78,17 +123,156 @@ def delete_irrelevant_objects(df: pd.DataFrame, movobj_grps: Union[list, np.ndar
                     last_one = i - 1
                     break
             variance = sum((df.loc[first_one:last_one, "speed"] - df.loc[first_one:last_one, p[2]]) ** 2)
-            if variance < 50 and nofcases < 50:
-                df = df.drop(columns=p)
+            if variance < 50 and nofcases < 5 * frame_rate:
+                irrelevant.append(list(p))
                 count += 1
             else:
                 for i in range(first_one, last_one):
-                    acceleration = (abs(df.loc[i + 1, p[2]] - df.loc[i, p[2]]) / 3.6) * 10
+                    acceleration = (abs(df.loc[i + 1, p[2]] - df.loc[i, p[2]]) / 3.6) * frame_rate
                     if acceleration > 250:
-                        df = df.drop(columns=p)
+                        irrelevant.append(list(p))
                         count += 1
                         break
-    return df, count
+    return irrelevant, count
+
+
+def estimate_csv_memory(path: str) -> int:
+    """
+    Estimates the memory of a numeric csv file as dataframe from its number of lines and columns,
+    without parsing the values.
+
+    Args:
+        path: Path to csv file
+
+    Returns:
+        object (int): Estimated memory in bytes (8 bytes per value)
+    """
+    if not isinstance(path, str):
+        raise TypeError("input must be a str")
+
+    lines = 0
+    last_block = b''
+    with open(path, 'rb') as f:
+        columns = len(f.readline().split(b','))
+        for block in iter(lambda: f.read(1 << 20), b''):
+            lines += block.count(b'\n')
+            last_block = block
+    if last_block and not last_block.endswith(b'\n'):
+        # Last row without line break
+        lines += 1
+    return lines * columns * 8
+
+
+def spill_array(shape: tuple, spill_dir: str = None) -> np.ndarray:
+    """
+    Float array backed by an anonymous temporary file instead of RAM. The operating system keeps the recently used
+    pages in memory and writes the others back to disk. The file is deleted when the array is released.
+
+    Args:
+        shape: Shape of the array
+        spill_dir: Directory of the temporary file. If None, the system temp directory is used.
+
+    Returns:
+        object (np.ndarray): Zero-initialized array (np.memmap)
+    """
+    if not isinstance(shape, tuple):
+        raise TypeError("input must be a tuple")
+
+    f = tempfile.TemporaryFile(prefix='osc_generator_', dir=spill_dir)
+    if int(np.prod(shape)) == 0:
+        f.close()
+        return np.zeros(shape)
+    array = np.memmap(f, dtype=np.float64, mode='w+', shape=shape)
+    # The mapping stays valid after the file is closed
+    f.close()
+    return array
+
+
+def read_csv_spilled(path: str, spill_dir: str = None, max_chunk_memory: int = 64 * 2 ** 20) -> pd.DataFrame:
+    """
+    Reads a numeric csv file chunk by chunk into a dataframe backed by a temporary file (see spill_array). The memory
+    needed while reading is bounded by the chunk size instead of a multiple of the file size.
+
+    Args:
+        path: Path to csv file
+        spill_dir: Directory of the temporary file
+        max_chunk_memory: Memory in bytes for parsing one chunk
+
+    Returns:
+        object (pd.DataFrame): Dataframe with float values
+    """
+    if not isinstance(path, str):
+        raise TypeError("input must be a str")
+    if not isinstance(max_chunk_memory, int):
+        raise TypeError("input must be a int")
+
+    columns = pd.read_csv(path, nrows=0).columns
+    rows = estimate_csv_memory(path) // (8 * len(columns))
+    chunk_rows = max(100, max_chunk_memory // (MEMORY_FACTOR * 8 * len(columns)))
+    values = spill_array((rows, len(columns)), spill_dir)
+    row = 0
+    for chunk in pd.read_csv(path, chunksize=chunk_rows):
+        values[row:row + len(chunk)] = chunk.to_numpy(dtype=np.float64)
+        row += len(chunk)
+    # Without copy, the dataframe keeps the file backed values
+    return pd.DataFrame(values[:row], columns=columns, copy=False)
+
+
+def resample_trajectories(df: pd.DataFrame, frame_rate: float) -> pd.DataFrame:
+    """
+    Resamples trajectories with arbitrary or jittered timestamps to a constant frame rate.
+    Continuous signals are linearly interpolated, headings are interpolated on the unit circle and
+    class/type columns take the value of the nearest sample. Target frames next to a missing sample stay missing.
+
+    Args:
+        df: Input dataframe with a 'timestamp' column in seconds
+        frame_rate: Target frames per second
+
+    Returns:
+        object (pd.DataFrame): Resampled dataframe, timestamps start at the first input timestamp
+    """
+    if not isinstance(df, pd.DataFrame):
+        raise TypeError("input must be a pd.DataFrame")
+    if not isinstance(frame_rate, float):
+        raise TypeError("input must be a float")
+    if frame_rate <= 0:
+        raise ValueError("frame rate must be positive")
+
+    df = df.dropna(subset=['timestamp']).sort_values('timestamp').drop_duplicates(subset='timestamp')
+    time = df['timestamp'].values.astype(float)
+    number_of_frames = int(math.floor((time[-1] - time[0]) * frame_rate + 1e-6)) + 1
+    target_time = time[0] + np.arange(number_of_frames) / frame_rate
+
+    # Index of the nearest input sample for every target frame
+    upper = np.clip(np.searchsorted(time, target_time), 0, len(time) - 1)
+    lower = np.clip(upper - 1, 0, len(time) - 1)
+    nearest = np.where(np.abs(time[lower] - target_time) <= np.abs(time[upper] - target_time), lower, upper)
+
+    columns = {'timestamp': target_time}
+    for col in df.columns:
+        if col == 'timestamp':
+            continue
+        values = df[col].values
+        if re.search('class|typ', col) or not np.issubdtype(values.dtype, np.number):
+            columns[col] = values[nearest]
+            continue
+
+        values = values.astype(float)
+        valid = ~np.isnan(values)
+        if not valid.any():
+            columns[col] = np.full(number_of_frames, np.nan)
+            continue
+        if col == 'heading':
+            unwrapped = np.degrees(np.unwrap(np.radians(values[valid])))
+            resampled = np.interp(target_time, time[valid], unwrapped)
+            resampled = np.mod(resampled, 360.0) if np.nanmin(values) >= 0 else np.mod(resampled + 180.0, 360.0) - 180.0
+        else:
+            resampled = np.interp(target_time, time[valid], values[valid])
+        # Interpolated validity is 1 only if both neighbouring samples are valid
+        resampled[np.interp(target_time, time, valid.astype(float)) < 1.0 - 1e-9] = np.nan
+        columns[col] = resampled
+
+    return pd.DataFrame(columns, columns=list(df.columns))
 
 
 def calc_new_geopos_from_2d_vector_on_spheric_earth(curr_coords: pd.Series, heading: float, dist_x: float, dist_y: float) -> list:
@@ -240,3 +424,190 @@ def calc_heading_from_two_geo_positions(lat1: float, lon1: float, lat2: float, l
 
     brng = Geodesic.WGS84.Inverse(lat1, lon1, lat2, lon2)['azi1']
     return brng
+
+
+def convert_headings(degrees: np.ndarray) -> np.ndarray:
+    """
+    Vectorised version of convert_heading
+
+    Args:
+        degrees: Headings starting north increasing clockwise
+
+    Returns:
+        object (np.ndarray): Heading angles in rad starting east increasing anti-clockwise
+    """
+    if not isinstance(degrees, np.ndarray):
+        raise TypeError("input must be a np.ndarray")
+
+    float_degrees = degrees.astype(float)
+    return np.radians(np.where(float_degrees == 0, 0.0, 360 - float_degrees) + 90)
+
+
+def calc_headings_from_geo_positions(lat: np.ndarray, lon: np.ndarray, step: int = 1) -> np.ndarray:
+    """
+    Get the headings of vehicles for all frames with a single vectorised geodesic inverse (WGS84).
+    The heading of frame i is the azimuth from frame i to frame i + step. The last step frames repeat
+    the last available heading. Frames with missing positions result in NaN.
+
+    Args:
+        lat: Latitudes, shape (frames,) or (frames, objects)
+        lon: Longitudes, same shape as lat
+        step: Frame offset of the second position
+
+    Returns:
+        object (np.ndarray): Headings in degree starting north increasing clockwise, same shape as lat
+    """
+    if not isinstance(lat, np.ndarray):
+        raise TypeError("input must be a np.ndarray")
+    if not isinstance(lon, np.ndarray):
+        raise TypeError("input must be a np.ndarray")
+    if not isinstance(step, int):
+        raise TypeError("input must be a int")
+    if lat.shape != lon.shape:
+        raise ValueError("lat and lon must have the same shape")
+    if step < 1:
+        raise ValueError("step must be positive")
+
+    lat = lat.astype(float)
+    lon = lon.astype(float)
+    headings = np.full(lat.shape, np.nan)
+    if lat.shape[0] <= step:
+        return headings
+
+    azi, _, _ = Geod(ellps='WGS84').inv(lon[:-step].ravel(), lat[:-step].ravel(),
+                                        lon[step:].ravel(), lat[step:].ravel())
+    headings[:-step] = np.asarray(azi).reshape(lat[:-step].shape)
+    headings[-step:] = headings[-step - 1]
+    return headings
+
+
+def simplify_trajectory(time: np.ndarray, x: np.ndarray, y: np.ndarray, tolerance: float) -> np.ndarray:
+    """
+    Ramer-Douglas-Peucker simplification of a timed polyline.
+    The distance of a sample is measured to the position interpolated at its timestamp on the simplified segment
+    (synchronized euclidean distance), so the kept vertices reproduce position and timing within tolerance.
+    The distances of a segment are computed in one vectorised step.
+
+    Args:
+        time: Strictly increasing timestamps
+        x: x coordinates
+        y: y coordinates
+        tolerance: Maximum position deviation
+
+    Returns:
+        object (np.ndarray): Sorted indices of the kept vertices, always including first and last sample
+    """
+    if not isinstance(time, np.ndarray):
+        raise TypeError("input must be a np.ndarray")
+    if not isinstance(x, np.ndarray):
+        raise TypeError("input must be a np.ndarray")
+    if not isinstance(y, np.ndarray):
+        raise TypeError("input must be a np.ndarray")
+    if not isinstance(tolerance, float):
+        raise TypeError("input must be a float")
+    if not (time.shape == x.shape == y.shape):
+        raise ValueError("time, x and y must have the same shape")
+
+    number_of_samples = len(time)
+    if number_of_samples <= 2:
+        return np.arange(number_of_samples)
+
+    keep = np.zeros(number_of_samples, dtype=bool)
+    keep[[0, -1]] = True
+    segments = [(0, number_of_samples - 1)]
+    while segments:
+        first, last = segments.pop()
+        if last - first < 2:
+            continue
+        ratio = (time[first + 1:last] - time[first]) / (time[last] - time[first])
+        dx = x[first + 1:last] - (x[first] + ratio * (x[last] - x[first]))
+        dy = y[first + 1:last] - (y[first] + ratio * (y[last] - y[first]))
+        distance = np.hypot(dx, dy)
+        farthest = int(np.argmax(distance))
+        if distance[farthest] > tolerance:
+            split = first + 1 + farthest
+            keep[split] = True
+            segments.append((first, split))
+            segments.append((split, last))
+
+    return np.flatnonzero(keep)
+
+
+def format_float(value) -> str:
+    """
+    Canonical text of a number: shortest representation that round-trips the double value, without negative zero.
+
+    Args:
+        value (int, float, str or np.floating): Number
+
+    Returns:
+        object (str): Formatted number
+    """
+    value = float(value)
+    if value == 0:
+        return '0.0'
+    return repr(value)
+
+
+def compute_content_hash(paths: list, parameters: dict) -> str:
+    """
+    Identifies the output generated from the input files and parameters by this generator version.
+
+    Args:
+        paths: Input files, e.g. trajectories, OpenDRIVE and user configuration
+        parameters: Parameters of the generation, numbers are formatted canonically
+
+    Returns:
+        object (str): SHA-256 hex digest
+    """
+    if not isinstance(paths, list):
+        raise TypeError("input must be a list")
+    if not isinstance(parameters, dict):
+        raise TypeError("input must be a dict")
+
+    sha = hashlib.sha256(('osc_generator ' + __version__).encode('utf-8'))
+    for path in paths:
+        sha.update(b'\0')
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                sha.update(chunk)
+    canonical = {key: format_float(value) if isinstance(value, numbers.Real) and not isinstance(value, bool) else value
+                 for key, value in parameters.items()}
+    sha.update(b'\0' + json.dumps(canonical, sort_keys=True).encode('utf-8'))
+
+    return sha.hexdigest()
+
+
+def content_hash_comment(content_hash: str) -> str:
+    """
+    Args:
+        content_hash: Hex digest of compute_content_hash
+
+    Returns:
+        object (str): XML comment which carries the hash
+    """
+    return '<!-- osc_generator content sha256:' + content_hash + ' -->'
+
+
+def read_content_hash(path: str) -> Union[str, None]:
+    """
+    Reads the content hash from the head of a scenario (.xosc or .xosc.gz).
+
+    Args:
+        path: Path to scenario file
+
+    Returns:
+        object (str, None): Hex digest or None, if the file does not exist or has no hash
+    """
+    if not isinstance(path, str):
+        raise TypeError("input must be a str")
+    if not os.path.isfile(path):
+        return None
+
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt', encoding='utf-8') as f:
+        for _ in range(2):
+            match = re.match(r'<!-- osc_generator content sha256:([0-9a-f]{64}) -->', f.readline())
+            if match:
+                return match.group(1)
+    return None
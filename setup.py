@@ -65,7 +65,7 @@ setup(name='osc_generator',
           "Source Code": "https://github.com/EFS-OpenSource/OSC-Generator"},
       author='Axel Aigner et al.',
       author_email='axel.aigner@efs-techhub.com',
-      packages=find_packages(exclude=('tests',)),
+      packages=find_packages(exclude=('tests', 'tests.*', 'benchmarks')),
       classifiers=[_f for _f in CLASSIFIERS.split('\n') if _f],
       python_requires='>=3.7',
       entry_points={'console_scripts': ['osc_generator=osc_generator.osc_generator:main']},
@@ -0,0 +1,122 @@
+#  ****************************************************************************
+#  @test_async_generator.py
+#
+#  @copyright 2023 e:fs TechHub GmbH and Audi AG. All rights reserved.
+#
+#  @license Apache v2.0
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#  ****************************************************************************
+
+from osc_generator.async_generator import AsyncOSCGenerator
+from concurrent.futures import ThreadPoolExecutor
+from xmldiff import main
+import asyncio
+import pytest
+import shutil
+import os
+import warnings
+
+
+@pytest.fixture
+def test_data_dir():
+    return os.path.join(os.path.dirname(__file__), '../test_data')
+
+
+@pytest.fixture
+def async_dir(test_data_dir, tmp_path):
+    for file_name in ['testfile_llc.csv', 'testfile_straight.csv', 'TestTrack.xodr']:
+        shutil.copyfile(os.path.join(test_data_dir, file_name), str(tmp_path / file_name))
+    return tmp_path
+
+
+class TestAsyncGenerator:
+    @pytest.mark.parametrize('use_threads', [True, False])
+    def test_generate(self, test_data_dir, async_dir, use_threads):
+        executor = ThreadPoolExecutor(max_workers=2) if use_threads else None
+        opendrive_path = str(async_dir / 'TestTrack.xodr')
+
+        async def generate_all():
+            async with AsyncOSCGenerator(executor, max_concurrency=2) as generator:
+                return await asyncio.gather(
+                    generator.generate(str(async_dir / 'testfile_straight.csv'), opendrive_path,
+                                       str(async_dir / 'straight.xosc'), osc_version='1.2'),
+                    generator.generate(str(async_dir / 'testfile_llc.csv'), opendrive_path, osc_version='1.2'))
+
+        actual = asyncio.run(generate_all())
+        assert actual == [str(async_dir / 'straight.xosc'),
+                          str(async_dir / 'man_export_testfile_llc.csv_time_lon_pos_lat_2.0_m.xosc')]
+        assert [] == main.diff_files(actual[0], os.path.join(test_data_dir, 'expected_straight.xosc'))
+        assert os.path.isfile(actual[1])
+        if executor is not None:
+            executor.shutdown()
+
+    def test_generate_osi(self, test_data_dir, tmp_path):
+        opendrive_path = os.path.join(test_data_dir, 'TestTrack.xodr')
+
+        async def generate(trajectories_path):
+            async with AsyncOSCGenerator(ThreadPoolExecutor(max_workers=1)) as generator:
+                return await generator.generate(trajectories_path, opendrive_path, str(tmp_path / 'straight.xosc'),
+                                                osc_version='1.2')
+
+        with pytest.raises(ValueError):
+            asyncio.run(generate(os.path.join(test_data_dir, 'testfile_straight.txt')))
+        try:
+            actual = asyncio.run(generate(os.path.join(test_data_dir, 'testfile_straight.osi')))
+            assert [] == main.diff_files(actual, os.path.join(test_data_dir, 'expected_straight.xosc'))
+        except NameError:
+            warnings.warn("Feature OSI Input Data is not available. Download from: "
+                          "https://github.com/OpenSimulationInterface/open-simulation-interface", UserWarning)
+
+    def test_generate_from_memory(self, test_data_dir):
+        with open(os.path.join(test_data_dir, 'testfile_straight.csv'), 'rb') as f:
+            trajectories = f.read()
+        with open(os.path.join(test_data_dir, 'TestTrack.xodr'), 'rb') as f:
+            opendrive = f.read()
+
+        async def generate():
+            async with AsyncOSCGenerator(ThreadPoolExecutor(max_workers=1)) as generator:
+                with pytest.raises(ValueError):
+                    await generator.generate_from_memory(trajectories, opendrive, skip_unchanged=True)
+                scenario = await generator.generate_from_memory(trajectories, opendrive,
+                                                                opendrive_name='TestTrack.xodr', osc_version='1.2')
+                # Same worker thread, the version of the previous call does not carry over
+                return scenario, await generator.generate_from_memory(trajectories, opendrive,
+                                                                      opendrive_name='TestTrack.xodr')
+
+        actual, default_version = asyncio.run(generate())
+        with open(os.path.join(test_data_dir, 'expected_straight.xosc'), 'rb') as f:
+            assert [] == main.diff_texts(actual.encode('utf-8'), f.read())
+        assert 'revMinor="2"' in actual
+        assert 'revMinor="0"' in default_version
+
+    def test_generate_cancelled(self, async_dir):
+        executor = ThreadPoolExecutor(max_workers=1)
+        output_paths = [str(async_dir / 'first.xosc'), str(async_dir / 'second.xosc')]
+
+        async def generate():
+            generator = AsyncOSCGenerator(executor, max_concurrency=1)
+            tasks = [asyncio.ensure_future(generator.generate(str(async_dir / 'testfile_llc.csv'),
+                                                              str(async_dir / 'TestTrack.xodr'), path))
+                     for path in output_paths]
+            await asyncio.sleep(0)
+            # The second generation waits for the first one
+            tasks[1].cancel()
+            await tasks[0]
+            with pytest.raises(asyncio.CancelledError):
+                await tasks[1]
+
+        asyncio.run(generate())
+        executor.shutdown()
+        assert os.path.isfile(output_paths[0])
+        assert not os.path.exists(output_paths[1])
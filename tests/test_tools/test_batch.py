@@ -0,0 +1,125 @@
+#  ****************************************************************************
+#  @test_batch.py
+#
+#  @copyright 2023 e:fs TechHub GmbH and Audi AG. All rights reserved.
+#
+#  @license Apache v2.0
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#  ****************************************************************************
+
+from osc_generator import batch
+from xmldiff import main
+from xml.etree import ElementTree
+import pytest
+import shutil
+import json
+import os
+
+
+@pytest.fixture
+def test_data_dir():
+    return os.path.join(os.path.dirname(__file__), '../test_data')
+
+
+@pytest.fixture
+def batch_dir(test_data_dir, tmp_path):
+    for file_name in ['testfile_llc.csv', 'testfile_straight.csv', 'TestTrack.xodr']:
+        shutil.copyfile(os.path.join(test_data_dir, file_name), str(tmp_path / file_name))
+    return tmp_path
+
+
+class TestBatch:
+    def test_collect_jobs(self, batch_dir):
+        jobs = batch.collect_jobs(str(batch_dir), str(batch_dir / 'TestTrack.xodr'), str(batch_dir / 'out'))
+        assert [os.path.basename(job['trajectories']) for job in jobs] == ['testfile_llc.csv',
+                                                                          'testfile_straight.csv']
+        assert jobs[1]['output'] == str(batch_dir / 'out' / 'testfile_straight.xosc')
+        assert jobs == batch.collect_jobs(str(batch_dir / '*.csv'), str(batch_dir / 'TestTrack.xodr'),
+                                          str(batch_dir / 'out'))
+
+        with open(str(batch_dir / 'manifest.csv'), 'w') as f:
+            f.write('trajectories,opendrive,output\ntestfile_llc.csv,TestTrack.xodr,\n')
+        jobs = batch.collect_jobs(str(batch_dir / 'manifest.csv'))
+        assert jobs == [{'trajectories': str(batch_dir / 'testfile_llc.csv'),
+                         'opendrive': str(batch_dir / 'TestTrack.xodr'), 'output': None}]
+
+        with pytest.raises(ValueError):
+            batch.collect_jobs(str(batch_dir))
+
+    @pytest.mark.parametrize('max_workers', [1, 2])
+    def test_run_batch(self, test_data_dir, batch_dir, max_workers):
+        manifest = [{'trajectories': 'testfile_straight.csv', 'opendrive': 'TestTrack.xodr',
+                     'output': 'straight.xosc'},
+                    {'trajectories': 'testfile_llc.csv', 'opendrive': 'TestTrack.xodr', 'output': 'llc.xosc'},
+                    {'trajectories': 'missing.csv', 'opendrive': 'TestTrack.xodr', 'output': 'missing.xosc'}]
+        manifest_path = str(batch_dir / 'manifest.json')
+        with open(manifest_path, 'w') as f:
+            json.dump(manifest, f)
+        journal_path = str(batch_dir / 'journal.jsonl')
+        jobs = batch.collect_jobs(manifest_path)
+
+        summary = batch.run_batch(jobs, journal_path, max_workers, osc_version='1.2')
+        assert (summary['done'], summary['failed'], summary['skipped']) == (2, 1, 0)
+        assert summary['throughput'] > 0
+        assert [] == main.diff_files(str(batch_dir / 'straight.xosc'),
+                                     os.path.join(test_data_dir, 'expected_straight.xosc'))
+        journal = batch.read_journal(journal_path)
+        assert journal[batch.job_key(jobs[2], {'osc_version': '1.2'})]['status'] == 'failed'
+
+        # Resumed, only the failed job is retried
+        os.remove(str(batch_dir / 'straight.xosc'))
+        summary = batch.run_batch(jobs, journal_path, max_workers, osc_version='1.2')
+        assert (summary['done'], summary['failed'], summary['skipped']) == (0, 1, 2)
+        assert not os.path.exists(str(batch_dir / 'straight.xosc'))
+
+        # Other scenario options are other jobs
+        summary = batch.run_batch(jobs, journal_path, max_workers, osc_version='1.1')
+        assert (summary['done'], summary['failed'], summary['skipped']) == (2, 1, 0)
+        assert os.path.exists(str(batch_dir / 'straight.xosc'))
+
+    def test_run_batch_default_output(self, batch_dir):
+        # Each job without output gets its own scenario, not the output of the previous job
+        jobs = batch.collect_jobs(str(batch_dir), str(batch_dir / 'TestTrack.xodr'))
+        assert all(job['output'] is None for job in jobs)
+
+        summary = batch.run_batch(jobs, str(batch_dir / 'journal.jsonl'))
+        assert (summary['done'], summary['failed'], summary['skipped']) == (2, 0, 0)
+        outputs = [entry['output'] for entry in batch.read_journal(str(batch_dir / 'journal.jsonl')).values()]
+        assert len(set(outputs)) == 2
+        for job, output in zip(jobs, sorted(outputs)):
+            assert os.path.dirname(output).startswith(os.path.dirname(job['trajectories']))
+            assert os.path.isfile(output)
+
+    @pytest.mark.parametrize('max_workers', [1, 2])
+    def test_run_batch_vehicle_catalog(self, batch_dir, max_workers):
+        jobs = batch.collect_jobs(str(batch_dir), str(batch_dir / 'TestTrack.xodr'), str(batch_dir / 'out'))
+        os.makedirs(str(batch_dir / 'out'))
+        journal_path = str(batch_dir / 'journal.jsonl')
+        summary = batch.run_batch(jobs, journal_path, max_workers, osc_version='1.2', vehicle_catalog=True)
+        assert (summary['done'], summary['failed'], summary['skipped']) == (2, 0, 0)
+
+        catalog_path = str(batch_dir / 'out' / 'Catalogs' / 'Vehicles' / 'VehicleCatalog.xosc')
+        entries = {vehicle.get('name') for vehicle in ElementTree.parse(catalog_path).getroot().iter('Vehicle')}
+        references = set()
+        for job in jobs:
+            entities = ElementTree.parse(job['output']).getroot().find('Entities')
+            assert not list(entities.iter('Vehicle'))
+            references.update(reference.get('entryName') for reference in entities.iter('CatalogReference'))
+        assert references == entries
+
+        # Resumed, the catalog still holds the vehicles of the jobs done before
+        os.remove(catalog_path)
+        summary = batch.run_batch(jobs, journal_path, max_workers, osc_version='1.2', vehicle_catalog=True)
+        assert summary['skipped'] == 2
+        assert entries == {vehicle.get('name') for vehicle in ElementTree.parse(catalog_path).getroot().iter('Vehicle')}
@@ -0,0 +1,59 @@
+#  ****************************************************************************
+#  @test_benchmarks.py
+#
+#  @copyright 2023 e:fs TechHub GmbH and Audi AG. All rights reserved.
+#
+#  @license Apache v2.0
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#  ****************************************************************************
+
+from benchmarks.synthetic import generate_recording, write_csv, EGO_COLUMNS, OBJECT_COLUMNS
+from benchmarks.run import compare
+from osc_generator.tools.converter import Converter
+import pandas as pd
+import pytest
+import shutil
+import os
+
+
+@pytest.fixture
+def test_data_dir():
+    return os.path.join(os.path.dirname(__file__), '../test_data')
+
+
+class TestBenchmarks:
+    def test_generate_recording(self, test_data_dir, tmp_path):
+        df = generate_recording(30.0, 3, 4.0, seed=1)
+        assert len(df) == 300
+        assert list(df.columns) == EGO_COLUMNS + [name + str(i) for i in range(1, 4) for name in OBJECT_COLUMNS]
+        pd.testing.assert_frame_equal(df, generate_recording(30.0, 3, 4.0, seed=1))
+
+        trajectories_path = write_csv(df, str(tmp_path / 'synthetic.csv'))
+        shutil.copyfile(os.path.join(test_data_dir, 'TestTrack.xodr'), str(tmp_path / 'TestTrack.xodr'))
+        converter = Converter()
+        converter.set_paths(trajectories_path, str(tmp_path / 'TestTrack.xodr'), str(tmp_path / 'synthetic.xosc'))
+        converter.process_trajectories(relative=True)
+        converter.label_maneuvers(acc_threshold=0.2, optimize_acc=False, generate_kml=False)
+        converter.write_scenario(output='xosc')
+
+        assert os.path.isfile(str(tmp_path / 'synthetic.xosc'))
+        # No object is filtered and the lane changes are labeled
+        assert len(converter.objects) == 3
+        assert sum(len(array) for array in converter.inf_maneuver_array.values()) > 0
+
+    def test_compare(self):
+        baselines = {'small': {'times': {'read': 1.0, 'generate_osc': 2.0}}}
+        results = {'small': {'times': {'read': 1.2, 'generate_osc': 4.0}},
+                   'large': {'times': {'read': 100.0}}}
+        assert compare(results, baselines, tolerance=1.5) == [('small', 'generate_osc', 4.0, 2.0)]
@@ -22,6 +22,8 @@ from osc_generator.tools.converter import Converter
 from xmldiff import main
 import pytest
 import pandas as pd
+import numpy as np
+import shutil
 import os
 import warnings
 
@@ -54,6 +56,76 @@ class TestConverter:
         diff = main.diff_files(output_scenario_path, expected_scenario_path)
         assert [] == diff
 
+    def test_converter_csv_relative_ego_llc_spilled(self, test_data_dir):  # left lane change, memory budget
+        trajectories_path = os.path.join(test_data_dir, r'testfile_llc.csv')
+        opendrive_path = os.path.join(test_data_dir, r'TestTrack.xodr')
+        output_scenario_path = os.path.join(test_data_dir, r'output_scenario.xosc')
+        expected_scenario_path = os.path.join(test_data_dir, r'expected_llc.xosc')
+        system_under_test = Converter()
+        system_under_test.osc_version = '1.2'
+        system_under_test.max_memory = 2 ** 16
+        system_under_test.set_paths(trajectories_path, opendrive_path, output_scenario_path)
+        system_under_test.process_trajectories(relative=True)
+        assert system_under_test.spilled
+        system_under_test.label_maneuvers(acc_threshold=0.2, optimize_acc=False, generate_kml=False)
+        system_under_test.write_scenario(plot=False,
+                                 radius_pos_trigger=2.0,
+                                 timebased_lon=True,
+                                 timebased_lat=True,
+                                 output='xosc')
+        diff = main.diff_files(output_scenario_path, expected_scenario_path)
+        assert [] == diff
+
+    def test_converter_csv_relative_ego_llc_streaming(self, test_data_dir, tmp_path):  # left lane change, streaming
+        trajectories_path = os.path.join(test_data_dir, r'testfile_llc.csv')
+        opendrive_path = os.path.join(test_data_dir, r'TestTrack.xodr')
+        output_scenario_path = str(tmp_path / 'output_scenario_streaming.xosc')
+        expected_scenario_path = os.path.join(test_data_dir, r'expected_llc.xosc')
+        system_under_test = Converter()
+        system_under_test.osc_version = '1.2'
+        system_under_test.set_paths(trajectories_path, opendrive_path, output_scenario_path)
+        system_under_test.process_trajectories(relative=True)
+        system_under_test.label_maneuvers(acc_threshold=0.2, optimize_acc=False, generate_kml=False)
+        system_under_test.write_scenario(plot=False,
+                                 radius_pos_trigger=2.0,
+                                 timebased_lon=True,
+                                 timebased_lat=True,
+                                 output='xosc',
+                                 streaming=True)
+        diff = main.diff_files(output_scenario_path, expected_scenario_path)
+        assert [] == diff
+
+    def test_converter_sweep(self, test_data_dir, tmp_path):  # left lane change, parameter sweep
+        for file_name in ['testfile_llc.csv', 'TestTrack.xodr']:
+            shutil.copyfile(os.path.join(test_data_dir, file_name), str(tmp_path / file_name))
+        system_under_test = Converter()
+        system_under_test.osc_version = '1.2'
+        system_under_test.set_paths(str(tmp_path / 'testfile_llc.csv'), str(tmp_path / 'TestTrack.xodr'))
+        system_under_test.process_trajectories(relative=True)
+        report = system_under_test.sweep({'acc_threshold': [0.2, 0.3],
+                                          'radius_pos_trigger': [2.0, 3.0],
+                                          'timebased_lat': [True, False]}, max_workers=2)
+
+        assert len(report) == 8
+        for path in report['path']:
+            assert os.path.isfile(path)
+        # Time based variants do not depend on the radius
+        assert report['path'].nunique() == 6
+        assert (report['rmse_ego'] >= 0.0).all() and np.isfinite(report['rmse_mean']).all()
+
+        # Same scenario as a single run
+        row = report[(report['acc_threshold'] == 0.2) & report['timebased_lat']].iloc[0]
+        diff = main.diff_files(row['path'], os.path.join(test_data_dir, r'expected_llc.xosc'))
+        assert [] == diff
+
+        # Lane changes of ego are labeled once, the speed once per threshold
+        stages = [record['stage'] for record in system_under_test.metrics.records]
+        assert stages.count('lateral_labeling') == 1
+        assert stages.count('longitudinal_labeling') == 2
+
+        with pytest.raises(ValueError):
+            system_under_test.sweep({'acc_thresholds': [0.2]})
+
     def test_converter_osi_relative_ego_llc(self, test_data_dir):  # left lane change scenario, from osi file
         trajectories_path = os.path.join(test_data_dir, r'testfile_llc.osi')
         opendrive_path = os.path.join(test_data_dir, r'TestTrack.xodr')
@@ -72,6 +144,9 @@ class TestConverter:
                                      output='xosc')
             diff = main.diff_files(output_scenario_path, expected_scenario_path)
             assert [] == diff
+            # The bounding boxes are kept in memory, not in the user configuration of the directory
+            assert system_under_test.user_config.object_boundingbox is not None
+            assert not os.path.exists(os.path.join(test_data_dir, 'user_config.json'))
         except NameError:
             warnings.warn(
                 "Feature OSI Input Data is not available. Download from: "
@@ -19,6 +19,11 @@
 #  ****************************************************************************
 
 import pandas as pd
+import numpy as np
+import io
+from pyproj import Geod
+import pyproj
+import shutil
 from osc_generator.tools import coord_calculations
 import pytest
 import os
@@ -55,3 +60,73 @@ class TestCoordCalculations:
         actual = coord_calculations.get_proj_from_open_drive(open_drive_path=odr_path)
         expected = '+proj=tmerc +lat_0=0 +lon_0=9 +k=0.9996 +x_0=-177308 +y_0=-5425923 +datum=WGS84 +units=m +no_defs'
         assert actual.srs == expected
+
+    def test_parse_open_drive_header_multiline(self):
+        open_drive = io.BytesIO(b'<?xml version="1.0" encoding="utf-8"?>\n'
+                                b'<OpenDRIVE xmlns="http://www.opendrive.org">\n'
+                                b'  <header revMajor="1" revMinor="6">\n'
+                                b'    <geoReference><![CDATA[+proj=tmerc +lat_0=0 +lon_0=9\n'
+                                b'      +k=0.9996 +datum=WGS84 +units=m]]></geoReference>\n'
+                                b'    <offset x="10.5" y="-2" z="0" hdg="0.1"/>\n'
+                                b'  </header>\n'
+                                b'  <road id="0"><broken')
+        actual = coord_calculations.parse_open_drive_header(open_drive)
+        assert actual['geo_reference'] == '+proj=tmerc +lat_0=0 +lon_0=9 +k=0.9996 +datum=WGS84 +units=m'
+        assert actual['offset'] == {'x': 10.5, 'y': -2.0, 'z': 0.0, 'hdg': 0.1}
+
+    def test_get_proj_from_open_drive_cached(self, test_data_dir, tmp_path):
+        odr_copy = str(tmp_path / 'TestTrack.xodr')
+        shutil.copyfile(os.path.join(test_data_dir, 'TestTrack.xodr'), odr_copy)
+        expected = '+proj=tmerc +lat_0=0 +lon_0=9 +k=0.9996 +x_0=-177308 +y_0=-5425923 +datum=WGS84 +units=m +no_defs'
+
+        actual = coord_calculations.get_proj_from_open_drive(open_drive_path=odr_copy)
+        assert actual.srs == expected
+        assert coord_calculations.get_proj_from_open_drive(open_drive_path=odr_copy) is actual
+        # Nothing is written next to the road network by default
+        assert os.listdir(str(tmp_path)) == ['TestTrack.xodr']
+
+        # Sidecar is used by a fresh process
+        sidecar_dir = str(tmp_path / 'headers')
+        coord_calculations._open_drive_header_cache.clear()
+        coord_calculations.read_open_drive_header(odr_copy, sidecar_dir)
+        assert len(os.listdir(sidecar_dir)) == 1
+        coord_calculations._open_drive_header_cache.clear()
+        header = coord_calculations.read_open_drive_header(odr_copy, sidecar_dir)
+        assert header['geo_reference'] + ' +no_defs' == expected
+        assert header['offset'] is None
+
+    def test_get_transformer(self, test_data_dir):
+        proj_in = pyproj.Proj('EPSG:4326')
+        proj_out = coord_calculations.get_proj_from_open_drive(os.path.join(test_data_dir, 'TestTrack.xodr'))
+        transformer = coord_calculations.get_transformer(proj_in, proj_out)
+        assert coord_calculations.get_transformer(pyproj.Proj('EPSG:4326'), proj_out) is transformer
+        expected = pyproj.Transformer.from_crs(proj_in.crs, proj_out.crs, always_xy=True).transform(11.41, 48.81)
+        assert transformer.transform(11.41, 48.81) == expected
+        assert coord_calculations.get_transformer(proj_in, proj_out, always_xy=False) is not transformer
+
+    def test_local_tangent_plane_offset(self, df):
+        ltp = coord_calculations.LocalTangentPlane(df['lat'][0], df['long'][0])
+        lat = df['lat'].values[:50]
+        lon = df['long'].values[:50]
+        heading = df['heading'].values[:50]
+        dist_x = np.full(50, 80.0)
+        dist_y = np.full(50, -3.5)
+
+        actual_lat, actual_lon = ltp.offset(lat, lon, heading, dist_x, dist_y)
+        az = heading - np.degrees(np.arctan2(dist_y, dist_x))
+        expected_lon, expected_lat, _ = Geod(ellps='WGS84').fwd(lon, lat, az, np.hypot(dist_x, dist_y))
+        _, _, error = Geod(ellps='WGS84').inv(actual_lon, actual_lat, expected_lon, expected_lat)
+        assert np.max(error) < 0.01
+
+        east, north = ltp.to_enu(lat, lon)
+        back_lat, back_lon = ltp.from_enu(east, north)
+        np.testing.assert_allclose(back_lat, lat, rtol=0, atol=1e-9)
+        np.testing.assert_allclose(back_lon, lon, rtol=0, atol=1e-9)
+
+    def test_local_tangent_plane_fallback(self):
+        small = coord_calculations.create_local_tangent_plane(pd.Series([48.8, 48.81]), pd.Series([11.4, 11.41]))
+        assert small is not None
+        assert small.max_error < 0.05
+        with pytest.warns(UserWarning):
+            large = coord_calculations.create_local_tangent_plane(pd.Series([48.8, 49.3]), pd.Series([11.4, 12.4]))
+        assert large is None
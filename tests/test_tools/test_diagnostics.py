@@ -0,0 +1,82 @@
+#  ****************************************************************************
+#  @test_diagnostics.py
+#
+#  @copyright 2023 e:fs TechHub GmbH and Audi AG. All rights reserved.
+#
+#  @license Apache v2.0
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#  ****************************************************************************
+
+from osc_generator.tools.converter import Converter
+from osc_generator.tools.diagnostics import DiagnosticsSink
+import numpy as np
+import pandas as pd
+import pytest
+import shutil
+import os
+
+
+@pytest.fixture
+def test_data_dir():
+    return os.path.join(os.path.dirname(__file__), '../test_data')
+
+
+def run_converter(test_data_dir, tmp_path, diagnostics_mode):
+    for file_name in ['testfile_llc.csv', 'TestTrack.xodr']:
+        shutil.copyfile(os.path.join(test_data_dir, file_name), str(tmp_path / file_name))
+    converter = Converter()
+    converter.diagnostics_mode = diagnostics_mode
+    converter.set_paths(str(tmp_path / 'testfile_llc.csv'), str(tmp_path / 'TestTrack.xodr'))
+    converter.process_trajectories(relative=True)
+    converter.label_maneuvers(acc_threshold=0.2, optimize_acc=False, generate_kml=False)
+    converter.close_diagnostics()
+    return converter
+
+
+class TestDiagnostics:
+    def test_diagnostics_off(self, test_data_dir, tmp_path):
+        run_converter(test_data_dir, tmp_path, 'off')
+        for file_name in ['df33.csv', 'maneuver_lists', 'diagnostics.npz']:
+            assert not os.path.exists(str(tmp_path / file_name))
+
+    def test_diagnostics_npz(self, test_data_dir, tmp_path):
+        converter = run_converter(test_data_dir, tmp_path, 'npz')
+        assert not os.path.exists(str(tmp_path / 'df33.csv'))
+        assert not os.path.exists(str(tmp_path / 'maneuver_lists'))
+        with np.load(str(tmp_path / 'diagnostics.npz')) as actual:
+            assert {'df33', 'maneuver_ego', 'maneuver_array_lon_0', 'maneuver_array_lat_0'} <= set(actual.files)
+            np.testing.assert_array_equal(actual['df33']['speed'], converter.df['speed'].values)
+            np.testing.assert_array_equal(actual['maneuver_array_lon_0'], converter.ego_maneuver_array[0])
+
+    def test_diagnostics_legacy(self, test_data_dir, tmp_path):
+        converter = run_converter(test_data_dir, tmp_path, 'legacy')
+        actual = pd.read_csv(str(tmp_path / 'df33.csv'), index_col=0)
+        pd.testing.assert_series_equal(actual['speed'], converter.df['speed'])
+        maneuver_files = sorted(os.listdir(str(tmp_path / 'maneuver_lists')))
+        assert maneuver_files == ['maneuver_array_lat_0.csv', 'maneuver_array_lon_0.csv', 'maneuver_ego.xlsx']
+
+    def test_diagnostics_sink(self, tmp_path):
+        with pytest.raises(ValueError):
+            DiagnosticsSink('xlsx', str(tmp_path))
+
+        sink = DiagnosticsSink('npz', str(tmp_path))
+        data = pd.DataFrame({'name': ['a', 'b'], 'value': [1.0, 2.0]})
+        sink.record('table', data, 'table.csv')
+        data['value'] = 0.0
+        sink.close()
+        with pytest.raises(ValueError):
+            sink.record('table', data, 'table.csv')
+        with np.load(str(tmp_path / 'diagnostics.npz')) as actual:
+            assert list(actual['table']['name']) == ['a', 'b']
+            assert list(actual['table']['value']) == [1.0, 2.0]
@@ -0,0 +1,58 @@
+#  ****************************************************************************
+#  @test_import_time.py
+#
+#  @copyright 2023 e:fs TechHub GmbH and Audi AG. All rights reserved.
+#
+#  @license Apache v2.0
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#  ****************************************************************************
+
+import subprocess
+import sys
+import os
+import pytest
+
+# Budget for the cumulative import time of the CLI module in s, generous for slow machines
+CLI_IMPORT_BUDGET = 0.5
+
+
+def import_times(module: str) -> dict:
+    """
+    Cumulative import time in s of each module imported by a fresh interpreter (python -X importtime).
+    """
+    root_dir = os.path.join(os.path.dirname(__file__), '../..')
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import ' + module], cwd=root_dir,
+                            stderr=subprocess.PIPE, universal_newlines=True, check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        times[name.strip()] = int(cumulative) / 1e6
+    return times
+
+
+class TestImportTime:
+    @pytest.mark.parametrize('module', ['osc_generator.osc_generator', 'osc_generator.batch'])
+    def test_cli_import_time(self, module):
+        times = import_times(module)
+        heavy = {'pandas', 'numpy', 'pyproj', 'shapely', 'scipy', 'matplotlib', 'simplekml', 'scenariogeneration',
+                 'openpyxl', 'geographiclib'}
+        assert heavy.isdisjoint(times)
+        assert times[module] < CLI_IMPORT_BUDGET
+
+    def test_converter_optional_imports(self):
+        times = import_times('osc_generator.tools.converter')
+        assert 'osc_generator.tools.converter' in times
+        assert {'matplotlib', 'scipy.signal', 'simplekml'}.isdisjoint(times)
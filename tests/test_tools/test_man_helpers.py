@@ -20,7 +20,7 @@
 
 import pandas as pd
 import numpy as np
-from osc_generator.tools import man_helpers
+from osc_generator.tools import man_helpers, utils
 import pytest
 import os
 
@@ -94,3 +94,28 @@ class TestManHelpers:
 
         np.testing.assert_array_equal(ego_maneuver_array[0], expected_ego_maneuver_array_0)
         np.testing.assert_array_equal(ego, expected_ego)
+
+    def test_object_headings(self, prepared_df):
+        movobj_grps_coord = np.array([['lat_6', 'lon_6', 'speed_6', 'class_6']])
+        actual = man_helpers.calc_object_headings(prepared_df, movobj_grps_coord, step=2)
+        k = int(prepared_df['lat_6'].first_valid_index())
+        heading = utils.calc_heading_from_two_geo_positions(prepared_df['lat_6'][k], prepared_df['lon_6'][k],
+                                                            prepared_df['lat_6'][k + 2], prepared_df['lon_6'][k + 2])
+        assert actual.shape == (len(prepared_df), 1)
+        assert abs(actual[k, 0] - utils.convert_heading(heading)) < 1e-10
+
+    def test_merge_maneuvers(self, prepared_df, expected_ego_maneuver_array_0):
+        speed = prepared_df['speed'].values
+        actual = man_helpers.merge_maneuvers(expected_ego_maneuver_array_0, speed, 0.3)
+        model_speed = man_helpers.create_speed_model(pd.DataFrame(actual), speed[0])
+
+        assert len(actual) == 2
+        assert actual[0][0] == '0' and actual[-1][1] == '101'
+        assert actual[-1][5] == expected_ego_maneuver_array_0[-1][5]
+        assert np.max(np.abs(model_speed[:len(speed)] - speed[:len(model_speed)])) <= 0.3
+
+        merged, report = man_helpers.compact_maneuvers(prepared_df, {0: expected_ego_maneuver_array_0},
+                                                       np.empty((0, 4)), 0.3)
+        np.testing.assert_array_equal(merged[0], actual)
+        assert list(report.loc[0, ['events_before', 'events_after']]) == [6, 2]
+        assert report.loc[0, 'rmse_after'] < 0.3
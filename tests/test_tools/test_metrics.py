@@ -0,0 +1,111 @@
+#  ****************************************************************************
+#  @test_metrics.py
+#
+#  @copyright 2023 e:fs TechHub GmbH and Audi AG. All rights reserved.
+#
+#  @license Apache v2.0
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#  ****************************************************************************
+
+from osc_generator.osc_generator import OSCGenerator
+from osc_generator.tools.metrics import MetricsRecorder
+from osc_generator.tools import metrics as metrics_module
+from xmldiff import main
+import pytest
+import shutil
+import json
+import os
+
+
+@pytest.fixture
+def test_data_dir():
+    return os.path.join(os.path.dirname(__file__), '../test_data')
+
+
+class TestMetrics:
+    def test_generate_osc_metrics(self, test_data_dir, tmp_path):
+        for file_name in ['testfile_straight.csv', 'TestTrack.xodr']:
+            shutil.copyfile(os.path.join(test_data_dir, file_name), str(tmp_path / file_name))
+        output_path = str(tmp_path / 'straight.xosc')
+        metrics_path = str(tmp_path / 'metrics.json')
+
+        records = []
+        oscg = OSCGenerator()
+        oscg.converter.metrics.add_callback(records.append)
+        oscg.generate_osc(str(tmp_path / 'testfile_straight.csv'), str(tmp_path / 'TestTrack.xodr'), output_path,
+                          osc_version='1.2', metrics=metrics_path)
+
+        # Instrumentation does not change the scenario
+        assert [] == main.diff_files(output_path, os.path.join(test_data_dir, 'expected_straight.xosc'))
+
+        with open(metrics_path, 'r') as f:
+            data = json.load(f)
+        stages = [stage['stage'] for stage in data['stages']]
+        for name in ['read', 'object_filtering', 'lane_reconstruction', 'coordinate_conversion',
+                     'lateral_labeling', 'longitudinal_labeling', 'projection', 'segment_extraction', 'xml_writing']:
+            assert name in stages
+        assert stages[0] == 'read' and stages[-1] == 'xml_writing'
+        assert records == data['records']
+        for stage in data['stages']:
+            assert stage['wall_time'] >= 0.0 and stage['cpu_time'] >= 0.0
+        assert data['stages'][0]['rows'] > 0
+        assert data['stages'][-1]['events'] > 0
+
+        # A new run starts with new records
+        oscg.generate_osc(str(tmp_path / 'testfile_straight.csv'), str(tmp_path / 'TestTrack.xodr'), output_path,
+                          osc_version='1.2')
+        assert len(oscg.converter.metrics.records) == len(data['records'])
+
+    @pytest.mark.parametrize('reset_peak', [True, False])
+    def test_memory_profiling(self, monkeypatch, reset_peak):
+        if not reset_peak:
+            # Python 3.7 and 3.8
+            monkeypatch.setattr(metrics_module, '_reset_peak', None)
+        metrics = MetricsRecorder(memory=True)
+        with metrics.stage('outer'):
+            outer = list(range(10 ** 5))
+            with metrics.stage('inner'):
+                inner = bytearray(10 ** 7)
+            del inner
+        with metrics.stage('later'):
+            later = bytearray(10 ** 5)
+        metrics.stop_memory_profiling()
+        summary = {stage['stage']: stage for stage in metrics.summary()}
+        assert summary['inner']['traced_peak'] >= 10 ** 7
+        # The nested peak also belongs to the enclosing stage, the retained memory does not
+        assert summary['outer']['traced_peak'] >= 10 ** 7
+        assert summary['outer']['traced_retained'] < 10 ** 7
+        assert len(outer) == 10 ** 5
+        # Earlier peaks do not belong to later stages
+        assert 10 ** 5 <= summary['later']['traced_peak'] < 10 ** 7
+        assert len(later) == 10 ** 5
+
+    def test_recorder(self):
+        metrics = MetricsRecorder()
+        with metrics.stage('a', rows=2) as counts:
+            counts['events'] = 1
+        metrics.end(metrics.begin('a'), rows=3)
+        metrics.end(metrics.begin('b'))
+        summary = metrics.summary()
+        assert [stage['stage'] for stage in summary] == ['a', 'b']
+        assert summary[0]['calls'] == 2 and summary[0]['rows'] == 5 and summary[0]['events'] == 1
+
+        disabled = MetricsRecorder(enabled=False)
+        with disabled.stage('a'):
+            pass
+        assert disabled.end(disabled.begin('b')) is None
+        assert disabled.records == []
+
+        with pytest.raises(TypeError):
+            metrics.add_callback('not callable')
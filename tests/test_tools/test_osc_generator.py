@@ -21,7 +21,10 @@
 from osc_generator.osc_generator import OSCGenerator
 from xmldiff import main
 import pandas as pd
+from xml.etree import ElementTree
+import io
 import pytest
+import shutil
 import os
 import warnings
 
@@ -113,6 +116,75 @@ class TestOSCGenerator:
         diff = main.diff_files(output_scenario_path, expected_scenario_path)
         assert [] == diff
 
+    def test_generate_osc_skip_unchanged(self, test_data_dir, tmp_path, capsys):
+        for file_name in ['testfile_straight.csv', 'TestTrack.xodr']:
+            shutil.copyfile(os.path.join(test_data_dir, file_name), str(tmp_path / file_name))
+        trajectories_path = str(tmp_path / 'testfile_straight.csv')
+        opendrive_path = str(tmp_path / 'TestTrack.xodr')
+        output_scenario_path = str(tmp_path / 'output_scenario.xosc')
+        expected_scenario_path = os.path.join(test_data_dir, r'expected_straight.xosc')
+        system_under_test = OSCGenerator()
+        system_under_test.generate_osc(trajectories_path, opendrive_path, output_scenario_path, osc_version="1.2",
+                                       skip_unchanged=True)
+        assert [] == main.diff_files(output_scenario_path, expected_scenario_path)
+        with open(output_scenario_path, 'rb') as f:
+            content = f.read()
+        assert content.startswith(b'<!-- osc_generator content sha256:')
+        capsys.readouterr()
+
+        system_under_test.generate_osc(trajectories_path, opendrive_path, output_scenario_path, osc_version="1.2",
+                                       skip_unchanged=True)
+        assert capsys.readouterr().out.startswith('Unchanged OpenSCENARIO file')
+
+        system_under_test.generate_osc(trajectories_path, opendrive_path, output_scenario_path, osc_version="1.1",
+                                       skip_unchanged=True)
+        assert capsys.readouterr().out.startswith('Path to OpenSCENARIO file')
+        with open(output_scenario_path, 'rb') as f:
+            assert f.read() != content
+
+    def test_generate_osc_vehicle_catalog(self, test_data_dir, tmp_path):
+        for file_name in ['testfile_llc.csv', 'TestTrack.xodr']:
+            shutil.copyfile(os.path.join(test_data_dir, file_name), str(tmp_path / file_name))
+        output_scenario_path = str(tmp_path / 'output_scenario.xosc')
+        system_under_test = OSCGenerator()
+        system_under_test.generate_osc(str(tmp_path / 'testfile_llc.csv'), str(tmp_path / 'TestTrack.xodr'),
+                                       output_scenario_path, osc_version="1.2", vehicle_catalog=True)
+
+        entities = ElementTree.parse(output_scenario_path).getroot().find('Entities')
+        objects = entities.findall('ScenarioObject')
+        assert objects
+        for scenario_object in objects:
+            assert [child.tag for child in scenario_object if child.tag != 'ObjectController'] == \
+                ['CatalogReference']
+        catalog = ElementTree.parse(str(tmp_path / 'Catalogs' / 'Vehicles' / 'VehicleCatalog.xosc')).getroot()
+        entries = {vehicle.get('name') for vehicle in catalog.iter('Vehicle')}
+        assert {reference.get('entryName') for reference in entities.iter('CatalogReference')} == entries
+
+    def test_generate_osc_from_memory(self, test_data_dir, tmp_path, monkeypatch):
+        expected_scenario_path = os.path.join(test_data_dir, r'expected_straight.xosc')
+        trajectories = pd.read_csv(os.path.join(test_data_dir, r'testfile_straight.csv'))
+        with open(os.path.join(test_data_dir, r'TestTrack.xodr'), 'rb') as f:
+            opendrive = f.read()
+        with open(expected_scenario_path, 'rb') as f:
+            expected = f.read()
+        test_data_files = sorted(os.listdir(test_data_dir))
+        monkeypatch.chdir(tmp_path)
+
+        system_under_test = OSCGenerator()
+        actual = system_under_test.generate_osc_from_memory(trajectories, opendrive, opendrive_name='TestTrack.xodr',
+                                                            osc_version="1.2")
+        assert [] == main.diff_texts(actual.encode('utf-8'), expected)
+
+        stream = io.StringIO()
+        with open(os.path.join(test_data_dir, r'testfile_straight.csv'), 'rb') as f:
+            trajectories = f.read()
+        assert system_under_test.generate_osc_from_memory(trajectories, opendrive, stream,
+                                                          opendrive_name='TestTrack.xodr', osc_version="1.2") is None
+        assert [] == main.diff_texts(stream.getvalue().encode('utf-8'), expected)
+
+        assert os.listdir(str(tmp_path)) == []
+        assert sorted(os.listdir(test_data_dir)) == test_data_files
+
     def test_generate_osc_straight_osi(self, test_data_dir):
         trajectories_path = os.path.join(test_data_dir, r'testfile_straight.osi')
         opendrive_path = os.path.join(test_data_dir, r'TestTrack.xodr')
@@ -18,7 +18,7 @@
 #  limitations under the License.
 #  ****************************************************************************
 
-from osc_generator.tools import rulebased
+from osc_generator.tools import rulebased, utils
 import pytest
 import pandas as pd
 import numpy as np
@@ -81,6 +81,13 @@ class TestRulebased:
         np.testing.assert_array_equal(decelerate_array, e_decelerate_array)
         np.testing.assert_array_equal(keep_velocity_array, e_keep_velocity_array)
 
+    def test_get_vehicle_state_maneuver_frame_rate(self, prepared_df, e_keep_velocity_array):
+        resampled = utils.resample_trajectories(prepared_df[['timestamp', 'speed']], 20.0)
+        keep_velocity_array = rulebased.create_longitudinal_maneuver_vectors(resampled['speed'],
+                                                                             frame_rate=20.0)[2]
+
+        np.testing.assert_array_equal(keep_velocity_array[::2], e_keep_velocity_array)
+
     def test_get_lanechange_absolute(self, prepared_df, df_lanes, e_lane_change_right_array, e_lane_change_left_array):
         lane_change_left_array, lane_change_right_array = rulebased.create_lateral_maneuver_vectors(df_lanes,
                                                                                                     prepared_df['lat'],
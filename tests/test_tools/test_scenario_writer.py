@@ -0,0 +1,223 @@
+#  ****************************************************************************
+#  @test_scenario_writer.py
+#
+#  @copyright 2023 e:fs TechHub GmbH and Audi AG. All rights reserved.
+#
+#  @license Apache v2.0
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#  ****************************************************************************
+
+from osc_generator.tools import scenario_writer
+from osc_generator.tools.converter import Converter
+from osc_generator.tools.bundle import ScenarioBundle
+from xml.etree.ElementTree import Element, SubElement
+from xml.etree import ElementTree
+from xmldiff import main
+import pytest
+import shutil
+import tarfile
+import zipfile
+import gzip
+import json
+import os
+
+
+@pytest.fixture
+def test_data_dir():
+    return os.path.join(os.path.dirname(__file__), '../test_data')
+
+
+@pytest.fixture
+def converter(test_data_dir, tmp_path):
+    for file_name in ['testfile_llc.csv', 'TestTrack.xodr']:
+        shutil.copyfile(os.path.join(test_data_dir, file_name), str(tmp_path / file_name))
+    system_under_test = Converter()
+    system_under_test.osc_version = '1.2'
+    system_under_test.set_paths(str(tmp_path / 'testfile_llc.csv'), str(tmp_path / 'TestTrack.xodr'))
+    system_under_test.process_trajectories(relative=True)
+    system_under_test.label_maneuvers(acc_threshold=0.2, optimize_acc=False, generate_kml=False)
+    return system_under_test
+
+
+class TestScenarioWriter:
+    def test_write_pretty(self, test_data_dir, tmp_path):
+        expected_scenario_path = os.path.join(test_data_dir, r'expected_llc.xosc')
+        output_path = str(tmp_path / 'pretty.xosc')
+        elem = ElementTree.parse(expected_scenario_path).getroot()
+        actual = scenario_writer.write_pretty(elem, 'xosc', True, True, True, str(tmp_path), 'llc', 2.0,
+                                              output_path)
+
+        assert actual == output_path
+        assert [] == main.diff_files(output_path, expected_scenario_path)
+        with open(output_path) as f:
+            lines = f.read().splitlines()
+        assert lines[0] == '<?xml version="1.0" ?>'
+        assert lines[2].startswith('\t<FileHeader ')
+
+    def test_indent_element(self):
+        root = Element('Root')
+        child = SubElement(root, 'Child')
+        SubElement(child, 'Leaf', attrib={'name': 'a'})
+        scenario_writer.indent_element(root)
+        assert ElementTree.tostring(root, encoding='unicode') == \
+            '<Root>\n    <Child>\n        <Leaf name="a" />\n    </Child>\n</Root>'
+
+    def test_write_compressed(self, converter, test_data_dir):
+        expected_scenario_path = os.path.join(test_data_dir, r'expected_llc.xosc')
+        for streaming in [False, True]:
+            converter.outfile = None
+            converter.write_scenario(timebased_lon=True, timebased_lat=True, output='xosc.gz', streaming=streaming)
+            assert converter.outfile.endswith('_time_lon_lat.xosc.gz')
+            with gzip.open(converter.outfile) as f, open(expected_scenario_path, 'rb') as g:
+                assert [] == main.diff_texts(f.read(), g.read())
+
+    @pytest.mark.parametrize('max_workers', [None, 2])
+    def test_write_scenario_variants(self, converter, max_workers):
+        variants = [(True, True, 2.0), (False, True, 2.0), (True, False, 1.0), (False, False, 5.0)]
+        actual = converter.write_scenario_variants(variants, max_workers=max_workers)
+        assert len(actual) == len(variants)
+        for path, (timebased_lon, timebased_lat, radius) in zip(actual, variants):
+            with open(path, 'rb') as f:
+                variant_content = f.read()
+            converter.outfile = None
+            converter.write_scenario(radius_pos_trigger=radius, timebased_lon=timebased_lon,
+                                     timebased_lat=timebased_lat)
+            assert path == converter.outfile
+            with open(converter.outfile, 'rb') as f:
+                assert [] == main.diff_texts(variant_content, f.read())
+
+        with pytest.raises(ValueError):
+            converter.write_scenario_variants([(True, True, 1.0), (True, True, 2.0)])
+
+    def test_write_parameterized(self, converter):
+        converter.write_scenario(timebased_lon=False, timebased_lat=False)
+        expected = ElementTree.parse(converter.outfile).getroot()
+        converter.outfile = None
+        converter.write_scenario(timebased_lon=False, timebased_lat=False, parameterize=True)
+        assert converter.outfile.endswith('_pos_lon_lat_param.xosc')
+        actual = ElementTree.parse(converter.outfile).getroot()
+
+        declarations = {p.get('name'): p.get('value') for p in actual.findall('ParameterDeclarations/*')}
+        assert declarations == {'RadiusPosTrigger': '2.0', 'SpeedFactor': '1.0'}
+        assert {c.get('value') for c in actual.iter('DistanceCondition')} == {'$RadiusPosTrigger'}
+
+        def resolve(value):
+            # Default SpeedFactor is 1
+            return float(value[len('${$SpeedFactor * '):-1]) if value.startswith('$') else float(value)
+        for tag in ['AbsoluteTargetSpeed', 'SpeedActionDynamics']:
+            actual_values = [resolve(e.get('value')) for e in actual.iter(tag)]
+            assert actual_values == [float(e.get('value')) for e in expected.iter(tag)]
+        assert all(e.get('value').startswith('${$SpeedFactor') for e in actual.iter('AbsoluteTargetSpeed'))
+
+    def test_write_parameterized_osc_1_0(self, converter):
+        # SpeedFactor expressions require OpenSCENARIO 1.1, no scenario is written
+        converter.osc_version = '1.0'
+        converter.outfile = None
+        with pytest.raises(ValueError, match='SpeedFactor'):
+            converter.write_scenario(timebased_lon=False, timebased_lat=False, parameterize=True)
+        assert not [f for f in os.listdir(converter.dir_name) if f.endswith('_param.xosc')]
+
+    @pytest.mark.parametrize('archive_name', ['scenarios.zip', 'scenarios.tar.gz'])
+    def test_write_bundle(self, converter, tmp_path, archive_name):
+        archive_path = str(tmp_path / archive_name)
+        with scenario_writer.open_scenario_bundle(archive_path, osc_version='1.2') as bundle:
+            converter.write_scenario(timebased_lon=True, timebased_lat=True, bundle=bundle)
+            converter.write_scenario(timebased_lon=True, timebased_lat=False, bundle=bundle, streaming=True)
+            with pytest.raises(ValueError):
+                converter.write_scenario(timebased_lon=True, timebased_lat=True, bundle=bundle)
+        assert converter.outfile is None
+
+        if archive_name.endswith('.zip'):
+            with zipfile.ZipFile(archive_path) as archive:
+                members = {name: archive.read(name) for name in archive.namelist()}
+        else:
+            with tarfile.open(archive_path) as archive:
+                members = {m.name: archive.extractfile(m).read() for m in archive.getmembers()}
+
+        manifest = json.loads(members['manifest.json'])
+        assert 'created' not in manifest
+        assert manifest['catalog'] == 'Catalogs/Vehicles/VehicleCatalog.xosc'
+        assert [s['name'] for s in manifest['scenarios']] == ['man_export_testfile_llc.csv_time_lon_lat.xosc',
+                                                             'man_export_testfile_llc.csv_time_lon_pos_lat_2.0_m.xosc']
+        catalog = ElementTree.fromstring(members[manifest['catalog']])
+        assert [v.get('name') for v in catalog.iter('Vehicle')] == ['car_white']
+        for entry in manifest['scenarios']:
+            scenario = ElementTree.fromstring(members[entry['name']])
+            assert entry['size'] == len(members[entry['name']])
+            assert scenario.find('CatalogLocations/VehicleCatalog/Directory').get('path') == 'Catalogs/Vehicles'
+            assert scenario.find('Entities/ScenarioObject/CatalogReference').get('entryName') == 'car_white'
+            assert scenario.find('Entities/ScenarioObject/Vehicle') is None
+
+    @pytest.mark.parametrize('archive_name', ['scenarios.zip', 'scenarios.tar', 'scenarios.tar.gz'])
+    def test_bundle_reproducible(self, tmp_path, archive_name):
+        archives = []
+        for created in [None, None, 1672531200.0]:
+            archive_path = str(tmp_path / archive_name)
+            with ScenarioBundle(archive_path, catalog=b'<catalog/>', created=created) as bundle:
+                bundle.add('scenario.xosc', b'<scenario/>')
+            with open(archive_path, 'rb') as f:
+                archives.append(f.read())
+
+        # Same members, same archive
+        assert archives[0] == archives[1]
+        assert archives[2] != archives[0]
+        if archive_name.endswith('.zip'):
+            with zipfile.ZipFile(archive_path) as archive:
+                assert {info.date_time for info in archive.infolist()} == {(2023, 1, 1, 0, 0, 0)}
+                manifest = json.loads(archive.read('manifest.json'))
+        else:
+            with tarfile.open(archive_path) as archive:
+                assert {member.mtime for member in archive.getmembers()} == {1672531200}
+                manifest = json.loads(archive.extractfile('manifest.json').read())
+        assert 'created' in manifest
+
+    def test_vehicle_catalog(self, converter):
+        converter.write_scenario()
+        expected = ElementTree.parse(converter.outfile).getroot().find('Entities/ScenarioObject/Vehicle')
+
+        vehicle_catalog = scenario_writer.VehicleCatalog('1.2')
+        bb_input = [1.872, 4.924, 1.444, 1.376, 0, 0.722]
+        first = vehicle_catalog.reference('car_white', bb_input, 'internal')
+        assert vehicle_catalog.reference('car_white', bb_input, 'internal').entryname == first.entryname
+        assert vehicle_catalog.reference('car_white', bb_input[:2] + [2.0] + bb_input[3:], 'internal').entryname \
+            == 'car_white_2'
+        assert len(vehicle_catalog) == 2
+
+        converter.write_scenario(vehicle_catalog=vehicle_catalog)
+        catalog_path = vehicle_catalog.write(converter.dir_name)
+        scenario = ElementTree.parse(converter.outfile).getroot()
+        assert scenario.find('Entities/ScenarioObject/Vehicle') is None
+        assert scenario.find('CatalogLocations/VehicleCatalog/Directory').get('path') == 'Catalogs/Vehicles'
+        entry_name = scenario.find('Entities/ScenarioObject/CatalogReference').get('entryName')
+        assert entry_name == 'car_white_3'
+        assert catalog_path == os.path.join(converter.dir_name, 'Catalogs', 'Vehicles', 'VehicleCatalog.xosc')
+
+        catalog = ElementTree.parse(catalog_path).getroot()
+        vehicles = {v.get('name'): v for v in catalog.iter('Vehicle')}
+        assert list(vehicles) == ['car_white', 'car_white_2', 'car_white_3']
+        expected.set('name', entry_name)
+        assert [] == main.diff_texts(ElementTree.tostring(vehicles[entry_name]), ElementTree.tostring(expected))
+
+    def test_write_trajectories(self, converter):
+        output_path = converter.dir_name + '/trajectories.xosc'
+        converter.outfile = output_path
+        converter.write_scenario(trajectory_tolerance=0.2)
+
+        scenario = ElementTree.parse(output_path).getroot()
+        assert scenario.find('.//FollowTrajectoryAction') is not None
+        assert scenario.find('.//LaneChangeAction') is None
+        vertices = scenario.findall('.//Polyline/Vertex')
+        assert 2 <= len(vertices) < len(converter.df) / 5
+        assert float(vertices[0].get('time')) == 0.0
+        assert float(vertices[-1].get('time')) == (len(converter.df) - 1) / 10.0
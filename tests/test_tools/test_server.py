@@ -0,0 +1,119 @@
+#  ****************************************************************************
+#  @test_server.py
+#
+#  @copyright 2023 e:fs TechHub GmbH and Audi AG. All rights reserved.
+#
+#  @license Apache v2.0
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#  ****************************************************************************
+
+from osc_generator.server import GenerationServer, GenerationClient
+from concurrent.futures import ThreadPoolExecutor
+from xmldiff import main
+import threading
+import signal
+import socket
+import pytest
+import shutil
+import os
+
+
+@pytest.fixture
+def test_data_dir():
+    return os.path.join(os.path.dirname(__file__), '../test_data')
+
+
+@pytest.fixture
+def server_dir(test_data_dir, tmp_path):
+    for file_name in ['testfile_llc.csv', 'testfile_straight.csv', 'TestTrack.xodr']:
+        shutil.copyfile(os.path.join(test_data_dir, file_name), str(tmp_path / file_name))
+    return tmp_path
+
+
+def run_server(unix_socket: str = None, max_workers: int = 2) -> tuple:
+    server = GenerationServer(port=0, unix_socket=unix_socket, max_workers=max_workers)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    if unix_socket is not None:
+        client = GenerationClient(unix_socket=unix_socket)
+    else:
+        client = GenerationClient(*server.address)
+    return server, client
+
+
+class TestServer:
+    def test_generate(self, test_data_dir, server_dir):
+        server, client = run_server()
+        try:
+            assert client.health()['workers'] == 2
+            outputs = [str(server_dir / 'straight.xosc'), str(server_dir / 'llc.xosc')]
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                entries = list(executor.map(
+                    lambda args: client.generate(*args, osc_version='1.2'),
+                    [(str(server_dir / 'testfile_straight.csv'), str(server_dir / 'TestTrack.xodr'), outputs[0]),
+                     (str(server_dir / 'testfile_llc.csv'), str(server_dir / 'TestTrack.xodr'), outputs[1])]))
+            assert [entry['status'] for entry in entries] == ['done', 'done']
+            assert [entry['output'] for entry in entries] == outputs
+            assert [] == main.diff_files(outputs[0], os.path.join(test_data_dir, 'expected_straight.xosc'))
+
+            entry = client.generate(str(server_dir / 'missing.csv'), str(server_dir / 'TestTrack.xodr'))
+            assert entry['status'] == 'failed'
+            assert 'FileNotFoundError' in entry['error']
+            with pytest.raises(ValueError):
+                client.generate(str(server_dir / 'testfile_llc.csv'), str(server_dir / 'TestTrack.xodr'),
+                                plot=True)
+        finally:
+            server.shutdown()
+            server.close()
+
+    @pytest.mark.skipif(not hasattr(socket, 'AF_UNIX'), reason='Unix sockets are not available')
+    def test_generate_unix_socket(self, test_data_dir, server_dir):
+        unix_socket = str(server_dir / 'osc_generator.sock')
+        server, client = run_server(unix_socket)
+        try:
+            entry = client.generate(str(server_dir / 'testfile_straight.csv'), str(server_dir / 'TestTrack.xodr'),
+                                    str(server_dir / 'straight.xosc'), osc_version='1.2')
+            assert entry['status'] == 'done'
+            assert [] == main.diff_files(entry['output'], os.path.join(test_data_dir, 'expected_straight.xosc'))
+        finally:
+            server.shutdown()
+            server.close()
+        assert not os.path.exists(unix_socket)
+
+    def test_request_state(self, server_dir):
+        server, client = run_server(max_workers=1)
+        try:
+            # Both requests on the same worker, the version and the output path do not carry over
+            first = client.generate(str(server_dir / 'testfile_straight.csv'), str(server_dir / 'TestTrack.xodr'),
+                                    str(server_dir / 'straight.xosc'), osc_version='1.2')
+            second = client.generate(str(server_dir / 'testfile_llc.csv'), str(server_dir / 'TestTrack.xodr'))
+            assert [first['status'], second['status']] == ['done', 'done']
+            assert second['output'] != first['output']
+            with open(second['output']) as f:
+                assert 'revMinor="0"' in f.read()
+
+            # A dead worker fails its job, the pool is replaced
+            for pid in list(server._executor._processes):
+                os.kill(pid, signal.SIGKILL)
+            entry = client.generate(str(server_dir / 'testfile_straight.csv'), str(server_dir / 'TestTrack.xodr'))
+            assert entry['status'] == 'failed'
+            entry = client.generate(str(server_dir / 'testfile_straight.csv'), str(server_dir / 'TestTrack.xodr'))
+            assert entry['status'] == 'done'
+        finally:
+            server.shutdown()
+            server.close()
+
+    def test_host(self):
+        with pytest.raises(ValueError):
+            GenerationServer(host='0.0.0.0', port=0, max_workers=1)
@@ -0,0 +1,137 @@
+#  ****************************************************************************
+#  @test_streaming.py
+#
+#  @copyright 2023 e:fs TechHub GmbH and Audi AG. All rights reserved.
+#
+#  @license Apache v2.0
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#  ****************************************************************************
+
+from osc_generator.tools.converter import Converter
+from osc_generator.tools.streaming import StreamingLabeler
+from osc_generator.tools import man_helpers, osi_stream
+from xmldiff import main
+import pandas as pd
+import numpy as np
+import threading
+import pytest
+import shutil
+import os
+import warnings
+
+
+@pytest.fixture
+def test_data_dir():
+    return os.path.join(os.path.dirname(__file__), '../test_data')
+
+
+class TestStreaming:
+    @pytest.mark.parametrize('file_name', ['testfile_llc.csv', 'trajectories_file.csv'])
+    def test_streaming_labeler(self, test_data_dir, tmp_path, file_name):
+        for name in [file_name, 'TestTrack.xodr']:
+            shutil.copyfile(os.path.join(test_data_dir, name), str(tmp_path / name))
+        converter = Converter()
+        converter.set_paths(str(tmp_path / file_name), str(tmp_path / 'TestTrack.xodr'))
+        converter.process_trajectories(relative=True)
+        expected = man_helpers.label_maneuvers(converter.df, converter.df_lanes, 0.2, False,
+                                               converter.opendrive_path, True, converter.dir_name)
+
+        labeler = StreamingLabeler(converter.df_lanes, converter.opendrive_path)
+        emitted = []
+        for k, (_, row) in enumerate(converter.df.iterrows()):
+            emitted.extend((k, segment) for segment in labeler.push(row.to_dict()))
+        emitted.extend((len(converter.df), segment) for segment in labeler.finish())
+        result = labeler.result()
+
+        # Same maneuvers as labeling the whole recording
+        for i in [0, 1]:
+            assert expected[i].keys() == result[i].keys()
+            for key in expected[i]:
+                assert np.array_equal(expected[i][key], result[i][key])
+        assert expected[2:5] == result[2:5]
+
+        # Segments are emitted shortly after they end, lane changes once no other lane line can extend them
+        length = len(converter.df)
+        lon = [(k, segment[2]) for k, segment in emitted if segment[1] == 'lon']
+        # Objects out of view keep their last maneuver open, a later standstill would change its target speed
+        assert all(k < length for k, segment in emitted if segment[:2] == (0, 'lon') and int(segment[2][1]) < length - 10)
+        assert max(k - int(row[1]) for k, row in lon if k < length and int(row[0]) > 0) <= 2 * labeler.look_ahead + 4
+        lat = [(k, segment[2]) for k, segment in emitted if segment[1] == 'lat' and k < length]
+        assert all(k - int(row[1]) <= labeler.max_lane_change * labeler.frame_rate for k, row in lat)
+
+    def test_convert_stream(self, test_data_dir, tmp_path):
+        for name in ['testfile_llc.csv', 'TestTrack.xodr']:
+            shutil.copyfile(os.path.join(test_data_dir, name), str(tmp_path / name))
+        converter = Converter()
+        converter.osc_version = '1.2'
+        converter.set_paths(str(tmp_path / 'testfile_llc.csv'), str(tmp_path / 'TestTrack.xodr'),
+                            str(tmp_path / 'output_scenario.xosc'))
+        # Lane lines of the recording, the frames are the raw rows
+        converter.process_trajectories(relative=True)
+        segments = []
+        frames = (row for _, row in pd.read_csv(str(tmp_path / 'testfile_llc.csv')).iterrows())
+        path = converter.convert_stream(frames, timebased_lat=True, callback=segments.append)
+
+        assert [] == main.diff_files(path, os.path.join(test_data_dir, 'expected_llc.xosc'))
+        assert converter.df is None
+        assert len(segments) == len(converter.ego_maneuver_array[0]) + len(converter.inf_maneuver_array[0])
+        assert converter.metrics.summary()[-1]['stage'] == 'streaming_labeling'
+
+        # An empty or broken stream leaves the scenario untouched
+        with open(path, 'rb') as f:
+            scenario = f.read()
+
+        def broken_stream():
+            yield next(frames)
+            raise ConnectionError
+
+        frames = (row for _, row in pd.read_csv(str(tmp_path / 'testfile_llc.csv')).iterrows())
+        for stream in [iter([]), broken_stream()]:
+            with pytest.raises((ValueError, ConnectionError)):
+                converter.convert_stream(stream)
+            with open(path, 'rb') as f:
+                assert f.read() == scenario
+        assert not [name for name in os.listdir(str(tmp_path)) if name.startswith('.tmp_')]
+
+    @pytest.mark.parametrize('protocol', ['tcp', 'udp'])
+    def test_osi_replay(self, test_data_dir, protocol):
+        osi_path = os.path.join(test_data_dir, 'testfile_llc.osi')
+        with open(osi_path, 'rb') as f:
+            expected = list(osi_stream.read_osi_messages(f))
+
+        with osi_stream.OSIReceiver(protocol=protocol, timeout=10.0) as receiver:
+            host, port = receiver.address
+            sent = []
+            replayer = threading.Thread(target=lambda: sent.append(
+                osi_stream.replay_osi(osi_path, host, port, protocol)))
+            replayer.start()
+            received = list(receiver)
+            replayer.join()
+
+        assert sent == [450]
+        assert received == expected
+
+    def test_osi_to_frame(self, test_data_dir):
+        osi_path = os.path.join(test_data_dir, 'testfile_llc.osi')
+        try:
+            from osc_generator.tools.osi_transformer import osi2df
+            with open(osi_path, 'rb') as f:
+                frames = [osi_stream.osi_to_frame(message) for message in osi_stream.read_osi_messages(f)]
+            df = osi2df(osi_path)
+            pd.testing.assert_frame_equal(pd.DataFrame(frames)[df.columns], df, check_dtype=False)
+        except (ImportError, NameError):
+            warnings.warn(
+                "Feature OSI Input Data is not available. Download from: "
+                "https://github.com/OpenSimulationInterface/open-simulation-interface",
+                UserWarning)
@@ -0,0 +1,90 @@
+#  ****************************************************************************
+#  @test_trajectory_cache.py
+#
+#  @copyright 2023 e:fs TechHub GmbH and Audi AG. All rights reserved.
+#
+#  @license Apache v2.0
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#  ****************************************************************************
+
+from osc_generator.tools.converter import Converter
+from osc_generator.tools.trajectory_cache import TrajectoryCache
+from xmldiff import main
+import pandas as pd
+import numpy as np
+import pytest
+import shutil
+import os
+
+
+@pytest.fixture
+def test_data_dir():
+    return os.path.join(os.path.dirname(__file__), '../test_data')
+
+
+class TestTrajectoryCache:
+    def test_converter_cache(self, test_data_dir, tmp_path):
+        for file_name in ['testfile_llc.csv', 'TestTrack.xodr']:
+            shutil.copyfile(os.path.join(test_data_dir, file_name), str(tmp_path / file_name))
+        cache = TrajectoryCache(str(tmp_path / 'cache'))
+
+        results = []
+        for osc_version in ['1.0', '1.2']:
+            system_under_test = Converter()
+            system_under_test.osc_version = osc_version
+            system_under_test.cache = cache
+            system_under_test.set_paths(str(tmp_path / 'testfile_llc.csv'), str(tmp_path / 'TestTrack.xodr'),
+                                        str(tmp_path / 'output_scenario.xosc'))
+            system_under_test.process_trajectories(relative=True)
+            system_under_test.label_maneuvers(acc_threshold=0.2, optimize_acc=False, generate_kml=False)
+            system_under_test.write_scenario(plot=False,
+                                             radius_pos_trigger=2.0,
+                                             timebased_lon=True,
+                                             timebased_lat=True,
+                                             output='xosc')
+            results.append(system_under_test)
+
+        # Writing with other parameters takes the processed trajectories from the cache
+        assert not results[0].cache_hit
+        assert results[1].cache_hit
+        assert 'read' not in [record['stage'] for record in results[1].metrics.records]
+        pd.testing.assert_frame_equal(results[0].df, results[1].df)
+        pd.testing.assert_frame_equal(results[0].df_lanes, results[1].df_lanes)
+        assert [] == main.diff_files(str(tmp_path / 'output_scenario.xosc'),
+                                     os.path.join(test_data_dir, 'expected_llc.xosc'))
+
+        # Other processing parameters are another entry
+        results[1].process_trajectories(relative=True, target_rate=20.0)
+        assert not results[1].cache_hit
+        assert len(cache.entries()) == 2
+
+    def test_eviction(self, tmp_path):
+        df = pd.DataFrame({'a': np.arange(1000, dtype=float), 'b': np.arange(1000)})
+        cache = TrajectoryCache(str(tmp_path / 'cache'), max_size=40000)
+        cache.store('first', {'df': df}, {'frame_rate': 10.0})
+        cache.store('second', {'df': df}, {'frame_rate': 10.0})
+        os.utime(os.path.join(cache.cache_dir, 'first', 'meta.json'), (0, 0))
+        os.utime(os.path.join(cache.cache_dir, 'second', 'meta.json'), (1, 1))
+
+        # Loading updates the last use
+        frames, values = cache.load('first')
+        pd.testing.assert_frame_equal(frames['df'], df)
+        assert values == {'frame_rate': 10.0}
+
+        cache.store('third', {'df': df})
+        assert [key for _, _, key in cache.entries()] == ['first', 'third']
+        assert cache.load('second') is None
+
+        cache.clear()
+        assert cache.entries() == []
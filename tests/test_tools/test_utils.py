@@ -58,6 +58,37 @@ class TestUtils:
         expected = cleaned_df
         pd.testing.assert_frame_equal(actual, expected)
 
+    def test_find_irrelevant_objects(self, df, cleaned_df, cols):
+        irrelevant, count = utils.find_irrelevant_objects(df, cols)
+        _, expected_count = utils.delete_irrelevant_objects(df, cols)
+        assert count == expected_count
+        assert [column for column in df.columns if column not in utils.flatten(irrelevant)] == \
+            list(cleaned_df.columns)
+
+    def test_read_csv_spilled(self, test_data_dir):
+        path = os.path.join(test_data_dir, 'trajectories_file.csv')
+        expected = pd.read_csv(path)
+        actual = utils.read_csv_spilled(path, max_chunk_memory=2 ** 10)
+        # Values are not copied into memory
+        base = actual.values
+        while base is not None and not isinstance(base, np.memmap):
+            base = base.base
+        assert base is not None
+        pd.testing.assert_frame_equal(actual, expected.astype(float))
+        assert utils.estimate_csv_memory(path) == expected.size * 8
+
+    def test_read_csv_spilled_no_trailing_newline(self, test_data_dir, tmp_path):
+        path = os.path.join(test_data_dir, 'trajectories_file.csv')
+        expected = pd.read_csv(path)
+        with open(path, 'rb') as f:
+            content = f.read().rstrip(b'\r\n')
+        path = str(tmp_path / 'trajectories_file.csv')
+        with open(path, 'wb') as f:
+            f.write(content)
+
+        assert utils.estimate_csv_memory(path) == expected.size * 8
+        pd.testing.assert_frame_equal(utils.read_csv_spilled(path, max_chunk_memory=2 ** 10), expected.astype(float))
+
     def test_new_coordinate_heading(self, df, cleaned_df):
         p = ['pos_x_6', 'pos_y_6', 'speed_x_6']
         k = 64
@@ -102,3 +133,64 @@ class TestUtils:
         actual = utils.calc_heading_from_two_geo_positions(48.80437693633773, 48.80440442405007, 11.465818732551098, 11.465823006918304)
         assert round(actual, 2) == -127.32
         assert utils.calc_heading_from_two_geo_positions(0, 0, 0, 0) == 180
+
+    def test_get_headings(self, df):
+        lat = np.column_stack([df['lat'].values, df['lat'].values[::-1]])
+        lon = np.column_stack([df['long'].values, df['long'].values[::-1]])
+        actual = utils.calc_headings_from_geo_positions(lat, lon, step=2)
+        assert actual.shape == lat.shape
+        for i in (0, 10, len(lat) - 3):
+            for j in range(2):
+                expected = utils.calc_heading_from_two_geo_positions(lat[i, j], lon[i, j], lat[i + 2, j], lon[i + 2, j])
+                assert abs(actual[i, j] - expected) < 1e-8
+        np.testing.assert_array_equal(actual[-2:, 0], actual[-3, 0])
+
+    def test_convert_headings(self):
+        degrees = np.array([0.0, 0, 360, -270, -735, 12.5])
+        expected = [utils.convert_heading(float(d)) for d in degrees]
+        np.testing.assert_array_equal(utils.convert_headings(degrees), expected)
+
+    def test_resample_trajectories(self, df):
+        identity = utils.resample_trajectories(df, 10.0)
+        pd.testing.assert_frame_equal(identity, df, check_dtype=False, check_exact=False, rtol=0, atol=1e-9)
+
+        jittered = df.copy()
+        jittered['timestamp'] = df['timestamp'] + np.tile([0.0, 0.004, -0.003], len(df))[:len(df)]
+        upsampled = utils.resample_trajectories(jittered, 20.0)
+        assert len(upsampled) == 2 * len(df) - 1
+        np.testing.assert_allclose(np.diff(upsampled['timestamp']), 0.05)
+        assert upsampled['class_1'].isin(df['class_1'].dropna().unique()).all()
+        np.testing.assert_allclose(upsampled['speed'].values[::2], df['speed'].values, atol=0.1)
+
+    def test_simplify_trajectory(self):
+        time = np.arange(200) / 10.0
+        x = 20.0 * time
+        y = np.where(time < 10, 0.0, 3.5 * np.sin(np.minimum(time - 10, 4) / 8 * np.pi))
+        actual = utils.simplify_trajectory(time, x, y, 0.05)
+        assert actual[0] == 0 and actual[-1] == 199
+        assert len(actual) < 40
+        np.testing.assert_array_equal(utils.simplify_trajectory(time[:100], x[:100], y[:100], 0.05), [0, 99])
+
+        # Positions interpolated at the original timestamps stay within tolerance
+        x_interp = np.interp(time, time[actual], x[actual])
+        y_interp = np.interp(time, time[actual], y[actual])
+        assert np.max(np.hypot(x - x_interp, y - y_interp)) <= 0.05
+
+    def test_format_float(self):
+        assert utils.format_float(np.float64(0.1) + np.float64(0.2)) == '0.30000000000000004'
+        assert utils.format_float(np.float32(0.5)) == '0.5'
+        assert utils.format_float('2') == '2.0'
+        assert utils.format_float(-0.0) == '0.0'
+
+    def test_compute_content_hash(self, test_data_dir, tmp_path):
+        paths = [os.path.join(test_data_dir, 'testfile_llc.csv'), os.path.join(test_data_dir, 'TestTrack.xodr')]
+        actual = utils.compute_content_hash(paths, {'osc_version': '1.2', 'frame_rate': 10.0})
+        assert actual == utils.compute_content_hash(paths, {'frame_rate': 10, 'osc_version': '1.2'})
+        assert actual != utils.compute_content_hash(paths, {'osc_version': '1.2', 'frame_rate': 20.0})
+        assert actual != utils.compute_content_hash(paths[::-1], {'osc_version': '1.2', 'frame_rate': 10.0})
+
+        scenario_path = str(tmp_path / 'scenario.xosc')
+        assert utils.read_content_hash(scenario_path) is None
+        with open(scenario_path, 'w') as f:
+            f.write('<?xml version="1.0" encoding="utf-8"?>\n' + utils.content_hash_comment(actual) + '\n<a/>\n')
+        assert utils.read_content_hash(scenario_path) == actual